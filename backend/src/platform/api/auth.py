@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import logging
 import os
+import time
+from collections import OrderedDict
 from typing import Optional
 
 import httpx
@@ -14,12 +17,77 @@ logger = logging.getLogger(__name__)
 
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development").lower()
 CONTROL_PLANE_URL = os.getenv("CONTROL_PLANE_URL")
+# Path on the control plane that receives usage counted from cached verdicts.
+CONTROL_PLANE_USAGE_PATH = os.getenv("CONTROL_PLANE_USAGE_PATH", "/usage")
 CONTROL_PLANE_TIMEOUT = float(os.getenv("CONTROL_PLANE_TIMEOUT", "20.0"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60.0"))
+AUTH_CACHE_NEGATIVE_TTL = float(os.getenv("AUTH_CACHE_NEGATIVE_TTL", "10.0"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "5.0"))
+USAGE_FLUSH_SIZE = int(os.getenv("USAGE_FLUSH_SIZE", "500"))
+USAGE_MAX_PENDING = int(os.getenv("USAGE_MAX_PENDING", "10000"))
 
 _http_client: httpx.AsyncClient | None = None
 _http_client_lock = asyncio.Lock()
 
 
+class ValidationCache:
+    """Bounded LRU of control-plane verdicts keyed by API key hash.
+
+    Accepted keys map to their principal for ``ttl`` seconds; rejected keys
+    keep their reason for the shorter ``negative_ttl`` so a revoked or
+    mistyped key cannot hammer the control plane, while a newly issued one
+    starts working quickly.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = AUTH_CACHE_TTL,
+        negative_ttl: float = AUTH_CACHE_NEGATIVE_TTL,
+        max_entries: int = AUTH_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, bool, str]] = OrderedDict()
+
+    def get(self, key_hash: str) -> tuple[bool, str] | None:
+        entry = self._entries.get(key_hash)
+        if entry is None:
+            return None
+        valid_until, accepted, value = entry
+        if valid_until <= time.monotonic():
+            del self._entries[key_hash]
+            return None
+        self._entries.move_to_end(key_hash)
+        return accepted, value
+
+    def put(self, key_hash: str, accepted: bool, value: str) -> None:
+        ttl = self.ttl if accepted else self.negative_ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key_hash] = (time.monotonic() + ttl, accepted, value)
+        self._entries.move_to_end(key_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_validation_cache = ValidationCache()
+_inflight: dict[str, asyncio.Task] = {}
+# (api key hash, action) -> count; raw keys are never held or sent here.
+_pending_usage: dict[tuple[str, str], int] = {}
+_dropped_usage = 0
+_last_usage_flush = time.monotonic()
+_usage_flush_task: asyncio.Task | None = None
+
+
 def is_dev_mode() -> bool:
     """Check if running in development mode."""
     return ENVIRONMENT == "development"
@@ -40,15 +108,17 @@ async def _get_http_client() -> httpx.AsyncClient:
     return _http_client
 
 
-async def validate_with_control_plane(api_key: str, action: str = "api_request") -> str:
-    """
-    Validate API key with control plane and return principal_id.
+def _hash_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
 
-    Every request hits the control plane for use tracking.
 
-    Args:
-        api_key: The API key to validate
-        action: The action being performed ('api_request' or 'environment_created')
+async def _request_validation(api_key: str, action: str) -> tuple[bool, str]:
+    """
+    Ask the control plane about an API key.
+
+    Returns ``(True, user_id)`` or ``(False, reason)`` for definitive
+    answers. Transient failures (timeouts, rate limiting, unexpected
+    statuses) raise so they are never cached.
     """
     if not CONTROL_PLANE_URL:
         raise RuntimeError("CONTROL_PLANE_URL not configured for production mode")
@@ -63,11 +133,11 @@ async def validate_with_control_plane(api_key: str, action: str = "api_request")
         if response.status_code == 200:
             data = response.json()
             if data.get("valid"):
-                return data["user_id"]
+                return True, data["user_id"]
             else:
-                raise PermissionError(data.get("reason", "access denied"))
+                return False, data.get("reason", "access denied")
         elif response.status_code == 401:
-            raise PermissionError("invalid api key")
+            return False, "invalid api key"
         elif response.status_code == 429:
             raise PermissionError("rate limit exceeded")
         else:
@@ -79,6 +149,139 @@ async def validate_with_control_plane(api_key: str, action: str = "api_request")
         raise RuntimeError(f"control plane unavailable: {e}")
 
 
+async def validate_with_control_plane(api_key: str, action: str = "api_request") -> str:
+    """
+    Validate API key with control plane and return principal_id.
+
+    Every call hits the control plane, which also records the use. Only
+    ``api_request`` verdicts are cached: other actions can be refused for
+    reasons, such as quota, that say nothing about plain API access.
+
+    Args:
+        api_key: The API key to validate
+        action: The action being performed ('api_request' or 'environment_created')
+    """
+    accepted, value = await _request_validation(api_key, action)
+    if action == "api_request":
+        _validation_cache.put(_hash_key(api_key), accepted, value)
+    if not accepted:
+        raise PermissionError(value)
+    return value
+
+
+async def _validate_cached(api_key: str, action: str) -> str:
+    """
+    Resolve an API key through the verdict cache.
+
+    Concurrent misses for the same key share a single control-plane call.
+    Requests answered without their own ``/validate`` round trip are
+    counted locally and reported in batches by ``flush_usage``.
+    """
+    key_hash = _hash_key(api_key)
+    cached = _validation_cache.get(key_hash)
+    if cached is None:
+        task = _inflight.get(key_hash)
+        # Only the caller that starts the lookup is counted by /validate.
+        counted = task is None
+        if task is None:
+            task = asyncio.ensure_future(_request_validation(api_key, action))
+            _inflight[key_hash] = task
+            task.add_done_callback(lambda t: _settle_validation(key_hash, t))
+        # Shield so one caller disconnecting does not cancel the others' lookup.
+        accepted, value = await asyncio.shield(task)
+    else:
+        counted = False
+        accepted, value = cached
+
+    if not accepted:
+        raise PermissionError(value)
+    if not counted:
+        _record_usage(key_hash, action)
+    return value
+
+
+def _settle_validation(key_hash: str, task: asyncio.Task) -> None:
+    _inflight.pop(key_hash, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+    accepted, value = task.result()
+    _validation_cache.put(key_hash, accepted, value)
+
+
+def _add_usage(key: tuple[str, str], count: int) -> None:
+    """Add to the pending counts; new keys past USAGE_MAX_PENDING are dropped."""
+    global _dropped_usage
+    if key not in _pending_usage and len(_pending_usage) >= USAGE_MAX_PENDING:
+        _dropped_usage += count
+        return
+    _pending_usage[key] = _pending_usage.get(key, 0) + count
+
+
+def _record_usage(key_hash: str, action: str) -> None:
+    global _usage_flush_task
+    _add_usage((key_hash, action), 1)
+    due = (
+        sum(_pending_usage.values()) >= USAGE_FLUSH_SIZE
+        or time.monotonic() - _last_usage_flush >= USAGE_FLUSH_INTERVAL
+    )
+    if due and (_usage_flush_task is None or _usage_flush_task.done()):
+        _usage_flush_task = asyncio.get_running_loop().create_task(flush_usage())
+
+
+async def flush_usage() -> None:
+    """
+    Report usage counted from cached verdicts to the control plane.
+
+    Sends one ``POST`` to ``CONTROL_PLANE_USAGE_PATH`` with per-key-hash,
+    per-action counts. On any failure the counts are kept (up to
+    ``USAGE_MAX_PENDING`` keys) and merged into the next flush.
+    """
+    global _last_usage_flush, _dropped_usage
+    _last_usage_flush = time.monotonic()
+    if _dropped_usage:
+        logger.warning(
+            "Dropped %d usage events: more than %d keys pending",
+            _dropped_usage,
+            USAGE_MAX_PENDING,
+        )
+        _dropped_usage = 0
+    if not _pending_usage or not CONTROL_PLANE_URL:
+        return
+
+    batch = dict(_pending_usage)
+    _pending_usage.clear()
+    events = [
+        {"api_key_hash": key_hash, "action": action, "count": count}
+        for (key_hash, action), count in batch.items()
+    ]
+    try:
+        client = await _get_http_client()
+        response = await client.post(
+            f"{CONTROL_PLANE_URL}{CONTROL_PLANE_USAGE_PATH}", json={"events": events}
+        )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        # A 4xx usually means the endpoint is missing or misconfigured;
+        # keep the counts so they are reported once it is fixed.
+        log = logger.error if e.response.is_client_error else logger.warning
+        log(
+            "Control plane rejected usage report of %d events: %s",
+            sum(batch.values()),
+            e,
+        )
+        for key, count in batch.items():
+            _add_usage(key, count)
+    except httpx.HTTPError as e:
+        logger.warning(f"Failed to report usage to control plane: {e}")
+        for key, count in batch.items():
+            _add_usage(key, count)
+
+
+def clear_auth_cache() -> None:
+    """Drop all cached verdicts (pending usage counts are kept)."""
+    _validation_cache.clear()
+
+
 async def get_principal_id(api_key: Optional[str], action: str = "api_request") -> str:
     """
     Get the principal (user) ID from API key.
@@ -98,7 +301,11 @@ async def get_principal_id(api_key: Optional[str], action: str = "api_request")
     if api_key.lower().startswith("bearer "):
         clean_key = api_key[7:]  # Remove "Bearer " (7 chars)
 
-    return await validate_with_control_plane(clean_key, action)
+    # Environment creation is quota-checked by the control plane, so it is
+    # never answered from the cache.
+    if action != "api_request":
+        return await validate_with_control_plane(clean_key, action)
+    return await _validate_cached(clean_key, action)
 
 
 def require_resource_access(principal_id: str, owner_id: str) -> None:
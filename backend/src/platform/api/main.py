@@ -10,6 +10,7 @@ from src.platform.evaluationEngine.replication import (
     LogicalReplicationService,
     ReplicationConfig,
 )
+from src.platform.evaluationEngine.retention import SnapshotReaper
 from src.platform.isolationEngine.environment import EnvironmentHandler
 from src.platform.isolationEngine.templateManager import TemplateManager
 from src.platform.isolationEngine.maintenance import (
@@ -20,6 +21,7 @@ from src.platform.testManager.core import CoreTestManager
 from starlette.routing import Router
 from src.platform.api.routes import routes as platform_routes
 from src.platform.api.middleware import IsolationMiddleware, PlatformMiddleware
+from src.platform.api.auth import flush_usage
 from src.services.slack.api.methods import routes as slack_routes
 from src.services.calendar.api import routes as calendar_routes
 from src.services.box.api.routes import routes as box_routes
@@ -46,16 +48,33 @@ def create_app():
         platform_engine = create_engine(
             db_url, pool_size=20, max_overflow=40, pool_pre_ping=True
         )
-    sessions = SessionManager(platform_engine)
-    environment_handler = EnvironmentHandler(session_manager=sessions)
-    pool_manager = PoolManager(sessions)
+    sessions = SessionManager(
+        platform_engine,
+        environment_cache_ttl=float(environ.get("ENVIRONMENT_CACHE_TTL", 5.0)),
+        last_used_flush_interval=float(environ.get("LAST_USED_FLUSH_INTERVAL", 5.0)),
+    )
+    environment_handler = EnvironmentHandler(
+        session_manager=sessions,
+        default_provisioning=environ.get("DEFAULT_PROVISIONING", "migrate").lower(),
+    )
+    pool_manager = PoolManager(
+        sessions, demand_window=float(environ.get("POOL_DEMAND_WINDOW", 600))
+    )
 
     coreIsolationEngine = CoreIsolationEngine(
         sessions=sessions,
         environment_handler=environment_handler,
         pool_manager=pool_manager,
     )
-    coreEvaluationEngine = CoreEvaluationEngine(sessions=sessions)
+    incremental_snapshots = (
+        environ.get("INCREMENTAL_SNAPSHOTS", "false").lower() == "true"
+    )
+    sql_assertions = environ.get("SQL_ASSERTIONS", "false").lower() == "true"
+    coreEvaluationEngine = CoreEvaluationEngine(
+        sessions=sessions,
+        incremental_snapshots=incremental_snapshots,
+        sql_assertions=sql_assertions,
+    )
     coreTestManager = CoreTestManager()
     templateManager = TemplateManager()
 
@@ -73,18 +92,35 @@ def create_app():
             idle_timeout=replication_idle_timeout,
         )
 
+    # Pool sizes per template. With adaptive sizing (the default) these are
+    # upper bounds and each pool follows the template's recent claim rate,
+    # never dropping below POOL_MIN_SIZE; with fixed sizing they are targets.
+    pool_max_size = int(environ.get("POOL_MAX_SIZE", 100))
     raw_targets = environ.get("ENVIRONMENT_POOL_TARGETS")
     if raw_targets:
         pool_targets = parse_pool_targets(raw_targets)
     else:
         with sessions.with_meta_session() as session:
             templates = session.query(TemplateEnvironment.location).all()
-            pool_targets = {location: 100 for (location,) in templates}
+            pool_targets = {location: pool_max_size for (location,) in templates}
+    pool_min_size: int | None = int(environ.get("POOL_MIN_SIZE", 1))
+    if environ.get("POOL_SIZING", "adaptive").lower() == "fixed":
+        pool_min_size = None
 
     # Create on-demand maintenance service (replaces cleanup + pool_refill)
     maintenance_idle_timeout = int(environ.get("MAINTENANCE_IDLE_TIMEOUT", 300))
     maintenance_cycle_interval = int(environ.get("MAINTENANCE_CYCLE_INTERVAL", 10))
     maintenance_concurrency = int(environ.get("POOL_REFILL_CONCURRENCY", 10))
+    # Snapshots of evaluated runs are dropped after this many seconds; a
+    # negative value keeps them until the environment is deleted.
+    snapshot_retention = int(environ.get("SNAPSHOT_RETENTION_SECONDS", 3600))
+    snapshot_reaper = None
+    if snapshot_retention >= 0:
+        snapshot_reaper = SnapshotReaper(
+            session_manager=sessions,
+            retention_seconds=snapshot_retention,
+            batch_size=int(environ.get("SNAPSHOT_REAP_BATCH_SIZE", 50)),
+        )
     maintenance_service = EnvironmentMaintenanceService(
         session_manager=sessions,
         environment_handler=environment_handler,
@@ -94,6 +130,9 @@ def create_app():
         cycle_interval=maintenance_cycle_interval,
         max_concurrent_builds=maintenance_concurrency,
         replication_service=replication_service,
+        snapshot_reaper=snapshot_reaper,
+        snapshot_reap_interval=int(environ.get("SNAPSHOT_REAP_INTERVAL", 300)),
+        pool_min_size=pool_min_size,
     )
 
     app.state.coreIsolationEngine = coreIsolationEngine
@@ -105,11 +144,16 @@ def create_app():
     app.state.pool_manager = pool_manager
     app.state.replication_service = replication_service
     app.state.replication_enabled = replication_enabled
+    # Runs evaluated at once by POST /evaluateRuns.
+    app.state.evaluate_runs_concurrency = int(
+        environ.get("EVALUATE_RUNS_CONCURRENCY", 4)
+    )
 
     app.add_middleware(
         IsolationMiddleware,
         session_manager=sessions,
         core_isolation_engine=coreIsolationEngine,
+        max_threads=int(environ.get("REQUEST_THREAD_POOL_SIZE", 32)),
     )
 
     platform_router = Router(
@@ -144,6 +188,8 @@ def create_app():
         # Stop replication service if running (it's on-demand now)
         if app.state.replication_service:
             app.state.replication_service.stop()
+        sessions.flush_last_used()
+        await flush_usage()
 
     return app
 
@@ -1,18 +1,21 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from starlette.exceptions import HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response, JSONResponse
 from starlette import status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.platform.isolationEngine.session import SessionManager
 from src.platform.isolationEngine.core import CoreIsolationEngine
 from src.platform.api.auth import get_principal_id, is_dev_mode
-from src.platform.db.schema import RunTimeEnvironment
 
 logger = logging.getLogger(__name__)
 
@@ -72,25 +75,80 @@ class PlatformMiddleware(BaseHTTPMiddleware):
             )
 
 
-class IsolationMiddleware(BaseHTTPMiddleware):
+class IsolationMiddleware:
+    """
+    Routes /api/env/{env_id}/... requests to the environment's schema.
+
+    Service handlers are ``async def`` but use synchronous SQLAlchemy
+    sessions, so running them on the event loop lets one slow query stall
+    every other request on the worker. Only authentication runs on the event
+    loop; the meta lookup, the environment session and the service handler
+    run together on a bounded thread pool, each worker thread driving the
+    handler with its own event loop. Response messages are relayed to the
+    main loop as the handler sends them; a response that is not streamed is
+    held until the session has committed, so a failed commit still turns
+    into an error response. The thread pool and its loops are closed when
+    the application shuts down.
+    """
+
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         *,
         session_manager: SessionManager,
         core_isolation_engine: CoreIsolationEngine,
+        max_threads: int = 32,
     ):
-        super().__init__(app)
+        self.app = app
         self.session_manager = session_manager
         self.core_isolation_engine = core_isolation_engine
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_threads, thread_name_prefix="env-request"
+        )
+        self._thread_state = threading.local()
+        self._loops: list[asyncio.AbstractEventLoop] = []
+        self._loops_lock = threading.Lock()
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        path = request.scope.get("path", "")
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.app(scope, receive, self._lifespan_send(send))
+            return
+
+        path = scope.get("path", "")
         # Expected: /api/env/{env_id}/services/{service}/...
-        if not path.startswith("/api/env/"):
-            return await call_next(request)
+        if scope["type"] != "http" or not path.startswith("/api/env/"):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        response = await self.dispatch(request, send)
+        if response is not None:
+            await response(scope, receive, send)
+
+    def shutdown(self) -> None:
+        """Wait for running requests, then close the pool's event loops."""
+        self._executor.shutdown(wait=True)
+        with self._loops_lock:
+            loops, self._loops = self._loops, []
+        for loop in loops:
+            loop.close()
+
+    def _lifespan_send(self, send: Send) -> Send:
+        async def lifespan_send(message: Message) -> None:
+            if message["type"] in (
+                "lifespan.shutdown.complete",
+                "lifespan.shutdown.failed",
+            ):
+                await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+            await send(message)
+
+        return lifespan_send
 
+    async def dispatch(self, request: Request, send: Send) -> Response | None:
+        """Handle ``request``; returns None once the handler's response is sent."""
+        path = request.scope.get("path", "")
         t_total_start = time.perf_counter()
+        relay: _ResponseRelay | None = None
 
         try:
             path_after_prefix = path[len("/api/env/") :]
@@ -128,32 +186,20 @@ class IsolationMiddleware(BaseHTTPMiddleware):
                 principal_id = "dev-user"
             t_auth_ms = (time.perf_counter() - t_auth_start) * 1000
 
-            t_meta_start = time.perf_counter()
-            with self.session_manager.with_meta_session() as meta_session:
-                request.state.principal_id = principal_id
+            # Read the body here; the handler thread receives it from the
+            # relay and only waits on the connection for a disconnect.
+            body = await request.body()
 
-                try:
-                    env_uuid = self.session_manager._to_uuid(env_id)
-                    env = (
-                        meta_session.query(RunTimeEnvironment)
-                        .filter(RunTimeEnvironment.id == env_uuid)
-                        .one_or_none()
-                    )
-                    if env is not None:
-                        request.state.impersonate_user_id = env.impersonate_user_id
-                        request.state.impersonate_email = env.impersonate_email
-                except (ValueError, TypeError) as e:
-                    logger.debug(
-                        f"Could not load impersonation data for env {env_id}: {e}"
-                    )
-            t_meta_ms = (time.perf_counter() - t_meta_start) * 1000
-
-            t_handler_start = time.perf_counter()
-            with self.session_manager.with_session_for_environment(env_id) as session:
-                request.state.db_session = session
-                request.state.environment_id = env_id
-                response = await call_next(request)
-            t_handler_ms = (time.perf_counter() - t_handler_start) * 1000
+            loop = asyncio.get_running_loop()
+            relay = _ResponseRelay(loop, request.receive, send, body)
+            t_meta_ms, t_handler_ms = await loop.run_in_executor(
+                self._executor,
+                self._handle_in_thread,
+                request.scope,
+                relay,
+                env_id,
+                principal_id,
+            )
 
             t_total_ms = (time.perf_counter() - t_total_start) * 1000
             # Extract service from path for easier log filtering
@@ -163,24 +209,122 @@ class IsolationMiddleware(BaseHTTPMiddleware):
                 f"[PERF] {request.method} {path} | service={service_name} "
                 f"total={t_total_ms:.0f}ms auth={t_auth_ms:.0f}ms "
                 f"meta_db={t_meta_ms:.0f}ms handler={t_handler_ms:.0f}ms "
-                f"status={response.status_code}"
+                f"status={relay.status_code}"
             )
-            return response
+            return None
 
-        except PermissionError as exc:
-            return JSONResponse(
-                {"ok": False, "error": str(exc)},
-                status_code=status.HTTP_401_UNAUTHORIZED,
-            )
-        except RuntimeError as exc:
-            logger.error(f"Control plane error: {exc}")
-            return JSONResponse(
-                {"ok": False, "error": str(exc)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
-        except Exception:
+        except Exception as exc:
+            if relay is not None and relay.started:
+                # Headers are already on the wire; all that is left is to
+                # abort the connection.
+                logger.exception("IsolationMiddleware failed mid-response")
+                raise
+            if isinstance(exc, PermissionError):
+                return JSONResponse(
+                    {"ok": False, "error": str(exc)},
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                )
+            if isinstance(exc, RuntimeError):
+                logger.error(f"Control plane error: {exc}")
+                return JSONResponse(
+                    {"ok": False, "error": str(exc)},
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
             logger.exception("Unhandled exception in IsolationMiddleware")
             return JSONResponse(
                 {"ok": False, "error": "internal_error"},
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+    def _handle_in_thread(
+        self, scope: Scope, relay: _ResponseRelay, env_id: str, principal_id: str
+    ) -> tuple[float, float]:
+        loop = getattr(self._thread_state, "loop", None)
+        if loop is None:
+            loop = self._thread_state.loop = asyncio.new_event_loop()
+            with self._loops_lock:
+                self._loops.append(loop)
+        return loop.run_until_complete(
+            self._handle(scope, relay, env_id, principal_id)
+        )
+
+    async def _handle(
+        self, scope: Scope, relay: _ResponseRelay, env_id: str, principal_id: str
+    ) -> tuple[float, float]:
+        request = Request(scope)
+        request.state.principal_id = principal_id
+        t_meta_start = time.perf_counter()
+        # Cached for a few seconds; with_session_for_environment below
+        # resolves the same entry without another query.
+        env = self.session_manager.resolve_environment(env_id)
+        request.state.impersonate_user_id = env.impersonate_user_id
+        request.state.impersonate_email = env.impersonate_email
+        t_meta_ms = (time.perf_counter() - t_meta_start) * 1000
+
+        t_handler_start = time.perf_counter()
+        with self.session_manager.with_session_for_environment(env_id) as session:
+            request.state.db_session = session
+            request.state.environment_id = env_id
+            await self.app(scope, relay.receive, relay.send)
+        await relay.finish()
+        t_handler_ms = (time.perf_counter() - t_handler_start) * 1000
+        return t_meta_ms, t_handler_ms
+
+
+class _ResponseRelay:
+    """Carries one request's ASGI messages between a handler thread's loop
+    and the server's loop.
+
+    ``http.response.start`` and a body sent in one message are held until
+    ``finish``; once the handler sends a chunk with ``more_body`` the
+    response is streaming and every message is forwarded as it arrives.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        receive: Receive,
+        send: Send,
+        body: bytes,
+    ):
+        self._loop = loop
+        self._receive = receive
+        self._send = send
+        self._body: bytes | None = body
+        self._held: list[Message] = []
+        self.started = False
+        self.status_code: int | None = None
+
+    async def receive(self) -> Message:
+        if self._body is not None:
+            body, self._body = self._body, None
+            return {"type": "http.request", "body": body, "more_body": False}
+        # The request body has been read, so the server's next message is
+        # http.disconnect once the client goes away or the response is done.
+        return await self._on_server_loop(self._receive())
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.status_code = message["status"]
+        if self.started:
+            await self._on_server_loop(self._send(message))
+            return
+        self._held.append(message)
+        if message["type"] == "http.response.body" and message.get("more_body"):
+            await self._flush()
+
+    async def finish(self) -> None:
+        if not self._held and not self.started:
+            raise RuntimeError("No response returned.")
+        await self._flush()
+
+    async def _flush(self) -> None:
+        held, self._held = self._held, []
+        if held:
+            self.started = True
+        for message in held:
+            await self._on_server_loop(self._send(message))
+
+    async def _on_server_loop(self, coro):
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return await asyncio.wrap_future(future)
@@ -20,6 +20,11 @@ class Visibility(str, Enum):
     private = "private"
 
 
+class Provisioning(str, Enum):
+    migrate = "migrate"
+    clone = "clone"
+
+
 class APIError(BaseModel):
     detail: str
 
@@ -176,16 +181,41 @@ class EndRunResponse(BaseModel):
     score: Any
 
 
+class EvaluateRunsRequest(BaseModel):
+    runIds: List[str]
+
+
+class EvaluateRunsResult(EndRunResponse):
+    """One NDJSON line of ``POST /evaluateRuns``."""
+
+    # Set when the run could not be evaluated at all (unknown id, no access).
+    error: Optional[str] = None
+
+
 class TestResultResponse(BaseModel):
     runId: str
     status: str
     passed: bool
     score: Any
     failures: List[str]
-    diff: Any
+    # Row counts per table; the rows themselves only with ?expand=diff.
+    diffSummary: Any = None
+    diff: Any = None
     createdAt: datetime
 
 
+class RunDiffResponse(BaseModel):
+    runId: str
+    summary: Any
+    inserts: List[dict[str, Any]]
+    updates: List[dict[str, Any]]
+    deletes: List[dict[str, Any]]
+    offset: int
+    limit: int
+    total: int
+    nextOffset: Optional[int] = None
+
+
 class DiffRunRequest(BaseModel):
     runId: Optional[str] = None
     envId: Optional[str] = None
@@ -214,6 +244,8 @@ class CreateTemplateFromEnvRequest(BaseModel):
     description: Optional[str] = None
     visibility: "Visibility" = Visibility.private
     version: str = "v1"  # optional
+    # How environments are built from the template; server default if unset.
+    provisioning: Optional["Provisioning"] = None
 
 
 class CreateTemplateFromEnvResponse(BaseModel):
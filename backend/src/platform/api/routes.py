@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
 from datetime import datetime
 import time
 
+from sqlalchemy.orm import Session
 from starlette import status
+from starlette.background import BackgroundTask
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, StreamingResponse
 from starlette.routing import Route
 
 from src.platform.api.models import (
@@ -21,7 +24,10 @@ from src.platform.api.models import (
     StartRunResponse,
     EndRunRequest,
     EndRunResponse,
+    EvaluateRunsRequest,
+    EvaluateRunsResult,
     TestResultResponse,
+    RunDiffResponse,
     DiffRunRequest,
     DiffRunResponse,
     DeleteEnvResponse,
@@ -49,6 +55,12 @@ from src.platform.db.schema import (
 )
 from src.platform.evaluationEngine.core import CoreEvaluationEngine
 from src.platform.evaluationEngine.differ import Differ
+from src.platform.evaluationEngine.diff_store import (
+    CHANGE_TYPES,
+    DiffStore,
+    paginate,
+    summarize,
+)
 from src.platform.evaluationEngine.models import DiffResult
 from src.platform.isolationEngine.core import CoreIsolationEngine
 from src.platform.testManager.core import CoreTestManager
@@ -69,6 +81,10 @@ from src.platform.api.errors import (
 
 logger = logging.getLogger(__name__)
 
+MAX_EVALUATE_RUNS = 500
+DIFF_PAGE_SIZE = 500
+MAX_DIFF_PAGE_SIZE = 5000
+
 
 def _principal_id_from_request(request: Request) -> str:
     """Extract principal_id from request state."""
@@ -181,6 +197,7 @@ async def create_template_from_environment(request: Request) -> JSONResponse:
             visibility=payload.visibility.value,
             owner_id=principal_id,
             version=payload.version or "v1",
+            provisioning=payload.provisioning.value if payload.provisioning else None,
         )
     except ValueError as e:
         logger.warning(f"Template creation failed: {e}")
@@ -632,54 +649,133 @@ async def start_run(request: Request) -> JSONResponse:
     )
 
 
-async def evaluate_run(request: Request) -> JSONResponse:
-    maintenance = getattr(request.app.state, "maintenance_service", None)
-    if maintenance:
-        await maintenance.trigger()
-
-    try:
-        body = await parse_request_body(request, EndRunRequest)
-    except ValueError as e:
-        return bad_request(str(e))
-
-    session = request.state.db_session
-    try:
-        principal_id = _principal_id_from_request(request)
-    except PermissionError:
-        return unauthorized()
-
-    run_uuid = parse_uuid(body.runId)
-    if run_uuid is None:
-        return bad_request("invalid run id")
-
+def _compute_run_diff(
+    core_eval: CoreEvaluationEngine,
+    run: TestRun,
+    rte: RunTimeEnvironment,
+    *,
+    use_journal: bool,
+    after_suffix: str,
+) -> DiffResult:
+    """Compute a run's diff, store it and point ``run.diff_id`` at it. Blocking."""
+    diff_timer = time.perf_counter()
+    if use_journal:
+        diff_payload = core_eval.compute_diff_from_journal(
+            environment_id=str(run.environment_id),
+            run_id=str(run.id),
+            schema=rte.schema,
+        )
+    else:
+        if run.before_snapshot_suffix is None:
+            raise ValueError("before snapshot missing")
+        diff_payload = core_eval.compute_diff(
+            schema=rte.schema,
+            environment_id=str(run.environment_id),
+            before_suffix=run.before_snapshot_suffix,
+            after_suffix=after_suffix,
+        )
+    logger.info(
+        "evaluate_run diff for run %s (env %s) took %.2fs",
+        run.id,
+        run.environment_id,
+        time.perf_counter() - diff_timer,
+    )
+    logger.debug(f"Diff payload: {diff_payload}")
+    differ = Differ(
+        schema=rte.schema,
+        environment_id=str(run.environment_id),
+        session_manager=core_eval.sessions,
+    )
+    run.diff_id = differ.store_diff(
+        diff_payload,
+        before_suffix=run.before_snapshot_suffix or "journal",
+        after_suffix=after_suffix,
+    )
+    return diff_payload
+
+
+async def _ensure_run_diff(
+    core_eval: CoreEvaluationEngine, session: Session, run: TestRun
+) -> None:
+    """Build and store the diff of a run evaluated with SQL assertions."""
+    if (
+        run.diff_id is not None
+        or run.result is None
+        or "diff" in run.result
+        or run.status not in ("passed", "failed")
+        or not run.before_snapshot_suffix
+        or not run.after_snapshot_suffix
+    ):
+        return
+    rte = (
+        session.query(RunTimeEnvironment)
+        .filter(RunTimeEnvironment.id == run.environment_id)
+        .one_or_none()
+    )
+    if rte is None:
+        return
     try:
-        run = require_run_access(session, principal_id, str(run_uuid))
-    except ValueError as e:
-        return not_found(str(e))
-    except PermissionError:
-        logger.warning(f"Unauthorized run access in end_run: run_id={body.runId}")
-        return unauthorized()
-
-    core_eval: CoreEvaluationEngine = request.app.state.coreEvaluationEngine
+        await asyncio.to_thread(
+            _compute_run_diff,
+            core_eval,
+            run,
+            rte,
+            use_journal=False,
+            after_suffix=run.after_snapshot_suffix,
+        )
+    except Exception as exc:
+        logger.warning(f"Could not build diff for run {run.id}: {exc}")
+
+
+def _compile_run_spec(
+    core_eval: CoreEvaluationEngine,
+    session: Session,
+    run: TestRun,
+    expected_output: dict | None,
+) -> dict:
+    """Compile the assertions a run is evaluated against."""
+    # Compiling normalizes predicates (e.g., "to": true -> "to": {"eq": true})
+    if expected_output:
+        logger.debug(f"Using expectedOutput from request: {expected_output}")
+        return core_eval.compile(expected_output)
+    if not run.test_id:
+        # No assertions - return empty evaluation
+        logger.debug("No expectedOutput or test_id - using empty assertions")
+        return core_eval.compile({"assertions": []})
+
+    test_obj = session.query(Test).filter(Test.id == run.test_id).one()
+    logger.debug(f"Using expected_output from test: {test_obj.name}")
+    return core_eval.compile(test_obj.expected_output)
+
+
+def _evaluate_run(
+    core_eval: CoreEvaluationEngine,
+    session: Session,
+    run: TestRun,
+    *,
+    expected_output: dict | None,
+    replication_service=None,
+    replication_enabled: bool = False,
+) -> EndRunResponse:
+    """Take the after snapshot, evaluate the run and record its result. Blocking."""
     rte = (
         session.query(RunTimeEnvironment)
         .filter(RunTimeEnvironment.id == run.environment_id)
         .one()
     )
 
-    replication_service = getattr(request.app.state, "replication_service", None)
-    replication_enabled = bool(getattr(request.app.state, "replication_enabled", False))
     use_journal = bool(replication_enabled and run.replication_slot)
     after_suffix = "journal"
     if not use_journal:
         after_suffix = core_eval.take_after(
-            schema=rte.schema, environment_id=str(run.environment_id)
+            schema=rte.schema,
+            environment_id=str(run.environment_id),
+            base_suffix=run.before_snapshot_suffix,
         ).suffix
 
     if replication_service and run.replication_slot:
         try:
-            await asyncio.to_thread(
-                replication_service.stop_stream,
+            replication_service.stop_stream(
                 environment_id=run.environment_id,
                 run_id=run.id,
                 target_schema=rte.schema,
@@ -689,63 +785,36 @@ async def evaluate_run(request: Request) -> JSONResponse:
                 "Failed to stop replication for run %s: %s", run.id, exc, exc_info=True
             )
 
-    diff_payload: DiffResult | None = None
     try:
-        diff_timer = time.perf_counter()
-        if use_journal:
-            diff_payload = await asyncio.to_thread(
-                core_eval.compute_diff_from_journal,
-                environment_id=str(run.environment_id),
-                run_id=str(run.id),
-            )
-        else:
+        compiled_spec = _compile_run_spec(core_eval, session, run, expected_output)
+
+        if not use_journal and core_eval.sql_assertions:
+            # Count matches in the snapshot tables; the diff itself is only
+            # built if a client asks for the run's results.
             if run.before_snapshot_suffix is None:
                 raise ValueError("before snapshot missing")
-            diff_payload = await asyncio.to_thread(
-                core_eval.compute_diff,
+            eval_timer = time.perf_counter()
+            evaluation = core_eval.evaluate_snapshots(
+                compiled_spec=compiled_spec,
                 schema=rte.schema,
                 environment_id=str(run.environment_id),
                 before_suffix=run.before_snapshot_suffix,
                 after_suffix=after_suffix,
             )
-        logger.info(
-            "evaluate_run diff for run %s (env %s) took %.2fs",
-            run.id,
-            run.environment_id,
-            time.perf_counter() - diff_timer,
-        )
-        logger.debug(f"Diff payload: {diff_payload}")
-        differ = Differ(
-            schema=rte.schema,
-            environment_id=str(run.environment_id),
-            session_manager=request.app.state.sessions,
-        )
-        logger.debug(f"Differ: {differ}")
-        await asyncio.to_thread(
-            differ.store_diff,
-            diff_payload,
-            before_suffix=run.before_snapshot_suffix or "journal",
-            after_suffix=after_suffix,
-        )
-        if body.expectedOutput:
-            raw_spec = body.expectedOutput
-            logger.debug(f"Using expectedOutput from request: {raw_spec}")
-        elif run.test_id:
-            test_obj = session.query(Test).filter(Test.id == run.test_id).one()
-            raw_spec = test_obj.expected_output
-            logger.debug(f"Using expected_output from test: {test_obj.name}")
+            logger.info(
+                "evaluate_run SQL assertions for run %s (env %s) took %.2fs",
+                run.id,
+                run.environment_id,
+                time.perf_counter() - eval_timer,
+            )
         else:
-            # No assertions - return empty evaluation
-            raw_spec = {"assertions": []}
-            logger.debug("No expectedOutput or test_id - using empty assertions")
-
-        # Compile the spec to normalize predicates (e.g., "to": true -> "to": {"eq": true})
-        compiled_spec = core_eval.compile(raw_spec)
-
-        evaluation = core_eval.evaluate(
-            compiled_spec=compiled_spec,
-            diff=diff_payload,
-        )
+            diff_payload = _compute_run_diff(
+                core_eval, run, rte, use_journal=use_journal, after_suffix=after_suffix
+            )
+            evaluation = core_eval.evaluate(
+                compiled_spec=compiled_spec,
+                diff=diff_payload,
+            )
         logger.debug(f"Evaluation: {evaluation}")
         run.status = "passed" if evaluation.get("passed") else "failed"
         logger.info(f"Test run {run.id} completed with status {run.status}")
@@ -759,22 +828,173 @@ async def evaluate_run(request: Request) -> JSONResponse:
                 f"Runtime error during evaluation: {exc.__class__.__name__}: {exc}"
             ],
         }
-    if diff_payload is not None:
-        evaluation.setdefault("diff", diff_payload.model_dump(mode="json"))
     run.result = evaluation
     run.after_snapshot_suffix = after_suffix
     run.updated_at = datetime.now()
 
-    response = EndRunResponse(
+    return EndRunResponse(
         runId=str(run.id),
         status=run.status,
         passed=bool(evaluation.get("passed")),
         score=evaluation.get("score"),
     )
+
+
+async def evaluate_run(request: Request) -> JSONResponse:
+    maintenance = getattr(request.app.state, "maintenance_service", None)
+    if maintenance:
+        await maintenance.trigger()
+
+    try:
+        body = await parse_request_body(request, EndRunRequest)
+    except ValueError as e:
+        return bad_request(str(e))
+
+    session = request.state.db_session
+    try:
+        principal_id = _principal_id_from_request(request)
+    except PermissionError:
+        return unauthorized()
+
+    run_uuid = parse_uuid(body.runId)
+    if run_uuid is None:
+        return bad_request("invalid run id")
+
+    try:
+        run = require_run_access(session, principal_id, str(run_uuid))
+    except ValueError as e:
+        return not_found(str(e))
+    except PermissionError:
+        logger.warning(f"Unauthorized run access in end_run: run_id={body.runId}")
+        return unauthorized()
+
+    core_eval: CoreEvaluationEngine = request.app.state.coreEvaluationEngine
+    response = await asyncio.to_thread(
+        _evaluate_run,
+        core_eval,
+        session,
+        run,
+        expected_output=body.expectedOutput,
+        replication_service=getattr(request.app.state, "replication_service", None),
+        replication_enabled=bool(
+            getattr(request.app.state, "replication_enabled", False)
+        ),
+    )
     logger.debug(f"EndRunResponse: {response}")
     return JSONResponse(response.model_dump(mode="json"))
 
 
+async def evaluate_runs(request: Request) -> JSONResponse | StreamingResponse:
+    """Evaluate many runs at once, streaming one NDJSON result per run.
+
+    Runs are evaluated concurrently on worker threads, at most
+    ``evaluate_runs_concurrency`` at a time, each in its own session; results
+    are written in completion order. Runs of the same test share one
+    compiled spec through the compiler's cache.
+    """
+    maintenance = getattr(request.app.state, "maintenance_service", None)
+    if maintenance:
+        await maintenance.trigger()
+
+    try:
+        body = await parse_request_body(request, EvaluateRunsRequest)
+    except ValueError as e:
+        return bad_request(str(e))
+    run_ids = list(dict.fromkeys(body.runIds))
+    if not run_ids:
+        return bad_request("runIds must not be empty")
+    if len(run_ids) > MAX_EVALUATE_RUNS:
+        return bad_request(f"at most {MAX_EVALUATE_RUNS} runs per request")
+
+    session = request.state.db_session
+    try:
+        principal_id = _principal_id_from_request(request)
+    except PermissionError:
+        return unauthorized()
+
+    def check_access() -> tuple[list[str], list[EvaluateRunsResult]]:
+        accepted: list[str] = []
+        rejected: list[EvaluateRunsResult] = []
+        for run_id in run_ids:
+            run_uuid = parse_uuid(run_id)
+            error = None
+            if run_uuid is None:
+                error = "invalid run id"
+            else:
+                try:
+                    require_run_access(session, principal_id, str(run_uuid))
+                    accepted.append(str(run_uuid))
+                except ValueError as e:
+                    error = str(e)
+                except PermissionError:
+                    logger.warning(
+                        f"Unauthorized run access in evaluate_runs: run_id={run_id}"
+                    )
+                    error = "unauthorized"
+            if error is not None:
+                rejected.append(
+                    EvaluateRunsResult(
+                        runId=run_id,
+                        status="error",
+                        passed=False,
+                        score=None,
+                        error=error,
+                    )
+                )
+        return accepted, rejected
+
+    accepted, rejected = await asyncio.to_thread(check_access)
+
+    core_eval: CoreEvaluationEngine = request.app.state.coreEvaluationEngine
+    replication_service = getattr(request.app.state, "replication_service", None)
+    replication_enabled = bool(getattr(request.app.state, "replication_enabled", False))
+    workers = asyncio.Semaphore(
+        max(1, getattr(request.app.state, "evaluate_runs_concurrency", 4))
+    )
+
+    def evaluate(run_id: str) -> EvaluateRunsResult:
+        with core_eval.sessions.with_meta_session() as run_session:
+            run = run_session.get(TestRun, run_id)
+            response = _evaluate_run(
+                core_eval,
+                run_session,
+                run,
+                expected_output=None,
+                replication_service=replication_service,
+                replication_enabled=replication_enabled,
+            )
+        return EvaluateRunsResult(**response.model_dump())
+
+    async def evaluate_bounded(run_id: str) -> EvaluateRunsResult:
+        async with workers:
+            try:
+                return await asyncio.to_thread(evaluate, run_id)
+            except Exception as exc:
+                logger.error(f"Test run {run_id} could not be evaluated: {exc}")
+                return EvaluateRunsResult(
+                    runId=run_id,
+                    status="error",
+                    passed=False,
+                    score=None,
+                    error=f"{exc.__class__.__name__}: {exc}",
+                )
+
+    async def results():
+        for result in rejected:
+            yield json.dumps(result.model_dump(mode="json")) + "\n"
+        tasks = [asyncio.create_task(evaluate_bounded(run_id)) for run_id in accepted]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                yield json.dumps(result.model_dump(mode="json")) + "\n"
+        finally:
+            # Client went away: runs not yet started are skipped.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 async def get_run_result(request: Request) -> JSONResponse:
     run_id = request.path_params["run_id"]
     session = request.state.db_session
@@ -795,18 +1015,118 @@ async def get_run_result(request: Request) -> JSONResponse:
         logger.warning(f"Unauthorized run access in get_run_result: run_id={run_id}")
         return unauthorized()
 
+    expand_param = request.query_params.get("expand", "")
+    include_diff = "diff" in {p.strip() for p in expand_param.split(",") if p}
+
+    core_eval: CoreEvaluationEngine = request.app.state.coreEvaluationEngine
+    # Runs evaluated with SQL assertions store no diff; build it on demand.
+    await _ensure_run_diff(core_eval, session, run)
+
+    diff_summary = None
+    diff = None
+    legacy_diff = run.result.get("diff") if run.result else None
+    if run.diff_id is not None:
+        store = DiffStore(core_eval.sessions)
+        if include_diff:
+            stored = await asyncio.to_thread(store.load, run.diff_id)
+            diff = stored.model_dump(mode="json") if stored else None
+        diff_summary = await asyncio.to_thread(store.summary, run.diff_id)
+    elif legacy_diff is not None:
+        diff_summary = summarize(legacy_diff)
+        diff = legacy_diff if include_diff else None
+
     payload = TestResultResponse(
         runId=str(run.id),
         status=run.status,
         passed=bool(run.result.get("passed") if run.result else False),
         score=run.result.get("score") if run.result else None,
         failures=run.result.get("failures", []) if run.result else [],
-        diff=run.result.get("diff") if run.result else None,
+        diffSummary=diff_summary,
+        diff=diff,
         createdAt=run.created_at,
     )
     return JSONResponse(payload.model_dump(mode="json"))
 
 
+def _csv_param(request: Request, name: str) -> set[str] | None:
+    raw = request.query_params.get(name, "")
+    values = {p.strip() for p in raw.split(",") if p.strip()}
+    return values or None
+
+
+async def get_run_diff(request: Request) -> JSONResponse:
+    run_id = request.path_params["run_id"]
+    session = request.state.db_session
+    try:
+        principal_id = _principal_id_from_request(request)
+    except PermissionError:
+        return unauthorized()
+
+    run_uuid = parse_uuid(run_id)
+    if run_uuid is None:
+        return bad_request("invalid run id")
+
+    tables = _csv_param(request, "table")
+    change_types = _csv_param(request, "type")
+    if change_types and not change_types <= set(CHANGE_TYPES):
+        return bad_request(f"type must be one of: {', '.join(CHANGE_TYPES)}")
+    try:
+        offset = int(request.query_params.get("offset", 0))
+        limit = int(request.query_params.get("limit", DIFF_PAGE_SIZE))
+    except ValueError:
+        return bad_request("offset and limit must be integers")
+    if offset < 0 or not 1 <= limit <= MAX_DIFF_PAGE_SIZE:
+        return bad_request(
+            f"offset must be >= 0 and limit between 1 and {MAX_DIFF_PAGE_SIZE}"
+        )
+
+    try:
+        run = require_run_access(session, principal_id, str(run_uuid))
+    except ValueError as e:
+        return not_found(str(e))
+    except PermissionError:
+        logger.warning(f"Unauthorized run access in get_run_diff: run_id={run_id}")
+        return unauthorized()
+
+    core_eval: CoreEvaluationEngine = request.app.state.coreEvaluationEngine
+    await _ensure_run_diff(core_eval, session, run)
+
+    page = None
+    legacy_diff = run.result.get("diff") if run.result else None
+    if run.diff_id is not None:
+        page = await asyncio.to_thread(
+            DiffStore(core_eval.sessions).page,
+            run.diff_id,
+            tables=tables,
+            change_types=change_types,
+            offset=offset,
+            limit=limit,
+        )
+    elif legacy_diff is not None:
+        page = paginate(
+            legacy_diff,
+            tables=tables,
+            change_types=change_types,
+            offset=offset,
+            limit=limit,
+        )
+    if page is None:
+        return not_found("run has no diff")
+
+    payload = RunDiffResponse(
+        runId=str(run.id),
+        summary=page.summary,
+        inserts=page.inserts,
+        updates=page.updates,
+        deletes=page.deletes,
+        offset=page.offset,
+        limit=page.limit,
+        total=page.total,
+        nextOffset=page.next_offset,
+    )
+    return JSONResponse(payload.model_dump(mode="json"))
+
+
 async def diff_run(request: Request) -> JSONResponse:
     try:
         body = await parse_request_body(request, DiffRunRequest)
@@ -869,6 +1189,7 @@ async def diff_run(request: Request) -> JSONResponse:
             core_eval.compute_diff_from_journal,
             environment_id=str(run.environment_id),
             run_id=str(run.id),
+            schema=env.schema,
         )
         before_suffix = None  # Not applicable for journal
         after_suffix = None  # Not applicable for journal
@@ -877,7 +1198,9 @@ async def diff_run(request: Request) -> JSONResponse:
         if before_suffix is None:
             return bad_request("before snapshot missing for run")
         snapshot_timer = time.perf_counter()
-        after = core_eval.take_after(schema=env.schema, environment_id=str(env.id))
+        after = core_eval.take_after(
+            schema=env.schema, environment_id=str(env.id), base_suffix=before_suffix
+        )
         snapshot_duration = time.perf_counter() - snapshot_timer
         logger.info("diff_run take_after for env %s: %.2fs", env.id, snapshot_duration)
         after_suffix = after.suffix
@@ -929,11 +1252,22 @@ async def delete_environment(request: Request) -> JSONResponse:
         return unauthorized()
 
     core: CoreIsolationEngine = request.app.state.coreIsolationEngine
-    core.environment_handler.drop_schema(env.schema)
     core.environment_handler.mark_environment_status(env_id, "deleted")
 
+    # The schema is released after the response is sent: pooled schemas go
+    # back to the pool for the maintenance loop to recycle, others are
+    # dropped on a worker thread.
+    if maintenance:
+        teardown = BackgroundTask(maintenance.release_environment, env.id, env.schema)
+    else:
+        teardown = BackgroundTask(core.environment_handler.drop_schema, env.schema)
+
     response = DeleteEnvResponse(environmentId=str(env_id), status="deleted")
-    return JSONResponse(response.model_dump(mode="json"))
+    return JSONResponse(
+        response.model_dump(mode="json"),
+        status_code=status.HTTP_202_ACCEPTED,
+        background=teardown,
+    )
 
 
 async def health_check(request: Request) -> JSONResponse:
@@ -947,8 +1281,21 @@ async def health_check(request: Request) -> JSONResponse:
     )
 
 
+async def pool_stats(request: Request) -> JSONResponse:
+    try:
+        _principal_id_from_request(request)
+    except PermissionError:
+        return unauthorized()
+    maintenance = getattr(request.app.state, "maintenance_service", None)
+    if maintenance is None:
+        return JSONResponse({"templates": {}})
+    status_by_template = await asyncio.to_thread(maintenance.pool_status)
+    return JSONResponse({"templates": status_by_template})
+
+
 routes = [
     Route("/health", health_check, methods=["GET"]),
+    Route("/poolStats", pool_stats, methods=["GET"]),
     Route("/testSuites", list_test_suites, methods=["GET"]),
     Route("/testSuites", create_test_suite, methods=["POST"]),
     Route("/testSuites/{suite_id}", get_test_suite, methods=["GET"]),
@@ -963,7 +1310,9 @@ routes = [
     Route("/initEnv", init_environment, methods=["POST"]),
     Route("/startRun", start_run, methods=["POST"]),
     Route("/evaluateRun", evaluate_run, methods=["POST"]),
+    Route("/evaluateRuns", evaluate_runs, methods=["POST"]),
     Route("/results/{run_id}", get_run_result, methods=["GET"]),
+    Route("/results/{run_id}/diff", get_run_diff, methods=["GET"]),
     Route("/diffRun", diff_run, methods=["POST"]),
     Route("/env/{env_id}", delete_environment, methods=["DELETE"]),
     Route("/tests/{test_id}", get_test, methods=["GET"]),
@@ -0,0 +1,91 @@
+"""slack messages keyset pagination indexes
+
+Revision ID: a4d8e2c6f0b3
+Revises: f2c6a8d4b1e9
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+revision: str = "a4d8e2c6f0b3"
+down_revision: Union[str, None] = "f2c6a8d4b1e9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Kept in sync with the Index definitions on the Slack Message model.
+INDEXES = {
+    "ix_messages_channel_ts": (
+        "(channel_id, (CAST(message_id AS double precision)), message_id) "
+        r"WHERE message_id ~ '^[0-9]+(\.[0-9]+)?$'"
+    ),
+    "ix_messages_channel_parent_created": "(channel_id, parent_id, created_at)",
+}
+
+
+def _fetch_slack_schemas(conn) -> list[str]:
+    """Fetch all Slack-related schemas (templates and runtime environments)."""
+    result = conn.execute(
+        text(
+            """
+            SELECT schema_name
+            FROM information_schema.schemata
+            WHERE schema_name LIKE 'slack_%'
+               OR schema_name LIKE 'state_pool_%'
+            """
+        )
+    )
+    return [row[0] for row in result]
+
+
+def _table_exists(conn, schema: str, table: str) -> bool:
+    result = conn.execute(
+        text(
+            """
+            SELECT 1
+            FROM information_schema.tables
+            WHERE table_schema = :schema
+              AND table_name = :table
+            """
+        ),
+        {"schema": schema, "table": table},
+    )
+    return result.scalar() is not None
+
+
+def _quote_ident(ident: str) -> str:
+    """Quote a PostgreSQL identifier, escaping internal double quotes."""
+    return '"' + ident.replace('"', '""') + '"'
+
+
+def upgrade() -> None:
+    """Index messages for conversations.history / conversations.replies paging.
+
+    History pages newest-first by the numeric message ts within a channel and
+    threads walk replies by created_at; both now page with keyset cursors that
+    these indexes turn into range scans.
+    """
+    conn = op.get_bind()
+    for schema in _fetch_slack_schemas(conn):
+        if not _table_exists(conn, schema, "messages"):
+            continue
+        schema_q = _quote_ident(schema)
+        for name, definition in INDEXES.items():
+            conn.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS {name} "
+                    f'ON {schema_q}."messages" {definition}'
+                )
+            )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for schema in _fetch_slack_schemas(conn):
+        schema_q = _quote_ident(schema)
+        for name in INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {schema_q}.{name}"))
@@ -0,0 +1,86 @@
+"""Record table writes once per transaction
+
+Replaces ``public.table_write_counters`` (one row per table, upserted by every
+write statement) with ``public.table_writes``, which gets one row per table
+and writing transaction. Concurrent writers to the same table no longer
+queue on a shared counter row; a table's write count is the number of its
+rows.
+
+Existing ``snapshot_metadata.write_count`` values were taken from the old
+counters and cannot be compared with the new counts, so they are cleared and
+the next snapshot of each table is a full copy.
+
+Revision ID: b3f7d9a1c5e2
+Revises: a4d8e2c6f0b3
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b3f7d9a1c5e2"
+down_revision: Union[str, None] = "a4d8e2c6f0b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "table_writes",
+        sa.Column("schema_name", sa.String(length=255), primary_key=True),
+        sa.Column("table_name", sa.String(length=255), primary_key=True),
+        sa.Column("txid", sa.BigInteger(), primary_key=True),
+        schema="public",
+    )
+    # Same function name, so triggers already installed keep working.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.bump_table_write_counter()
+        RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO public.table_writes (schema_name, table_name, txid)
+            VALUES (TG_TABLE_SCHEMA, TG_TABLE_NAME, txid_current())
+            ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.drop_table("table_write_counters", schema="public")
+    op.execute("UPDATE public.snapshot_metadata SET write_count = NULL")
+
+
+def downgrade() -> None:
+    op.create_table(
+        "table_write_counters",
+        sa.Column("schema_name", sa.String(length=255), primary_key=True),
+        sa.Column("table_name", sa.String(length=255), primary_key=True),
+        sa.Column(
+            "write_count",
+            sa.BigInteger(),
+            nullable=False,
+            server_default=sa.text("0"),
+        ),
+        schema="public",
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.bump_table_write_counter()
+        RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO public.table_write_counters AS c
+                (schema_name, table_name, write_count)
+            VALUES (TG_TABLE_SCHEMA, TG_TABLE_NAME, 1)
+            ON CONFLICT (schema_name, table_name)
+            DO UPDATE SET write_count = c.write_count + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.drop_table("table_writes", schema="public")
+    op.execute("UPDATE public.snapshot_metadata SET write_count = NULL")
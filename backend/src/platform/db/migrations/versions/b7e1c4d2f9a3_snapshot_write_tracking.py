@@ -0,0 +1,71 @@
+"""Track table writes for incremental snapshots
+
+Adds ``public.table_write_counters`` plus the trigger function that bumps it,
+and records the counter value / source snapshot on ``snapshot_metadata`` so
+snapshots can skip copying tables that were not written since the base
+snapshot.
+
+Revision ID: b7e1c4d2f9a3
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e1c4d2f9a3"
+down_revision: Union[str, None] = "a1b2c3d4e5f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "table_write_counters",
+        sa.Column("schema_name", sa.String(length=255), primary_key=True),
+        sa.Column("table_name", sa.String(length=255), primary_key=True),
+        sa.Column(
+            "write_count",
+            sa.BigInteger(),
+            nullable=False,
+            server_default=sa.text("0"),
+        ),
+        schema="public",
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.bump_table_write_counter()
+        RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO public.table_write_counters AS c
+                (schema_name, table_name, write_count)
+            VALUES (TG_TABLE_SCHEMA, TG_TABLE_NAME, 1)
+            ON CONFLICT (schema_name, table_name)
+            DO UPDATE SET write_count = c.write_count + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.add_column(
+        "snapshot_metadata",
+        sa.Column("write_count", sa.BigInteger(), nullable=True),
+        schema="public",
+    )
+    op.add_column(
+        "snapshot_metadata",
+        sa.Column("source_suffix", sa.String(length=64), nullable=True),
+        schema="public",
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("snapshot_metadata", "source_suffix", schema="public")
+    op.drop_column("snapshot_metadata", "write_count", schema="public")
+    op.execute("DROP FUNCTION IF EXISTS public.bump_table_write_counter() CASCADE")
+    op.drop_table("table_write_counters", schema="public")
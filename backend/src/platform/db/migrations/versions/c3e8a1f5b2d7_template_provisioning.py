@@ -0,0 +1,34 @@
+"""Per-template provisioning strategy
+
+Adds ``environments.provisioning`` so each template can choose how new
+environments are built from it ('migrate' or 'clone').
+
+Revision ID: c3e8a1f5b2d7
+Revises: b7e1c4d2f9a3
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e8a1f5b2d7"
+down_revision: Union[str, None] = "b7e1c4d2f9a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "environments",
+        sa.Column("provisioning", sa.String(length=16), nullable=True),
+        schema="public",
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("environments", "provisioning", schema="public")
@@ -0,0 +1,33 @@
+"""Add the cleanup_failed environment status
+
+Environments whose schema could not be dropped are marked ``cleanup_failed``
+and retried by the maintenance cleanup cycle. The value was written by the
+cleanup code but was missing from the ``test_state_status`` enum.
+
+Revision ID: c9e4a7b2d6f1
+Revises: b3f7d9a1c5e2
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "c9e4a7b2d6f1"
+down_revision: Union[str, None] = "b3f7d9a1c5e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TYPE test_state_status ADD VALUE IF NOT EXISTS 'cleanup_failed'")
+
+
+def downgrade() -> None:
+    # Enum values cannot be dropped; keep the value but move rows off it.
+    op.execute(
+        "UPDATE public.run_time_environments SET status = 'expired' "
+        "WHERE status = 'cleanup_failed'"
+    )
@@ -0,0 +1,35 @@
+"""Template fingerprint on pool entries
+
+Adds ``environment_pool_entries.template_fingerprint`` so recycled pool
+schemas can be refilled in place while their template's structure is
+unchanged.
+
+Revision ID: d5a9c2e7f3b1
+Revises: c3e8a1f5b2d7
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a9c2e7f3b1"
+down_revision: Union[str, None] = "c3e8a1f5b2d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "environment_pool_entries",
+        sa.Column("template_fingerprint", sa.String(length=64), nullable=True),
+        schema="public",
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("environment_pool_entries", "template_fingerprint", schema="public")
@@ -0,0 +1,45 @@
+"""Fold recorded table writes into one row per table
+
+``public.table_writes`` gets one row per table and writing transaction, and
+rows were only removed when their schema was dropped. Pooled schemas are
+recycled without being dropped, so their rows grew without bound. Rows now
+carry a ``write_count``; the snapshot reaper folds committed rows into a
+single row per table (``txid`` 0) holding their sum, and a table's write
+count is the sum over its rows.
+
+Revision ID: e2c5a8f1d3b7
+Revises: c9e4a7b2d6f1
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "e2c5a8f1d3b7"
+down_revision: Union[str, None] = "c9e4a7b2d6f1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "table_writes",
+        sa.Column(
+            "write_count",
+            sa.BigInteger(),
+            nullable=False,
+            server_default=sa.text("1"),
+        ),
+        schema="public",
+    )
+
+
+def downgrade() -> None:
+    # Row counts stand in for write counts again, so folded rows make the
+    # stored snapshot write counts incomparable.
+    op.drop_column("table_writes", "write_count", schema="public")
+    op.execute("UPDATE public.snapshot_metadata SET write_count = NULL")
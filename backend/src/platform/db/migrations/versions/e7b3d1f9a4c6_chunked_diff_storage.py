@@ -0,0 +1,99 @@
+"""Chunked diff storage
+
+Stores run diffs once, as compressed per-table row chunks in ``diff_chunks``
+referenced from ``test_runs.diff_id``, instead of as a JSON blob in both
+``diffs.diff`` and ``test_runs.result``.
+
+Revision ID: e7b3d1f9a4c6
+Revises: d5a9c2e7f3b1
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b3d1f9a4c6"
+down_revision: Union[str, None] = "d5a9c2e7f3b1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "diffs",
+        "diff",
+        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+        nullable=True,
+        schema="public",
+    )
+    op.add_column(
+        "diffs",
+        sa.Column("summary", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        schema="public",
+    )
+    op.add_column(
+        "diffs",
+        sa.Column("codec", sa.String(length=16), nullable=True),
+        schema="public",
+    )
+    op.create_table(
+        "diff_chunks",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("diff_id", sa.UUID(), nullable=False),
+        sa.Column("change_type", sa.String(length=16), nullable=False),
+        sa.Column("table_name", sa.String(length=255), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["diff_id"], ["public.diffs.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "diff_id",
+            "change_type",
+            "table_name",
+            "seq",
+            name="uq_diff_chunk_position",
+        ),
+        schema="public",
+    )
+    op.add_column(
+        "test_runs",
+        sa.Column("diff_id", sa.UUID(), nullable=True),
+        schema="public",
+    )
+    op.create_foreign_key(
+        "test_runs_diff_id_fkey",
+        "test_runs",
+        "diffs",
+        ["diff_id"],
+        ["id"],
+        source_schema="public",
+        referent_schema="public",
+        ondelete="SET NULL",
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "test_runs_diff_id_fkey", "test_runs", schema="public", type_="foreignkey"
+    )
+    op.drop_column("test_runs", "diff_id", schema="public")
+    op.drop_table("diff_chunks", schema="public")
+    op.drop_column("diffs", "codec", schema="public")
+    op.drop_column("diffs", "summary", schema="public")
+    op.execute("DELETE FROM public.diffs WHERE diff IS NULL")
+    op.alter_column(
+        "diffs",
+        "diff",
+        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+        nullable=False,
+        schema="public",
+    )
@@ -0,0 +1,121 @@
+"""slack messages trigram search index
+
+Revision ID: f2c6a8d4b1e9
+Revises: e7b3d1f9a4c6
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+revision: str = "f2c6a8d4b1e9"
+down_revision: Union[str, None] = "e7b3d1f9a4c6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "ix_messages_message_text_trgm"
+
+
+def _fetch_slack_schemas(conn) -> list[str]:
+    """Fetch all Slack-related schemas (templates and runtime environments)."""
+    result = conn.execute(
+        text(
+            """
+            SELECT schema_name
+            FROM information_schema.schemata
+            WHERE schema_name LIKE 'slack_%'
+               OR schema_name LIKE 'state_pool_%'
+            """
+        )
+    )
+    return [row[0] for row in result]
+
+
+def _table_exists(conn, schema: str, table: str) -> bool:
+    result = conn.execute(
+        text(
+            """
+            SELECT 1
+            FROM information_schema.tables
+            WHERE table_schema = :schema
+              AND table_name = :table
+            """
+        ),
+        {"schema": schema, "table": table},
+    )
+    return result.scalar() is not None
+
+
+def _existing_indexes(conn) -> dict[str, str]:
+    """Map schema -> name of its messages trigram index.
+
+    Environment copies carry a ``<schema>_`` prefix (see ``_copy_custom_indexes``).
+    """
+    result = conn.execute(
+        text(
+            """
+            SELECT schemaname, indexname
+            FROM pg_indexes
+            WHERE tablename = 'messages'
+              AND indexname LIKE :pattern
+            """
+        ),
+        {"pattern": f"%{INDEX_NAME}"},
+    )
+    return {row[0]: row[1] for row in result}
+
+
+def _quote_ident(ident: str) -> str:
+    """Quote a PostgreSQL identifier, escaping internal double quotes."""
+    return '"' + ident.replace('"', '""') + '"'
+
+
+def _enable_pg_trgm(conn) -> bool:
+    nested = conn.begin_nested()
+    try:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        nested.commit()
+        return True
+    except Exception as exc:
+        nested.rollback()
+        logger.warning(f"pg_trgm unavailable, skipping messages search index: {exc}")
+        return False
+
+
+def upgrade() -> None:
+    """Add a GIN trigram index on messages.message_text.
+
+    search.messages filters with ``ILIKE '%term%'``; the trigram index serves
+    those predicates directly. New environments pick the index up from their
+    template through the custom-index copy in provisioning.
+    """
+    conn = op.get_bind()
+    if not _enable_pg_trgm(conn):
+        return
+
+    existing = _existing_indexes(conn)
+    for schema in _fetch_slack_schemas(conn):
+        if schema in existing or not _table_exists(conn, schema, "messages"):
+            continue
+        conn.execute(
+            text(
+                f"CREATE INDEX {INDEX_NAME} "
+                f'ON {_quote_ident(schema)}."messages" '
+                f"USING gin (message_text gin_trgm_ops)"
+            )
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for schema, index in _existing_indexes(conn).items():
+        conn.execute(
+            text(f"DROP INDEX IF EXISTS {_quote_ident(schema)}.{_quote_ident(index)}")
+        )
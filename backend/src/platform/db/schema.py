@@ -7,6 +7,7 @@ from sqlalchemy import (
     Integer,
     Boolean,
     BigInteger,
+    LargeBinary,
 )
 from sqlalchemy.dialects.postgresql import UUID as PgUUID, JSONB
 from sqlalchemy import ForeignKey, Text, Index
@@ -55,6 +56,9 @@ class TemplateEnvironment(PlatformBase):
         String(512), nullable=False
     )  # schema_name or s3://… URI
     table_order: Mapped[list[str] | None] = mapped_column(JSONB, nullable=True)
+    # Provisioning backend for new environments ('migrate' or 'clone');
+    # NULL uses the server default.
+    provisioning: Mapped[str | None] = mapped_column(String(16), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.now, nullable=False
     )
@@ -78,7 +82,14 @@ class RunTimeEnvironment(PlatformBase):
     )
     schema: Mapped[str] = mapped_column(String(128), nullable=False)
     status: Mapped[str] = mapped_column(
-        Enum("initializing", "ready", "expired", "deleted", name="test_state_status"),
+        Enum(
+            "initializing",
+            "ready",
+            "expired",
+            "deleted",
+            "cleanup_failed",
+            name="test_state_status",
+        ),
         nullable=False,
         default="initializing",
     )
@@ -127,6 +138,11 @@ class EnvironmentPoolEntry(PlatformBase):
     )
     last_used_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     last_refreshed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Structure hash of the template when the schema was built; the schema is
+    # refilled in place on recycle only while the template still matches it.
+    template_fingerprint: Mapped[str | None] = mapped_column(
+        String(64), nullable=True
+    )
     claimed_by: Mapped[str | None] = mapped_column(String(255), nullable=True)
     claimed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
@@ -148,13 +164,46 @@ class Diff(PlatformBase):
     )
     before_suffix: Mapped[str] = mapped_column(String(255), nullable=False)
     after_suffix: Mapped[str] = mapped_column(String(255), nullable=False)
-    diff: Mapped[dict] = mapped_column(
-        JSONB, nullable=False
+    # Full diff as JSON; only set on rows written before diffs were chunked.
+    diff: Mapped[dict | None] = mapped_column(
+        JSONB, nullable=True
     )  # TODO: Add models for diff, expected output, and snapshots for run-time validation
+    # Row counts per table and change type (see diff_store.summarize).
+    summary: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    # Compression of the rows in diff_chunks ("zstd" or "zlib").
+    codec: Mapped[str | None] = mapped_column(String(16), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
 
 
+class DiffChunk(PlatformBase):
+    """A compressed run of diff rows of one change type in one table."""
+
+    __tablename__ = "diff_chunks"
+    __table_args__ = (
+        UniqueConstraint(
+            "diff_id",
+            "change_type",
+            "table_name",
+            "seq",
+            name="uq_diff_chunk_position",
+        ),
+        {"schema": "public"},
+    )
+
+    id: Mapped[PyUUID] = mapped_column(
+        PgUUID(as_uuid=True), primary_key=True, default=uuid4
+    )
+    diff_id: Mapped[PyUUID] = mapped_column(
+        ForeignKey("public.diffs.id", ondelete="CASCADE"), nullable=False
+    )
+    change_type: Mapped[str] = mapped_column(String(16), nullable=False)
+    table_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
 class SnapshotMetadata(PlatformBase):
     __tablename__ = "snapshot_metadata"
     __table_args__ = (
@@ -179,6 +228,12 @@ class SnapshotMetadata(PlatformBase):
     table_name: Mapped[str] = mapped_column(String(255), nullable=False)
     row_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
     checksum: Mapped[str] = mapped_column(String(64), nullable=False)
+    # Value of the table's write counter when the snapshot was taken
+    # (incremental snapshots only).
+    write_count: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # Suffix of the snapshot holding this table's data when it was not copied
+    # because the table had no writes since the base snapshot.
+    source_suffix: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.now, nullable=False
     )
@@ -187,6 +242,27 @@ class SnapshotMetadata(PlatformBase):
     )
 
 
+class TableWrite(PlatformBase):
+    """One row per tracked environment table and transaction that wrote it.
+
+    Inserted by the statement-level trigger function
+    ``public.bump_table_write_counter()``; a table's write count is the sum of
+    ``write_count`` over its rows. The snapshot reaper folds committed rows
+    into one row per table with ``txid`` 0. Rows are removed when the schema
+    is dropped.
+    """
+
+    __tablename__ = "table_writes"
+    __table_args__ = ({"schema": "public"},)
+
+    schema_name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    txid: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    write_count: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=1, server_default="1"
+    )
+
+
 class ChangeJournal(PlatformBase):
     __tablename__ = "change_journal"
     __table_args__ = (
@@ -305,6 +381,10 @@ class TestRun(PlatformBase):
     after_snapshot_suffix: Mapped[str | None] = mapped_column(
         String(255), nullable=True
     )
+    # Stored diff of the run (see diff_store); older runs keep it in result["diff"].
+    diff_id: Mapped[PyUUID | None] = mapped_column(
+        ForeignKey("public.diffs.id", ondelete="SET NULL"), nullable=True
+    )
     replication_slot: Mapped[str | None] = mapped_column(String(255), nullable=True)
     replication_plugin: Mapped[str | None] = mapped_column(String(64), nullable=True)
     replication_started_at: Mapped[datetime | None] = mapped_column(
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from typing import Any, Literal, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any, Callable, Literal, Mapping, Sequence
 from datetime import date, datetime
 import json
+import operator
 import re
 import logging
 
@@ -41,131 +43,166 @@ def _get_ignore_sets(
     return ignores
 
 
-def _get(row: Mapping[str, Any], key: str) -> Any:
+Predicate = Callable[[Any], bool]
+
+
+def _split_path(key: str) -> tuple[str, ...]:
+    return tuple(key.split("."))
+
+
+def _get_path(row: Mapping[str, Any], parts: tuple[str, ...]) -> Any:
+    if len(parts) == 1:
+        return row.get(parts[0]) if isinstance(row, Mapping) else None
     cur: Any = row
-    for part in key.split("."):
+    for part in parts:
         if not isinstance(cur, Mapping) or part not in cur:
             return None
         cur = cur[part]
     return cur
 
 
-def _matches_predicate(value: Any, pred: Mapping[str, Any]) -> bool:
-    if not pred:
-        return True
-    if len(pred) != 1:
-        return all(_matches_predicate(value, {op: v}) for op, v in pred.items())
-    op, expected = next(iter(pred.items()))
+def _get(row: Mapping[str, Any], key: str) -> Any:
+    return _get_path(row, _split_path(key))
+
 
-    # Normalize date/datetime values to ISO strings for comparison
-    value = _normalize_for_comparison(value)
+def _as_text(value: Any) -> Any:
+    # JSONB (dict/list) is searched as compact JSON text.
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def _compile_op(op: str, expected: Any) -> Predicate:
+    """Build a predicate for one operator with its operand normalized once."""
     expected = _normalize_for_comparison(expected)
+    norm = _normalize_for_comparison
 
     if op == "eq":
-        return value == expected
+        return lambda v: norm(v) == expected
     if op in ("ne", "not_eq"):
-        return value != expected
-    if op == "in":
-        try:
-            return value in expected
-        except TypeError:
-            return False
-    if op == "not_in":
-        try:
-            return value not in expected
-        except TypeError:
-            return False
-    if op == "contains":
-        # Handle JSONB (dict/list) by converting to JSON string (compact, no spaces)
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value, separators=(",", ":"))
-        return (
-            isinstance(value, str) and isinstance(expected, str) and expected in value
-        )
-    if op == "not_contains":
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value, separators=(",", ":"))
-        return (
-            isinstance(value, str)
-            and isinstance(expected, str)
-            and expected not in value
-        )
-    if op == "i_contains":
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value, separators=(",", ":"))
-        return (
-            isinstance(value, str)
-            and isinstance(expected, str)
-            and expected.lower() in value.lower()
-        )
-    if op == "starts_with":
-        return (
-            isinstance(value, str)
-            and isinstance(expected, str)
-            and value.startswith(expected)
-        )
-    if op == "ends_with":
-        return (
-            isinstance(value, str)
-            and isinstance(expected, str)
-            and value.endswith(expected)
-        )
-    if op == "i_starts_with":
-        return (
-            isinstance(value, str)
-            and isinstance(expected, str)
-            and value.lower().startswith(expected.lower())
-        )
-    if op == "i_ends_with":
-        return (
-            isinstance(value, str)
-            and isinstance(expected, str)
-            and value.lower().endswith(expected.lower())
-        )
+        return lambda v: norm(v) != expected
+    if op in ("in", "not_in"):
+        members: Any = expected
+        fallback: Any = expected
+        if isinstance(expected, (list, tuple, set)):
+            fallback = tuple(expected)
+            try:
+                members = frozenset(fallback)
+            except TypeError:
+                members = fallback
+        negate = op == "not_in"
+
+        def _in(v: Any) -> bool:
+            v = norm(v)
+            try:
+                return (v in members) is not negate
+            except TypeError:
+                pass
+            # Unhashable values (JSON objects/arrays) compare by equality.
+            try:
+                return (v in fallback) is not negate
+            except TypeError:
+                return False
+
+        return _in
+    if op in (
+        "contains",
+        "not_contains",
+        "i_contains",
+        "starts_with",
+        "ends_with",
+        "i_starts_with",
+        "i_ends_with",
+    ):
+        if not isinstance(expected, str):
+            return lambda v: False
+        lowered = expected.lower()
+        if op == "contains":
+            return lambda v: isinstance(t := _as_text(norm(v)), str) and expected in t
+        if op == "not_contains":
+            return lambda v: (
+                isinstance(t := _as_text(norm(v)), str) and expected not in t
+            )
+        if op == "i_contains":
+            return lambda v: (
+                isinstance(t := _as_text(norm(v)), str) and lowered in t.lower()
+            )
+        if op == "starts_with":
+            return lambda v: isinstance(t := norm(v), str) and t.startswith(expected)
+        if op == "ends_with":
+            return lambda v: isinstance(t := norm(v), str) and t.endswith(expected)
+        if op == "i_starts_with":
+            return lambda v: (
+                isinstance(t := norm(v), str) and t.lower().startswith(lowered)
+            )
+        return lambda v: isinstance(t := norm(v), str) and t.lower().endswith(lowered)
     if op == "regex":
         try:
-            return isinstance(value, str) and re.search(expected, value) is not None
-        except re.error:
-            return False
-    if op == "gt":
-        try:
-            return value > expected
-        except Exception:
-            return False
-    if op == "gte":
-        try:
-            return value >= expected
-        except Exception:
-            return False
-    if op == "lt":
-        try:
-            return value < expected
-        except Exception:
-            return False
-    if op == "lte":
-        try:
-            return value <= expected
-        except Exception:
-            return False
+            pattern = re.compile(expected)
+        except (re.error, TypeError):
+            return lambda v: False
+        return lambda v: isinstance(t := norm(v), str) and pattern.search(t) is not None
+    if op in ("gt", "gte", "lt", "lte"):
+        compare = {
+            "gt": operator.gt,
+            "gte": operator.ge,
+            "lt": operator.lt,
+            "lte": operator.le,
+        }[op]
+
+        def _order(v: Any) -> bool:
+            try:
+                return bool(compare(norm(v), expected))
+            except Exception:
+                return False
+
+        return _order
     if op == "exists":
-        present = value is not None
-        return bool(expected) is present
-    if op == "has_any":
-        return isinstance(value, Sequence) and any(
-            item in value for item in (expected or [])
-        )
-    if op == "has_all":
-        return isinstance(value, Sequence) and all(
-            item in value for item in (expected or [])
+        wanted = bool(expected)
+        return lambda v: (v is not None) is wanted
+    if op in ("has_any", "has_all"):
+        items = tuple(expected or [])
+        combine = any if op == "has_any" else all
+        return lambda v: isinstance(t := norm(v), Sequence) and combine(
+            item in t for item in items
         )
-    return False
+    return lambda v: False
+
+
+def _compile_predicate(pred: Any) -> Predicate:
+    if not isinstance(pred, Mapping) and pred is not None:
+        # Bare values are equality checks, as in DSLCompiler.normalize.
+        pred = {"eq": pred}
+    if not pred:
+        return lambda v: True
+    checks = [_compile_op(op, expected) for op, expected in pred.items()]
+    if len(checks) == 1:
+        return checks[0]
+    return lambda v: all(check(v) for check in checks)
+
+
+def _matches_predicate(value: Any, pred: Mapping[str, Any]) -> bool:
+    return _compile_predicate(pred)(value)
+
+
+def _compile_where(where: Mapping[str, Any]) -> Callable[[Mapping[str, Any]], bool]:
+    checks = [
+        (_split_path(key), _compile_predicate(pred)) for key, pred in where.items()
+    ]
+    if not checks:
+        return lambda row: True
+
+    def _matches(row: Mapping[str, Any]) -> bool:
+        for parts, check in checks:
+            if not check(_get_path(row, parts)):
+                return False
+        return True
+
+    return _matches
 
 
 def _row_matches_where(row: Mapping[str, Any], where: Mapping[str, Any]) -> bool:
-    for key, pred in where.items():
-        if not _matches_predicate(_get(row, key), pred):
-            return False
-    return True
+    return _compile_where(where)(row)
 
 
 def _changed_keys(
@@ -175,131 +212,237 @@ def _changed_keys(
     return {k for k in keys if k not in ignores and before.get(k) != after.get(k)}
 
 
+_BUCKETS: dict[str, Bucket] = {
+    "added": "inserts",
+    "removed": "deletes",
+    "changed": "updates",
+}
+
+
+@dataclass(frozen=True)
+class _FieldChange:
+    field: str
+    matches_from: Predicate | None
+    matches_to: Predicate | None
+
+
+# (matched rows, sorted changed fields of each row rejected by strict mode)
+Outcome = tuple[int, list[list[str]]]
+
+
+@dataclass(frozen=True)
+class CompiledAssertion:
+    index: int
+    spec: Mapping[str, Any]
+    diff_type: str
+    entity: str
+    where_keys: tuple[str, ...]
+    matches: Callable[[Mapping[str, Any]], bool]
+    ignore: frozenset[str]
+    expected_keys: frozenset[str]
+    changes: tuple[_FieldChange, ...]
+
+
+def _index_diff(
+    diff: Mapping[str, Sequence[Mapping[str, Any]]],
+) -> dict[tuple[str, Any], list[Mapping[str, Any]]]:
+    """Group diff rows by (bucket, table) in one pass."""
+    index: dict[tuple[str, Any], list[Mapping[str, Any]]] = {}
+    for bucket in ("inserts", "deletes", "updates"):
+        for row in diff.get(bucket, []) or []:
+            index.setdefault((bucket, row.get("__table__")), []).append(row)
+    return index
+
+
 class AssertionEngine:
+    """
+    Evaluates a compiled spec against diffs.
+
+    Assertions are compiled once at construction (predicates with normalized
+    operands and precompiled regexes, pre-split field paths), so one engine
+    can evaluate any number of diffs.
+    """
+
     def __init__(self, compiled_spec: Mapping[str, Any]):
         self.spec = compiled_spec
         self.strict = bool(compiled_spec.get("strict", True))
+        self.assertions = [
+            self._compile_assertion(idx, a)
+            for idx, a in enumerate(compiled_spec.get("assertions", []), start=1)
+        ]
+
+    def _compile_assertion(
+        self, idx: int, a: Mapping[str, Any]
+    ) -> CompiledAssertion:
+        entity = a["entity"]
+        where = a.get("where", {})
+        expected_changes: Mapping[str, Any] = a.get("expected_changes", {})
+        return CompiledAssertion(
+            index=idx,
+            spec=a,
+            diff_type=a["diff_type"],
+            entity=entity,
+            where_keys=tuple(where.keys()),
+            matches=_compile_where(where),
+            ignore=frozenset(
+                _get_ignore_sets(
+                    self.spec, entity, a.get("ignore_fields", a.get("ignore", []))
+                )
+            ),
+            expected_keys=frozenset(expected_changes.keys()),
+            changes=tuple(
+                _FieldChange(
+                    field=field,
+                    matches_from=(
+                        None
+                        if spec_chg.get("from") is None
+                        else _compile_predicate(spec_chg["from"])
+                    ),
+                    matches_to=(
+                        None
+                        if spec_chg.get("to") is None
+                        else _compile_predicate(spec_chg["to"])
+                    ),
+                )
+                for field, spec_chg in expected_changes.items()
+            ),
+        )
 
     def evaluate(self, diff: Mapping[str, Sequence[Mapping[str, Any]]]) -> dict:
-        failures: list[str] = []
-        failed_indexes: set[int] = set()
-
-        assertions_list = list(self.spec.get("assertions", []))
-        for idx, a in enumerate(assertions_list, start=1):
-            diff_type: Kind = a["diff_type"]
-            entity = a["entity"]
-            where = a.get("where", {})
-            ignore = _get_ignore_sets(
-                self.spec, entity, a.get("ignore_fields", a.get("ignore", []))
+        rows_by_table = _index_diff(diff)
+        outcomes: list[Outcome | None] = []
+        for ca in self.assertions:
+            bucket = _BUCKETS.get(ca.diff_type)
+            if bucket is None:
+                outcomes.append(None)
+                continue
+            outcomes.append(self.match(ca, rows_by_table.get((bucket, ca.entity), [])))
+        return self.report(outcomes)
+
+    def match(
+        self, ca: CompiledAssertion, rows: Sequence[Mapping[str, Any]]
+    ) -> Outcome:
+        """Count the rows of ``ca``'s bucket and table that satisfy it.
+
+        Also returns, in row order, the sorted changed fields of every row
+        rejected by strict mode.
+        """
+        idx = ca.index
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(
+                "assertion#%d %s %s: found %d rows, where_keys=%s",
+                idx,
+                ca.diff_type,
+                ca.entity,
+                len(rows),
+                list(ca.where_keys),
             )
 
-            if diff_type == "added":
-                rows = [
-                    r
-                    for r in (diff.get("inserts", []) or [])
-                    if r.get("__table__") == entity
-                ]
-                logger.debug(f"assertion#{idx} added {entity}: found {len(rows)} total inserts, where_keys={list(where.keys())}")
-                for r in rows:
-                    row_id = r.get("id")
-                    match_result = _row_matches_where(r, where)
-                    logger.debug(f"assertion#{idx} insert row id={row_id}: match={match_result}")
-                matched = [r for r in rows if _row_matches_where(r, where)]
-                self._check_count(
-                    a, len(matched), failures, failed_indexes, idx, entity, diff_type
+        if ca.diff_type in ("added", "removed"):
+            matched = 0
+            for r in rows:
+                match_result = ca.matches(r)
+                if debug:
+                    logger.debug(
+                        "assertion#%d row id=%s: match=%s",
+                        idx,
+                        r.get("id"),
+                        match_result,
+                    )
+                matched += match_result
+            return matched, []
+
+        matched = 0
+        strict_violations: list[list[str]] = []
+        for r in rows:
+            before = r.get("before", {})
+            after = r.get("after", {})
+            row_id = after.get("id") or before.get("id")
+            if not (ca.matches(after) or ca.matches(before)):
+                if debug:
+                    logger.debug("assertion#%d row %s: where not matched", idx, row_id)
+                continue
+            changed = _changed_keys(before, after, ca.ignore)
+            if self.strict and not changed.issubset(ca.expected_keys):
+                if debug:
+                    logger.debug(
+                        "assertion#%d row %s: STRICT FAIL - extra fields changed",
+                        idx,
+                        row_id,
+                    )
+                strict_violations.append(sorted(changed))
+                continue
+            ok = True
+            for chg in ca.changes:
+                if chg.field not in changed:
+                    reason = "not in changed set"
+                elif chg.matches_from is not None and not chg.matches_from(
+                    before.get(chg.field)
+                ):
+                    reason = "from predicate failed"
+                elif chg.matches_to is not None and not chg.matches_to(
+                    after.get(chg.field)
+                ):
+                    reason = "to predicate failed"
+                else:
+                    continue
+                if debug:
+                    logger.debug(
+                        "assertion#%d row %s: field '%s' %s",
+                        idx,
+                        row_id,
+                        chg.field,
+                        reason,
+                    )
+                ok = False
+                break
+            if debug:
+                logger.debug(
+                    "assertion#%d row %s: %s",
+                    idx,
+                    row_id,
+                    "MATCHED" if ok else "NOT MATCHED",
                 )
+            matched += ok
+        return matched, strict_violations
 
-            elif diff_type == "removed":
-                rows = [
-                    r
-                    for r in (diff.get("deletes", []) or [])
-                    if r.get("__table__") == entity
-                ]
-                logger.debug(f"assertion#{idx} removed {entity}: found {len(rows)} total deletes, where_keys={list(where.keys())}")
-                for r in rows:
-                    row_id = r.get("id")
-                    match_result = _row_matches_where(r, where)
-                    logger.debug(f"assertion#{idx} delete row id={row_id}: match={match_result}")
-                matched = [r for r in rows if _row_matches_where(r, where)]
-                self._check_count(
-                    a, len(matched), failures, failed_indexes, idx, entity, diff_type
-                )
+    def report(self, outcomes: Sequence[Outcome | None]) -> dict:
+        """Build the evaluation result from one outcome per assertion.
 
-            elif diff_type == "changed":
-                updates = [
-                    r
-                    for r in (diff.get("updates", []) or [])
-                    if r.get("__table__") == entity
-                ]
-                logger.debug(f"assertion#{idx} changed {entity}: found {len(updates)} updates, where_keys={list(where.keys())}, ignore_count={len(ignore)}")
-                matched_updates = []
-                for r in updates:
-                    before = r.get("before", {})
-                    after = r.get("after", {})
-                    row_id = after.get("id") or before.get("id")
-                    where_match_after = _row_matches_where(after, where)
-                    where_match_before = _row_matches_where(before, where)
-                    logger.debug(f"assertion#{idx} row {row_id}: where_match_after={where_match_after}, where_match_before={where_match_before}")
-                    if not (where_match_after or where_match_before):
-                        continue
-                    changed = _changed_keys(before, after, ignore)
-                    expected_changes: dict = a.get("expected_changes", {})
-                    expected_keys = set(expected_changes.keys())
-                    logger.debug(f"assertion#{idx} row {row_id}: changed_count={len(changed)}, expected_count={len(expected_keys)}")
-                    if self.strict:
-                        if not changed.issubset(expected_keys):
-                            logger.debug(f"assertion#{idx} row {row_id}: STRICT FAIL - extra fields changed")
-                            self._add_failure(
-                                failures,
-                                failed_indexes,
-                                idx,
-                                f"assertion#{idx} {entity} changed fields {sorted(changed)} not subset of expected {sorted(expected_keys)}",
-                            )
-                            continue
-                    ok = True
-                    for field, spec_chg in expected_changes.items():
-                        if field not in changed:
-                            logger.debug(f"assertion#{idx} row {row_id}: field '{field}' not in changed set")
-                            ok = False
-                            break
-                        pred_from = spec_chg.get("from")
-                        pred_to = spec_chg.get("to")
-                        if pred_from is not None and not _matches_predicate(
-                            before.get(field), pred_from
-                        ):
-                            logger.debug(f"assertion#{idx} row {row_id}: field '{field}' from predicate failed")
-                            ok = False
-                            break
-                        if pred_to is not None and not _matches_predicate(
-                            after.get(field), pred_to
-                        ):
-                            logger.debug(f"assertion#{idx} row {row_id}: field '{field}' to predicate failed")
-                            ok = False
-                            break
-                    if ok:
-                        logger.debug(f"assertion#{idx} row {row_id}: MATCHED")
-                        matched_updates.append(r)
-                    else:
-                        logger.debug(f"assertion#{idx} row {row_id}: NOT MATCHED")
-                self._check_count(
-                    a,
-                    len(matched_updates),
+        ``None`` marks an assertion with an unknown diff_type.
+        """
+        failures: list[str] = []
+        failed_indexes: set[int] = set()
+        for ca, outcome in zip(self.assertions, outcomes):
+            idx = ca.index
+            if outcome is None:
+                self._add_failure(
                     failures,
                     failed_indexes,
                     idx,
-                    entity,
-                    diff_type,
+                    f"assertion#{idx} has unknown diff_type: {ca.diff_type}",
                 )
-
-            else:
+                continue
+            matched, strict_violations = outcome
+            for changed in strict_violations:
                 self._add_failure(
                     failures,
                     failed_indexes,
                     idx,
-                    f"assertion#{idx} has unknown diff_type: {diff_type}",
+                    f"assertion#{idx} {ca.entity} changed fields {changed} not subset of expected {sorted(ca.expected_keys)}",
                 )
+            self._check_count(
+                ca.spec,
+                matched,
+                failures,
+                failed_indexes,
+                idx,
+                ca.entity,
+                ca.diff_type,
+            )
 
-        total = len(assertions_list)
+        total = len(self.assertions)
         failed_count = len(failed_indexes)
         passed_count = max(total - failed_count, 0)
         percent = float(passed_count) / total * 100.0 if total else 100.0
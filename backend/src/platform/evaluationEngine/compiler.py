@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Any, Mapping
+import hashlib
 import json
+import threading
 from pathlib import Path
-from jsonschema import validate as jsonschema_validate
+from jsonschema.exceptions import best_match
+from jsonschema.protocols import Validator
+from jsonschema.validators import validator_for
 
 
 SCHEMA_PATH = Path(__file__).with_name("dsl_schema.json")
+COMPILED_SPEC_CACHE_SIZE = 1024
 
 
 def _load_schema(schema_path: str | Path | None = None) -> dict:
@@ -14,6 +21,21 @@ def _load_schema(schema_path: str | Path | None = None) -> dict:
     return json.loads(p.read_text(encoding="utf-8"))
 
 
+@lru_cache(maxsize=None)
+def _schema_validator(schema_path: Path) -> Validator:
+    """Read, check and build the validator for a schema file, once per process."""
+    schema = _load_schema(schema_path)
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+def spec_hash(spec: Mapping[str, Any]) -> str:
+    """Content hash of a spec; equal for specs that differ only in key order."""
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
 def _as_predicate(value: Any) -> dict:
     if isinstance(value, dict):
         return value
@@ -44,11 +66,25 @@ def _normalize_expected_changes(changes: Mapping[str, Any] | None) -> dict:
 
 
 class DSLCompiler:
-    def __init__(self, schema_path: str | Path | None = None):
-        self.schema = _load_schema(schema_path)
+    def __init__(
+        self,
+        schema_path: str | Path | None = None,
+        cache_size: int = COMPILED_SPEC_CACHE_SIZE,
+    ):
+        self._validator = _schema_validator(
+            Path(schema_path) if schema_path else SCHEMA_PATH
+        )
+        self.schema = self._validator.schema
+        # Compiled specs by content hash, least recently used first.
+        self._compiled: OrderedDict[str, dict] = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
 
     def validate(self, spec: Mapping[str, Any]) -> None:
-        jsonschema_validate(instance=spec, schema=self.schema)
+        # Same error as jsonschema.validate, without re-checking the schema.
+        error = best_match(self._validator.iter_errors(spec))
+        if error is not None:
+            raise error
 
     def normalize(self, spec: Mapping[str, Any]) -> dict:
         normalized: dict[str, Any] = dict(spec)
@@ -65,5 +101,22 @@ class DSLCompiler:
         return normalized
 
     def compile(self, spec: Mapping[str, Any]) -> dict:
+        """Validate and normalize ``spec``.
+
+        Results are cached by content hash, so a spec seen before is neither
+        validated nor normalized again. The returned dict is shared between
+        callers and must not be modified.
+        """
+        key = spec_hash(spec)
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self._compiled.move_to_end(key)
+                return compiled
         self.validate(spec)
-        return self.normalize(spec)
+        compiled = self.normalize(spec)
+        with self._lock:
+            self._compiled[key] = compiled
+            while len(self._compiled) > self._cache_size:
+                self._compiled.popitem(last=False)
+        return compiled
@@ -4,9 +4,13 @@ from typing_extensions import Literal
 from src.platform.evaluationEngine.compiler import DSLCompiler
 from src.platform.evaluationEngine.differ import Differ
 from src.platform.evaluationEngine.assertion import AssertionEngine
+from src.platform.evaluationEngine.sql_assertions import SnapshotAssertionEvaluator
 from src.platform.evaluationEngine.models import DiffResult
 from src.platform.isolationEngine.session import SessionManager
+from src.platform.evaluationEngine.journal import JournalCompactor
+from src.platform.isolationEngine.schema_cache import schema_metadata_cache
 from src.platform.db.schema import ChangeJournal
+from sqlalchemy import delete, func, select
 from uuid import uuid4, UUID
 
 
@@ -18,9 +22,16 @@ class SnapshotResult:
 
 
 class CoreEvaluationEngine:
-    def __init__(self, sessions: SessionManager):
+    def __init__(
+        self,
+        sessions: SessionManager,
+        incremental_snapshots: bool = False,
+        sql_assertions: bool = False,
+    ):
         self.sessions = sessions
         self.compiler = DSLCompiler()
+        self.incremental_snapshots = incremental_snapshots
+        self.sql_assertions = sql_assertions
 
     @staticmethod
     def generate_suffix(prefix: str) -> str:
@@ -36,14 +47,16 @@ class CoreEvaluationEngine:
         environment_id: str,
         prefix: Literal["before", "after"],
         suffix: str | None = None,
+        base_suffix: str | None = None,
     ) -> SnapshotResult:
         suffix = suffix or self.generate_suffix(prefix)
         differ = Differ(
             schema=schema,
             environment_id=environment_id,
             session_manager=self.sessions,
+            incremental=self.incremental_snapshots,
         )
-        differ.create_snapshot(suffix)
+        differ.create_snapshot(suffix, base_suffix=base_suffix)
         return SnapshotResult(
             suffix=suffix, schema=schema, environment_id=environment_id
         )
@@ -59,13 +72,19 @@ class CoreEvaluationEngine:
         )
 
     def take_after(
-        self, *, schema: str, environment_id: str, suffix: str | None = None
+        self,
+        *,
+        schema: str,
+        environment_id: str,
+        suffix: str | None = None,
+        base_suffix: str | None = None,
     ) -> SnapshotResult:
         return self.take_snapshot(
             schema=schema,
             environment_id=environment_id,
             prefix="after",
             suffix=suffix,
+            base_suffix=base_suffix,
         )
 
     def compute_diff(
@@ -87,48 +106,46 @@ class CoreEvaluationEngine:
         *,
         environment_id: str,
         run_id: str,
+        schema: str | None = None,
+        batch_size: int = 1000,
     ) -> DiffResult:
+        """
+        Fold the run's journal into its net diff and consume the entries.
+
+        Entries are read in LSN order through a server-side cursor. When
+        ``schema`` is given, its primary keys identify rows, so a delete and
+        re-insert of the same key nets to an update as in the snapshot differ.
+        """
         env_uuid = UUID(environment_id)
         run_uuid = UUID(run_id)
+        primary_keys = (
+            schema_metadata_cache.get(self.sessions.base_engine, schema).primary_keys
+            if schema
+            else None
+        )
+        compactor = JournalCompactor(primary_keys)
+        run_filter = (
+            ChangeJournal.environment_id == env_uuid,
+            ChangeJournal.run_id == run_uuid,
+        )
         with self.sessions.with_meta_session() as session:
-            entries = (
-                session.query(ChangeJournal)
-                .filter(
-                    ChangeJournal.environment_id == env_uuid,
-                    ChangeJournal.run_id == run_uuid,
+            stmt = (
+                select(
+                    ChangeJournal.table_name,
+                    ChangeJournal.operation,
+                    ChangeJournal.before,
+                    ChangeJournal.after,
+                    ChangeJournal.lsn,
                 )
-                .order_by(ChangeJournal.recorded_at.asc(), ChangeJournal.lsn.asc())
-                .all()
+                .where(*run_filter)
+                .order_by(func.pg_lsn(ChangeJournal.lsn), ChangeJournal.recorded_at)
+                .execution_options(yield_per=batch_size)
             )
-            session.query(ChangeJournal).filter(
-                ChangeJournal.environment_id == env_uuid,
-                ChangeJournal.run_id == run_uuid,
-            ).delete(synchronize_session=False)
-
-        inserts: list[dict] = []
-        updates: list[dict] = []
-        deletes: list[dict] = []
-
-        for entry in entries:
-            table = entry.table_name
-            if entry.operation == "insert":
-                row = dict(entry.after or {})
-                row["__table__"] = table
-                inserts.append(row)
-            elif entry.operation == "delete":
-                row = dict(entry.before or {})
-                row["__table__"] = table
-                deletes.append(row)
-            elif entry.operation == "update":
-                updates.append(
-                    {
-                        "__table__": table,
-                        "before": entry.before or {},
-                        "after": entry.after or {},
-                    }
-                )
+            for table, operation, before, after, lsn in session.execute(stmt):
+                compactor.add(table, operation, before, after, lsn)
+            session.execute(delete(ChangeJournal).where(*run_filter))
 
-        return DiffResult(inserts=inserts, updates=updates, deletes=deletes)
+        return compactor.result()
 
     def archive(self, *, schema: str, environment_id: str, suffixes: list[str]) -> None:
         differ = Differ(
@@ -144,3 +161,20 @@ class CoreEvaluationEngine:
         diff: DiffResult,
     ) -> dict:
         return AssertionEngine(compiled_spec).evaluate(diff.model_dump())
+
+    def evaluate_snapshots(
+        self,
+        *,
+        compiled_spec: dict[str, Any],
+        schema: str,
+        environment_id: str,
+        before_suffix: str,
+        after_suffix: str,
+    ) -> dict:
+        """Evaluate assertions against snapshot tables without building a diff."""
+        differ = Differ(
+            schema=schema, environment_id=environment_id, session_manager=self.sessions
+        )
+        return SnapshotAssertionEvaluator(
+            AssertionEngine(compiled_spec), differ, before_suffix, after_suffix
+        ).evaluate()
@@ -0,0 +1,298 @@
+"""
+Storage for run diffs.
+
+A diff is stored once: a ``Diff`` row holding per-table row counts, and its
+rows split by change type and table into compressed chunks of at most
+``chunk_rows`` rows in ``diff_chunks``. Runs point at it through
+``TestRun.diff_id``. Pages of rows are read by skipping whole chunks on their
+row counts, so only the chunks that overlap a page are decompressed.
+
+Rows written before chunking kept the full diff as JSON in ``Diff.diff`` (and
+in ``TestRun.result["diff"]``); ``paginate`` and ``summarize`` work on those
+too.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Iterable
+from uuid import UUID, uuid4
+
+from sqlalchemy import insert, select
+
+from src.platform.db.schema import Diff, DiffChunk
+from src.platform.evaluationEngine.models import DiffResult
+from src.platform.isolationEngine.session import SessionManager
+
+try:
+    from compression import zstd
+except ImportError:  # Python < 3.14
+    zstd = None
+
+CHANGE_TYPES = ("inserts", "updates", "deletes")
+CHUNK_ROWS = 500
+
+
+def _compress(payload: bytes) -> bytes:
+    if zstd is not None:
+        return zstd.compress(payload)
+    return zlib.compress(payload)
+
+
+def _decompress(codec: str | None, data: bytes) -> list[dict[str, Any]]:
+    if codec == "zstd":
+        if zstd is None:
+            raise RuntimeError("diff chunks are zstd-compressed; zstd is unavailable")
+        payload = zstd.decompress(data)
+    else:
+        payload = zlib.decompress(data)
+    return json.loads(payload)
+
+
+def _group_rows(
+    diff: dict[str, Any],
+) -> dict[tuple[str, str], list[dict[str, Any]]]:
+    """Rows of a JSON diff keyed by (change type, table), in storage order."""
+    groups: dict[tuple[str, str], list[dict[str, Any]]] = defaultdict(list)
+    for change_type in CHANGE_TYPES:
+        for row in diff.get(change_type) or []:
+            groups[(change_type, row.get("__table__") or "")].append(row)
+    return {key: groups[key] for key in sorted(groups, key=_order)}
+
+
+def _order(key: tuple[str, str]) -> tuple[int, str]:
+    change_type, table = key
+    return CHANGE_TYPES.index(change_type), table
+
+
+def summarize(diff: dict[str, Any]) -> dict[str, Any]:
+    """Row counts of a JSON diff, in total and per table."""
+    summary: dict[str, Any] = {change_type: 0 for change_type in CHANGE_TYPES}
+    tables: dict[str, dict[str, int]] = {}
+    for (change_type, table), rows in _group_rows(diff).items():
+        counts = tables.setdefault(table, {c: 0 for c in CHANGE_TYPES})
+        counts[change_type] += len(rows)
+        summary[change_type] += len(rows)
+    summary["tables"] = tables
+    return summary
+
+
+@dataclass
+class DiffPage:
+    summary: dict[str, Any]
+    offset: int
+    limit: int
+    # Rows matching the table and change type filters, across all pages.
+    total: int
+    inserts: list[dict[str, Any]] = field(default_factory=list)
+    updates: list[dict[str, Any]] = field(default_factory=list)
+    deletes: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def next_offset(self) -> int | None:
+        end = self.offset + self.limit
+        return end if end < self.total else None
+
+
+@dataclass
+class _Segment:
+    change_type: str
+    table: str
+    row_count: int
+    # Chunk id for stored diffs, rows for JSON diffs.
+    ref: Any
+
+
+def _window(
+    segments: Iterable[_Segment],
+    *,
+    tables: set[str] | None,
+    change_types: set[str] | None,
+    offset: int,
+    limit: int,
+) -> tuple[int, list[tuple[_Segment, int, int]]]:
+    """Total matching rows, and the (segment, start, stop) slices of the page."""
+    total = 0
+    picked: list[tuple[_Segment, int, int]] = []
+    end = offset + limit
+    for segment in segments:
+        if tables is not None and segment.table not in tables:
+            continue
+        if change_types is not None and segment.change_type not in change_types:
+            continue
+        first, total = total, total + segment.row_count
+        if total <= offset or first >= end:
+            continue
+        picked.append(
+            (segment, max(offset - first, 0), min(end - first, segment.row_count))
+        )
+    return total, picked
+
+
+def _fill(
+    page: DiffPage,
+    picked: list[tuple[_Segment, int, int]],
+    rows_of: Callable[[_Segment], list[dict[str, Any]]],
+) -> DiffPage:
+    for segment, start, stop in picked:
+        getattr(page, segment.change_type).extend(rows_of(segment)[start:stop])
+    return page
+
+
+def paginate(
+    diff: dict[str, Any],
+    *,
+    tables: set[str] | None = None,
+    change_types: set[str] | None = None,
+    offset: int = 0,
+    limit: int = CHUNK_ROWS,
+) -> DiffPage:
+    """Page through a diff held as JSON (runs stored before chunking)."""
+    segments = [
+        _Segment(change_type, table, len(rows), rows)
+        for (change_type, table), rows in _group_rows(diff).items()
+    ]
+    total, picked = _window(
+        segments,
+        tables=tables,
+        change_types=change_types,
+        offset=offset,
+        limit=limit,
+    )
+    page = DiffPage(summarize(diff), offset, limit, total)
+    return _fill(page, picked, lambda segment: segment.ref)
+
+
+class DiffStore:
+    def __init__(self, session_manager: SessionManager, chunk_rows: int = CHUNK_ROWS):
+        self.session_manager = session_manager
+        self.chunk_rows = max(1, chunk_rows)
+
+    def save(
+        self,
+        environment_id: str,
+        before_suffix: str,
+        after_suffix: str,
+        diff: DiffResult,
+    ) -> UUID:
+        """Store ``diff`` as compressed chunks. Returns the ``Diff`` id."""
+        payload = diff.model_dump(mode="json")
+        diff_id = uuid4()
+        codec = "zstd" if zstd is not None else "zlib"
+        chunks = []
+        for (change_type, table), rows in _group_rows(payload).items():
+            for seq, start in enumerate(range(0, len(rows), self.chunk_rows)):
+                batch = rows[start : start + self.chunk_rows]
+                data = _compress(json.dumps(batch, separators=(",", ":")).encode())
+                chunks.append(
+                    {
+                        "diff_id": diff_id,
+                        "change_type": change_type,
+                        "table_name": table,
+                        "seq": seq,
+                        "row_count": len(batch),
+                        "data": data,
+                    }
+                )
+        now = datetime.now()
+        with self.session_manager.with_meta_session() as session:
+            session.add(
+                Diff(
+                    id=diff_id,
+                    environment_id=environment_id,
+                    before_suffix=before_suffix,
+                    after_suffix=after_suffix,
+                    summary=summarize(payload),
+                    codec=codec,
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
+            session.flush()
+            if chunks:
+                session.execute(insert(DiffChunk), chunks)
+        return diff_id
+
+    def summary(self, diff_id: UUID) -> dict[str, Any] | None:
+        with self.session_manager.with_meta_session() as session:
+            diff = session.get(Diff, diff_id)
+            if diff is None:
+                return None
+            if diff.summary is None and diff.diff is not None:
+                return summarize(diff.diff)
+            return diff.summary
+
+    def load(self, diff_id: UUID) -> DiffResult | None:
+        """The whole diff, decompressing every chunk."""
+        page = self.page(diff_id, offset=0, limit=2**62)
+        if page is None:
+            return None
+        return DiffResult(
+            inserts=page.inserts, updates=page.updates, deletes=page.deletes
+        )
+
+    def page(
+        self,
+        diff_id: UUID,
+        *,
+        tables: set[str] | None = None,
+        change_types: set[str] | None = None,
+        offset: int = 0,
+        limit: int = CHUNK_ROWS,
+    ) -> DiffPage | None:
+        """Rows ``offset`` to ``offset + limit`` of the diff, after filtering."""
+        with self.session_manager.with_meta_session() as session:
+            diff = session.get(Diff, diff_id)
+            if diff is None:
+                return None
+            if diff.diff is not None:
+                return paginate(
+                    diff.diff,
+                    tables=tables,
+                    change_types=change_types,
+                    offset=offset,
+                    limit=limit,
+                )
+            rows = session.execute(
+                select(
+                    DiffChunk.id,
+                    DiffChunk.change_type,
+                    DiffChunk.table_name,
+                    DiffChunk.row_count,
+                )
+                .where(DiffChunk.diff_id == diff_id)
+                .order_by(DiffChunk.seq)
+            ).all()
+            # Stable sort: chunks of one table stay in sequence order.
+            segments = sorted(
+                (
+                    _Segment(change_type, table, row_count, chunk_id)
+                    for chunk_id, change_type, table, row_count in rows
+                ),
+                key=lambda segment: _order((segment.change_type, segment.table)),
+            )
+            total, picked = _window(
+                segments,
+                tables=tables,
+                change_types=change_types,
+                offset=offset,
+                limit=limit,
+            )
+            data = {}
+            if picked:
+                data = dict(
+                    session.execute(
+                        select(DiffChunk.id, DiffChunk.data).where(
+                            DiffChunk.id.in_([segment.ref for segment, _, _ in picked])
+                        )
+                    ).all()
+                )
+            page = DiffPage(diff.summary or {}, offset, limit, total)
+            codec = diff.codec
+        return _fill(
+            page, picked, lambda segment: _decompress(codec, data[segment.ref])
+        )
@@ -1,14 +1,24 @@
-from sqlalchemy import text, inspect
+from sqlalchemy import text
 from src.platform.isolationEngine.session import SessionManager
+from src.platform.isolationEngine.schema_cache import schema_metadata_cache
 from datetime import datetime
-from src.platform.db.schema import Diff, SnapshotMetadata
+from src.platform.db.schema import SnapshotMetadata
+from .diff_store import DiffStore
 from .models import DiffResult
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import time
-from typing import Any
+from typing import Any, Callable, TypeVar
+from uuid import UUID
 
 logger = logging.getLogger(__name__)
 
+WRITE_TRACKING_TRIGGER = "track_table_writes"
+DIFF_MAX_WORKERS = 4
+
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 def _sanitize_row(row: dict[str, Any]) -> dict[str, Any]:
     """Convert non-JSON-serializable types (memoryview, bytes) to strings."""
@@ -24,35 +34,71 @@ def _sanitize_row(row: dict[str, Any]) -> dict[str, Any]:
 
 class Differ:
     def __init__(
-        self, schema: str, environment_id: str, session_manager: SessionManager
+        self,
+        schema: str,
+        environment_id: str,
+        session_manager: SessionManager,
+        incremental: bool = False,
+        max_workers: int = DIFF_MAX_WORKERS,
     ):
         self.session_manager = session_manager
         self.schema = schema
         self.environment_id = environment_id
+        self.incremental = incremental
+        self.max_workers = max(1, max_workers)
         self.engine = session_manager.base_engine
-        self.inspector = inspect(self.engine)
-        self.tables = [
-            name
-            for name in self.inspector.get_table_names(schema=self.schema)
-            if "_snapshot_" not in name
-        ]
+        self.metadata = schema_metadata_cache.get(self.engine, self.schema)
+        self.tables = list(self.metadata.tables)
         self.q = self.engine.dialect.identifier_preparer.quote
-        self._pk_cache = {}
-        self._column_cache: dict[str, list[str]] = {}
+        self._source_cache: dict[str, dict[str, str | None]] = {}
 
     def _get_pk_columns(self, table: str) -> list[str]:
         """Get primary key column(s) for a table."""
-        if table not in self._pk_cache:
-            pk = self.inspector.get_pk_constraint(table, schema=self.schema)
-            self._pk_cache[table] = pk["constrained_columns"]
-        return self._pk_cache[table]
+        return self.metadata.primary_keys.get(table, [])
 
-    def create_snapshot(self, suffix: str) -> None:
+    def _get_columns(self, table: str) -> list[str]:
+        return self.metadata.columns.get(table, [])
+
+    def create_snapshot(self, suffix: str, base_suffix: str | None = None) -> None:
+        """Copy every table into ``<table>_snapshot_<suffix>``.
+
+        In incremental mode, tables whose write counter has not moved since
+        ``base_suffix`` are not copied; their metadata points back at the
+        snapshot that already holds the data.
+        """
         start = time.perf_counter()
-        with self.engine.begin() as conn:
-            table_count = 0
+        base_meta: dict[str, SnapshotMetadata] = {}
+        engine = self.engine
+        if self.incremental:
+            self._ensure_write_tracking()
+            if base_suffix:
+                base_meta = self._load_metadata_map(base_suffix)
+            # One MVCC snapshot for the copies and the counters, so a counter
+            # value always matches the data copied alongside it.
+            engine = self.engine.execution_options(isolation_level="REPEATABLE READ")
+        # (table, snapshot table, write count) of every table copied.
+        copied: list[tuple[str, str, int | None]] = []
+        with engine.begin() as conn:
+            write_counts = self._load_write_counts(conn) if self.incremental else {}
+            reused_count = 0
             for t in self.tables:
-                table_count += 1
+                write_count = write_counts.get(t, 0) if self.incremental else None
+                base_entry = base_meta.get(t)
+                if (
+                    base_entry is not None
+                    and base_entry.write_count is not None
+                    and base_entry.write_count == write_count
+                ):
+                    self._store_snapshot_metadata(
+                        suffix,
+                        t,
+                        base_entry.row_count,
+                        base_entry.checksum,
+                        write_count=write_count,
+                        source_suffix=base_entry.source_suffix or base_suffix,
+                    )
+                    reused_count += 1
+                    continue
                 table_start = time.perf_counter()
                 snapshot_table = f"{t}_snapshot_{suffix}"
                 sql = f""" 
@@ -60,12 +106,7 @@ class Differ:
                     SELECT * FROM {self.q(self.schema)}.{self.q(t)}
                 """
                 conn.execute(text(sql))
-                row_count, checksum = self._compute_snapshot_fingerprint(
-                    conn,
-                    snapshot_table,
-                    self._ordering_columns(t),
-                )
-                self._store_snapshot_metadata(suffix, t, row_count, checksum)
+                copied.append((t, snapshot_table, write_count))
                 table_duration = time.perf_counter() - table_start
                 if table_duration > 1:
                     logger.debug(
@@ -74,222 +115,151 @@ class Differ:
                         snapshot_table,
                         table_duration,
                     )
+        copy_duration = time.perf_counter() - start
+
+        # Committed snapshot tables never change, so they are fingerprinted
+        # after the copy, concurrently.
+        fingerprint_start = time.perf_counter()
+        fingerprints = self._map_tables(
+            self._compute_snapshot_fingerprint,
+            [snapshot_table for _, snapshot_table, _ in copied],
+        )
+        for (t, _, write_count), (row_count, checksum) in zip(copied, fingerprints):
+            self._store_snapshot_metadata(
+                suffix, t, row_count, checksum, write_count=write_count
+            )
         logger.info(
-            "Created snapshot %s for schema %s (%d tables) in %.2fs",
+            "Created snapshot %s for schema %s (%d tables copied, %d unchanged) "
+            "in %.2fs (copy %.2fs, fingerprint %.2fs)",
             suffix,
             self.schema,
-            table_count,
+            len(copied),
+            reused_count,
             time.perf_counter() - start,
+            copy_duration,
+            time.perf_counter() - fingerprint_start,
         )
 
-    def get_inserts(
-        self, before_suffix: str, after_suffix: str, tables: list[str]
-    ) -> list[dict]:
-        inserts: list[dict] = []
-        start = time.perf_counter()
-        total_rows = 0
-        per_table_stats: list[tuple[str, int, float]] = []
-        with self.engine.begin() as conn:
-            for t in tables:
-                before_table = f"{t}_snapshot_{before_suffix}"
-                after_table = f"{t}_snapshot_{after_suffix}"
-                pk_cols = self._get_pk_columns(t)
-
-                if not pk_cols:
-                    continue
-
-                join_conditions = " AND ".join(
-                    f"a.{self.q(pk)} = b.{self.q(pk)}" for pk in pk_cols
-                )
-                where_conditions = " AND ".join(
-                    f"b.{self.q(pk)} IS NULL" for pk in pk_cols
-                )
-
-                q_inserts = f"""
-                    SELECT a.*
-                    FROM {self.q(self.schema)}.{self.q(after_table)} AS a
-                    LEFT JOIN {self.q(self.schema)}.{self.q(before_table)} AS b
-                    ON {join_conditions}
-                    WHERE {where_conditions}
-                """
-                table_start = time.perf_counter()
-                rows = conn.execute(text(q_inserts)).mappings().all()
-                table_duration = time.perf_counter() - table_start
-                for r in rows:
-                    item = _sanitize_row(dict(r))
-                    item["__table__"] = t
-                    inserts.append(item)
-                stats_count = len(rows)
-                if stats_count:
-                    total_rows += len(rows)
-                per_table_stats.append((t, stats_count, table_duration))
-                if stats_count:
-                    logger.debug(
-                        "Diff inserts %s.%s -> %d rows in %.2fs",
-                        self.schema,
-                        t,
-                        stats_count,
-                        table_duration,
-                    )
-        logger.info(
-            "Computed inserts diff for %s (%d rows, %.2fs)",
-            self.schema,
-            total_rows,
-            time.perf_counter() - start,
-        )
-        self._log_stage_stats("inserts", per_table_stats)
-        return inserts
+    def get_diff(self, before_suffix: str, after_suffix: str) -> DiffResult:
+        """Classify inserts, updates and deletes in one pass per flagged table.
 
-    def get_updates(
-        self,
-        before_suffix: str,
-        after_suffix: str,
-        tables: list[str],
-        exclude_cols: list[str] | None = None,
-    ) -> list[dict]:
-        updates = []
+        Tables are diffed concurrently on up to ``max_workers`` connections;
+        results are concatenated in table order.
+        """
+        tables = self._tables_to_compare(before_suffix, after_suffix)
+        tables = [t for t in tables if self._get_pk_columns(t)]
         start = time.perf_counter()
-        total_rows = 0
-        per_table_stats: list[tuple[str, int, float]] = []
-        with self.engine.begin() as conn:
-            for t in tables:
-                before = f"{t}_snapshot_{before_suffix}"
-                after = f"{t}_snapshot_{after_suffix}"
-                pk_cols = self._get_pk_columns(t)
-
-                if not pk_cols:
-                    continue
-
-                cols = [
-                    c["name"] for c in self.inspector.get_columns(t, schema=self.schema)
-                ]
-                if exclude_cols is not None:
-                    compare_cols = [c for c in cols if c not in exclude_cols]
-                else:
-                    compare_cols = cols
-
-                if not compare_cols:
-                    continue
-
-                join_conditions = " AND ".join(
-                    f"a.{self.q(pk)} = b.{self.q(pk)}" for pk in pk_cols
-                )
-
-                cmp_expr = " OR ".join(
-                    f"a.{self.q(c)} IS DISTINCT FROM b.{self.q(c)}"
-                    for c in compare_cols
-                )
+        # Resolve snapshot tables up front so worker threads only read caches.
+        pairs = [
+            (
+                t,
+                self._snapshot_table(t, before_suffix),
+                self._snapshot_table(t, after_suffix),
+            )
+            for t in tables
+        ]
 
-                proj_cols = ", ".join(
-                    [f"a.{self.q(c)} AS {self.q(f'after_{c}')}" for c in cols]
-                    + [f"b.{self.q(c)} AS {self.q(f'before_{c}')}" for c in cols]
-                )
-                sql = f"""
-                    SELECT {proj_cols}
-                    FROM {self.q(self.schema)}.{self.q(after)} AS a
-                    JOIN {self.q(self.schema)}.{self.q(before)} AS b
-                      ON {join_conditions}
-                    WHERE {cmp_expr}
-                """
-                table_start = time.perf_counter()
-                rows = conn.exec_driver_sql(sql).mappings().all()
-                table_duration = time.perf_counter() - table_start
-                for r in rows:
-                    after_map = _sanitize_row({c: r.get(f"after_{c}") for c in cols})
-                    before_map = _sanitize_row({c: r.get(f"before_{c}") for c in cols})
-                    updates.append(
-                        {
-                            "__table__": t,
-                            "after": after_map,
-                            "before": before_map,
-                        }
-                    )
-                stats_count = len(rows)
-                if stats_count:
-                    total_rows += len(rows)
-                per_table_stats.append((t, stats_count, table_duration))
-                if stats_count:
-                    logger.debug(
-                        "Diff updates %s.%s -> %d rows in %.2fs",
-                        self.schema,
-                        t,
-                        stats_count,
-                        table_duration,
-                    )
-        logger.info(
-            "Computed updates diff for %s (%d rows, %.2fs)",
-            self.schema,
-            total_rows,
-            time.perf_counter() - start,
-        )
-        self._log_stage_stats("updates", per_table_stats)
-        return updates
+        workers = min(self.max_workers, len(pairs))
+        results = self._map_tables(lambda p: self._diff_table(*p), pairs)
 
-    def get_deletes(
-        self, before_suffix: str, after_suffix: str, tables: list[str]
-    ) -> list[dict]:
+        inserts: list[dict] = []
+        updates: list[dict] = []
         deletes: list[dict] = []
-        start = time.perf_counter()
-        total_rows = 0
         per_table_stats: list[tuple[str, int, float]] = []
-        with self.engine.begin() as conn:
-            for t in tables:
-                before_table = f"{t}_snapshot_{before_suffix}"
-                after_table = f"{t}_snapshot_{after_suffix}"
-                pk_cols = self._get_pk_columns(t)
-
-                if not pk_cols:
-                    continue
-
-                join_conditions = " AND ".join(
-                    f"b.{self.q(pk)} = a.{self.q(pk)}" for pk in pk_cols
-                )
-                where_conditions = " AND ".join(
-                    f"a.{self.q(pk)} IS NULL" for pk in pk_cols
-                )
-
-                q_deletes = f"""
-                    SELECT b.*
-                    FROM {self.q(self.schema)}.{self.q(before_table)} AS b
-                    LEFT JOIN {self.q(self.schema)}.{self.q(after_table)} AS a
-                    ON {join_conditions}
-                    WHERE {where_conditions}
-                """
-                table_start = time.perf_counter()
-                rows = conn.execute(text(q_deletes)).mappings().all()
-                table_duration = time.perf_counter() - table_start
-                for r in rows:
-                    item = _sanitize_row(dict(r))
-                    item["__table__"] = t
-                    deletes.append(item)
-                stats_count = len(rows)
-                if stats_count:
-                    total_rows += len(rows)
-                per_table_stats.append((t, stats_count, table_duration))
-                if stats_count:
-                    logger.debug(
-                        "Diff deletes %s.%s -> %d rows in %.2fs",
-                        self.schema,
-                        t,
-                        stats_count,
-                        table_duration,
-                    )
+        for t, (t_inserts, t_updates, t_deletes, duration) in zip(tables, results):
+            inserts.extend(t_inserts)
+            updates.extend(t_updates)
+            deletes.extend(t_deletes)
+            per_table_stats.append(
+                (t, len(t_inserts) + len(t_updates) + len(t_deletes), duration)
+            )
         logger.info(
-            "Computed deletes diff for %s (%d rows, %.2fs)",
+            "Computed diff for %s (%d inserts, %d updates, %d deletes, "
+            "%d tables, %d workers, %.2fs)",
             self.schema,
-            total_rows,
+            len(inserts),
+            len(updates),
+            len(deletes),
+            len(tables),
+            workers,
             time.perf_counter() - start,
         )
-        self._log_stage_stats("deletes", per_table_stats)
-        return deletes
-
-    def get_diff(self, before_suffix: str, after_suffix: str) -> DiffResult:
-        tables = self._tables_to_compare(before_suffix, after_suffix)
-        inserts = self.get_inserts(before_suffix, after_suffix, tables)
-        updates = self.get_updates(before_suffix, after_suffix, tables)
-        deletes = self.get_deletes(before_suffix, after_suffix, tables)
+        self._log_stage_stats("diff", per_table_stats)
         return DiffResult(inserts=inserts, updates=updates, deletes=deletes)
 
+    def _diff_table(
+        self, table: str, before_table: str, after_table: str
+    ) -> tuple[list[dict], list[dict], list[dict], float]:
+        """Diff one table with a single FULL OUTER JOIN between snapshots."""
+        pk_cols = self._get_pk_columns(table)
+        cols = self._get_columns(table)
+        join_conditions = " AND ".join(
+            f"a.{self.q(pk)} = b.{self.q(pk)}" for pk in pk_cols
+        )
+        after_missing = " AND ".join(f"a.{self.q(pk)} IS NULL" for pk in pk_cols)
+        before_missing = " AND ".join(f"b.{self.q(pk)} IS NULL" for pk in pk_cols)
+        cmp_expr = " OR ".join(
+            f"a.{self.q(c)} IS DISTINCT FROM b.{self.q(c)}" for c in cols
+        )
+        proj_cols = ", ".join(
+            [f"a.{self.q(c)} AS {self.q(f'after_{c}')}" for c in cols]
+            + [f"b.{self.q(c)} AS {self.q(f'before_{c}')}" for c in cols]
+        )
+        # Rows come back in primary key order so results, and the order of
+        # assertion failures reported from them, are stable between runs.
+        key_order = ", ".join(
+            f"COALESCE(a.{self.q(pk)}, b.{self.q(pk)})" for pk in pk_cols
+        )
+        sql = f"""
+            SELECT CASE
+                     WHEN {before_missing} THEN 'insert'
+                     WHEN {after_missing} THEN 'delete'
+                     ELSE 'update'
+                   END AS __op__,
+                   {proj_cols}
+            FROM {self.q(self.schema)}.{self.q(after_table)} AS a
+            FULL OUTER JOIN {self.q(self.schema)}.{self.q(before_table)} AS b
+              ON {join_conditions}
+            WHERE ({before_missing}) OR ({after_missing}) OR ({cmp_expr})
+            ORDER BY {key_order}
+        """
+        inserts: list[dict] = []
+        updates: list[dict] = []
+        deletes: list[dict] = []
+        table_start = time.perf_counter()
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql(sql).mappings().all()
+        duration = time.perf_counter() - table_start
+        for r in rows:
+            op = r["__op__"]
+            if op == "insert":
+                item = _sanitize_row({c: r[f"after_{c}"] for c in cols})
+                item["__table__"] = table
+                inserts.append(item)
+            elif op == "delete":
+                item = _sanitize_row({c: r[f"before_{c}"] for c in cols})
+                item["__table__"] = table
+                deletes.append(item)
+            else:
+                updates.append(
+                    {
+                        "__table__": table,
+                        "after": _sanitize_row({c: r[f"after_{c}"] for c in cols}),
+                        "before": _sanitize_row({c: r[f"before_{c}"] for c in cols}),
+                    }
+                )
+        if rows:
+            logger.debug(
+                "Diff %s.%s -> %d inserts, %d updates, %d deletes in %.2fs",
+                self.schema,
+                table,
+                len(inserts),
+                len(updates),
+                len(deletes),
+                duration,
+            )
+        return inserts, updates, deletes, duration
+
     def archive_snapshots(self, suffix: str) -> None:
         with self.engine.begin() as conn:
             for t in self.tables:
@@ -299,53 +269,95 @@ class Differ:
                 """
                 conn.execute(text(sql))
         self._delete_snapshot_metadata(suffix)
+        self._source_cache.pop(suffix, None)
 
     def store_diff(
         self,
         diff: DiffResult,
         before_suffix: str,
         after_suffix: str,
-    ) -> None:
-        with self.session_manager.with_meta_session() as session:
-            diff_object = Diff(
-                environment_id=self.environment_id,
-                before_suffix=before_suffix,
-                after_suffix=after_suffix,
-                diff=diff.model_dump(mode="json"),
-                created_at=datetime.now(),
-                updated_at=datetime.now(),
-            )
-            session.add(diff_object)
+    ) -> UUID:
+        """Persist ``diff`` as compressed chunks. Returns the ``Diff`` id."""
+        return DiffStore(self.session_manager).save(
+            self.environment_id, before_suffix, after_suffix, diff
+        )
 
-    def _ordering_columns(self, table: str) -> list[str]:
-        pk_cols = self._get_pk_columns(table)
-        if pk_cols:
-            return pk_cols
-        if table not in self._column_cache:
-            cols = [
-                c["name"] for c in self.inspector.get_columns(table, schema=self.schema)
-            ]
-            self._column_cache[table] = cols
-        return self._column_cache[table]
+    def _snapshot_table(self, table: str, suffix: str) -> str:
+        """Name of the physical table holding ``table`` for snapshot ``suffix``."""
+        if suffix not in self._source_cache:
+            self._load_metadata_map(suffix)
+        source = self._source_cache[suffix].get(table)
+        return f"{table}_snapshot_{source or suffix}"
 
-    def _compute_snapshot_fingerprint(
-        self,
-        conn,
-        snapshot_table: str,
-        order_cols: list[str],
-    ) -> tuple[int, str]:
-        agg_order = ""
-        if order_cols:
-            order_expr = ", ".join(f"t.{self.q(col)}" for col in order_cols)
-            agg_order = f" ORDER BY {order_expr}"
+    def _ensure_write_tracking(self) -> None:
+        """Install the statement-level write counter trigger on every table."""
+        with self.engine.begin() as conn:
+            tracked = {
+                row[0]
+                for row in conn.execute(
+                    text(
+                        """
+                        SELECT c.relname
+                        FROM pg_trigger tg
+                        JOIN pg_class c ON c.oid = tg.tgrelid
+                        JOIN pg_namespace n ON n.oid = c.relnamespace
+                        WHERE n.nspname = :schema AND tg.tgname = :trigger
+                        """
+                    ),
+                    {"schema": self.schema, "trigger": WRITE_TRACKING_TRIGGER},
+                )
+            }
+            for t in self.tables:
+                if t in tracked:
+                    continue
+                conn.execute(
+                    text(
+                        f"CREATE TRIGGER {self.q(WRITE_TRACKING_TRIGGER)} "
+                        f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+                        f"ON {self.q(self.schema)}.{self.q(t)} "
+                        f"FOR EACH STATEMENT "
+                        f"EXECUTE FUNCTION public.bump_table_write_counter()"
+                    )
+                )
+
+    def _load_write_counts(self, conn) -> dict[str, int]:
+        rows = conn.execute(
+            text(
+                """
+                SELECT table_name, sum(write_count)
+                FROM public.table_writes
+                WHERE schema_name = :schema
+                GROUP BY table_name
+                """
+            ),
+            {"schema": self.schema},
+        ).fetchall()
+        return {table: int(count) for table, count in rows}
+
+    def _map_tables(self, fn: Callable[[T], R], items: list[T]) -> list[R]:
+        """``fn`` over ``items`` on up to ``max_workers`` threads, in order."""
+        workers = min(self.max_workers, len(items))
+        if workers <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="differ"
+        ) as pool:
+            return list(pool.map(fn, items))
+
+    def _compute_snapshot_fingerprint(self, snapshot_table: str) -> tuple[int, str]:
+        """Row count and an order-independent checksum, in one scan.
+
+        The checksum is the sum of a 64-bit hash of every row, so it needs no
+        sort and no per-row JSON, and equal multisets of rows give equal sums.
+        """
         sql = f"""
             SELECT COUNT(*) AS row_count,
-                   md5(COALESCE(string_agg(md5(row_to_json(t)::text), ''{agg_order}), '')) AS checksum
+                   COALESCE(SUM(hashtextextended(ROW(t.*)::text, 0)), 0) AS checksum
             FROM {self.q(self.schema)}.{self.q(snapshot_table)} AS t
         """
-        row = conn.execute(text(sql)).one()
-        checksum = row.checksum or ""
-        return int(row.row_count), checksum
+        with self.engine.connect() as conn:
+            row = conn.execute(text(sql)).one()
+        return int(row.row_count), f"h64:{row.checksum}"
 
     def _store_snapshot_metadata(
         self,
@@ -353,6 +365,9 @@ class Differ:
         table: str,
         row_count: int,
         checksum: str,
+        *,
+        write_count: int | None = None,
+        source_suffix: str | None = None,
     ) -> None:
         with self.session_manager.with_meta_session() as session:
             entry = (
@@ -374,6 +389,8 @@ class Differ:
                     table_name=table,
                     row_count=row_count,
                     checksum=checksum,
+                    write_count=write_count,
+                    source_suffix=source_suffix,
                     created_at=now,
                     updated_at=now,
                 )
@@ -381,6 +398,8 @@ class Differ:
             else:
                 entry.row_count = row_count
                 entry.checksum = checksum
+                entry.write_count = write_count
+                entry.source_suffix = source_suffix
                 entry.updated_at = now
 
     def _delete_snapshot_metadata(self, suffix: str) -> None:
@@ -406,6 +425,9 @@ class Differ:
                 )
                 .all()
             )
+        self._source_cache[suffix] = {
+            entry.table_name: entry.source_suffix for entry in entries
+        }
         return {entry.table_name: entry for entry in entries}
 
     def _tables_to_compare(
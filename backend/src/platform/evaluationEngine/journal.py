@@ -0,0 +1,171 @@
+"""
+Fold change-journal entries into the net effect of a run.
+
+The journal records every captured change, so a row edited five times shows
+up as five updates and a row inserted and then deleted shows up twice. The
+snapshot differ only ever sees the first and last state of each row, and
+assertions are written against that view. ``JournalCompactor`` consumes
+entries in LSN order and keeps, per row, the state before the run and the
+current state, so the result matches what ``Differ.get_diff`` would report.
+
+Rows are identified by their primary key when the table's key columns are
+known. Otherwise they are chained by full row image: environments use
+REPLICA IDENTITY FULL, so the ``before`` of an update or delete is exactly
+the ``after`` of the change that preceded it.
+
+Entries can be delivered twice: changes decoded after the slot's last
+advance are re-read after a crash, and the replay is journaled again under
+the same LSN. Every change of a transaction shares that LSN, so entries are
+buffered per LSN and a group that is one transaction repeated is folded
+once. A group whose LSN is below one already folded is a late replay and is
+skipped.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Mapping, Sequence
+
+from src.platform.evaluationEngine.models import DiffResult
+from src.platform.evaluationEngine.replication import parse_lsn
+
+_Entry = tuple[str, str, dict[str, Any] | None, dict[str, Any] | None]
+
+
+@dataclass
+class _RowChange:
+    table: str
+    # Row as it was before the run; None when the run inserted it.
+    original: dict[str, Any] | None
+    # Row as it is now; None when it has been deleted.
+    current: dict[str, Any] | None
+
+
+class JournalCompactor:
+    def __init__(self, primary_keys: Mapping[str, Sequence[str]] | None = None):
+        self.primary_keys = primary_keys or {}
+        self._rows: dict[tuple[str, str], _RowChange] = {}
+        # Changes displaced from ``_rows`` by a key collision, kept so that
+        # every change still reaches the result.
+        self._displaced: list[_RowChange] = []
+        # Entries sharing the LSN currently being read, and the highest LSN
+        # whose entries have been folded.
+        self._group: list[_Entry] = []
+        self._group_lsn: int | None = None
+        self._applied_lsn = -1
+        self.entries = 0
+
+    def add(
+        self,
+        table: str,
+        operation: str,
+        before: dict[str, Any] | None,
+        after: dict[str, Any] | None,
+        lsn: str | None = None,
+    ) -> None:
+        self.entries += 1
+        entry = (table, operation, before, after)
+        if lsn is None:
+            self._flush_group()
+            self._apply(*entry)
+            return
+        position = parse_lsn(lsn)
+        if position != self._group_lsn:
+            self._flush_group()
+            if position <= self._applied_lsn:
+                # Replay of a transaction that has already been folded.
+                return
+            self._group_lsn = position
+        self._group.append(entry)
+
+    def _flush_group(self) -> None:
+        group = self._group
+        if not group:
+            return
+        # A replayed transaction repeats the original's entries in order,
+        # so fold only the shortest prefix the group is a repetition of.
+        size = len(group)
+        period = next(
+            p
+            for p in range(1, size + 1)
+            if size % p == 0 and group == group[:p] * (size // p)
+        )
+        for entry in group[:period]:
+            self._apply(*entry)
+        assert self._group_lsn is not None
+        self._applied_lsn = max(self._applied_lsn, self._group_lsn)
+        self._group, self._group_lsn = [], None
+
+    def _apply(
+        self,
+        table: str,
+        operation: str,
+        before: dict[str, Any] | None,
+        after: dict[str, Any] | None,
+    ) -> None:
+        if operation == "insert":
+            row = dict(after or {})
+            key = self._key(table, row)
+            change = self._rows.get(key)
+            if change is not None and change.current is None:
+                # Deleted earlier in the run and inserted again.
+                change.current = row
+            else:
+                self._place(key, _RowChange(table, None, row))
+        elif operation == "update":
+            old, new = dict(before or {}), dict(after or {})
+            old_key, new_key = self._key(table, old), self._key(table, new)
+            change = self._rows.pop(old_key, None)
+            if change is None or change.current is None:
+                if change is not None:
+                    self._displaced.append(change)
+                change = _RowChange(table, old, new)
+            change.current = new
+            self._place(new_key, change)
+        elif operation == "delete":
+            old = dict(before or {})
+            key = self._key(table, old)
+            change = self._rows.get(key)
+            if change is None:
+                self._place(key, _RowChange(table, old, None))
+            elif change.current is not None:
+                change.current = None
+
+    def result(self) -> DiffResult:
+        self._flush_group()
+        inserts: list[dict] = []
+        updates: list[dict] = []
+        deletes: list[dict] = []
+        for change in [*self._displaced, *self._rows.values()]:
+            if change.original is None and change.current is not None:
+                row = dict(change.current)
+                row["__table__"] = change.table
+                inserts.append(row)
+            elif change.original is not None and change.current is None:
+                row = dict(change.original)
+                row["__table__"] = change.table
+                deletes.append(row)
+            elif change.original is not None and change.original != change.current:
+                updates.append(
+                    {
+                        "__table__": change.table,
+                        "before": change.original,
+                        "after": change.current,
+                    }
+                )
+        return DiffResult(inserts=inserts, updates=updates, deletes=deletes)
+
+    def _place(self, key: tuple[str, str], change: _RowChange) -> None:
+        existing = self._rows.get(key)
+        if existing is not None:
+            self._displaced.append(existing)
+        self._rows[key] = change
+
+    def _key(self, table: str, row: dict[str, Any]) -> tuple[str, str]:
+        pk_cols = self.primary_keys.get(table)
+        if pk_cols and all(c in row for c in pk_cols):
+            identity: Any = [row[c] for c in pk_cols]
+        else:
+            identity = row
+        return table, json.dumps(identity, sort_keys=True, default=str)
@@ -2,14 +2,19 @@ from __future__ import annotations
 
 import json
 import logging
+import select
 import threading
 import time
 from dataclasses import dataclass
+from datetime import datetime
 from typing import Any, Mapping
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import psycopg  # type: ignore[import]
+import psycopg2
 from psycopg.rows import tuple_row  # type: ignore[import]
+from psycopg2.extras import LogicalReplicationConnection
+from sqlalchemy import insert
 
 from src.platform.db.schema import ChangeJournal
 from src.platform.isolationEngine.session import SessionManager
@@ -25,6 +30,17 @@ class ReplicationConfig:
     poll_interval: float = 0.5
     batch_size: int = 100
     plugin_options: dict[str, str] | None = None
+    # Journal flush policy: write buffered changes once this many are
+    # pending or the oldest has waited this many seconds.
+    flush_size: int = 500
+    flush_interval: float = 1.0
+    # "poll" peeks the slot with SQL every poll_interval; "stream" keeps a
+    # replication-protocol connection open and receives changes as they
+    # are decoded.
+    mode: str = "poll"
+    # How long stop_stream waits for the worker to reach the current WAL
+    # position before the run is evaluated from the journal.
+    stop_timeout: float = 5.0
 
     @classmethod
     def from_environ(
@@ -43,12 +59,38 @@ class ReplicationConfig:
             plugin_options=parse_replication_options(
                 environ.get("LOGICAL_REPLICATION_PLUGIN_OPTIONS")
             ),
+            flush_size=int(environ.get("LOGICAL_REPLICATION_FLUSH_SIZE", "500")),
+            flush_interval=float(
+                environ.get("LOGICAL_REPLICATION_FLUSH_INTERVAL", "1.0")
+            ),
+            mode=environ.get("LOGICAL_REPLICATION_MODE", "poll").lower(),
+            stop_timeout=float(environ.get("LOGICAL_REPLICATION_STOP_TIMEOUT", "5.0")),
         )
 
 
 class ChangeJournalWriter:
-    def __init__(self, session_manager: SessionManager):
+    """
+    Buffers captured changes and writes them to the journal in bulk.
+
+    ``write`` only appends to an in-memory buffer; ``flush`` inserts
+    everything buffered with one multi-row INSERT in a single transaction.
+    Changes must not be acknowledged to the replication slot before the
+    flush that contains them has returned.
+    """
+
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        *,
+        flush_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
         self._sessions = session_manager
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._buffer: list[dict[str, Any]] = []
+        self._buffered_since: float | None = None
+        self._lock = threading.Lock()
 
     def write(
         self,
@@ -62,18 +104,59 @@ class ChangeJournalWriter:
         before: dict[str, Any] | None,
         after: dict[str, Any] | None,
     ) -> None:
-        with self._sessions.with_meta_session() as session:
-            entry = ChangeJournal(
-                environment_id=environment_id,
-                run_id=run_id,
-                lsn=lsn,
-                table_name=table,
-                operation=operation,
-                primary_key=primary_key,
-                before=before,
-                after=after,
-            )
-            session.add(entry)
+        # recorded_at is taken at capture time so journal order follows
+        # the order changes were read from the slot, not flush time.
+        entry = {
+            "id": uuid4(),
+            "environment_id": environment_id,
+            "run_id": run_id,
+            "lsn": lsn,
+            "table_name": table,
+            "operation": operation,
+            "primary_key": primary_key,
+            "before": before,
+            "after": after,
+            "recorded_at": datetime.now(),
+        }
+        with self._lock:
+            if not self._buffer:
+                self._buffered_since = time.monotonic()
+            self._buffer.append(entry)
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def should_flush(self) -> bool:
+        with self._lock:
+            if not self._buffer:
+                return False
+            if len(self._buffer) >= self.flush_size:
+                return True
+            assert self._buffered_since is not None
+            return time.monotonic() - self._buffered_since >= self.flush_interval
+
+    def flush(self) -> int:
+        """Write all buffered changes; returns the number written.
+
+        On failure the changes are put back at the front of the buffer so a
+        later flush retries them in order.
+        """
+        with self._lock:
+            rows, since = self._buffer, self._buffered_since
+            self._buffer, self._buffered_since = [], None
+        if not rows:
+            return 0
+        try:
+            with self._sessions.with_meta_session() as session:
+                session.execute(insert(ChangeJournal), rows)
+        except Exception:
+            with self._lock:
+                self._buffer = rows + self._buffer
+                self._buffered_since = since
+            raise
+        logger.debug("Flushed %d change journal entries", len(rows))
+        return len(rows)
 
 
 @dataclass
@@ -106,9 +189,42 @@ class GlobalReplicationWorker(threading.Thread):
         self._active_runs = active_runs
         self._runs_lock = runs_lock
         self._stop_event = threading.Event()
+        # Slot rows read with peek but not yet acknowledged, and the LSN of
+        # the last one. The slot is only advanced once the journal flush
+        # covering those rows has committed (at-least-once delivery).
+        self._peeked = 0
+        self._peeked_lsn: str | None = None
+        # Highest LSN up to which every change has been routed to the
+        # writer; stop_stream waits on it through wait_for_lsn.
+        self._seen_lsn = 0
+        self._progress = threading.Condition()
+        self._wake = threading.Event()
 
     def stop(self) -> None:
         self._stop_event.set()
+        self._wake.set()
+
+    def wait_for_lsn(self, lsn: str, timeout: float) -> bool:
+        """Block until changes up to ``lsn`` have been routed to the writer.
+
+        Returns False if the worker did not get there within ``timeout``.
+        """
+        target = parse_lsn(lsn)
+        deadline = time.monotonic() + timeout
+        with self._progress:
+            while self._seen_lsn < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_alive():
+                    return False
+                self._wake.set()
+                self._progress.wait(min(remaining, 0.1))
+        return True
+
+    def _mark_seen(self, lsn: int) -> None:
+        with self._progress:
+            if lsn > self._seen_lsn:
+                self._seen_lsn = lsn
+                self._progress.notify_all()
 
     def run(self) -> None:
         logger.info(
@@ -118,7 +234,9 @@ class GlobalReplicationWorker(threading.Thread):
             while not self._stop_event.is_set():
                 has_changes = self._poll_changes()
                 if not has_changes:
-                    time.sleep(self.config.poll_interval)
+                    self._wake.wait(self.config.poll_interval)
+                    self._wake.clear()
+            self._acknowledge()
         except Exception as exc:
             logger.error("Global replication worker failed: %s", exc, exc_info=True)
         finally:
@@ -127,12 +245,17 @@ class GlobalReplicationWorker(threading.Thread):
     def _poll_changes(self) -> bool:
         query_options = self._build_plugin_options()
         sql = (
-            "SELECT lsn, data FROM pg_logical_slot_get_changes(%s, NULL, %s"
+            "SELECT lsn, data FROM pg_logical_slot_peek_changes(%s, NULL, %s"
             + (", " + ", ".join("%s" for _ in query_options) if query_options else "")
             + ")"
         )
 
-        params: list[Any] = [self.config.slot_name, self.config.batch_size]
+        # Peeking always starts at the slot's confirmed position, so ask for
+        # the rows already buffered plus a fresh batch and skip the former.
+        params: list[Any] = [
+            self.config.slot_name,
+            self._peeked + self.config.batch_size,
+        ]
         params.extend(query_options)
 
         rows: list[tuple[str, str]] = []
@@ -141,8 +264,10 @@ class GlobalReplicationWorker(threading.Thread):
                 self.config.dsn, row_factory=tuple_row, autocommit=True
             ) as conn:
                 with conn.cursor() as cur:
+                    cur.execute("SELECT pg_current_wal_lsn()")
+                    wal_lsn = cur.fetchone()[0]
                     cur.execute(sql, params)
-                    result = cur.fetchall()
+                    result = cur.fetchall()[self._peeked :]
                     for record in result:
                         if len(record) == 3:
                             lsn, _, data = record
@@ -159,7 +284,16 @@ class GlobalReplicationWorker(threading.Thread):
             logger.debug("Slot %s doesn't exist yet", self.config.slot_name)
             return False
 
+        # A short batch means the slot was drained up to at least the WAL
+        # position read before peeking.
+        caught_up = len(result) < self.config.batch_size
+
         if not rows:
+            # Caught up: acknowledge skipped rows right away, and buffered
+            # changes once they are old enough.
+            if self.writer.pending == 0 or self.writer.should_flush():
+                self._acknowledge()
+            self._mark_seen(parse_lsn(str(wal_lsn)))
             return False
 
         # Get current snapshot of active runs
@@ -167,57 +301,82 @@ class GlobalReplicationWorker(threading.Thread):
             active_schemas = dict(self._active_runs)
 
         for lsn, payload in rows:
-            try:
-                payload_json = json.loads(payload)
-            except json.JSONDecodeError:
-                logger.warning("Failed to decode logical change payload: %s", payload)
-                continue
+            self._route_payload(lsn, payload, active_schemas)
 
-            for change in payload_json.get("change", []):
-                table_name = change.get("table")
-                change_schema = change.get("schema", "public")
-                op = change.get("kind")
+        self._peeked += len(rows)
+        self._peeked_lsn = rows[-1][0]
+        if self.writer.should_flush() or self._peeked >= self.writer.flush_size:
+            self._acknowledge()
+        self._mark_seen(parse_lsn(str(wal_lsn)) if caught_up else parse_lsn(rows[-1][0]))
+        return True
 
-                if not table_name:
-                    continue
+    def _route_payload(
+        self, lsn: str, payload: str, active_schemas: dict[str, ActiveRun]
+    ) -> None:
+        """Decode one wal2json transaction and buffer changes for tracked runs."""
+        try:
+            payload_json = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning("Failed to decode logical change payload: %s", payload)
+            return
 
-                # Look up which run this schema belongs to
-                run_info = active_schemas.get(change_schema)
-                if not run_info:
-                    # Schema not being tracked, skip
-                    continue
+        for change in payload_json.get("change", []):
+            table_name = change.get("table")
+            change_schema = change.get("schema", "public")
+            op = change.get("kind")
 
-                logger.debug(
-                    "Captured change: %s.%s (%s) -> run %s",
-                    change_schema,
-                    table_name,
-                    op,
-                    run_info.run_id.hex[:8],
-                )
+            if not table_name:
+                continue
 
-                oldkeys = change.get("oldkeys", {})
-                before = self._zip_columns(
-                    oldkeys.get("keynames"),
-                    oldkeys.get("keyvalues"),
-                    oldkeys.get("keytypes"),
-                )
-                after = self._zip_columns(
-                    change.get("columnnames"),
-                    change.get("columnvalues"),
-                    change.get("columntypes"),
-                )
-                primary_key = self._primary_key_from_change(change, before, after)
-                self.writer.write(
-                    environment_id=run_info.environment_id,
-                    run_id=run_info.run_id,
-                    lsn=lsn,
-                    table=table_name,
-                    operation=op,
-                    primary_key=primary_key,
-                    before=before if op in ("update", "delete") else None,
-                    after=after if op in ("insert", "update") else None,
-                )
-        return True
+            # Look up which run this schema belongs to
+            run_info = active_schemas.get(change_schema)
+            if not run_info:
+                # Schema not being tracked, skip
+                continue
+
+            logger.debug(
+                "Captured change: %s.%s (%s) -> run %s",
+                change_schema,
+                table_name,
+                op,
+                run_info.run_id.hex[:8],
+            )
+
+            oldkeys = change.get("oldkeys", {})
+            before = self._zip_columns(
+                oldkeys.get("keynames"),
+                oldkeys.get("keyvalues"),
+                oldkeys.get("keytypes"),
+            )
+            after = self._zip_columns(
+                change.get("columnnames"),
+                change.get("columnvalues"),
+                change.get("columntypes"),
+            )
+            primary_key = self._primary_key_from_change(change, before, after)
+            self.writer.write(
+                environment_id=run_info.environment_id,
+                run_id=run_info.run_id,
+                lsn=lsn,
+                table=table_name,
+                operation=op,
+                primary_key=primary_key,
+                before=before if op in ("update", "delete") else None,
+                after=after if op in ("insert", "update") else None,
+            )
+
+    def _acknowledge(self) -> None:
+        """Flush the journal, then advance the slot past every peeked row."""
+        self.writer.flush()
+        if self._peeked_lsn is None:
+            return
+        with psycopg.connect(self.config.dsn, autocommit=True) as conn:
+            conn.execute(
+                "SELECT pg_replication_slot_advance(%s, %s::pg_lsn)",
+                (self.config.slot_name, self._peeked_lsn),
+            )
+        self._peeked = 0
+        self._peeked_lsn = None
 
     def _build_plugin_options(self) -> list[str]:
         options = self.config.plugin_options or {}
@@ -290,6 +449,114 @@ class GlobalReplicationWorker(threading.Thread):
         return {}
 
 
+class StreamingReplicationWorker(GlobalReplicationWorker):
+    """
+    Worker that keeps one replication-protocol connection open.
+
+    Changes are received with START_REPLICATION as soon as they are decoded
+    instead of being polled. The slot position is confirmed with standby
+    status feedback once the journal flush containing the changes has
+    committed, so delivery stays at-least-once.
+    """
+
+    # Send standby status at least this often so the server does not time
+    # out an idle connection (wal_sender_timeout defaults to 60s).
+    status_interval = 10.0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.name = "replication-stream"
+        self._received_lsn = 0
+
+    def run(self) -> None:
+        logger.info(
+            "Streaming replication worker started (slot=%s)", self.config.slot_name
+        )
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self._stream()
+                except psycopg2.Error as exc:
+                    logger.warning(
+                        "Replication stream on slot %s dropped: %s",
+                        self.config.slot_name,
+                        exc,
+                    )
+                    self._stop_event.wait(self.config.poll_interval)
+        except Exception as exc:
+            logger.error("Streaming replication worker failed: %s", exc, exc_info=True)
+        finally:
+            logger.info("Streaming replication worker stopped")
+
+    def _connect(self):
+        return psycopg2.connect(
+            self.config.dsn, connection_factory=LogicalReplicationConnection
+        )
+
+    def _stream(self) -> None:
+        options = self._build_plugin_options()
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.start_replication(
+                slot_name=self.config.slot_name,
+                decode=True,
+                options=dict(zip(options[::2], options[1::2])),
+            )
+            last_status = time.monotonic()
+            while not self._stop_event.is_set():
+                msg = cur.read_message()
+                if msg is not None:
+                    with self._runs_lock:
+                        active_schemas = dict(self._active_runs)
+                    self._route_payload(
+                        format_lsn(msg.data_start), msg.payload, active_schemas
+                    )
+                    self._received_lsn = max(self._received_lsn, msg.data_start)
+                    self._mark_seen(msg.data_start)
+                    if self.writer.should_flush():
+                        self._confirm(cur)
+                        last_status = time.monotonic()
+                    continue
+
+                # Nothing buffered on the connection: everything the server
+                # has decoded so far (wal_end) has been routed.
+                self._mark_seen(cur.wal_end)
+                if self.writer.pending == 0 or self.writer.should_flush():
+                    self._confirm(cur)
+                    last_status = time.monotonic()
+                waiting = self._wake.is_set()
+                if waiting or time.monotonic() - last_status >= self.status_interval:
+                    # Ask the server for a keepalive so wal_end catches up
+                    # for callers blocked in wait_for_lsn.
+                    cur.send_feedback(reply=waiting, force=True)
+                    last_status = time.monotonic()
+                    self._wake.clear()
+                self._wait_readable(conn, self.config.poll_interval)
+            self._confirm(cur)
+        finally:
+            conn.close()
+
+    def _confirm(self, cur) -> None:
+        """Flush the journal, then confirm everything received so far."""
+        self.writer.flush()
+        if self._received_lsn:
+            cur.send_feedback(
+                write_lsn=self._received_lsn, flush_lsn=self._received_lsn
+            )
+
+    def _wait_readable(self, conn, timeout: float) -> None:
+        # Also return early when wait_for_lsn wants a fresh keepalive.
+        deadline = time.monotonic() + timeout
+        while not self._stop_event.is_set() and not self._wake.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            ready, _, _ = select.select([conn], [], [], min(remaining, 0.05))
+            if ready:
+                return
+
+
 class LogicalReplicationService:
     """
     On-demand single-slot replication service.
@@ -311,7 +578,11 @@ class LogicalReplicationService:
         self._sessions = session_manager
         self._config = config
         self._idle_timeout = idle_timeout
-        self._writer = ChangeJournalWriter(session_manager)
+        self._writer = ChangeJournalWriter(
+            session_manager,
+            flush_size=config.flush_size,
+            flush_interval=config.flush_interval,
+        )
         self._active_runs: dict[str, ActiveRun] = {}  # schema -> ActiveRun
         self._lock = threading.Lock()
         self._worker: GlobalReplicationWorker | None = None
@@ -339,7 +610,12 @@ class LogicalReplicationService:
         self._ensure_slot()
 
         # Start the global worker
-        self._worker = GlobalReplicationWorker(
+        worker_cls = (
+            StreamingReplicationWorker
+            if self._config.mode == "stream"
+            else GlobalReplicationWorker
+        )
+        self._worker = worker_cls(
             config=self._config,
             writer=self._writer,
             active_runs=self._active_runs,
@@ -493,8 +769,12 @@ class LogicalReplicationService:
         """
         Unregister a run from receiving replication events.
 
-        No slot dropping - just removes the schema -> run mapping.
+        No slot dropping - just removes the schema -> run mapping. Waits
+        (up to ``stop_timeout``) for the worker to route everything written
+        before this call, so the journal is complete when the run is
+        evaluated.
         """
+        self._wait_for_current_lsn()
         with self._lock:
             if target_schema and target_schema in self._active_runs:
                 del self._active_runs[target_schema]
@@ -510,6 +790,32 @@ class LogicalReplicationService:
                     del self._active_runs[schema]
                     logger.debug("Unregistered replication for schema %s", schema)
 
+        # The run is about to be evaluated from the journal; make sure
+        # everything captured so far is visible there.
+        self._writer.flush()
+
+    def _wait_for_current_lsn(self) -> None:
+        worker = self._worker
+        if worker is None or not worker.is_alive():
+            return
+        try:
+            with psycopg.connect(self._config.dsn, autocommit=True) as conn:
+                target = conn.execute("SELECT pg_current_wal_lsn()").fetchone()[0]
+        except psycopg.Error as exc:
+            logger.warning("Could not read current WAL position: %s", exc)
+            return
+        t0 = time.perf_counter()
+        if worker.wait_for_lsn(str(target), timeout=self._config.stop_timeout):
+            logger.debug(
+                "Replication reached %s in %.3fs", target, time.perf_counter() - t0
+            )
+        else:
+            logger.warning(
+                "Replication did not reach %s within %.1fs; journal may be incomplete",
+                target,
+                self._config.stop_timeout,
+            )
+
     def cleanup_environment(self, environment_id: UUID) -> None:
         """Remove all run registrations for an environment."""
         env_id = UUID(str(environment_id))
@@ -558,6 +864,16 @@ class LogicalReplicationService:
         return self._started and self._worker is not None and self._worker.is_alive()
 
 
+def parse_lsn(lsn: str) -> int:
+    """Convert a textual LSN such as ``16/B374D848`` to an integer."""
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def format_lsn(lsn: int) -> str:
+    return f"{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}"
+
+
 def parse_replication_options(raw: str | None) -> dict[str, str] | None:
     if not raw:
         return None
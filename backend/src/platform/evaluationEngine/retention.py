@@ -0,0 +1,344 @@
+"""
+Retention for run snapshots.
+
+Every snapshot-based run leaves a ``<table>_snapshot_<suffix>`` copy of each
+table in the environment schema and one ``SnapshotMetadata`` row per table.
+Nothing removes them until the environment itself is dropped, so a
+long-lived environment keeps a full copy of its data for every run.
+
+``SnapshotReaper`` drops the snapshots of runs that finished evaluating more
+than ``retention_seconds`` ago, and snapshots no run refers to (such as the
+after snapshots taken by ``diff_run``) once they are that old. Snapshots of
+runs still in progress, and snapshots whose tables a retained incremental
+snapshot points at, are kept. Metadata rows left behind by deleted
+environments, and write-tracking rows of schemas that no longer exist, are
+removed without touching their (already dropped) schemas. Write-tracking
+rows of live schemas are folded into one row per table, since pooled
+schemas are recycled without being dropped.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import delete, func, or_, select, text
+
+from src.platform.db.schema import RunTimeEnvironment, SnapshotMetadata, TestRun
+from src.platform.evaluationEngine.differ import Differ
+from src.platform.isolationEngine.session import SessionManager
+
+logger = logging.getLogger(__name__)
+
+FINISHED_RUN_STATUSES = ("passed", "failed", "error")
+
+# (environment_id, schema_name, snapshot_suffix)
+SnapshotKey = tuple[str, str, str]
+
+
+@dataclass
+class ReapStats:
+    snapshots: int = 0
+    tables: int = 0
+    bytes_reclaimed: int = 0
+    orphaned_rows: int = 0
+
+
+@dataclass
+class _Snapshot:
+    created_at: datetime
+    # Tables physically copied for this snapshot.
+    tables: list[str]
+    # Suffixes of older snapshots holding the data of unchanged tables.
+    sources: set[str]
+
+
+@dataclass
+class _RunRef:
+    id: UUID
+    status: str
+    updated_at: datetime
+    before_suffix: str | None
+    after_suffix: str | None
+    has_diff: bool
+
+
+class SnapshotReaper:
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        retention_seconds: int = 3600,
+        batch_size: int = 50,
+    ):
+        self.session_manager = session_manager
+        self.retention = timedelta(seconds=max(0, retention_seconds))
+        self.batch_size = max(1, batch_size)
+        self.engine = session_manager.base_engine
+        self.q = self.engine.dialect.identifier_preparer.quote
+
+    def reap(self) -> ReapStats:
+        """Drop expired snapshots and orphaned metadata. Returns what was removed."""
+        stats = ReapStats()
+        cutoff = datetime.now() - self.retention
+        snapshots, orphaned_envs = self._load_snapshots()
+        if orphaned_envs:
+            stats.orphaned_rows = self._delete_orphaned_metadata(orphaned_envs)
+        stats.orphaned_rows += self._delete_orphaned_write_tracking()
+        self._fold_write_tracking()
+        if not snapshots:
+            return stats
+
+        runs = self._load_runs({env_id for env_id, _, _ in snapshots})
+        expired = self._expired_snapshots(snapshots, runs, cutoff)
+        if not expired:
+            return stats
+
+        by_schema: dict[tuple[str, str], list[str]] = defaultdict(list)
+        for env_id, schema, suffix in sorted(expired):
+            by_schema[(env_id, schema)].append(suffix)
+        for (env_id, schema), suffixes in by_schema.items():
+            tables = [
+                f"{table}_snapshot_{suffix}"
+                for suffix in suffixes
+                for table in snapshots[(env_id, schema, suffix)].tables
+            ]
+            try:
+                stats.bytes_reclaimed += self._drop_tables(schema, tables)
+                self._delete_metadata(env_id, schema, suffixes)
+            except Exception as exc:
+                logger.error(
+                    "Failed to reap snapshots %s in schema %s: %s",
+                    suffixes,
+                    schema,
+                    exc,
+                )
+                continue
+            stats.snapshots += len(suffixes)
+            stats.tables += len(tables)
+
+        if stats.snapshots:
+            logger.info(
+                "Reaped %d snapshots (%d tables), reclaimed %d bytes",
+                stats.snapshots,
+                stats.tables,
+                stats.bytes_reclaimed,
+            )
+        return stats
+
+    def _load_snapshots(self) -> tuple[dict[SnapshotKey, _Snapshot], set[str]]:
+        """Group metadata rows by snapshot; also return deleted environments."""
+        snapshots: dict[SnapshotKey, _Snapshot] = {}
+        orphaned_envs: set[str] = set()
+        with self.session_manager.with_meta_session() as session:
+            rows = session.execute(
+                select(
+                    SnapshotMetadata.environment_id,
+                    SnapshotMetadata.schema_name,
+                    SnapshotMetadata.snapshot_suffix,
+                    SnapshotMetadata.table_name,
+                    SnapshotMetadata.source_suffix,
+                    SnapshotMetadata.created_at,
+                    RunTimeEnvironment.status,
+                ).join(
+                    RunTimeEnvironment,
+                    RunTimeEnvironment.id == SnapshotMetadata.environment_id,
+                )
+            ).all()
+        for env_id, schema, suffix, table, source, created_at, status in rows:
+            env_id = str(env_id)
+            if status == "deleted":
+                orphaned_envs.add(env_id)
+                continue
+            if status != "ready":
+                # Expired environments are dropped whole by the cleanup cycle.
+                continue
+            snapshot = snapshots.setdefault(
+                (env_id, schema, suffix), _Snapshot(created_at, [], set())
+            )
+            snapshot.created_at = max(snapshot.created_at, created_at)
+            if source:
+                snapshot.sources.add(source)
+            else:
+                snapshot.tables.append(table)
+        return snapshots, orphaned_envs
+
+    def _load_runs(self, environment_ids: set[str]) -> dict[str, list[_RunRef]]:
+        runs: dict[str, list[_RunRef]] = defaultdict(list)
+        with self.session_manager.with_meta_session() as session:
+            rows = session.execute(
+                select(
+                    TestRun.id,
+                    TestRun.environment_id,
+                    TestRun.status,
+                    TestRun.updated_at,
+                    TestRun.before_snapshot_suffix,
+                    TestRun.after_snapshot_suffix,
+                    or_(
+                        TestRun.diff_id.is_not(None),
+                        func.coalesce(TestRun.result.has_key("diff"), False),
+                    ),
+                ).where(TestRun.environment_id.in_(environment_ids))
+            ).all()
+        for run_id, env_id, status, updated_at, before, after, has_diff in rows:
+            runs[str(env_id)].append(
+                _RunRef(run_id, status, updated_at, before, after, has_diff)
+            )
+        return runs
+
+    def _expired_snapshots(
+        self,
+        snapshots: dict[SnapshotKey, _Snapshot],
+        runs: dict[str, list[_RunRef]],
+        cutoff: datetime,
+    ) -> set[SnapshotKey]:
+        expired: set[SnapshotKey] = set()
+        for key, snapshot in snapshots.items():
+            env_id, schema, suffix = key
+            refs = [
+                run
+                for run in runs.get(env_id, [])
+                if suffix in (run.before_suffix, run.after_suffix)
+            ]
+            if refs:
+                if all(
+                    run.status in FINISHED_RUN_STATUSES and run.updated_at < cutoff
+                    for run in refs
+                ) and all(self._ensure_diff(env_id, schema, run) for run in refs):
+                    expired.add(key)
+            elif snapshot.created_at < cutoff:
+                expired.add(key)
+
+        # An incremental snapshot reads unchanged tables from the snapshot it
+        # was based on, so those must outlive it.
+        for key, snapshot in snapshots.items():
+            if key not in expired:
+                env_id, schema, _ = key
+                expired.difference_update(
+                    (env_id, schema, source) for source in snapshot.sources
+                )
+        return expired
+
+    def _ensure_diff(self, environment_id: str, schema: str, run: _RunRef) -> bool:
+        """Store the run's diff before its snapshots go away.
+
+        Runs evaluated with SQL assertions only build their diff when the
+        result is first read; after reaping it could not be built at all.
+        """
+        if (
+            run.has_diff
+            or run.status not in ("passed", "failed")
+            or not run.before_suffix
+            or not run.after_suffix
+        ):
+            return True
+        try:
+            differ = Differ(
+                schema=schema,
+                environment_id=environment_id,
+                session_manager=self.session_manager,
+            )
+            diff = differ.get_diff(run.before_suffix, run.after_suffix)
+            diff_id = differ.store_diff(diff, run.before_suffix, run.after_suffix)
+            with self.session_manager.with_meta_session() as session:
+                test_run = session.get(TestRun, run.id)
+                if test_run is not None:
+                    test_run.diff_id = diff_id
+        except Exception as exc:
+            logger.warning(
+                "Keeping snapshots of run %s; could not store its diff: %s",
+                run.id,
+                exc,
+            )
+            return False
+        run.has_diff = True
+        return True
+
+    def _drop_tables(self, schema: str, tables: list[str]) -> int:
+        """Drop ``tables`` in batches. Returns the bytes they occupied."""
+        reclaimed = 0
+        for start in range(0, len(tables), self.batch_size):
+            batch = tables[start : start + self.batch_size]
+            with self.engine.begin() as conn:
+                reclaimed += conn.execute(
+                    text(
+                        """
+                        SELECT COALESCE(SUM(pg_total_relation_size(c.oid)), 0)
+                        FROM pg_class c
+                        JOIN pg_namespace n ON n.oid = c.relnamespace
+                        WHERE n.nspname = :schema AND c.relname = ANY(:tables)
+                        """
+                    ),
+                    {"schema": schema, "tables": batch},
+                ).scalar_one()
+                names = ", ".join(
+                    f"{self.q(schema)}.{self.q(table)}" for table in batch
+                )
+                conn.execute(text(f"DROP TABLE IF EXISTS {names}"))
+        return int(reclaimed)
+
+    def _delete_metadata(
+        self, environment_id: str, schema: str, suffixes: list[str]
+    ) -> None:
+        with self.session_manager.with_meta_session() as session:
+            session.execute(
+                delete(SnapshotMetadata).where(
+                    SnapshotMetadata.environment_id == environment_id,
+                    SnapshotMetadata.schema_name == schema,
+                    SnapshotMetadata.snapshot_suffix.in_(suffixes),
+                )
+            )
+
+    def _delete_orphaned_metadata(self, environment_ids: set[str]) -> int:
+        with self.session_manager.with_meta_session() as session:
+            result = session.execute(
+                delete(SnapshotMetadata).where(
+                    SnapshotMetadata.environment_id.in_(environment_ids)
+                )
+            )
+            return result.rowcount or 0
+
+    def _delete_orphaned_write_tracking(self) -> int:
+        """Remove write-tracking rows of schemas that no longer exist."""
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                text(
+                    """
+                    DELETE FROM public.table_writes w
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM pg_namespace n WHERE n.nspname = w.schema_name
+                    )
+                    """
+                )
+            )
+            return result.rowcount or 0
+
+    def _fold_write_tracking(self) -> int:
+        """Fold committed per-transaction write rows into one row per table.
+
+        The folded row (``txid`` 0) holds the sum of the rows it replaced, so
+        every table's write count is unchanged. Runs as one statement: a
+        snapshot reading the counters sees either all rows or the fold.
+        """
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                text(
+                    """
+                    WITH folded AS (
+                        DELETE FROM public.table_writes
+                        WHERE txid <> 0
+                        RETURNING schema_name, table_name, write_count
+                    )
+                    INSERT INTO public.table_writes AS w
+                        (schema_name, table_name, txid, write_count)
+                    SELECT schema_name, table_name, 0, sum(write_count)
+                    FROM folded
+                    GROUP BY schema_name, table_name
+                    ON CONFLICT (schema_name, table_name, txid)
+                    DO UPDATE SET write_count = w.write_count + EXCLUDED.write_count
+                    """
+                )
+            )
+            return result.rowcount or 0
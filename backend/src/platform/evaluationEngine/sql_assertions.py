@@ -0,0 +1,386 @@
+"""
+Evaluate compiled assertions directly against snapshot tables.
+
+``AssertionEngine`` needs the full diff in Python. For snapshot runs most of
+that diff is filtered away again, so this module translates each assertion's
+``where`` and ``expected_changes`` predicates into SQL and lets PostgreSQL
+count the matching rows. Assertions on the same (kind, table) share one query
+with one ``count(*) FILTER (...)`` per assertion.
+
+A predicate is only translated when SQL gives the same answer as the Python
+engine for that column type (text, integer, numeric with integer operands,
+boolean; ``exists`` on any column). Anything else (regex and case
+insensitive matching, JSON paths, float, timestamp and UUID comparisons,
+``has_any``) sends that assertion down the Python path, which evaluates it
+over the rows of its own table only. Float columns stay in Python because a
+``real`` value is widened to double precision in SQL but decoded from its
+shortest text form by the driver, so equality can disagree.
+
+Strict-mode violations are reported in primary key order, the order in which
+``Differ`` returns diff rows.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Mapping
+
+from sqlalchemy import text
+from sqlalchemy import types as sqltypes
+
+from src.platform.evaluationEngine.assertion import (
+    AssertionEngine,
+    CompiledAssertion,
+    Outcome,
+    _BUCKETS,
+    _compile_predicate,
+)
+from src.platform.evaluationEngine.differ import Differ
+
+logger = logging.getLogger(__name__)
+
+_TEXT = "text"
+_INT = "int"
+_FLOAT = "float"
+_NUMERIC = "numeric"
+_BOOL = "bool"
+_JSON = "json"
+_BINARY = "binary"
+_OTHER = "other"
+
+_ORDERING = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+class _Untranslatable(Exception):
+    """The predicate has no exact SQL equivalent for this column."""
+
+
+def _column_kind(column_type: sqltypes.TypeEngine) -> str:
+    if isinstance(column_type, sqltypes.Boolean):
+        return _BOOL
+    if isinstance(column_type, sqltypes.Integer):
+        return _INT
+    if isinstance(column_type, sqltypes.Float):
+        return _FLOAT
+    if isinstance(column_type, sqltypes.Numeric):
+        return _NUMERIC
+    if isinstance(column_type, sqltypes.JSON):
+        return _JSON
+    if isinstance(column_type, sqltypes.LargeBinary):
+        return _BINARY
+    # CHAR is padded by the driver but not by ::text, so it stays in Python.
+    if isinstance(column_type, sqltypes.String) and not isinstance(
+        column_type, sqltypes.CHAR
+    ):
+        return _TEXT
+    return _OTHER
+
+
+def _operand_fits(kind: str, value: Any) -> bool:
+    """Whether SQL and Python compare a column of ``kind`` with ``value`` alike."""
+    if isinstance(value, bool):
+        return kind == _BOOL
+    if isinstance(value, int):
+        return kind in (_INT, _NUMERIC)
+    if isinstance(value, float):
+        return kind == _INT
+    if isinstance(value, str):
+        return kind == _TEXT
+    return False
+
+
+class _Query:
+    """Collects bind parameters while SQL fragments are built."""
+
+    def __init__(self) -> None:
+        self.params: dict[str, Any] = {}
+
+    def bind(self, value: Any) -> str:
+        name = f"p{len(self.params)}"
+        self.params[name] = value
+        return f":{name}"
+
+
+def _op_sql(ref: str, kind: str, op: str, expected: Any, query: _Query) -> str:
+    if op == "exists":
+        present = f"{ref} IS NOT NULL"
+        if kind == _JSON:
+            # A JSON null decodes to None in Python.
+            present = f"({ref} IS NOT NULL AND {ref}::jsonb <> 'null'::jsonb)"
+        return present if expected else f"NOT {present}"
+
+    if kind in (_JSON, _BINARY, _FLOAT, _OTHER):
+        raise _Untranslatable(op)
+
+    if op in ("eq", "ne", "not_eq"):
+        if expected is None:
+            return f"{ref} IS NULL" if op == "eq" else f"{ref} IS NOT NULL"
+        if not _operand_fits(kind, expected):
+            raise _Untranslatable(op)
+        distinct = "IS NOT DISTINCT FROM" if op == "eq" else "IS DISTINCT FROM"
+        return f"{ref} {distinct} {query.bind(expected)}"
+
+    if op in ("in", "not_in"):
+        if not isinstance(expected, (list, tuple, set)):
+            raise _Untranslatable(op)
+        values = [v for v in expected if v is not None]
+        if not all(_operand_fits(kind, v) for v in values):
+            raise _Untranslatable(op)
+        member = f"COALESCE({ref} = ANY({query.bind(values)}), FALSE)"
+        if len(values) != len(expected):
+            member = f"({member} OR {ref} IS NULL)"
+        return member if op == "in" else f"NOT {member}"
+
+    if op in _ORDERING:
+        if expected is None or kind == _BOOL or not _operand_fits(kind, expected):
+            raise _Untranslatable(op)
+        # Python orders strings by code point, which is what the C collation does.
+        collate = ' COLLATE "C"' if kind == _TEXT else ""
+        return f"COALESCE({ref}{collate} {_ORDERING[op]} {query.bind(expected)}, FALSE)"
+
+    if op in ("contains", "not_contains", "starts_with", "ends_with"):
+        if not isinstance(expected, str) or kind != _TEXT:
+            # Python requires both sides to be strings; other column kinds
+            # never produce one.
+            return "FALSE"
+        p = query.bind(expected)
+        if op == "contains":
+            return f"COALESCE(strpos({ref}, {p}) > 0, FALSE)"
+        if op == "not_contains":
+            return f"COALESCE(strpos({ref}, {p}) = 0, FALSE)"
+        if op == "starts_with":
+            return f"COALESCE(starts_with({ref}, {p}), FALSE)"
+        return f"COALESCE(right({ref}, char_length({p})) = {p}, FALSE)"
+
+    if op in ("regex", "i_contains", "i_starts_with", "i_ends_with", "has_any", "has_all"):
+        raise _Untranslatable(op)
+    return "FALSE"
+
+
+def _predicate_sql(ref: str, kind: str, pred: Any, query: _Query) -> str:
+    if not isinstance(pred, Mapping) and pred is not None:
+        pred = {"eq": pred}
+    if not pred:
+        return "TRUE"
+    parts = [_op_sql(ref, kind, op, expected, query) for op, expected in pred.items()]
+    return "(" + " AND ".join(parts) + ")"
+
+
+class _TableShape:
+    def __init__(self, differ: Differ, table: str):
+        sa_table = differ.metadata.metadata.tables[f"{differ.schema}.{table}"]
+        self.q = differ.q
+        self.columns = differ._get_columns(table)
+        self.pk = differ._get_pk_columns(table)
+        self.kinds = {c.name: _column_kind(c.type) for c in sa_table.columns}
+
+    def ref(self, alias: str, column: str) -> str:
+        ref = f"{alias}.{self.q(column)}"
+        # Enums and varchars compare as text.
+        return f"{ref}::text" if self.kinds[column] == _TEXT else ref
+
+    def where_sql(self, alias: str, where: Mapping[str, Any], query: _Query) -> str:
+        parts: list[str] = []
+        for key, pred in where.items():
+            if key in self.kinds:
+                parts.append(
+                    _predicate_sql(self.ref(alias, key), self.kinds[key], pred, query)
+                )
+                continue
+            head = key.split(".", 1)[0]
+            if "." in key and self.kinds.get(head) == _JSON:
+                raise _Untranslatable(key)
+            # Not a column (or a path into a scalar): Python sees None.
+            parts.append("TRUE" if _compile_predicate(pred)(None) else "FALSE")
+        return "(" + " AND ".join(parts) + ")" if parts else "TRUE"
+
+
+class SnapshotAssertionEvaluator:
+    """Evaluates an ``AssertionEngine``'s assertions between two snapshots."""
+
+    def __init__(
+        self,
+        engine: AssertionEngine,
+        differ: Differ,
+        before_suffix: str,
+        after_suffix: str,
+    ):
+        self.engine = engine
+        self.differ = differ
+        self.before_suffix = before_suffix
+        self.after_suffix = after_suffix
+        self._diff_rows: dict[str, dict[str, list]] = {}
+
+    def evaluate(self) -> dict:
+        start = time.perf_counter()
+        flagged = set(self.differ._tables_to_compare(self.before_suffix, self.after_suffix))
+        outcomes: dict[int, Outcome | None] = {}
+        groups: dict[tuple[str, str], list[CompiledAssertion]] = {}
+        for ca in self.engine.assertions:
+            bucket = _BUCKETS.get(ca.diff_type)
+            if bucket is None:
+                outcomes[ca.index] = None
+            elif ca.entity not in flagged or not self.differ._get_pk_columns(ca.entity):
+                # Unchanged or unkeyed tables never contribute diff rows.
+                outcomes[ca.index] = self.engine.match(ca, [])
+            else:
+                groups.setdefault((bucket, ca.entity), []).append(ca)
+
+        pushed = fallback = 0
+        for (bucket, table), assertions in groups.items():
+            shape = _TableShape(self.differ, table)
+            translated: list[tuple[CompiledAssertion, str, str, str | None]] = []
+            query = _Query()
+            for ca in assertions:
+                try:
+                    translated.append((ca, *self._assertion_sql(ca, shape, query)))
+                except _Untranslatable as exc:
+                    logger.debug(
+                        "assertion#%d on %s evaluated in Python (%s)",
+                        ca.index,
+                        table,
+                        exc,
+                    )
+                    rows = self._rows(table)[bucket]
+                    outcomes[ca.index] = self.engine.match(ca, rows)
+                    fallback += 1
+            if translated:
+                outcomes.update(self._count(bucket, shape, table, translated, query))
+                pushed += len(translated)
+
+        logger.info(
+            "Evaluated %d assertions on %s in SQL (%d in Python) in %.2fs",
+            pushed,
+            self.differ.schema,
+            fallback,
+            time.perf_counter() - start,
+        )
+        return self.engine.report([outcomes[ca.index] for ca in self.engine.assertions])
+
+    def _assertion_sql(
+        self, ca: CompiledAssertion, shape: _TableShape, query: _Query
+    ) -> tuple[str, str, str | None]:
+        """Return (where filter, expected change filter, strict check) SQL."""
+        where = ca.spec.get("where", {})
+        if ca.diff_type == "added":
+            return shape.where_sql("a", where, query), "TRUE", None
+        if ca.diff_type == "removed":
+            return shape.where_sql("b", where, query), "TRUE", None
+
+        matches_where = (
+            f"({shape.where_sql('a', where, query)} OR {shape.where_sql('b', where, query)})"
+        )
+        row_filter = ["TRUE"]
+        for chg in ca.changes:
+            spec_chg = ca.spec["expected_changes"][chg.field]
+            if chg.field not in shape.kinds or chg.field in ca.ignore:
+                row_filter.append("FALSE")
+                continue
+            kind = shape.kinds[chg.field]
+            row_filter.append(f"{query.bind(chg.field)} = ANY(ch.changed)")
+            if spec_chg.get("from") is not None:
+                row_filter.append(
+                    _predicate_sql(
+                        shape.ref("b", chg.field), kind, spec_chg["from"], query
+                    )
+                )
+            if spec_chg.get("to") is not None:
+                row_filter.append(
+                    _predicate_sql(shape.ref("a", chg.field), kind, spec_chg["to"], query)
+                )
+        strict = None
+        if self.engine.strict:
+            allowed = sorted(ca.expected_keys | ca.ignore)
+            strict = f"ch.changed <@ CAST({query.bind(allowed)} AS text[])"
+        return matches_where, " AND ".join(row_filter), strict
+
+    def _count(
+        self,
+        bucket: str,
+        shape: _TableShape,
+        table: str,
+        translated: list[tuple[CompiledAssertion, str, str, str | None]],
+        query: _Query,
+    ) -> dict[int, Outcome]:
+        q = shape.q
+        schema = q(self.differ.schema)
+        after = f"{schema}.{q(self.differ._snapshot_table(table, self.after_suffix))}"
+        before = f"{schema}.{q(self.differ._snapshot_table(table, self.before_suffix))}"
+        join = " AND ".join(f"a.{q(pk)} = b.{q(pk)}" for pk in shape.pk)
+        # Deleted rows only exist in the before snapshot.
+        key_alias = "b" if bucket == "deletes" else "a"
+        key_order = ", ".join(f"{key_alias}.{q(pk)}" for pk in shape.pk)
+
+        selects: list[str] = []
+        for n, (_, matches_where, changes_ok, strict) in enumerate(translated):
+            if strict is None:
+                selects.append(
+                    f"count(*) FILTER (WHERE {matches_where} AND {changes_ok}) AS m{n}"
+                )
+            else:
+                selects.append(
+                    f"count(*) FILTER (WHERE {matches_where} AND {strict} "
+                    f"AND {changes_ok}) AS m{n}"
+                )
+                selects.append(
+                    f"COALESCE(json_agg(ch.changed ORDER BY {key_order}) FILTER (WHERE "
+                    f"{matches_where} AND NOT {strict}), '[]') AS v{n}"
+                )
+
+        if bucket == "inserts":
+            source = (
+                f"{after} AS a LEFT JOIN {before} AS b ON {join} "
+                f"WHERE b.{q(shape.pk[0])} IS NULL"
+            )
+        elif bucket == "deletes":
+            source = (
+                f"{before} AS b LEFT JOIN {after} AS a ON {join} "
+                f"WHERE a.{q(shape.pk[0])} IS NULL"
+            )
+        else:
+            # Binary columns are sanitized to a placeholder in Python, so a
+            # change to them is never reported as a changed field.
+            tracked = [c for c in shape.columns if shape.kinds[c] != _BINARY]
+            changed = ", ".join(
+                f"CASE WHEN a.{q(c)} IS DISTINCT FROM b.{q(c)} THEN {query.bind(c)} END"
+                for c in tracked
+            )
+            differs = " OR ".join(
+                f"a.{q(c)} IS DISTINCT FROM b.{q(c)}" for c in shape.columns
+            )
+            source = (
+                f"{after} AS a JOIN {before} AS b ON {join} "
+                f"CROSS JOIN LATERAL (SELECT array_remove("
+                f"ARRAY[{changed}]::text[], NULL) AS changed) AS ch "
+                f"WHERE {differs}"
+            )
+
+        sql = f"SELECT {', '.join(selects)} FROM {source}"
+        with self.differ.engine.connect() as conn:
+            row = conn.execute(text(sql), query.params).mappings().one()
+
+        outcomes: dict[int, Outcome] = {}
+        for n, (ca, _, _, strict) in enumerate(translated):
+            violations = []
+            if strict is not None:
+                violations = [
+                    sorted(set(changed) - ca.ignore) for changed in row[f"v{n}"]
+                ]
+            outcomes[ca.index] = (row[f"m{n}"], violations)
+        return outcomes
+
+    def _rows(self, table: str) -> dict[str, list]:
+        """Full diff rows of one table, for assertions evaluated in Python."""
+        if table not in self._diff_rows:
+            inserts, updates, deletes, _ = self.differ._diff_table(
+                table,
+                self.differ._snapshot_table(table, self.before_suffix),
+                self.differ._snapshot_table(table, self.after_suffix),
+            )
+            self._diff_rows[table] = {
+                "inserts": inserts,
+                "updates": updates,
+                "deletes": deletes,
+            }
+        return self._diff_rows[table]
@@ -63,24 +63,27 @@ class CoreIsolationEngine:
             logger.warning(f"Pool miss for {template_schema}, building from scratch...")
 
             t1 = time.perf_counter()
-            self.environment_handler.create_schema(environment_schema)
-            logger.info(f"create_schema took {time.perf_counter() - t1:.2f}s")
-
-            t2 = time.perf_counter()
-            self.environment_handler.migrate_schema(template_schema, environment_schema)
-            logger.info(f"migrate_schema took {time.perf_counter() - t2:.2f}s")
-
-            t3 = time.perf_counter()
-            self.environment_handler.seed_data_from_template(
-                template_schema, environment_schema, tables_order=table_order
+            strategy = self.environment_handler.resolve_provisioning(
+                template_schema, template_meta
+            )
+            self.environment_handler.provision_schema(
+                template_schema,
+                environment_schema,
+                tables_order=table_order,
+                strategy=strategy,
+            )
+            logger.info(
+                f"provision_schema ({strategy}) took {time.perf_counter() - t1:.2f}s"
             )
-            logger.info(f"seed_data took {time.perf_counter() - t3:.2f}s")
 
             self.pool_manager.register_entry(
                 schema_name=environment_schema,
                 template_schema=template_schema,
                 template_id=template_meta.id if template_meta else None,
                 status="in_use",
+                template_fingerprint=self.environment_handler.template_fingerprint(
+                    template_schema
+                ),
             )
             logger.info(f"Total non-pooled build: {time.perf_counter() - t0:.2f}s")
 
@@ -122,6 +125,7 @@ class CoreIsolationEngine:
         visibility: str = "private",
         owner_id: str | None = None,
         version: str = "v1",
+        provisioning: str | None = None,
     ) -> TemplateCreateResult:
         rte = self.environment_handler.require_environment(environment_id)
         source_schema = rte.schema
@@ -153,6 +157,7 @@ class CoreIsolationEngine:
             kind="schema",
             location=target_schema,
             table_order=table_order,
+            provisioning=provisioning,
         )
 
         return TemplateCreateResult(
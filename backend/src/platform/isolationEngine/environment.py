@@ -3,18 +3,41 @@ from datetime import datetime
 from typing import Iterable
 from uuid import UUID, uuid4
 
-from sqlalchemy import MetaData, text
+from sqlalchemy import Row, delete, text
 
-from src.platform.db.schema import RunTimeEnvironment, TemplateEnvironment
+from src.platform.db.schema import (
+    RunTimeEnvironment,
+    TableWrite,
+    TemplateEnvironment,
+)
 
+from .schema_cache import schema_metadata_cache
 from .session import SessionManager
 
 logger = logging.getLogger(__name__)
 
+# Provisioning backends for building an environment schema from a template.
+# "migrate" replays the reflected DDL with create_all and seeds the data with
+# deferred constraints; "clone" copies table definitions with
+# CREATE TABLE ... (LIKE ...), loads the bare tables and builds constraints
+# and indexes after the load.
+PROVISIONING_MIGRATE = "migrate"
+PROVISIONING_CLONE = "clone"
+PROVISIONING_STRATEGIES = (PROVISIONING_MIGRATE, PROVISIONING_CLONE)
+
 
 class EnvironmentHandler:
-    def __init__(self, session_manager: SessionManager):
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        default_provisioning: str = PROVISIONING_MIGRATE,
+    ):
+        if default_provisioning not in PROVISIONING_STRATEGIES:
+            raise ValueError(
+                f"unknown provisioning strategy '{default_provisioning}'"
+            )
         self.session_manager = session_manager
+        self.default_provisioning = default_provisioning
 
     def schema_exists(self, schema: str) -> bool:
         with self.session_manager.base_engine.begin() as conn:
@@ -30,19 +53,57 @@ class EnvironmentHandler:
         try:
             with self.session_manager.base_engine.begin() as conn:
                 conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+            schema_metadata_cache.invalidate(schema)
             logger.debug(f"Created schema {schema}")
         except Exception as e:
             logger.error(f"Failed to create schema {schema}: {e}")
             raise
 
+    def provision_schema(
+        self,
+        template_schema: str,
+        target_schema: str,
+        *,
+        tables_order: list[str] | None = None,
+        strategy: str | None = None,
+    ) -> None:
+        """Create ``target_schema`` as a copy of ``template_schema``.
+
+        ``strategy`` defaults to the template's configured provisioning
+        backend, falling back to ``default_provisioning``.
+        """
+        if strategy is None:
+            strategy = self.resolve_provisioning(template_schema)
+        if strategy not in PROVISIONING_STRATEGIES:
+            raise ValueError(f"unknown provisioning strategy '{strategy}'")
+
+        self.create_schema(target_schema)
+        if strategy == PROVISIONING_CLONE:
+            self.clone_schema(template_schema, target_schema)
+        else:
+            self.migrate_schema(template_schema, target_schema)
+            self.seed_data_from_template(
+                template_schema, target_schema, tables_order=tables_order
+            )
+
+    def resolve_provisioning(
+        self,
+        template_schema: str,
+        template: TemplateEnvironment | None = None,
+    ) -> str:
+        if template is None:
+            template = self.get_template_metadata(location=template_schema)
+        if template is not None and template.provisioning:
+            return template.provisioning
+        return self.default_provisioning
+
     def migrate_schema(self, template_schema: str, target_schema: str) -> None:
         engine = self.session_manager.base_engine
-        meta = MetaData()
-        meta.reflect(bind=engine, schema=template_schema)
+        template = schema_metadata_cache.get(engine, template_schema)
         translated = engine.execution_options(
             schema_translate_map={template_schema: target_schema}
         )
-        meta.create_all(translated)
+        template.metadata.create_all(translated)
 
         # Ensure newer columns exist even if template was seeded before they
         # were added to the ORM models.  Uses IF NOT EXISTS so it's safe to
@@ -52,7 +113,7 @@ class EnvironmentHandler:
         # Copy GIN / non-standard indexes that MetaData.reflect doesn't capture
         self._copy_custom_indexes(template_schema, target_schema)
 
-        self._set_replica_identity(target_schema)
+        self._set_replica_identity(target_schema, tables=template.tables)
 
     def _ensure_box_columns(self, schema: str) -> None:
         """Add columns that may be missing from older template snapshots.
@@ -101,18 +162,11 @@ class EnvironmentHandler:
 
     def _copy_custom_indexes(self, src_schema: str, dst_schema: str) -> None:
         """Copy GIN trigram and other custom indexes from template to target schema."""
-        with self.session_manager.base_engine.begin() as conn:
-            rows = conn.execute(
-                text(
-                    """
-                    SELECT indexname, indexdef
-                    FROM pg_indexes
-                    WHERE schemaname = :schema
-                      AND indexdef LIKE '%gin%'
-                    """
-                ),
-                {"schema": src_schema},
-            ).fetchall()
+        engine = self.session_manager.base_engine
+        rows = schema_metadata_cache.get(engine, src_schema).custom_indexes
+        if not rows:
+            return
+        with engine.begin() as conn:
             for idx_name, idx_def in rows:
                 # Rewrite the CREATE INDEX to target the new schema
                 new_def = idx_def.replace(f" ON {src_schema}.", f" ON {dst_schema}.")
@@ -158,10 +212,14 @@ class EnvironmentHandler:
         ).fetchall()
         return [r[0] for r in rows]
 
-    def _set_replica_identity(self, schema: str) -> None:
+    def _set_replica_identity(
+        self, schema: str, tables: Iterable[str] | None = None
+    ) -> None:
         """Set REPLICA IDENTITY FULL for all tables in schema to enable logical replication."""
         with self.session_manager.base_engine.begin() as conn:
-            tables = self._list_tables(conn, schema)
+            tables = list(tables) if tables is not None else None
+            if tables is None:
+                tables = self._list_tables(conn, schema)
             if not tables:
                 logger.warning(
                     f"No tables found in schema {schema} to set REPLICA IDENTITY"
@@ -189,7 +247,7 @@ class EnvironmentHandler:
                     FROM information_schema.columns
                     WHERE table_schema = :schema
                       AND table_name = :table
-                      AND column_default LIKE 'nextval(%'
+                      AND (column_default LIKE 'nextval(%' OR is_identity = 'YES')
                     """
                 ),
                 {"schema": schema, "table": tbl},
@@ -270,45 +328,394 @@ class EnvironmentHandler:
         tables_order: list[str] | None = None,
     ) -> None:
         engine = self.session_manager.base_engine
+        ordered_tables = self._seed_order(template_schema, tables_order)
+        if not ordered_tables:
+            return
         with engine.begin() as conn:
-            meta = MetaData()
-            meta.reflect(bind=engine, schema=template_schema)
-            available_tables = [t.name for t in meta.sorted_tables]
-            if not available_tables:
-                return
+            self._ensure_constraints_deferrable(conn, target_schema)
+            conn.execute(text("SET CONSTRAINTS ALL DEFERRED"))
+            try:
+                for tbl in ordered_tables:
+                    conn.execute(
+                        text(
+                            f'INSERT INTO "{target_schema}"."{tbl}" '
+                            f'SELECT * FROM "{template_schema}"."{tbl}"'
+                        )
+                    )
+            finally:
+                conn.execute(text("SET CONSTRAINTS ALL IMMEDIATE"))
 
-            available_set = set(available_tables)
-            ordered_tables: list[str] = []
-            seen: set[str] = set()
+            self._reset_sequences(conn, target_schema, ordered_tables)
 
-            explicit_order = tables_order or self._load_template_table_order(
-                template_schema
-            )
-            if explicit_order:
-                for tbl in explicit_order:
-                    if tbl in available_set and tbl not in seen:
-                        ordered_tables.append(tbl)
-                        seen.add(tbl)
-
-            for tbl in available_tables:
-                if tbl not in seen:
+    def _seed_order(
+        self, template_schema: str, tables_order: list[str] | None = None
+    ) -> list[str]:
+        """Template tables in load order: the explicit order, then FK order."""
+        template = schema_metadata_cache.get(
+            self.session_manager.base_engine, template_schema
+        )
+        available_tables = list(template.fk_order)
+        if not available_tables:
+            return []
+        available_set = set(available_tables)
+        ordered_tables: list[str] = []
+        seen: set[str] = set()
+
+        explicit_order = tables_order or self._load_template_table_order(
+            template_schema
+        )
+        if explicit_order:
+            for tbl in explicit_order:
+                if tbl in available_set and tbl not in seen:
                     ordered_tables.append(tbl)
                     seen.add(tbl)
 
-            self._ensure_constraints_deferrable(conn, target_schema)
+        for tbl in available_tables:
+            if tbl not in seen:
+                ordered_tables.append(tbl)
+                seen.add(tbl)
+        return ordered_tables
+
+    def reload_schema(
+        self,
+        template_schema: str,
+        target_schema: str,
+        *,
+        tables_order: list[str] | None = None,
+    ) -> None:
+        """Reset the data in ``target_schema`` to the template's, keeping its DDL.
+
+        ``target_schema`` must have been provisioned from ``template_schema``
+        while the template had its current structure (compare
+        ``template_fingerprint``). Leftover snapshot tables are dropped, the
+        data tables are emptied with one TRUNCATE and refilled from the
+        template, all in a single transaction.
+        """
+        engine = self.session_manager.base_engine
+        template = schema_metadata_cache.get(engine, template_schema)
+        ordered_tables = self._seed_order(template_schema, tables_order)
+        with engine.begin() as conn:
+            snapshot_tables = conn.execute(
+                text(
+                    """
+                    SELECT c.relname
+                    FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = :schema AND c.relkind = 'r'
+                      AND position('_snapshot_' IN c.relname) > 0
+                    """
+                ),
+                {"schema": target_schema},
+            ).scalars().all()
+            if snapshot_tables:
+                names = ", ".join(
+                    f'"{target_schema}"."{tbl}"' for tbl in snapshot_tables
+                )
+                conn.execute(text(f"DROP TABLE {names}"))
+            if not ordered_tables:
+                return
+
+            names = ", ".join(f'"{target_schema}"."{tbl}"' for tbl in ordered_tables)
+            conn.execute(text(f"TRUNCATE {names} RESTART IDENTITY"))
             conn.execute(text("SET CONSTRAINTS ALL DEFERRED"))
             try:
                 for tbl in ordered_tables:
+                    columns = ", ".join(f'"{c}"' for c in template.columns[tbl])
                     conn.execute(
                         text(
-                            f'INSERT INTO "{target_schema}"."{tbl}" '
-                            f'SELECT * FROM "{template_schema}"."{tbl}"'
+                            f'INSERT INTO "{target_schema}"."{tbl}" ({columns}) '
+                            f'SELECT {columns} FROM "{template_schema}"."{tbl}"'
                         )
                     )
             finally:
                 conn.execute(text("SET CONSTRAINTS ALL IMMEDIATE"))
 
             self._reset_sequences(conn, target_schema, ordered_tables)
+        logger.info(
+            "Reloaded schema %s from template %s (%d tables, %d snapshot tables dropped)",
+            target_schema,
+            template_schema,
+            len(ordered_tables),
+            len(snapshot_tables),
+        )
+
+    def template_fingerprint(self, template_schema: str) -> str:
+        """Hash of the template's table structure (columns, constraints, indexes).
+
+        Schemas provisioned from a template can be refilled in place only
+        while this value is unchanged.
+        """
+        with self.session_manager.base_engine.begin() as conn:
+            return conn.execute(
+                text(
+                    """
+                    WITH rel AS (
+                        SELECT c.oid, c.relname
+                        FROM pg_class c
+                        JOIN pg_namespace n ON n.oid = c.relnamespace
+                        WHERE n.nspname = :schema AND c.relkind = 'r'
+                          AND position('_snapshot_' IN c.relname) = 0
+                    )
+                    SELECT md5(COALESCE(string_agg(item, E'\n' ORDER BY item), ''))
+                    FROM (
+                        SELECT format(
+                            'column %s.%s %s %s %s',
+                            rel.relname,
+                            a.attname,
+                            format_type(a.atttypid, a.atttypmod),
+                            a.attnotnull,
+                            pg_get_expr(d.adbin, d.adrelid)
+                        )
+                        FROM rel
+                        JOIN pg_attribute a ON a.attrelid = rel.oid
+                        LEFT JOIN pg_attrdef d
+                          ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+                        WHERE a.attnum > 0 AND NOT a.attisdropped
+                        UNION ALL
+                        SELECT format(
+                            'constraint %s.%s %s',
+                            rel.relname,
+                            con.conname,
+                            pg_get_constraintdef(con.oid)
+                        )
+                        FROM rel
+                        JOIN pg_constraint con ON con.conrelid = rel.oid
+                        UNION ALL
+                        SELECT pg_get_indexdef(idx.indexrelid)
+                        FROM rel
+                        JOIN pg_index idx ON idx.indrelid = rel.oid
+                    ) AS items(item)
+                    """
+                ),
+                {"schema": template_schema},
+            ).scalar_one()
+
+    def clone_schema(self, template_schema: str, target_schema: str) -> None:
+        """Copy tables and data from ``template_schema`` into ``target_schema``.
+
+        Tables are created with ``LIKE`` (columns, defaults, CHECK
+        constraints, generated and identity columns), filled while they have
+        no indexes, and only then get their primary keys, unique and foreign
+        key constraints and indexes. Generated columns are computed again
+        rather than copied. Serial sequences are created with the template's
+        options, and serial and identity sequences are moved past the copied
+        rows. Everything runs in a single transaction.
+        """
+        engine = self.session_manager.base_engine
+        template = schema_metadata_cache.get(engine, template_schema)
+        tables = list(template.tables)
+        if not tables:
+            return
+
+        with engine.begin() as conn:
+            all_sequences = self._owned_sequences(conn, template_schema)
+            # Identity sequences are created by LIKE ... INCLUDING IDENTITY.
+            sequences = [seq for seq in all_sequences if not seq.identity]
+            columns = self._insertable_columns(conn, template_schema)
+            constraints = self._table_constraints(conn, template_schema)
+            indexes = self._standalone_indexes(conn, template_schema)
+
+            created: set[str] = set()
+            for seq in sequences:
+                if seq.sequence_name in created:
+                    continue
+                created.add(seq.sequence_name)
+                conn.execute(
+                    text(
+                        f'CREATE SEQUENCE "{target_schema}"."{seq.sequence_name}" '
+                        f"AS {seq.data_type} INCREMENT BY {seq.increment_by} "
+                        f"MINVALUE {seq.min_value} MAXVALUE {seq.max_value} "
+                        f"START WITH {seq.start_value} CACHE {seq.cache_size} "
+                        + ("CYCLE" if seq.cycle else "NO CYCLE")
+                    )
+                )
+
+            for tbl in tables:
+                conn.execute(
+                    text(
+                        f'CREATE TABLE "{target_schema}"."{tbl}" '
+                        f'(LIKE "{template_schema}"."{tbl}" '
+                        "INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+                        "INCLUDING GENERATED INCLUDING IDENTITY)"
+                    )
+                )
+                # Generated columns cannot be written, and GENERATED ALWAYS
+                # identity columns only accept values with OVERRIDING.
+                column_list = ", ".join(f'"{c}"' for c in columns.get(tbl, []))
+                conn.execute(
+                    text(
+                        f'INSERT INTO "{target_schema}"."{tbl}" ({column_list}) '
+                        "OVERRIDING SYSTEM VALUE "
+                        f'SELECT {column_list} FROM "{template_schema}"."{tbl}"'
+                    )
+                )
+
+            # LIKE copies serial defaults verbatim, still pointing at the
+            # template's sequences; repoint them at the copies.
+            for seq in sequences:
+                conn.execute(
+                    text(
+                        f'ALTER TABLE "{target_schema}"."{seq.table_name}" '
+                        f'ALTER COLUMN "{seq.column_name}" '
+                        f"SET DEFAULT nextval('\"{target_schema}\".\"{seq.sequence_name}\"')"
+                    )
+                )
+                conn.execute(
+                    text(
+                        f'ALTER SEQUENCE "{target_schema}"."{seq.sequence_name}" '
+                        f'OWNED BY "{target_schema}"."{seq.table_name}"."{seq.column_name}"'
+                    )
+                )
+
+            # Constraint definitions were read with the template schema on the
+            # search_path, so foreign keys name their targets unqualified and
+            # resolve against the target schema here.
+            conn.execute(text(f'SET LOCAL search_path TO "{target_schema}", public'))
+            keys = [c for c in constraints if c[2] != "f"]
+            foreign_keys = [c for c in constraints if c[2] == "f"]
+            for tbl, name, _, definition in keys:
+                conn.execute(
+                    text(
+                        f'ALTER TABLE "{target_schema}"."{tbl}" '
+                        f'ADD CONSTRAINT "{name}" {definition}'
+                    )
+                )
+            for definition in indexes:
+                conn.execute(
+                    text(
+                        definition.replace(
+                            f" ON {template_schema}.", f' ON "{target_schema}".', 1
+                        )
+                    )
+                )
+            for tbl, name, _, definition in foreign_keys:
+                if "INITIALLY DEFERRED" not in definition:
+                    # Match migrate_schema + seed, which leave foreign keys
+                    # deferred.
+                    definition = (
+                        definition.replace(" DEFERRABLE", "")
+                        + " DEFERRABLE INITIALLY DEFERRED"
+                    )
+                conn.execute(
+                    text(
+                        f'ALTER TABLE "{target_schema}"."{tbl}" '
+                        f'ADD CONSTRAINT "{name}" {definition}'
+                    )
+                )
+
+            for tbl in tables:
+                conn.execute(
+                    text(f'ALTER TABLE "{target_schema}"."{tbl}" REPLICA IDENTITY FULL')
+                )
+            self._reset_sequences(
+                conn, target_schema, {seq.table_name for seq in all_sequences}
+            )
+
+        self._ensure_box_columns(target_schema)
+
+    def _owned_sequences(self, conn, schema: str) -> list[Row]:
+        """Return the serial and identity sequences of columns in ``schema``.
+
+        Each row has the owning ``table_name`` and ``column_name``, the
+        ``sequence_name``, whether it backs an ``identity`` column, and the
+        sequence's options from ``pg_sequences``.
+        """
+        rows = conn.execute(
+            text(
+                """
+                SELECT tbl.relname AS table_name, att.attname AS column_name,
+                       seq.relname AS sequence_name, dep.deptype = 'i' AS identity,
+                       ps.data_type, ps.start_value, ps.min_value, ps.max_value,
+                       ps.increment_by, ps.cycle, ps.cache_size
+                FROM pg_depend dep
+                JOIN pg_class seq ON seq.oid = dep.objid AND seq.relkind = 'S'
+                JOIN pg_class tbl ON tbl.oid = dep.refobjid
+                JOIN pg_attribute att
+                  ON att.attrelid = tbl.oid AND att.attnum = dep.refobjsubid
+                JOIN pg_namespace ns ON ns.oid = seq.relnamespace
+                JOIN pg_sequences ps
+                  ON ps.schemaname = ns.nspname AND ps.sequencename = seq.relname
+                WHERE dep.deptype IN ('a', 'i') AND ns.nspname = :schema
+                ORDER BY tbl.relname, att.attname
+                """
+            ),
+            {"schema": schema},
+        ).fetchall()
+        return [r for r in rows if "_snapshot_" not in r.table_name]
+
+    def _insertable_columns(self, conn, schema: str) -> dict[str, list[str]]:
+        """Return each table's columns in order, without generated columns."""
+        rows = conn.execute(
+            text(
+                """
+                SELECT tbl.relname, att.attname
+                FROM pg_attribute att
+                JOIN pg_class tbl ON tbl.oid = att.attrelid
+                JOIN pg_namespace ns ON ns.oid = tbl.relnamespace
+                WHERE ns.nspname = :schema
+                  AND tbl.relkind = 'r'
+                  AND att.attnum > 0
+                  AND NOT att.attisdropped
+                  AND att.attgenerated = ''
+                ORDER BY tbl.relname, att.attnum
+                """
+            ),
+            {"schema": schema},
+        ).fetchall()
+        columns: dict[str, list[str]] = {}
+        for tbl, column in rows:
+            columns.setdefault(tbl, []).append(column)
+        return columns
+
+    def _table_constraints(
+        self, conn, schema: str
+    ) -> list[tuple[str, str, str, str]]:
+        """Return (table, name, type, definition) for key constraints."""
+        conn.execute(text(f'SET LOCAL search_path TO "{schema}"'))
+        try:
+            rows = conn.execute(
+                text(
+                    """
+                    SELECT tbl.relname, con.conname, con.contype,
+                           pg_get_constraintdef(con.oid)
+                    FROM pg_constraint con
+                    JOIN pg_class tbl ON tbl.oid = con.conrelid
+                    JOIN pg_namespace ns ON ns.oid = tbl.relnamespace
+                    WHERE ns.nspname = :schema
+                      AND con.contype IN ('p', 'u', 'x', 'f')
+                      AND position('_snapshot_' IN tbl.relname) = 0
+                    ORDER BY tbl.relname, con.conname
+                    """
+                ),
+                {"schema": schema},
+            ).fetchall()
+        finally:
+            conn.execute(text("SET LOCAL search_path TO DEFAULT"))
+        return [(r[0], r[1], r[2], r[3]) for r in rows]
+
+    def _standalone_indexes(self, conn, schema: str) -> list[str]:
+        """Return definitions of indexes that do not back a constraint."""
+        rows = conn.execute(
+            text(
+                """
+                SELECT pg_get_indexdef(idx.indexrelid)
+                FROM pg_index idx
+                JOIN pg_class tbl ON tbl.oid = idx.indrelid
+                JOIN pg_namespace ns ON ns.oid = tbl.relnamespace
+                WHERE ns.nspname = :schema
+                  AND tbl.relkind = 'r'
+                  AND position('_snapshot_' IN tbl.relname) = 0
+                  AND NOT EXISTS (
+                      SELECT 1 FROM pg_constraint con
+                      WHERE con.conindid = idx.indexrelid
+                        AND con.contype IN ('p', 'u', 'x')
+                  )
+                ORDER BY 1
+                """
+            ),
+            {"schema": schema},
+        ).fetchall()
+        return [r[0] for r in rows]
 
     def set_runtime_environment(
         self,
@@ -341,6 +748,7 @@ class EnvironmentHandler:
                 existing.impersonate_email = impersonate_email
                 return
             if existing and existing.id != env_uuid:
+                self.session_manager.invalidate_environment(existing.id)
                 archive_suffix = uuid4().hex[:6]
                 existing.schema = f"{existing.schema}_archived_{archive_suffix}"
                 existing.status = "deleted"
@@ -424,7 +832,10 @@ class EnvironmentHandler:
         kind: str,
         location: str,
         table_order: Iterable[str] | None = None,
+        provisioning: str | None = None,
     ) -> str:
+        if provisioning is not None and provisioning not in PROVISIONING_STRATEGIES:
+            raise ValueError(f"unknown provisioning strategy '{provisioning}'")
         from uuid import uuid4
 
         template_uuid = uuid4()
@@ -441,14 +852,20 @@ class EnvironmentHandler:
                 kind=kind,
                 location=location,
                 table_order=order_value,
+                provisioning=provisioning,
             )
             s.add(tmpl)
+        schema_metadata_cache.invalidate(location)
         return str(template_uuid)
 
     def drop_schema(self, schema: str) -> None:
         try:
             with self.session_manager.base_engine.begin() as conn:
                 conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+                conn.execute(
+                    delete(TableWrite).where(TableWrite.schema_name == schema)
+                )
+            schema_metadata_cache.invalidate(schema)
             logger.info(f"Dropped schema {schema}")
         except Exception as e:
             logger.error(f"Failed to drop schema {schema}: {e}")
@@ -466,6 +883,7 @@ class EnvironmentHandler:
                 raise ValueError("environment not found")
             env.status = status
             env.updated_at = datetime.now()
+        self.session_manager.invalidate_environment(env_uuid)
 
     @staticmethod
     def _to_uuid(value: str | UUID | None) -> UUID:
@@ -18,6 +18,7 @@ from src.platform.db.schema import RunTimeEnvironment
 
 if TYPE_CHECKING:
     from src.platform.evaluationEngine.replication import LogicalReplicationService
+    from src.platform.evaluationEngine.retention import SnapshotReaper
     from .session import SessionManager
     from .environment import EnvironmentHandler
     from .pool import PoolManager
@@ -43,21 +44,30 @@ class EnvironmentMaintenanceService:
         cycle_interval: int = 10,
         max_concurrent_builds: int = 5,
         replication_service: "LogicalReplicationService | None" = None,
+        snapshot_reaper: "SnapshotReaper | None" = None,
+        snapshot_reap_interval: int = 300,
+        pool_min_size: int | None = None,
     ):
         self.session_manager = session_manager
         self.environment_handler = environment_handler
         self.pool_manager = pool_manager
+        # With ``pool_min_size`` set, ``pool_targets`` are upper bounds and each
+        # template's pool follows its claim rate; otherwise they are fixed.
         self.pool_targets = {k: v for k, v in pool_targets.items() if v > 0}
+        self.pool_min_size = pool_min_size
         self.idle_timeout = idle_timeout
         self.cycle_interval = cycle_interval
         self.max_concurrent_builds = max(1, max_concurrent_builds)
         self.replication_service = replication_service
+        self.snapshot_reaper = snapshot_reaper
+        self.snapshot_reap_interval = snapshot_reap_interval
 
         self._running = False
         self._last_activity = 0.0
         self._lock = asyncio.Lock()
         self._build_semaphore = asyncio.Semaphore(self.max_concurrent_builds)
         self._cleanup_phase = 1  # Alternates between 1 (mark) and 2 (delete)
+        self._last_snapshot_reap = 0.0
 
     async def trigger(self) -> None:
         """
@@ -93,6 +103,14 @@ class EnvironmentMaintenanceService:
                 if did_cleanup:
                     self._touch_activity()
 
+                did_drain = await self._drain_released_schemas()
+                if did_drain:
+                    self._touch_activity()
+
+                did_reap = await self._run_snapshot_reap_cycle()
+                if did_reap:
+                    self._touch_activity()
+
                 did_refill = await self._run_pool_refill_cycle()
                 if did_refill:
                     self._touch_activity()
@@ -122,6 +140,8 @@ class EnvironmentMaintenanceService:
     async def _run_cleanup_cycle(self) -> bool:
         """Run one cleanup phase (mark or delete). Returns True if work was done."""
         try:
+            # Write coalesced last_used_at values from request lookups.
+            await asyncio.to_thread(self.session_manager.flush_last_used)
             if self._cleanup_phase == 1:
                 count = await asyncio.to_thread(self._mark_expired_environments)
                 self._cleanup_phase = 2
@@ -134,6 +154,23 @@ class EnvironmentMaintenanceService:
             logger.error("Cleanup cycle error: %s", exc, exc_info=True)
             return False
 
+    async def _run_snapshot_reap_cycle(self) -> bool:
+        """Drop expired run snapshots, at most once per reap interval.
+
+        Returns True if anything was removed.
+        """
+        if not self.snapshot_reaper:
+            return False
+        if time.time() - self._last_snapshot_reap < self.snapshot_reap_interval:
+            return False
+        self._last_snapshot_reap = time.time()
+        try:
+            stats = await asyncio.to_thread(self.snapshot_reaper.reap)
+            return stats.snapshots > 0 or stats.orphaned_rows > 0
+        except Exception as exc:
+            logger.error("Snapshot reap error: %s", exc, exc_info=True)
+            return False
+
     def _mark_expired_environments(self) -> int:
         """Phase 1: Mark ready environments that passed TTL as expired. Returns count."""
         with self.session_manager.with_meta_session() as session:
@@ -153,15 +190,20 @@ class EnvironmentMaintenanceService:
                 for env in ready_but_expired:
                     env.status = "expired"
                     env.updated_at = datetime.now()
+                    self.session_manager.invalidate_environment(env.id)
 
             return len(ready_but_expired)
 
     def _delete_expired_environments(self) -> int:
-        """Phase 2: Drop schemas for environments marked as expired. Returns count."""
+        """Phase 2: Drop (or release for recycle) schemas of expired environments.
+
+        Environments whose earlier cleanup failed (``cleanup_failed``) are
+        retried. Returns the number cleaned up.
+        """
         with self.session_manager.with_meta_session() as session:
             expired_envs = (
                 session.query(RunTimeEnvironment)
-                .filter(RunTimeEnvironment.status == "expired")
+                .filter(RunTimeEnvironment.status.in_(("expired", "cleanup_failed")))
                 .all()
             )
 
@@ -170,11 +212,22 @@ class EnvironmentMaintenanceService:
 
             logger.info("Found %d expired environments to cleanup", len(expired_envs))
 
+            cleaned = 0
             for env in expired_envs:
                 try:
-                    self.environment_handler.drop_schema(env.schema)
+                    if self._recyclable_in_place(env.schema):
+                        # Keep the tables; the pool refill truncates and
+                        # reloads them from the template.
+                        logger.info(
+                            "Keeping schema %s of expired environment %s for recycle",
+                            env.schema,
+                            env.id,
+                        )
+                    else:
+                        self.environment_handler.drop_schema(env.schema)
                     env.status = "deleted"
                     env.updated_at = datetime.now()
+                    cleaned += 1
                     logger.info(
                         "Cleaned up expired environment %s (schema: %s)",
                         env.id,
@@ -201,7 +254,74 @@ class EnvironmentMaintenanceService:
                             )
                     self._stop_replication(env.id)
 
-            return len(expired_envs)
+            return cleaned
+
+    def release_environment(self, environment_id, schema: str) -> None:
+        """Hand a deleted environment's schema back to the pool.
+
+        Blocking; call from a worker thread. Pooled schemas are only marked
+        dirty and the maintenance loop recycles or drops them; schemas the
+        pool does not know are dropped here. If that drop fails the
+        environment is marked ``cleanup_failed`` so the cleanup cycle retries
+        it.
+        """
+        self._stop_replication(environment_id)
+        if self.pool_manager and self.pool_manager.release_in_use(
+            schema, recycle=True
+        ):
+            return
+        try:
+            self.environment_handler.drop_schema(schema)
+        except Exception as exc:
+            logger.error(
+                "Failed to drop schema %s of deleted environment %s, will retry: %s",
+                schema,
+                environment_id,
+                exc,
+            )
+            self.environment_handler.mark_environment_status(
+                environment_id, "cleanup_failed"
+            )
+
+    async def _drain_released_schemas(self) -> bool:
+        """Drop released schemas of templates without a pool. Returns True if any."""
+        if not self.pool_manager:
+            return False
+        try:
+            schemas = await asyncio.to_thread(
+                self.pool_manager.claim_released,
+                exclude_templates=list(self.pool_targets),
+                limit=self.max_concurrent_builds,
+            )
+        except Exception as exc:
+            logger.error("Failed to claim released schemas: %s", exc, exc_info=True)
+            return False
+        if schemas:
+            await asyncio.gather(*(self._drop_released(name) for name in schemas))
+            logger.info("Dropped %d released schemas", len(schemas))
+        return bool(schemas)
+
+    async def _drop_released(self, schema_name: str) -> None:
+        async with self._build_semaphore:
+            try:
+                await asyncio.to_thread(self.environment_handler.drop_schema, schema_name)
+                await asyncio.to_thread(self.pool_manager.remove_entry, schema_name)
+            except Exception as exc:
+                logger.warning(
+                    "Failed to drop released schema %s: %s", schema_name, exc
+                )
+                self.pool_manager.mark_dirty(schema_name)
+
+    def _recyclable_in_place(self, schema: str) -> bool:
+        """Whether ``schema`` will be refilled by the pool rather than dropped."""
+        if not self.pool_manager:
+            return False
+        entry = self.pool_manager.get_entry(schema)
+        return (
+            entry is not None
+            and entry.template_fingerprint is not None
+            and entry.template_schema in self.pool_targets
+        )
 
     def _stop_replication(self, environment_id) -> None:
         """Stop replication for an environment."""
@@ -217,19 +337,66 @@ class EnvironmentMaintenanceService:
             )
 
     async def _run_pool_refill_cycle(self) -> bool:
-        """Check and refill pool for all templates. Returns True if any work was done."""
+        """Check and refill pool for all templates. Returns True if any work was done.
+
+        Templates with recent pool misses are handled first so that their
+        builds queue ahead of the others on the build semaphore.
+        """
         if not self.pool_targets:
             return False
 
         tasks = [
-            self._ensure_pool_capacity(template_schema, target)
-            for template_schema, target in self.pool_targets.items()
+            self._ensure_pool_capacity(t, self.pool_target(t))
+            for t in self._templates_by_priority()
         ]
         if tasks:
             results = await asyncio.gather(*tasks, return_exceptions=True)
             return any(r is True for r in results if not isinstance(r, Exception))
         return False
 
+    def pool_target(self, template_schema: str) -> int:
+        maximum = self.pool_targets.get(template_schema, 0)
+        if self.pool_min_size is None:
+            return maximum
+        return self.pool_manager.target_size(
+            template_schema,
+            minimum=min(self.pool_min_size, maximum),
+            maximum=maximum,
+        )
+
+    def _templates_by_priority(self) -> list[str]:
+        demand = {t: self.pool_manager.demand(t) for t in self.pool_targets}
+        return sorted(
+            self.pool_targets,
+            key=lambda t: (-demand[t].miss_rate, -demand[t].claim_rate),
+        )
+
+    def pool_status(self) -> dict[str, dict]:
+        """Per-template pool size bounds, current target, ready count and demand."""
+        status: dict[str, dict] = {}
+        with self.session_manager.with_meta_session() as session:
+            for template_schema in self._templates_by_priority():
+                demand = self.pool_manager.demand(template_schema)
+                maximum = self.pool_targets[template_schema]
+                status[template_schema] = {
+                    "min": maximum
+                    if self.pool_min_size is None
+                    else min(self.pool_min_size, maximum),
+                    "max": maximum,
+                    "target": self.pool_target(template_schema),
+                    "ready": self.pool_manager.ready_count(
+                        template_schema=template_schema, session=session
+                    ),
+                    "claims": demand.claims,
+                    "misses": demand.misses,
+                    "claimsPerMinute": round(demand.claim_rate * 60, 3),
+                    "missesPerMinute": round(demand.miss_rate * 60, 3),
+                    "secondsSinceMiss": None
+                    if demand.last_miss_at is None
+                    else round(demand.updated_at - demand.last_miss_at, 1),
+                }
+        return status
+
     async def _ensure_pool_capacity(self, template_schema: str, target: int) -> bool:
         """Ensure pool has enough ready schemas for a template. Returns True if work done."""
         try:
@@ -239,6 +406,11 @@ class EnvironmentMaintenanceService:
                 )
 
             missing = target - ready
+            if missing <= 0 and self.pool_min_size is not None:
+                # Don't shrink warm pools on targets from unmeasured demand.
+                if not self.pool_manager.demand_observed():
+                    return False
+                return await self._trim_pool(template_schema, -missing)
             if missing <= 0:
                 return False
 
@@ -247,6 +419,9 @@ class EnvironmentMaintenanceService:
             )
             table_order = template_meta.table_order if template_meta else None
             template_id = template_meta.id if template_meta else None
+            fingerprint = self.environment_handler.template_fingerprint(
+                template_schema
+            )
 
             # Get schemas marked for refresh first
             refresh_targets = self.pool_manager.schemas_for_refresh(
@@ -255,11 +430,17 @@ class EnvironmentMaintenanceService:
 
             build_tasks = []
 
-            # Refresh existing dirty schemas
-            for schema_name, _ in refresh_targets:
+            # Refresh existing dirty schemas; those built from the current
+            # template structure are refilled in place.
+            for schema_name, _, built_from in refresh_targets:
                 build_tasks.append(
                     self._schedule_build(
-                        template_schema, table_order, template_id, schema_name
+                        template_schema,
+                        table_order,
+                        template_id,
+                        schema_name,
+                        fingerprint,
+                        reload=built_from == fingerprint,
                     )
                 )
                 missing -= 1
@@ -268,7 +449,7 @@ class EnvironmentMaintenanceService:
             for _ in range(missing):
                 build_tasks.append(
                     self._schedule_build(
-                        template_schema, table_order, template_id, None
+                        template_schema, table_order, template_id, None, fingerprint
                     )
                 )
 
@@ -287,12 +468,47 @@ class EnvironmentMaintenanceService:
             )
             return False
 
+    async def _trim_pool(self, template_schema: str, surplus: int) -> bool:
+        """Drop ready schemas above the template's target, then dirty ones.
+
+        Dirty schemas are not needed once the pool is at its target. At most
+        ``max_concurrent_builds`` schemas go per cycle, so a drop in demand
+        shrinks the pool gradually. Returns True if any schema was removed.
+        """
+        limit = self.max_concurrent_builds
+        schemas = self.pool_manager.claim_surplus(
+            template_schema=template_schema, limit=min(surplus, limit)
+        )
+        schemas += [
+            schema_name
+            for schema_name, _, _ in self.pool_manager.schemas_for_refresh(
+                template_schema=template_schema, limit=limit - len(schemas)
+            )
+        ]
+        for schema_name in schemas:
+            try:
+                await asyncio.to_thread(self.environment_handler.drop_schema, schema_name)
+                self.pool_manager.remove_entry(schema_name)
+            except Exception as exc:
+                logger.warning("Failed to trim pooled schema %s: %s", schema_name, exc)
+                self.pool_manager.mark_dirty(schema_name)
+        if schemas:
+            logger.info(
+                "Trimmed %d surplus pooled schemas for template %s",
+                len(schemas),
+                template_schema,
+            )
+        return bool(schemas)
+
     async def _schedule_build(
         self,
         template_schema: str,
         table_order: list[str] | None,
         template_id,
         schema_name: str | None,
+        template_fingerprint: str | None = None,
+        *,
+        reload: bool = False,
     ) -> None:
         """Schedule a pool entry build with concurrency limiting."""
         async with self._build_semaphore:
@@ -302,6 +518,8 @@ class EnvironmentMaintenanceService:
                 table_order,
                 template_id,
                 schema_name,
+                template_fingerprint,
+                reload=reload,
             )
             self._touch_activity()
 
@@ -311,20 +529,48 @@ class EnvironmentMaintenanceService:
         table_order: list[str] | None,
         template_id,
         schema_name: str | None,
+        template_fingerprint: str | None = None,
+        *,
+        reload: bool = False,
         _retry: int = 0,
     ) -> None:
-        """Build a single pool entry. Runs in thread pool."""
+        """Build a single pool entry. Runs in thread pool.
+
+        With ``reload``, the existing schema keeps its tables and indexes and
+        only its data is reset; a failed reload falls back to a rebuild.
+        """
         name = schema_name or f"state_pool_{uuid4().hex}"
         max_retries = 2
 
+        if reload and schema_name:
+            try:
+                self.environment_handler.reload_schema(
+                    template_schema, name, tables_order=table_order
+                )
+                self.pool_manager.register_entry(
+                    schema_name=name,
+                    template_schema=template_schema,
+                    template_id=template_id,
+                    status="ready",
+                    template_fingerprint=template_fingerprint,
+                )
+                self.pool_manager.mark_ready(name)
+                logger.info(
+                    "Recycled pooled schema %s in place for template %s",
+                    name,
+                    template_schema,
+                )
+                return
+            except Exception as exc:
+                logger.warning(
+                    "In-place recycle of %s failed, rebuilding: %s", name, exc
+                )
+
         try:
             # Drop and recreate if exists
             if self.environment_handler.schema_exists(name):
                 self.environment_handler.drop_schema(name)
-            self.environment_handler.create_schema(name)
-
-            self.environment_handler.migrate_schema(template_schema, name)
-            self.environment_handler.seed_data_from_template(
+            self.environment_handler.provision_schema(
                 template_schema, name, tables_order=table_order
             )
 
@@ -333,6 +579,7 @@ class EnvironmentMaintenanceService:
                 template_schema=template_schema,
                 template_id=template_id,
                 status="ready",
+                template_fingerprint=template_fingerprint,
             )
             self.pool_manager.mark_ready(name)
             logger.info(
@@ -358,7 +605,12 @@ class EnvironmentMaintenanceService:
                 except Exception:
                     pass
                 return self._build_pool_entry(
-                    template_schema, table_order, template_id, schema_name, _retry + 1
+                    template_schema,
+                    table_order,
+                    template_id,
+                    schema_name,
+                    template_fingerprint,
+                    _retry=_retry + 1,
                 )
 
             logger.error(
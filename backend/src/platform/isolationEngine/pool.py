@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
 import logging
+import math
+import threading
+import time
+from typing import Collection
 from uuid import UUID, uuid4
 
 from sqlalchemy import select
@@ -15,9 +20,29 @@ from .session import SessionManager
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class TemplateDemand:
+    """Claim counters and exponentially weighted claim/miss rates for a template.
+
+    Rates are in claims per second as of ``updated_at`` (a monotonic
+    timestamp); they decay with time constant ``PoolManager.demand_window``.
+    """
+
+    claims: int = 0
+    misses: int = 0
+    claim_rate: float = 0.0
+    miss_rate: float = 0.0
+    updated_at: float = 0.0
+    last_miss_at: float | None = None
+
+
 class PoolManager:
-    def __init__(self, sessions: SessionManager):
+    def __init__(self, sessions: SessionManager, demand_window: float = 600.0):
         self.sessions = sessions
+        self.demand_window = max(1.0, demand_window)
+        self._demand: dict[str, TemplateDemand] = {}
+        self._demand_lock = threading.Lock()
+        self._started_at = time.monotonic()
 
     def claim_ready_schema(
         self,
@@ -36,6 +61,7 @@ class PoolManager:
                 .with_for_update(skip_locked=True)
             )
             entry = session.execute(stmt).scalars().first()
+            self._record_claim(template_schema, hit=entry is not None)
             if entry is None:
                 logger.debug("No ready pool entries for template %s", template_schema)
                 return None
@@ -54,6 +80,58 @@ class PoolManager:
             )
             return entry
 
+    def _record_claim(self, template_schema: str, *, hit: bool) -> None:
+        now = time.monotonic()
+        with self._demand_lock:
+            demand = self._demand.get(template_schema)
+            if demand is None:
+                demand = self._demand[template_schema] = TemplateDemand(updated_at=now)
+            decay = math.exp(-(now - demand.updated_at) / self.demand_window)
+            demand.claim_rate = demand.claim_rate * decay + 1 / self.demand_window
+            demand.miss_rate = demand.miss_rate * decay
+            demand.claims += 1
+            if not hit:
+                demand.miss_rate += 1 / self.demand_window
+                demand.misses += 1
+                demand.last_miss_at = now
+            demand.updated_at = now
+
+    def demand(self, template_schema: str) -> TemplateDemand:
+        """Current demand for ``template_schema`` with rates decayed to now."""
+        now = time.monotonic()
+        with self._demand_lock:
+            demand = self._demand.get(template_schema)
+            if demand is None:
+                return TemplateDemand(updated_at=now)
+            decay = math.exp(-(now - demand.updated_at) / self.demand_window)
+            return TemplateDemand(
+                claims=demand.claims,
+                misses=demand.misses,
+                claim_rate=demand.claim_rate * decay,
+                miss_rate=demand.miss_rate * decay,
+                updated_at=now,
+                last_miss_at=demand.last_miss_at,
+            )
+
+    def demand_observed(self) -> bool:
+        """Whether a full demand window has been observed since startup.
+
+        Demand is kept in process memory, so right after a restart every rate
+        is zero; until a window has passed, low rates mean "not measured yet"
+        rather than "not needed".
+        """
+        return time.monotonic() - self._started_at >= self.demand_window
+
+    def target_size(self, template_schema: str, *, minimum: int, maximum: int) -> int:
+        """Pool size for ``template_schema`` sized to its recent demand.
+
+        The claim rate times the demand window approximates the number of
+        claims in the last window, weighted towards recent ones; the pool is
+        sized to absorb that many, clamped to ``[minimum, maximum]``.
+        """
+        expected = self.demand(template_schema).claim_rate * self.demand_window
+        return max(minimum, min(maximum, math.ceil(round(expected, 6))))
+
     def register_entry(
         self,
         *,
@@ -61,6 +139,7 @@ class PoolManager:
         template_schema: str,
         template_id: UUID | None = None,
         status: str = "in_use",
+        template_fingerprint: str | None = None,
     ) -> EnvironmentPoolEntry:
         with self.sessions.with_meta_session() as session:
             entry = (
@@ -76,6 +155,7 @@ class PoolManager:
                     template_schema=template_schema,
                     schema_name=schema_name,
                     status=status,
+                    template_fingerprint=template_fingerprint,
                     created_at=now,
                     updated_at=now,
                 )
@@ -90,11 +170,48 @@ class PoolManager:
                 entry.template_id = template_id
                 entry.template_schema = template_schema
                 entry.status = status
+                entry.template_fingerprint = template_fingerprint
                 entry.updated_at = now
                 logger.debug("Updated pool entry %s -> status %s", schema_name, status)
             session.flush()
             return entry
 
+    def get_entry(self, schema_name: str) -> EnvironmentPoolEntry | None:
+        with self.sessions.with_meta_session() as session:
+            return (
+                session.query(EnvironmentPoolEntry)
+                .filter(EnvironmentPoolEntry.schema_name == schema_name)
+                .one_or_none()
+            )
+
+    def claim_surplus(self, *, template_schema: str, limit: int) -> list[str]:
+        """Take up to ``limit`` ready schemas out of the pool for removal."""
+        if limit <= 0:
+            return []
+        with self.sessions.with_meta_session() as session:
+            stmt = (
+                select(EnvironmentPoolEntry)
+                .where(
+                    EnvironmentPoolEntry.template_schema == template_schema,
+                    EnvironmentPoolEntry.status == "ready",
+                )
+                .order_by(EnvironmentPoolEntry.updated_at.asc())
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            entries = session.execute(stmt).scalars().all()
+            now = datetime.now()
+            for entry in entries:
+                entry.status = "refreshing"
+                entry.updated_at = now
+            return [entry.schema_name for entry in entries]
+
+    def remove_entry(self, schema_name: str) -> None:
+        with self.sessions.with_meta_session() as session:
+            session.query(EnvironmentPoolEntry).filter(
+                EnvironmentPoolEntry.schema_name == schema_name
+            ).delete(synchronize_session=False)
+
     def mark_ready(self, schema_name: str) -> None:
         self._update_status(schema_name, "ready", last_refreshed_at=datetime.now())
 
@@ -104,13 +221,43 @@ class PoolManager:
     def mark_refreshing(self, schema_name: str) -> None:
         self._update_status(schema_name, "refreshing")
 
-    def release_in_use(self, schema_name: str, *, recycle: bool) -> None:
+    def release_in_use(self, schema_name: str, *, recycle: bool) -> bool:
+        """Hand a schema back to the pool. Returns False if it is not pooled."""
         if recycle:
-            self.mark_dirty(schema_name)
-            logger.info("Marked schema %s as dirty for pool recycle", schema_name)
+            found = self._update_status(schema_name, "dirty")
+            if found:
+                logger.info("Marked schema %s as dirty for pool recycle", schema_name)
         else:
-            self._update_status(schema_name, "refreshing")
-            logger.info("Marked schema %s as refreshing", schema_name)
+            found = self._update_status(schema_name, "refreshing")
+            if found:
+                logger.info("Marked schema %s as refreshing", schema_name)
+        return found
+
+    def claim_released(
+        self, *, exclude_templates: Collection[str], limit: int
+    ) -> list[str]:
+        """Claim dirty schemas of templates without a pool, for dropping."""
+        if limit <= 0:
+            return []
+        with self.sessions.with_meta_session() as session:
+            stmt = (
+                select(EnvironmentPoolEntry)
+                .where(
+                    EnvironmentPoolEntry.status == "dirty",
+                    EnvironmentPoolEntry.template_schema.not_in(
+                        list(exclude_templates)
+                    ),
+                )
+                .order_by(EnvironmentPoolEntry.updated_at.asc())
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            entries = session.execute(stmt).scalars().all()
+            now = datetime.now()
+            for entry in entries:
+                entry.status = "refreshing"
+                entry.updated_at = now
+            return [entry.schema_name for entry in entries]
 
     def ready_count(
         self, *, template_schema: str, session: Session | None = None
@@ -134,7 +281,11 @@ class PoolManager:
 
     def schemas_for_refresh(
         self, *, template_schema: str, limit: int | None
-    ) -> list[tuple[str, UUID | None]]:
+    ) -> list[tuple[str, UUID | None, str | None]]:
+        """Claim dirty entries for refresh.
+
+        Returns (schema_name, template_id, template_fingerprint) per entry.
+        """
         if limit is not None and limit <= 0:
             return []
         with self.sessions.with_meta_session() as session:
@@ -151,11 +302,13 @@ class PoolManager:
                 query = query.limit(limit)
             entries = query.all()
             now = datetime.now()
-            result: list[tuple[str, UUID | None]] = []
+            result: list[tuple[str, UUID | None, str | None]] = []
             for entry in entries:
                 entry.status = "refreshing"
                 entry.updated_at = now
-                result.append((entry.schema_name, entry.template_id))
+                result.append(
+                    (entry.schema_name, entry.template_id, entry.template_fingerprint)
+                )
             session.flush()
             return result
 
@@ -165,7 +318,7 @@ class PoolManager:
         new_status: str,
         *,
         last_refreshed_at: datetime | None = None,
-    ) -> None:
+    ) -> bool:
         with self.sessions.with_meta_session() as session:
             entry = (
                 session.query(EnvironmentPoolEntry)
@@ -174,9 +327,10 @@ class PoolManager:
                 .one_or_none()
             )
             if entry is None:
-                return
+                return False
             entry.status = new_status
             entry.updated_at = datetime.now()
             if last_refreshed_at is not None:
                 entry.last_refreshed_at = last_refreshed_at
             session.flush()
+            return True
@@ -0,0 +1,187 @@
+"""
+Process-wide cache of reflected schema metadata.
+
+Reflecting a template schema (``MetaData.reflect``, ``pg_indexes`` lookups)
+costs several catalog round trips. Pool refills, environment builds and every
+``Differ`` used to repeat that work for the same schema; they now share one
+cached reflection per schema.
+
+Entries are versioned by a fingerprint of the schema's catalog rows (its
+namespace OID plus its relations, columns and constraints, snapshot tables
+excluded). The fingerprint is checked on a miss and when an entry is older
+than ``revalidate_after`` seconds, so a schema that is dropped and recreated,
+or altered in place by DDL such as an alembic migration run from another
+process, is reflected again without a catalog query on every lookup.
+``invalidate`` drops entries explicitly; it is called when templates are
+registered and when this process creates or drops schemas.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import Engine, MetaData, text
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SchemaMetadata:
+    schema: str
+    version: str
+    metadata: MetaData
+    # Table names in alphabetical order (snapshot tables excluded).
+    tables: tuple[str, ...]
+    # Table names in foreign-key dependency order, parents first.
+    fk_order: tuple[str, ...]
+    columns: dict[str, list[str]]
+    primary_keys: dict[str, list[str]]
+    # (index name, index definition) for GIN and other indexes that
+    # MetaData.reflect does not capture.
+    custom_indexes: tuple[tuple[str, str], ...]
+
+
+# Any DDL on the schema (CREATE/DROP/ALTER of tables, columns, indexes or
+# constraints) changes at least one of these catalog rows. Snapshot tables
+# and their indexes are left out, as in reflection, so taking a snapshot
+# does not change the version.
+_VERSION_SQL = text(
+    r"""
+    WITH ns AS (
+        SELECT oid FROM pg_namespace WHERE nspname = :schema
+    ),
+    rels AS (
+        SELECT c.oid, c.relname, c.relkind
+        FROM pg_class c
+        JOIN ns ON c.relnamespace = ns.oid
+        LEFT JOIN pg_index i ON i.indexrelid = c.oid
+        LEFT JOIN pg_class t ON t.oid = i.indrelid
+        WHERE c.relname NOT LIKE '%\_snapshot\_%'
+          AND coalesce(t.relname, '') NOT LIKE '%\_snapshot\_%'
+    ),
+    parts AS (
+        SELECT concat_ws(':', 'r', oid, relname, relkind) AS part FROM rels
+        UNION ALL
+        SELECT concat_ws(
+            ':', 'a', a.attrelid, a.attnum, a.attname, a.atttypid,
+            a.attnotnull, a.atthasdef
+        )
+        FROM pg_attribute a JOIN rels ON a.attrelid = rels.oid
+        WHERE a.attnum > 0 AND NOT a.attisdropped
+        UNION ALL
+        SELECT concat_ws(':', 'k', co.oid, co.conname)
+        FROM pg_constraint co JOIN ns ON co.connamespace = ns.oid
+        WHERE co.conrelid = 0 OR co.conrelid IN (SELECT oid FROM rels)
+    )
+    SELECT (SELECT oid FROM ns)::text || ':' || md5(
+        coalesce(string_agg(part, ',' ORDER BY part), '')
+    )
+    FROM parts
+    """
+)
+
+
+def _is_data_table(name: str, _meta: MetaData | None = None) -> bool:
+    return "_snapshot_" not in name
+
+
+class SchemaMetadataCache:
+    def __init__(self, revalidate_after: float = 30.0) -> None:
+        self.revalidate_after = revalidate_after
+        self._entries: dict[str, SchemaMetadata] = {}
+        # time.monotonic() at which each entry's version was last confirmed.
+        self._checked_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._schema_locks: dict[str, threading.Lock] = {}
+
+    def get(self, engine: Engine, schema: str) -> SchemaMetadata:
+        """Return metadata for ``schema``, reflecting it on first use."""
+        entry = self._fresh_entry(schema)
+        if entry is not None:
+            return entry
+
+        with self._schema_lock(schema):
+            entry = self._fresh_entry(schema)
+            if entry is not None:
+                return entry
+            version = self._current_version(engine, schema)
+            entry = self._entries.get(schema)
+            if entry is None or entry.version != version:
+                entry = self._reflect(engine, schema, version)
+            with self._lock:
+                self._entries[schema] = entry
+                self._checked_at[schema] = time.monotonic()
+            return entry
+
+    def invalidate(self, schema: str | None = None) -> None:
+        """Drop the cached entry for ``schema``, or every entry when omitted."""
+        with self._lock:
+            if schema is None:
+                self._entries.clear()
+                self._checked_at.clear()
+            else:
+                self._entries.pop(schema, None)
+                self._checked_at.pop(schema, None)
+
+    def _fresh_entry(self, schema: str) -> SchemaMetadata | None:
+        with self._lock:
+            entry = self._entries.get(schema)
+            checked_at = self._checked_at.get(schema)
+        if entry is None or checked_at is None:
+            return None
+        if time.monotonic() - checked_at >= self.revalidate_after:
+            return None
+        return entry
+
+    def _schema_lock(self, schema: str) -> threading.Lock:
+        with self._lock:
+            lock = self._schema_locks.get(schema)
+            if lock is None:
+                lock = self._schema_locks[schema] = threading.Lock()
+            return lock
+
+    @staticmethod
+    def _current_version(engine: Engine, schema: str) -> str:
+        with engine.connect() as conn:
+            version = conn.execute(_VERSION_SQL, {"schema": schema}).scalar()
+        return version or ""
+
+    @staticmethod
+    def _reflect(engine: Engine, schema: str, version: str) -> SchemaMetadata:
+        meta = MetaData()
+        meta.reflect(bind=engine, schema=schema, only=_is_data_table)
+        with engine.connect() as conn:
+            custom_indexes = conn.execute(
+                text(
+                    """
+                    SELECT indexname, indexdef
+                    FROM pg_indexes
+                    WHERE schemaname = :schema
+                      AND indexdef LIKE '%gin%'
+                    """
+                ),
+                {"schema": schema},
+            ).fetchall()
+
+        # reflect() may pull in tables from other schemas through foreign keys.
+        own = [t for t in meta.tables.values() if t.schema == schema]
+        tables = sorted(t.name for t in own)
+        logger.debug("Reflected schema %s (%d tables)", schema, len(tables))
+        return SchemaMetadata(
+            schema=schema,
+            version=version,
+            metadata=meta,
+            tables=tuple(tables),
+            fk_order=tuple(t.name for t in meta.sorted_tables if t.schema == schema),
+            columns={t.name: [c.name for c in t.columns] for t in own},
+            primary_keys={t.name: [c.name for c in t.primary_key.columns] for t in own},
+            custom_indexes=tuple(
+                (name, definition) for name, definition in custom_indexes
+            ),
+        )
+
+
+schema_metadata_cache = SchemaMetadataCache()
@@ -1,21 +1,57 @@
 from __future__ import annotations
 
+import logging
+import threading
+import time
 from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import Engine
+from sqlalchemy import Engine, bindparam, update
 from sqlalchemy.orm import Session, sessionmaker
 
 from src.platform.db.schema import RunTimeEnvironment
 
+logger = logging.getLogger(__name__)
+
+_MAX_GENERATIONS = 4096
+
+
+@dataclass(frozen=True)
+class EnvironmentInfo:
+    schema: str
+    status: str
+    impersonate_user_id: str | None
+    impersonate_email: str | None
+    expires_at: datetime | None
+
 
 class SessionManager:
     def __init__(
         self,
         base_engine: Engine,
+        *,
+        environment_cache_ttl: float = 5.0,
+        last_used_flush_interval: float = 5.0,
     ):
         self.base_engine = base_engine
+        # Ready environments resolved recently: id -> (valid until, info).
+        # Entries are dropped by invalidate_environment when this process
+        # changes an environment's status; changes made by other processes
+        # are picked up within environment_cache_ttl.
+        self.environment_cache_ttl = environment_cache_ttl
+        self._environments: dict[UUID, tuple[float, EnvironmentInfo]] = {}
+        # Bumped by invalidate_environment so a read that was in flight
+        # during an invalidation does not write its stale result back.
+        self._generations: dict[UUID, int] = {}
+        self._epoch = 0
+        self._next_sweep = time.monotonic()
+        # last_used_at values waiting to be written by flush_last_used.
+        self.last_used_flush_interval = last_used_flush_interval
+        self._last_used: dict[UUID, datetime] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
 
     def get_meta_session(self):
         """
@@ -37,8 +73,15 @@ class SessionManager:
         finally:
             session.close()
 
-    def lookup_environment(self, env_id: str):
+    def resolve_environment(self, env_id: str) -> EnvironmentInfo:
+        """Return a ready environment, raising PermissionError otherwise."""
         env_uuid = self._to_uuid(env_id)
+        cached = self._environments.get(env_uuid)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        with self._lock:
+            generation = (self._epoch, self._generations.get(env_uuid, 0))
+
         with Session(bind=self.base_engine) as s:
             env = (
                 s.query(RunTimeEnvironment)
@@ -47,19 +90,102 @@ class SessionManager:
             )
             if env is None:
                 raise PermissionError(f"environment '{env_id}' not found")
-            if env.status == "expired":
-                raise PermissionError(
-                    f"environment '{env_id}' has expired (TTL reached)"
-                )
-            if env.status == "deleted":
-                raise PermissionError(f"environment '{env_id}' has been deleted")
-            if env.status != "ready":
-                raise PermissionError(
-                    f"environment '{env_id}' is not ready (status: {env.status})"
+            info = EnvironmentInfo(
+                schema=env.schema,
+                status=env.status,
+                impersonate_user_id=env.impersonate_user_id,
+                impersonate_email=env.impersonate_email,
+                expires_at=env.expires_at,
+            )
+
+        if info.status == "expired":
+            raise PermissionError(f"environment '{env_id}' has expired (TTL reached)")
+        if info.status == "deleted":
+            raise PermissionError(f"environment '{env_id}' has been deleted")
+        if info.status != "ready":
+            raise PermissionError(
+                f"environment '{env_id}' is not ready (status: {info.status})"
+            )
+
+        ttl = self.environment_cache_ttl
+        if info.expires_at is not None:
+            # Re-read once the TTL passes so expiry is noticed promptly.
+            ttl = min(ttl, (info.expires_at - datetime.now()).total_seconds())
+        if ttl > 0:
+            with self._lock:
+                current = (self._epoch, self._generations.get(env_uuid, 0))
+                if current == generation:
+                    now = time.monotonic()
+                    self._environments[env_uuid] = (now + ttl, info)
+                    self._evict_expired(now)
+        return info
+
+    def _evict_expired(self, now: float) -> None:
+        """Drop expired cache entries; called with ``_lock`` held."""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.environment_cache_ttl
+        for env_uuid in [
+            k for k, (until, _) in self._environments.items() if until <= now
+        ]:
+            del self._environments[env_uuid]
+        if len(self._generations) > _MAX_GENERATIONS:
+            # Forgetting generations is only safe with an epoch bump, which
+            # makes every read still in flight skip its cache write.
+            self._generations.clear()
+            self._epoch += 1
+
+    def invalidate_environment(self, env_id: str | UUID | None = None) -> None:
+        """Drop the cached entry for ``env_id``, or all entries when omitted."""
+        with self._lock:
+            if env_id is None:
+                self._environments.clear()
+                self._generations.clear()
+                self._epoch += 1
+            else:
+                env_uuid = self._to_uuid(env_id)
+                self._environments.pop(env_uuid, None)
+                self._generations[env_uuid] = self._generations.get(env_uuid, 0) + 1
+
+    def lookup_environment(self, env_id: str):
+        info = self.resolve_environment(env_id)
+        return info.schema, self._touch(self._to_uuid(env_id))
+
+    def _touch(self, env_uuid: UUID) -> datetime:
+        now = datetime.now()
+        with self._lock:
+            self._last_used[env_uuid] = now
+            due = time.monotonic() - self._last_flush >= self.last_used_flush_interval
+        if due:
+            self.flush_last_used()
+        return now
+
+    def flush_last_used(self) -> int:
+        """Write pending last_used_at values in one batched UPDATE."""
+        with self._lock:
+            pending, self._last_used = self._last_used, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        try:
+            table = RunTimeEnvironment.__table__
+            with self.base_engine.begin() as conn:
+                conn.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("env_id"))
+                    .values(last_used_at=bindparam("last_used")),
+                    [
+                        {"env_id": env_uuid, "last_used": last_used}
+                        for env_uuid, last_used in pending.items()
+                    ],
                 )
-            env.last_used_at = datetime.now()
-            s.commit()
-            return env.schema, env.last_used_at
+        except Exception as exc:
+            logger.warning("Failed to flush last_used_at: %s", exc)
+            with self._lock:
+                for env_uuid, last_used in pending.items():
+                    self._last_used.setdefault(env_uuid, last_used)
+            return 0
+        return len(pending)
 
     def get_session_for_schema(self, schema: str):
         """
@@ -109,7 +235,9 @@ class SessionManager:
             session.close()
 
     @staticmethod
-    def _to_uuid(value: str) -> UUID:
+    def _to_uuid(value: str | UUID) -> UUID:
+        if isinstance(value, UUID):
+            return value
         try:
             return UUID(value)
         except ValueError:
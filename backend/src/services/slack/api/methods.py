@@ -19,6 +19,7 @@ from starlette.routing import Route
 from starlette import status
 
 from src.services.slack.database import operations as ops
+from src.services.slack.database.membership import membership_index
 from src.services.slack.database.schema import (
     User,
     Channel,
@@ -26,6 +27,7 @@ from src.services.slack.database.schema import (
     Message,
     UserTeam,
     UserTeamsRole,
+    MESSAGE_TS_PATTERN,
 )
 from sqlalchemy.sql.elements import ColumnElement as SAColumnElement
 
@@ -342,11 +344,37 @@ def _element_to_mrkdwn(item: dict, in_code: bool = False) -> str:
 
 
 def _channel_members(session, channel_id: str) -> list[str]:
-    return list(
-        session.execute(
-            select(ChannelMember.user_id).where(ChannelMember.channel_id == channel_id)
+    return list(membership_index(session).members(channel_id))
+
+
+@dataclass
+class _ConversationPrefetch:
+    """Members and latest DM messages for a page of channels."""
+
+    members: dict[str, list[str]]
+    latest: dict[str, Message]
+
+
+def _prefetch_conversations(session, channels: list[Channel]) -> _ConversationPrefetch:
+    """Load what ``_serialize_conversation`` needs for ``channels`` in two queries."""
+    index = membership_index(session)
+    members = {ch.channel_id: list(index.members(ch.channel_id)) for ch in channels}
+
+    latest: dict[str, Message] = {}
+    dm_ids = [ch.channel_id for ch in channels if ch.is_dm]
+    if dm_ids:
+        latest_messages = session.execute(
+            select(Message)
+            .where(Message.channel_id.in_(dm_ids))
+            .distinct(Message.channel_id)
+            .order_by(
+                Message.channel_id,
+                Message.created_at.desc(),
+                Message.message_id.desc(),
+            )
         ).scalars()
-    )
+        latest = {msg.channel_id: msg for msg in latest_messages}
+    return _ConversationPrefetch(members=members, latest=latest)
 
 
 def _topic_payload(text: str | None) -> dict[str, Any]:
@@ -364,8 +392,11 @@ def _serialize_conversation(
     include_locale: bool = False,
     creator_id: str | None = None,
     is_member: bool = True,
+    prefetched: _ConversationPrefetch | None = None,
 ) -> dict[str, Any]:
     effective_team_id = team_id or channel.team_id or "T00000000"
+    if prefetched is not None and channel.channel_id not in prefetched.members:
+        prefetched = None
     created_ts = (
         int(channel.created_at.timestamp())
         if channel.created_at
@@ -374,18 +405,21 @@ def _serialize_conversation(
     updated_ts = created_ts
 
     if channel.is_dm:
-        member_ids = _channel_members(session, channel.channel_id)
-        other_member = next((mid for mid in member_ids if mid != actor_id), None)
-
-        latest_message = (
-            session.execute(
-                select(Message)
-                .where(Message.channel_id == channel.channel_id)
-                .order_by(Message.created_at.desc(), Message.message_id.desc())
+        if prefetched is not None:
+            member_ids = prefetched.members[channel.channel_id]
+            latest_message = prefetched.latest.get(channel.channel_id)
+        else:
+            member_ids = _channel_members(session, channel.channel_id)
+            latest_message = (
+                session.execute(
+                    select(Message)
+                    .where(Message.channel_id == channel.channel_id)
+                    .order_by(Message.created_at.desc(), Message.message_id.desc())
+                )
+                .scalars()
+                .first()
             )
-            .scalars()
-            .first()
-        )
+        other_member = next((mid for mid in member_ids if mid != actor_id), None)
 
         if latest_message is not None:
             latest_payload: dict[str, Any] | None = {
@@ -419,7 +453,9 @@ def _serialize_conversation(
         return payload
 
     member_ids: list[str] = []
-    if include_num_members or channel.is_gc or channel.is_private or flavor == "info":
+    if prefetched is not None:
+        member_ids = prefetched.members[channel.channel_id]
+    elif include_num_members or channel.is_gc or channel.is_private or flavor == "info":
         member_ids = _channel_members(session, channel.channel_id)
 
     base_payload: dict[str, Any] = {
@@ -819,25 +855,34 @@ async def chat_post_message(request: Request) -> JSONResponse:
     if session.get(ChannelMember, (channel_id, user_id)) is None:
         _slack_error("not_in_channel")
 
-    # Determine message_text: use provided text, or extract from blocks
-    if isinstance(text, str) and _has_content(text):
-        message_text = text
-    elif _has_content(text):
-        message_text = str(text)
-    elif blocks is not None:
-        message_text = _blocks_to_mrkdwn(blocks)
-    else:
-        message_text = ""
-
     message = ops.send_message(
         session=session,
         channel_id=channel_id,
         user_id=user_id,
-        message_text=message_text,
+        message_text=_post_message_text(text, blocks),
         parent_id=thread_ts,
         blocks=blocks,
     )
 
+    return _json_response(
+        {"ok": True, **_posted_message_payload(channel, message, attachments)}
+    )
+
+
+def _post_message_text(text: Any, blocks: list | None) -> str:
+    """Use provided text, or extract it from blocks."""
+    if isinstance(text, str) and _has_content(text):
+        return text
+    if _has_content(text):
+        return str(text)
+    if blocks is not None:
+        return _blocks_to_mrkdwn(blocks)
+    return ""
+
+
+def _posted_message_payload(
+    channel: str, message: Message, attachments: Any = None
+) -> dict[str, Any]:
     message_obj: dict[str, Any] = {
         "type": "message",
         "user": _format_user_id(message.user_id),
@@ -850,13 +895,96 @@ async def chat_post_message(request: Request) -> JSONResponse:
         message_obj["blocks"] = message.blocks
     if message.parent_id:
         message_obj["thread_ts"] = message.parent_id
+    return {"channel": channel, "ts": message.message_id, "message": message_obj}
+
+
+MAX_BATCH_WRITE_ITEMS = 1000
+
+
+async def batch_write(request: Request) -> JSONResponse:
+    """Post a burst of messages and reactions as the acting user in one call.
+
+    Not a Slack method: ``messages`` items take chat.postMessage arguments and
+    ``reactions`` items take reactions.add arguments. The whole batch is
+    validated before anything is written and fails with the first Slack error;
+    reactions that already exist are skipped instead of reported.
+    """
+    payload = await _get_params_async(request)
+    message_items = payload.get("messages") or []
+    reaction_items = payload.get("reactions") or []
+    if not isinstance(message_items, list) or not isinstance(reaction_items, list):
+        _slack_error("invalid_arguments")
+    if len(message_items) + len(reaction_items) > MAX_BATCH_WRITE_ITEMS:
+        _slack_error("too_many_items")
+
+    session = _session(request)
+    user_id = _principal_user_id(request)
+    resolved: dict[str, str] = {}
+
+    def _channel_id(channel: Any) -> str:
+        if channel not in resolved:
+            try:
+                resolved[channel] = _resolve_channel_id(str(channel), session)
+            except (ValueError, AttributeError):
+                _slack_error("channel_not_found")
+        return resolved[channel]
+
+    messages: list[dict[str, Any]] = []
+    for item in message_items:
+        if not isinstance(item, dict) or not item.get("channel"):
+            _slack_error("invalid_arguments")
+        blocks = _validate_blocks(item.get("blocks"))
+        text = item.get("text")
+        if (
+            not _has_content(text)
+            and not _has_content(item.get("attachments"))
+            and blocks is None
+        ):
+            _slack_error("no_text")
+        messages.append(
+            {
+                "channel_id": _channel_id(item["channel"]),
+                "message_text": _post_message_text(text, blocks),
+                "parent_id": item.get("thread_ts"),
+                "blocks": blocks,
+            }
+        )
+
+    reactions: list[dict[str, Any]] = []
+    for item in reaction_items:
+        if not isinstance(item, dict):
+            _slack_error("invalid_arguments")
+        name = _normalize_reaction_name(item.get("name"))
+        if not name or name not in COMMON_REACTIONS:
+            _slack_error("invalid_name")
+        channel = item.get("channel") or item.get("channel_id")
+        ts = item.get("timestamp") or item.get("ts")
+        if not channel or not ts:
+            _slack_error("no_item_specified")
+        reactions.append(
+            {
+                "channel_id": _channel_id(channel),
+                "message_id": ts,
+                "reaction_type": name,
+            }
+        )
+
+    try:
+        posted = ops.post_messages(session, user_id, messages)
+        added = ops.add_reactions(session, user_id, reactions)
+    except ValueError as exc:
+        _slack_error(str(exc))
 
     return _json_response(
         {
             "ok": True,
-            "channel": channel,
-            "ts": message.message_id,
-            "message": message_obj,
+            "messages": [
+                _posted_message_payload(
+                    item["channel"], message, item.get("attachments")
+                )
+                for item, message in zip(message_items, posted)
+            ],
+            "reactions_added": len(added),
         }
     )
 
@@ -1119,6 +1247,7 @@ async def conversations_list(request: Request) -> JSONResponse:
     if has_more:
         filtered_channels = filtered_channels[:limit]
 
+    prefetched = _prefetch_conversations(session, filtered_channels)
     data = [
         _serialize_conversation(
             session,
@@ -1127,6 +1256,7 @@ async def conversations_list(request: Request) -> JSONResponse:
             team_id=team_id,
             flavor="list",
             include_num_members=True,
+            prefetched=prefetched,
         )
         for ch in filtered_channels
     ]
@@ -1154,13 +1284,14 @@ async def conversations_history(request: Request) -> JSONResponse:
         _slack_error("invalid_limit")
 
     cursor_param = params.get("cursor")
-    if cursor_param is None or cursor_param == "":
-        cursor = 0
-    else:
+    cursor, cursor_key = 0, None
+    if cursor_param:
         try:
-            cursor = _decode_cursor(cursor_param)
+            cursor, cursor_key = _decode_keyset_cursor(cursor_param)
         except ValueError:
             _slack_error("invalid_cursor")
+        if cursor_key is not None and not re.match(MESSAGE_TS_PATTERN, cursor_key[0]):
+            _slack_error("invalid_cursor")
     oldest_param = params.get("oldest")
     latest_param = params.get("latest")
     inclusive = _parse_bool_param(params.get("inclusive"), default=False)
@@ -1219,6 +1350,7 @@ async def conversations_history(request: Request) -> JSONResponse:
         oldest=oldest_dt,
         latest=latest_dt,
         inclusive=inclusive,
+        before_ts=cursor_key[0] if cursor_key else None,
     )
 
     has_more = len(messages) > limit
@@ -1246,7 +1378,11 @@ async def conversations_history(request: Request) -> JSONResponse:
         "has_more": has_more,
         "pin_count": 0,
         "response_metadata": {
-            "next_cursor": _encode_cursor(cursor + limit) if has_more else ""
+            "next_cursor": (
+                _encode_keyset_cursor(messages[-1].message_id, messages[-1].message_id)
+                if has_more
+                else ""
+            )
         },
     }
 
@@ -1277,11 +1413,12 @@ async def conversations_replies(request: Request) -> JSONResponse:
         _slack_error("invalid_limit")
 
     cursor_param = params.get("cursor")
-    if cursor_param is None or cursor_param == "":
-        cursor = 0
-    else:
+    cursor, after = 0, None
+    if cursor_param:
         try:
-            cursor = _decode_cursor(cursor_param)
+            cursor, cursor_key = _decode_keyset_cursor(cursor_param)
+            if cursor_key is not None:
+                after = (datetime.fromisoformat(cursor_key[0]), cursor_key[1])
         except ValueError:
             _slack_error("invalid_cursor")
 
@@ -1339,6 +1476,7 @@ async def conversations_replies(request: Request) -> JSONResponse:
             oldest=oldest_dt,
             latest=latest_dt,
             inclusive=inclusive,
+            after=after,
         )
     except ValueError as exc:
         if "thread_not_found" in str(exc):
@@ -1380,7 +1518,15 @@ async def conversations_replies(request: Request) -> JSONResponse:
 
         messages_payload.append(payload)
 
-    next_cursor = _encode_cursor(cursor + len(thread_messages)) if has_more else ""
+    next_cursor = ""
+    if has_more:
+        last = thread_messages[-1]
+        if last.created_at is not None:
+            next_cursor = _encode_keyset_cursor(
+                last.created_at.isoformat(), last.message_id
+            )
+        else:
+            next_cursor = _encode_cursor(cursor + len(thread_messages))
 
     return _json_response(
         {
@@ -1644,22 +1790,9 @@ async def conversations_open(request: Request) -> JSONResponse:
 
     # Search for existing MPIM with these exact members
     existing_mpim = None
-    mpdm_channels = (
-        session.execute(
-            select(Channel).where(Channel.is_gc.is_(True), Channel.team_id == team_id)
-        )
-        .scalars()
-        .all()
-    )
-
-    for ch in mpdm_channels:
-        members = ops.list_members_in_channel(
-            session=session, channel_id=ch.channel_id, team_id=team_id
-        )
-        member_ids = sorted([m.user_id for m in members])
-        if member_ids == all_member_ids:
-            existing_mpim = ch
-            break
+    mpim_id = membership_index(session).find_mpim(team_id, all_member_ids)
+    if mpim_id is not None:
+        existing_mpim = session.get(Channel, mpim_id)
 
     if existing_mpim:
         if return_im:
@@ -2353,9 +2486,12 @@ async def users_list(request: Request) -> JSONResponse:
     # Get current timestamp for cache_ts
     from time import time
 
+    roles = _prefetch_user_roles(session, [u.user_id for u in users], team_id)
     members = []
     for user_row in users:
-        serialized = _serialize_user(user_row, session=session, team_id=team_id)
+        serialized = _serialize_user(
+            user_row, session=session, team_id=team_id, roles=roles
+        )
         if include_locale:
             serialized["locale"] = user_row.timezone or "en-US"
         members.append(serialized)
@@ -2370,11 +2506,31 @@ async def users_list(request: Request) -> JSONResponse:
     )
 
 
-def _serialize_user(user, session=None, team_id: str | None = None) -> dict[str, Any]:
+def _prefetch_user_roles(
+    session, user_ids: list[str], team_id: str | None
+) -> dict[str, UserTeamsRole | None]:
+    """Map each of ``user_ids`` that belongs to ``team_id`` to its team role."""
+    if team_id is None or not user_ids:
+        return {}
+    rows = session.execute(
+        select(UserTeam.user_id, UserTeam.role).where(
+            UserTeam.team_id == team_id, UserTeam.user_id.in_(user_ids)
+        )
+    )
+    return {user_id: role for user_id, role in rows}
+
+
+def _serialize_user(
+    user,
+    session=None,
+    team_id: str | None = None,
+    roles: dict[str, UserTeamsRole | None] | None = None,
+) -> dict[str, Any]:
     """Serialize user to match Slack API format.
 
     Returns user object with all fields that Slack API typically includes.
-    If session and team_id are provided, queries user_teams for admin/owner status.
+    If session and team_id are provided, queries user_teams for admin/owner status;
+    list endpoints pass ``roles`` from ``_prefetch_user_roles`` instead.
     """
     user_id_str = _format_user_id(user.user_id)
     real_name = user.real_name or user.username
@@ -2389,11 +2545,15 @@ def _serialize_user(user, session=None, team_id: str | None = None) -> dict[str,
     # Determine admin/owner status from user_teams role
     is_admin = False
     is_owner = False
-    if session is not None and team_id is not None:
+    role = None
+    if roles is not None:
+        role = roles.get(user.user_id)
+    elif session is not None and team_id is not None:
         user_team = session.get(UserTeam, (user.user_id, team_id))
-        if user_team and user_team.role:
-            is_owner = user_team.role == UserTeamsRole.owner
-            is_admin = user_team.role in (UserTeamsRole.admin, UserTeamsRole.owner)
+        role = user_team.role if user_team else None
+    if role:
+        is_owner = role == UserTeamsRole.owner
+        is_admin = role in (UserTeamsRole.admin, UserTeamsRole.owner)
 
     # Get is_bot from user record
     is_bot = user.is_bot if hasattr(user, "is_bot") and user.is_bot else False
@@ -2476,6 +2636,7 @@ async def users_conversations(request: Request) -> JSONResponse:
     if has_more:
         channels = channels[:limit]
 
+    prefetched = _prefetch_conversations(session, channels)
     data = []
     for ch in channels:
         serialized = _serialize_conversation(
@@ -2485,6 +2646,7 @@ async def users_conversations(request: Request) -> JSONResponse:
             team_id=team_id,
             flavor="list",
             include_num_members=False,
+            prefetched=prefetched,
         )
         serialized.pop("is_member", None)
         serialized.pop("num_members", None)
@@ -2572,6 +2734,28 @@ def _decode_cursor(cursor: str) -> int:
         raise ValueError("invalid_cursor") from exc
 
 
+def _encode_keyset_cursor(ts: str, message_id: str) -> str:
+    data = json.dumps({"ts": ts, "id": message_id})
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def _decode_keyset_cursor(cursor: str) -> tuple[int, tuple[str, str] | None]:
+    """Decode a message-list cursor into ``(offset, (ts, message_id))``.
+
+    Offset cursors handed out before keyset paging keep working.
+    """
+    if not cursor or cursor == "*":
+        return 0, None
+    try:
+        decoded = base64.urlsafe_b64decode(cursor.encode()).decode()
+        payload = json.loads(decoded)
+        if "id" in payload:
+            return 0, (str(payload["ts"]), str(payload["id"]))
+    except Exception as exc:
+        raise ValueError("invalid_cursor") from exc
+    return _decode_cursor(cursor), None
+
+
 def _parse_time_filter(value: str) -> datetime:
     candidate = value.strip()
     if candidate.startswith('"') and candidate.endswith('"'):
@@ -2738,10 +2922,11 @@ def _ci_contains(text: str | None, term: str) -> bool:
     return term.lower() in text.lower()
 
 
-def _count_ci_occurrences(text: str | None, term: str) -> int:
-    if not text:
-        return 0
-    return len(re.findall(re.escape(term), text, flags=re.IGNORECASE))
+def _ci_occurrences(column, term: str):
+    """SQL expression counting non-overlapping case-insensitive hits of ``term``."""
+    lowered = func.lower(func.coalesce(column, ""))
+    stripped = func.replace(lowered, func.lower(term), "")
+    return (func.length(lowered) - func.length(stripped)) / len(term)
 
 
 def _highlight_text(text: str | None, terms: list[str]) -> str:
@@ -2792,18 +2977,14 @@ def _resolve_user_id(session, value: str) -> str | None:
 def _build_dm_membership_cache(
     session, channels: list[Channel], team_id: str
 ) -> dict[str, set[str]]:
-    cache: dict[str, set[str]] = {}
-    for ch in channels:
-        if not ch.is_dm:
-            continue
-        try:
-            members = ops.list_members_in_channel(
-                session=session, channel_id=ch.channel_id, team_id=team_id
-            )
-            cache[ch.channel_id] = {m.user_id for m in members}
-        except Exception:
-            cache[ch.channel_id] = set()
-    return cache
+    index = membership_index(session)
+    return {
+        ch.channel_id: set(index.members(ch.channel_id))
+        if ch.team_id == team_id
+        else set()
+        for ch in channels
+        if ch.is_dm
+    }
 
 
 def _resolve_channel_filter(
@@ -2852,15 +3033,7 @@ def _resolve_channel_filter(
                 continue
             members = dm_member_cache.get(ch.channel_id)
             if members is None:
-                try:
-                    members = {
-                        m.user_id
-                        for m in ops.list_members_in_channel(
-                            session=session, channel_id=ch.channel_id, team_id=team_id
-                        )
-                    }
-                except Exception:
-                    members = set()
+                members = set(membership_index(session).members(ch.channel_id))
                 dm_member_cache[ch.channel_id] = members
             if {actor_id, user_id}.issubset(members):
                 resolved.add(ch.channel_id)
@@ -2987,21 +3160,6 @@ async def search_messages(request: Request) -> JSONResponse:
     if after_dt is not None:
         msg_filters.append(Message.created_at >= after_dt)
 
-    query = (
-        select(Message, Channel, User)
-        .join(Channel, Channel.channel_id == Message.channel_id)
-        .join(User, User.user_id == Message.user_id)
-        .where(*msg_filters)
-    )
-
-    if sort == "timestamp":
-        if sort_dir == "asc":
-            query = query.order_by(Message.created_at.asc(), Message.message_id.asc())
-        else:
-            query = query.order_by(Message.created_at.desc(), Message.message_id.desc())
-
-    rows = session.execute(query).all()
-
     def _unique_terms(values: list[str]) -> list[str]:
         seen: set[str] = set()
         ordered: list[str] = []
@@ -3016,26 +3174,55 @@ async def search_messages(request: Request) -> JSONResponse:
         parsed.include_terms + [term for group in parsed.any_terms for term in group]
     )
 
-    results = []
-    for msg, ch, user in rows:
-        text_for_score = msg.message_text or ""
-        if highlight_terms:
-            score = sum(
-                _count_ci_occurrences(text_for_score, term) for term in highlight_terms
-            )
-        else:
-            score = 1
-        results.append((score, msg, ch, user))
-
-    if sort == "score":
-        reverse = sort_dir != "asc"
-        results.sort(
-            key=lambda t: (t[0], t[1].created_at or datetime.min),
-            reverse=reverse,
-        )
+    # The ILIKE filters are served by the trigram index on messages.message_text;
+    # ranking and paging stay in SQL so only the requested page is loaded.
+    total = session.execute(
+        select(func.count())
+        .select_from(Message)
+        .join(Channel, Channel.channel_id == Message.channel_id)
+        .join(User, User.user_id == Message.user_id)
+        .where(*msg_filters)
+    ).scalar_one()
 
-    total = len(results)
-    page_items = results[start_index : start_index + per_page]
+    query = (
+        select(Message, Channel, User)
+        .join(Channel, Channel.channel_id == Message.channel_id)
+        .join(User, User.user_id == Message.user_id)
+        .where(*msg_filters)
+    )
+
+    if sort == "timestamp":
+        if sort_dir == "asc":
+            ordering = [Message.created_at.asc(), Message.message_id.asc()]
+        else:
+            ordering = [Message.created_at.desc(), Message.message_id.desc()]
+    else:
+        # Score is the total number of term hits; without search terms every
+        # match scores the same and only the timestamp breaks ties.
+        score = None
+        for term in filter(None, highlight_terms):
+            hits = _ci_occurrences(Message.message_text, term)
+            score = hits if score is None else score + hits
+        if sort_dir == "asc":
+            ordering = [
+                Message.created_at.asc().nulls_first(),
+                Message.message_id.asc(),
+            ]
+            if score is not None:
+                ordering.insert(0, score.asc())
+        else:
+            ordering = [
+                Message.created_at.desc().nulls_last(),
+                Message.message_id.desc(),
+            ]
+            if score is not None:
+                ordering.insert(0, score.desc())
+
+    page_items = []
+    if start_index < total:
+        page_items = session.execute(
+            query.order_by(*ordering).offset(start_index).limit(per_page)
+        ).all()
 
     if cursor_param is None:
         effective_page = page_num
@@ -3047,7 +3234,7 @@ async def search_messages(request: Request) -> JSONResponse:
         next_cursor = _encode_cursor(start_index + per_page)
 
     matches: list[dict[str, Any]] = []
-    for score, msg, ch, user in page_items:
+    for msg, ch, user in page_items:
         text = msg.message_text or ""
         display_text = (
             _highlight_text(text, highlight_terms)
@@ -3060,15 +3247,7 @@ async def search_messages(request: Request) -> JSONResponse:
         if ch.is_dm:
             members = dm_member_cache.get(ch.channel_id)
             if members is None:
-                try:
-                    members = {
-                        m.user_id
-                        for m in ops.list_members_in_channel(
-                            session=session, channel_id=ch.channel_id, team_id=team_id
-                        )
-                    }
-                except Exception:
-                    members = set()
+                members = set(membership_index(session).members(ch.channel_id))
                 dm_member_cache[ch.channel_id] = members
             other_member = next((uid for uid in members if uid != actor_id), None)
             if other_member:
@@ -3170,6 +3349,7 @@ async def search_all(request: Request) -> JSONResponse:
 SLACK_HANDLERS: dict[str, Callable[[Request], Awaitable[JSONResponse]]] = {
     "auth.test": auth_test,
     "chat.postMessage": chat_post_message,
+    "batch.write": batch_write,
     "chat.update": chat_update,
     "chat.delete": chat_delete,
     "conversations.create": conversations_create,
@@ -0,0 +1,114 @@
+"""
+Per-session index of Slack channel membership.
+
+DM lookup, search ``in:`` filters, MPIM matching and conversation
+serialization all need "who is in which channel". Rather than querying
+``channel_members`` for each channel they touch, they share one index per
+session, built from a single query on first use.
+
+The index lives in ``session.info`` and is dropped whenever a ``Channel`` or
+``ChannelMember`` is added to or deleted from the session, or the session
+commits or rolls back, so the next lookup rebuilds it.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from src.services.slack.database.schema import Channel, ChannelMember
+
+_INFO_KEY = "slack_membership_index"
+
+
+@dataclass
+class MembershipIndex:
+    # channel_id -> member user_ids, in channel_members row order
+    channel_members: dict[str, list[str]] = field(default_factory=dict)
+    # user_id -> channel_ids the user belongs to
+    user_channels: dict[str, set[str]] = field(default_factory=dict)
+    # (team_id, sorted member ids) -> channel_id, for DMs and MPIMs
+    dm_channels: dict[tuple[str | None, tuple[str, ...]], str] = field(
+        default_factory=dict
+    )
+    mpim_channels: dict[tuple[str | None, tuple[str, ...]], str] = field(
+        default_factory=dict
+    )
+
+    def members(self, channel_id: str) -> list[str]:
+        return self.channel_members.get(channel_id, [])
+
+    def channels_of(self, user_id: str) -> set[str]:
+        return self.user_channels.get(user_id, set())
+
+    def find_dm(self, team_id: str | None, *user_ids: str) -> str | None:
+        return self.dm_channels.get((team_id, tuple(sorted(set(user_ids)))))
+
+    def find_mpim(self, team_id: str | None, user_ids: list[str]) -> str | None:
+        return self.mpim_channels.get((team_id, tuple(sorted(set(user_ids)))))
+
+
+def _build(session: Session) -> MembershipIndex:
+    index = MembershipIndex()
+    conversations: dict[str, tuple[str | None, bool, bool]] = {}
+    rows = session.execute(
+        select(
+            ChannelMember.channel_id,
+            ChannelMember.user_id,
+            Channel.team_id,
+            Channel.is_dm,
+            Channel.is_gc,
+        ).join(Channel, Channel.channel_id == ChannelMember.channel_id)
+    )
+    for channel_id, user_id, team_id, is_dm, is_gc in rows:
+        index.channel_members.setdefault(channel_id, []).append(user_id)
+        index.user_channels.setdefault(user_id, set()).add(channel_id)
+        if is_dm or is_gc:
+            conversations[channel_id] = (team_id, bool(is_dm), bool(is_gc))
+
+    for channel_id, (team_id, is_dm, is_gc) in conversations.items():
+        key = (team_id, tuple(sorted(set(index.channel_members[channel_id]))))
+        target = index.dm_channels if is_dm else index.mpim_channels
+        target.setdefault(key, channel_id)
+    return index
+
+
+def membership_index(session: Session) -> MembershipIndex:
+    """Return the session's membership index, building it on first use."""
+    index = session.info.get(_INFO_KEY)
+    if index is None:
+        index = _build(session)
+        session.info[_INFO_KEY] = index
+    return index
+
+
+def invalidate_membership_index(session: Session) -> None:
+    session.info.pop(_INFO_KEY, None)
+
+
+def _is_membership_row(instance: object) -> bool:
+    return isinstance(instance, (Channel, ChannelMember))
+
+
+@event.listens_for(Session, "after_attach")
+def _on_attach(session: Session, instance: object) -> None:
+    if _is_membership_row(instance):
+        invalidate_membership_index(session)
+
+
+@event.listens_for(Session, "before_flush")
+def _on_flush(session: Session, flush_context, instances) -> None:
+    if any(_is_membership_row(obj) for obj in session.deleted):
+        invalidate_membership_index(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    invalidate_membership_index(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _on_rollback(session: Session, previous_transaction) -> None:
+    invalidate_membership_index(session)
@@ -6,6 +6,11 @@ from src.services.slack.database.schema import (
     ChannelMember,
     MessageReaction,
     UserTeam,
+    message_has_numeric_ts,
+)
+from src.services.slack.database.membership import (
+    invalidate_membership_index,
+    membership_index,
 )
 
 import secrets
@@ -14,7 +19,19 @@ import time
 from datetime import datetime
 from typing import Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import select, exists, and_, or_, func, cast, Float
+from sqlalchemy import (
+    select,
+    insert,
+    exists,
+    and_,
+    or_,
+    func,
+    cast,
+    literal,
+    tuple_,
+    Float,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 
 
@@ -217,6 +234,7 @@ def kick_user_from_channel(session: Session, channel_id: str, user_id: str):
     if channel_member is None:
         raise ValueError("Channel member not found")
     session.delete(channel_member)
+    invalidate_membership_index(session)
     return channel_member
 
 
@@ -325,6 +343,164 @@ def add_emoji_reaction(
     return reaction
 
 
+# bulk writes
+#
+# insert_messages / insert_reactions write rows as given (seeding, trusted
+# callers); post_messages / add_reactions validate a burst from one user with
+# a fixed number of lookups and raise ValueError with the Slack error code
+# before anything is written.
+
+
+_BURST_ID_ATTEMPTS = 5
+
+
+def _burst_message_ids(count: int, not_before: int = 0) -> tuple[list[str], int]:
+    """Strictly increasing Slack-style timestamp IDs for ``count`` messages.
+
+    Returns the IDs and the first microsecond tick after them.
+    """
+    start = max(int(time.time() * 1_000_000), not_before)
+    ids = [
+        f"{tick // 1_000_000}.{tick % 1_000_000:06d}"
+        for tick in range(start, start + count)
+    ]
+    return ids, start + count
+
+
+def insert_messages(session: Session, rows: list[dict]) -> list[Message]:
+    """Insert message rows in one bulk statement, in order.
+
+    Rows without a ``message_id`` get consecutive timestamp IDs. A concurrent
+    writer can take one of those IDs first; the insert is then retried in a
+    savepoint with IDs past the ones that collided.
+    """
+    if not rows:
+        return []
+    stmt = insert(Message).returning(Message, sort_by_parameter_order=True)
+    missing = sum(not r.get("message_id") for r in rows)
+    if not missing:
+        return list(session.scalars(stmt, rows))
+
+    attempts, next_tick = 0, 0
+    while True:
+        ids, next_tick = _burst_message_ids(missing, not_before=next_tick)
+        new_ids = iter(ids)
+        batch = [
+            r if r.get("message_id") else {**r, "message_id": next(new_ids)}
+            for r in rows
+        ]
+        try:
+            with session.begin_nested():
+                return list(session.scalars(stmt, batch))
+        except IntegrityError:
+            attempts += 1
+            if attempts == _BURST_ID_ATTEMPTS:
+                raise
+
+
+def insert_reactions(session: Session, rows: list[dict]) -> list[MessageReaction]:
+    """Insert reaction rows in one bulk statement, skipping ones that exist."""
+    if not rows:
+        return []
+    stmt = (
+        pg_insert(MessageReaction)
+        .on_conflict_do_nothing(
+            index_elements=["message_id", "user_id", "reaction_type"]
+        )
+        .returning(MessageReaction)
+    )
+    return list(session.scalars(stmt, rows))
+
+
+def _require_membership(session: Session, user_id: str, channel_ids: set[str]) -> None:
+    member_of = set(
+        session.scalars(
+            select(ChannelMember.channel_id).where(
+                ChannelMember.user_id == user_id,
+                ChannelMember.channel_id.in_(channel_ids),
+            )
+        )
+    )
+    if channel_ids - member_of:
+        raise ValueError("not_in_channel")
+
+
+def post_messages(
+    session: Session, user_id: str, messages: list[dict]
+) -> list[Message]:
+    """Post several messages as ``user_id``, validating each channel once.
+
+    Each item has ``channel_id`` and ``message_text`` and optionally
+    ``parent_id``, ``blocks`` and ``created_at``.
+    """
+    if not messages:
+        return []
+    channel_ids = {m["channel_id"] for m in messages}
+    channels = session.scalars(
+        select(Channel).where(Channel.channel_id.in_(channel_ids))
+    ).all()
+    if len(channels) != len(channel_ids):
+        raise ValueError("channel_not_found")
+    if any(ch.is_archived for ch in channels):
+        raise ValueError("is_archived")
+    _require_membership(session, user_id, channel_ids)
+
+    parent_ids = {m["parent_id"] for m in messages if m.get("parent_id")}
+    if parent_ids:
+        parent_channels = dict(
+            session.execute(
+                select(Message.message_id, Message.channel_id).where(
+                    Message.message_id.in_(parent_ids)
+                )
+            ).all()
+        )
+        for m in messages:
+            parent_id = m.get("parent_id")
+            if parent_id and parent_channels.get(parent_id) != m["channel_id"]:
+                raise ValueError("thread_not_found")
+
+    return insert_messages(session, [{**m, "user_id": user_id} for m in messages])
+
+
+def add_reactions(
+    session: Session, user_id: str, reactions: list[dict]
+) -> list[MessageReaction]:
+    """Add several reactions as ``user_id``; returns only the newly added ones.
+
+    Each item has ``message_id`` and ``reaction_type`` and optionally the
+    ``channel_id`` the message must belong to.
+    """
+    if not reactions:
+        return []
+    message_ids = {r["message_id"] for r in reactions}
+    rows = session.execute(
+        select(Message.message_id, Message.channel_id, Channel.is_archived)
+        .join(Channel, Channel.channel_id == Message.channel_id)
+        .where(Message.message_id.in_(message_ids))
+    ).all()
+    message_channels = {message_id: channel_id for message_id, channel_id, _ in rows}
+    if len(message_channels) != len(message_ids) or any(
+        r.get("channel_id") and r["channel_id"] != message_channels[r["message_id"]]
+        for r in reactions
+    ):
+        raise ValueError("message_not_found")
+    if any(is_archived for _, _, is_archived in rows):
+        raise ValueError("is_archived")
+    _require_membership(session, user_id, set(message_channels.values()))
+
+    return insert_reactions(
+        session,
+        [
+            {
+                "message_id": r["message_id"],
+                "user_id": user_id,
+                "reaction_type": r["reaction_type"],
+            }
+            for r in reactions
+        ],
+    )
+
+
 # remove-emoji-reaction
 
 
@@ -443,38 +619,18 @@ def leave_channel(session: Session, channel_id: str, user_id: str) -> None:
     if member is None:
         raise ValueError("Not a channel member")
     session.delete(member)
+    invalidate_membership_index(session)
 
 
 def find_or_create_dm_channel(
     session: Session, user1_id: str, user2_id: str, team_id: str
 ) -> Channel:
     a, b = (user1_id, user2_id) if user1_id <= user2_id else (user2_id, user1_id)
-    dm = (
-        session.execute(
-            select(Channel)
-            .where(Channel.is_dm.is_(True), Channel.team_id == team_id)
-            .where(
-                and_(
-                    exists().where(
-                        and_(
-                            ChannelMember.channel_id == Channel.channel_id,
-                            ChannelMember.user_id == a,
-                        )
-                    ),
-                    exists().where(
-                        and_(
-                            ChannelMember.channel_id == Channel.channel_id,
-                            ChannelMember.user_id == b,
-                        )
-                    ),
-                )
-            )
-        )
-        .scalars()
-        .first()
-    )
-    if dm:
-        return dm
+    dm_id = membership_index(session).find_dm(team_id, a, b)
+    if dm_id is not None:
+        dm = session.get(Channel, dm_id)
+        if dm is not None:
+            return dm
 
     channel_id = _generate_slack_id("D")
     dm_name = f"dm-{a}-{b}"
@@ -684,10 +840,11 @@ def list_channel_history(
     user_id: str,
     team_id: str,
     limit: int,
-    offset: int,
+    offset: int = 0,
     oldest: datetime | None = None,
     latest: datetime | None = None,
     inclusive: bool = False,
+    before_ts: str | None = None,
 ):
     """List channel message history with optional timestamp filtering.
 
@@ -701,6 +858,7 @@ def list_channel_history(
         oldest: Only include messages after this timestamp
         latest: Only include messages before this timestamp
         inclusive: If True, include messages with exact oldest/latest timestamps
+        before_ts: Keyset cursor; only include messages older than this ts
     """
     channel = session.get(Channel, channel_id)
     if channel is None:
@@ -727,7 +885,15 @@ def list_channel_history(
         else:
             query = query.where(Message.created_at < latest)
 
+    # Matches the partial ix_messages_channel_ts so pages are index range
+    # scans; ids that are not numeric timestamps cannot be ordered by ts anyway.
+    query = query.where(message_has_numeric_ts)
     ts_order = cast(Message.message_id, Float)
+    if before_ts is not None:
+        query = query.where(
+            tuple_(ts_order, Message.message_id)
+            < tuple_(cast(literal(before_ts), Float), literal(before_ts))
+        )
     query = (
         query.order_by(ts_order.desc(), Message.message_id.desc())
         .limit(limit)
@@ -745,12 +911,17 @@ def list_thread_messages(
     team_id: str,
     thread_root_ts: str,
     limit: int,
-    offset: int,
+    offset: int = 0,
     oldest: datetime | None = None,
     latest: datetime | None = None,
     inclusive: bool = False,
+    after: tuple[datetime, str] | None = None,
 ):
-    """List messages for a thread anchored at thread_root_ts."""
+    """List messages for a thread anchored at thread_root_ts.
+
+    ``after`` is a keyset cursor of (created_at, message_id); only messages
+    that sort after it are returned.
+    """
 
     channel = session.get(Channel, channel_id)
     if channel is None:
@@ -786,6 +957,12 @@ def list_thread_messages(
         else:
             query = query.where(Message.created_at < latest)
 
+    if after is not None:
+        query = query.where(
+            tuple_(Message.created_at, Message.message_id)
+            > tuple_(literal(after[0]), literal(after[1]))
+        )
+
     query = (
         query.order_by(Message.created_at.asc(), Message.message_id.asc())
         .offset(offset)
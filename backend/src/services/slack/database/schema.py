@@ -10,7 +10,11 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Enum,
+    Float,
+    Index,
     UniqueConstraint,
+    cast,
+    literal_column,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -128,6 +132,28 @@ class Message(Base):
     )
 
 
+# conversations.history pages newest-first by the numeric ts (the message_id);
+# conversations.replies and reply counts walk a thread in created_at order.
+# The ts index is partial so ids that are not Slack timestamps never hit the cast.
+MESSAGE_TS_PATTERN = r"^[0-9]+(\.[0-9]+)?$"
+message_has_numeric_ts = Message.message_id.op("~")(
+    literal_column(f"'{MESSAGE_TS_PATTERN}'")
+)
+Index(
+    "ix_messages_channel_ts",
+    Message.channel_id,
+    cast(Message.message_id, Float),
+    Message.message_id,
+    postgresql_where=message_has_numeric_ts,
+)
+Index(
+    "ix_messages_channel_parent_created",
+    Message.channel_id,
+    Message.parent_id,
+    Message.created_at,
+)
+
+
 class ChannelMember(Base):
     __tablename__ = "channel_members"
     channel_id: Mapped[str] = mapped_column(
@@ -229,6 +229,46 @@ class TestMaintenanceService:
         # env2 schema should be gone
         assert not environment_handler.schema_exists(env2.schema_name)
 
+    def test_failed_release_is_retried_by_cleanup(
+        self, core_isolation_engine, environment_handler, session_manager, monkeypatch
+    ):
+        env = core_isolation_engine.create_environment(
+            template_schema="slack_default",
+            ttl_seconds=3600,
+            created_by="test_user",
+        )
+        environment_handler.mark_environment_status(env.environment_id, "deleted")
+        maintenance_service = EnvironmentMaintenanceService(
+            session_manager=session_manager,
+            environment_handler=environment_handler,
+            pool_manager=None,
+            pool_targets={},
+        )
+
+        drop_schema = environment_handler.drop_schema
+
+        def failing_drop(schema):
+            raise RuntimeError("lock timeout")
+
+        monkeypatch.setattr(environment_handler, "drop_schema", failing_drop)
+        maintenance_service.release_environment(env.environment_id, env.schema_name)
+        monkeypatch.setattr(environment_handler, "drop_schema", drop_schema)
+
+        def status():
+            with session_manager.with_meta_session() as session:
+                return (
+                    session.query(RunTimeEnvironment.status)
+                    .filter(RunTimeEnvironment.id == env.environment_id)
+                    .scalar()
+                )
+
+        assert status() == "cleanup_failed"
+        assert environment_handler.schema_exists(env.schema_name)
+
+        assert maintenance_service._delete_expired_environments() >= 1
+        assert status() == "deleted"
+        assert not environment_handler.schema_exists(env.schema_name)
+
     @pytest.mark.asyncio
     async def test_trigger_is_idempotent(
         self, session_manager, environment_handler, pool_manager
@@ -0,0 +1,183 @@
+"""Tests for chunked diff storage and paging."""
+
+from datetime import datetime
+from uuid import UUID
+
+import pytest
+
+from src.platform.db.schema import DiffChunk
+from src.platform.db.schema import TestRun as RunRecord  # keep pytest from collecting it
+from src.platform.evaluationEngine.diff_store import DiffStore, paginate
+from src.platform.evaluationEngine.models import DiffResult
+
+
+def _diff() -> DiffResult:
+    return DiffResult(
+        inserts=[
+            *({"__table__": "messages", "message_id": f"M{i}"} for i in range(5)),
+            *({"__table__": "channels", "channel_id": f"C{i}"} for i in range(3)),
+        ],
+        updates=[
+            {
+                "__table__": "users",
+                "before": {"user_id": "U1", "name": "a"},
+                "after": {"user_id": "U1", "name": "b"},
+            }
+        ],
+        deletes=[{"__table__": "messages", "message_id": "M_OLD"}],
+    )
+
+
+@pytest.fixture
+def stored(differ_env):
+    store = DiffStore(differ_env["session_manager"], chunk_rows=2)
+    diff_id = store.save(differ_env["env_id"], "before", "after", _diff())
+    return store, diff_id
+
+
+class TestDiffStore:
+    def test_rows_are_chunked_per_table(self, stored, differ_env):
+        store, diff_id = stored
+        with differ_env["session_manager"].with_meta_session() as session:
+            counts = [
+                (c.change_type, c.table_name, c.seq, c.row_count)
+                for c in session.query(DiffChunk)
+                .filter(DiffChunk.diff_id == diff_id)
+                .order_by(DiffChunk.change_type, DiffChunk.table_name, DiffChunk.seq)
+            ]
+        assert counts == [
+            ("deletes", "messages", 0, 1),
+            ("inserts", "channels", 0, 2),
+            ("inserts", "channels", 1, 1),
+            ("inserts", "messages", 0, 2),
+            ("inserts", "messages", 1, 2),
+            ("inserts", "messages", 2, 1),
+            ("updates", "users", 0, 1),
+        ]
+        summary = store.summary(diff_id)
+        assert (summary["inserts"], summary["updates"], summary["deletes"]) == (8, 1, 1)
+        assert summary["tables"]["messages"] == {
+            "inserts": 5,
+            "updates": 0,
+            "deletes": 1,
+        }
+
+    def test_load_round_trips(self, stored):
+        store, diff_id = stored
+        loaded = store.load(diff_id)
+        expected = _diff()
+        assert sorted(r["message_id"] for r in loaded.inserts if "message_id" in r) == [
+            f"M{i}" for i in range(5)
+        ]
+        assert len(loaded.inserts) == len(expected.inserts)
+        assert loaded.updates == expected.updates
+        assert loaded.deletes == expected.deletes
+
+    @pytest.mark.parametrize(
+        "tables, change_types, offset, limit",
+        [
+            (None, None, 0, 4),
+            (None, None, 3, 4),
+            (None, None, 8, 100),
+            ({"messages"}, None, 1, 3),
+            ({"messages"}, {"inserts"}, 4, 10),
+            (None, {"updates", "deletes"}, 0, 1),
+            ({"no_such_table"}, None, 0, 10),
+        ],
+    )
+    def test_pages_match_json_paging(self, stored, tables, change_types, offset, limit):
+        store, diff_id = stored
+        page = store.page(
+            diff_id,
+            tables=tables,
+            change_types=change_types,
+            offset=offset,
+            limit=limit,
+        )
+        expected = paginate(
+            _diff().model_dump(mode="json"),
+            tables=tables,
+            change_types=change_types,
+            offset=offset,
+            limit=limit,
+        )
+        assert page == expected
+
+    def test_walks_all_pages(self, stored):
+        store, diff_id = stored
+        seen, offset = [], 0
+        while offset is not None:
+            page = store.page(diff_id, tables={"messages"}, offset=offset, limit=3)
+            seen += [r["message_id"] for r in page.inserts + page.deletes]
+            offset = page.next_offset
+        assert seen == [f"M{i}" for i in range(5)] + ["M_OLD"]
+
+
+@pytest.mark.asyncio
+async def test_result_endpoints_return_summary_and_pages(
+    stored, differ_env, test_user_id, core_evaluation_engine
+):
+    from httpx import ASGITransport, AsyncClient
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+
+    from src.platform.api.routes import get_run_diff, get_run_result
+
+    _, diff_id = stored
+    sessions = differ_env["session_manager"]
+    with sessions.with_meta_session() as session:
+        run = RunRecord(
+            environment_id=UUID(differ_env["env_id"]),
+            status="passed",
+            result={"passed": True, "score": {}, "failures": []},
+            diff_id=diff_id,
+            created_by=test_user_id,
+            created_at=datetime.now(),
+            updated_at=datetime.now(),
+        )
+        session.add(run)
+        session.flush()
+        run_id = str(run.id)
+
+    app = Starlette(
+        routes=[
+            Route("/results/{run_id}", get_run_result, methods=["GET"]),
+            Route("/results/{run_id}/diff", get_run_diff, methods=["GET"]),
+        ]
+    )
+    app.state.coreEvaluationEngine = core_evaluation_engine
+
+    @app.middleware("http")
+    async def add_db_session(request, call_next):
+        with sessions.with_meta_session() as session:
+            request.state.db_session = session
+            request.state.principal_id = test_user_id
+            return await call_next(request)
+
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            summary_only = (await client.get(f"/results/{run_id}")).json()
+            expanded = (await client.get(f"/results/{run_id}?expand=diff")).json()
+            page = (
+                await client.get(
+                    f"/results/{run_id}/diff",
+                    params={
+                        "table": "messages",
+                        "type": "inserts",
+                        "limit": 2,
+                        "offset": 3,
+                    },
+                )
+            ).json()
+            bad = await client.get(f"/results/{run_id}/diff", params={"type": "moves"})
+
+        assert summary_only["diff"] is None
+        assert summary_only["diffSummary"]["inserts"] == 8
+        assert len(expanded["diff"]["inserts"]) == 8
+        assert [r["message_id"] for r in page["inserts"]] == ["M3", "M4"]
+        assert (page["total"], page["nextOffset"]) == (5, None)
+        assert bad.status_code == 400
+    finally:
+        with sessions.with_meta_session() as session:
+            session.query(RunRecord).filter(RunRecord.id == UUID(run_id)).delete()
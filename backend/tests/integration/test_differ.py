@@ -1,9 +1,12 @@
 """Integration tests for Differ using slack_bench scenarios via raw SQL."""
 
+from uuid import UUID, uuid4
+
 import pytest
 from sqlalchemy import text
+from src.platform.evaluationEngine.diff_store import DiffStore
 from src.platform.evaluationEngine.differ import Differ
-from src.platform.db.schema import Diff
+from src.platform.db.schema import ChangeJournal, Diff
 
 MESSAGE_1 = "1699564800.000123"
 MESSAGE_2 = "1699568400.000456"
@@ -236,25 +239,6 @@ class TestDifferUpdates:
         assert "Hello everyone" in diff.updates[0]["after"]["message_text"]
         assert diff.updates[0]["before"]["message_text"] != diff.updates[0]["after"]["message_text"]
 
-    def test_diff_update_with_exclude_cols(self, differ_env):
-        differ = differ_env["differ"]
-        schema = differ_env["schema"]
-        engine = differ_env["engine"]
-
-        differ.create_snapshot("before")
-
-        execute_sql(engine, schema, """
-            UPDATE {schema}.messages
-            SET message_text = 'Updated text', created_at = NOW()
-            WHERE message_id = '1699564800.000123'
-        """)
-
-        differ.create_snapshot("after")
-        diff_with_exclude = differ.get_updates("before", "after", exclude_cols=["created_at"])
-
-        assert len(diff_with_exclude) == 1
-        assert diff_with_exclude[0]["after"]["message_text"] == "Updated text"
-
     def test_diff_update_null_handling(self, differ_env):
         differ = differ_env["differ"]
         schema = differ_env["schema"]
@@ -387,6 +371,27 @@ class TestSnapshotManagement:
         snap_count = query_count(engine, f"{schema}.messages_snapshot_isolated")
         assert snap_count == original_count
 
+    def test_fingerprint_ignores_row_order(self, differ_env):
+        differ = differ_env["differ"]
+        schema = differ_env["schema"]
+        engine = differ_env["engine"]
+
+        differ.create_snapshot("fp_a")
+        # A no-op update rewrites the row at the end of the heap.
+        execute_sql(engine, schema, """
+            UPDATE {schema}.channels SET topic_text = topic_text
+            WHERE channel_id = 'C01ABCD1234'
+        """)
+        differ.create_snapshot("fp_b")
+        assert differ._tables_to_compare("fp_a", "fp_b") == []
+
+        execute_sql(engine, schema, """
+            UPDATE {schema}.channels SET topic_text = 'fingerprinted'
+            WHERE channel_id = 'C01ABCD1234'
+        """)
+        differ.create_snapshot("fp_c")
+        assert differ._tables_to_compare("fp_b", "fp_c") == ["channels"]
+
 
 class TestComplexScenarios:
     def test_diff_combined_operations(self, differ_env):
@@ -479,13 +484,274 @@ class TestDiffStorage:
 
         differ.create_snapshot("after")
         diff = differ.get_diff("before", "after")
-        differ.store_diff(diff, "before", "after")
+        diff_id = differ.store_diff(diff, "before", "after")
 
         with session_manager.with_meta_session() as session:
             stored = session.query(Diff).filter(Diff.environment_id == env_id).first()
             assert stored is not None
+            assert stored.id == diff_id
             assert stored.before_suffix == "before"
             assert stored.after_suffix == "after"
-            assert len(stored.diff["inserts"]) == len(diff.inserts)
-            assert len(stored.diff["updates"]) == len(diff.updates)
-            assert len(stored.diff["deletes"]) == len(diff.deletes)
+            assert stored.summary["inserts"] == len(diff.inserts)
+            assert stored.summary["tables"]["messages"]["inserts"] == 1
+        loaded = DiffStore(session_manager).load(diff_id)
+        assert loaded.inserts == diff.model_dump(mode="json")["inserts"]
+        assert len(loaded.updates) == len(diff.updates)
+        assert len(loaded.deletes) == len(diff.deletes)
+
+
+class TestIncrementalSnapshots:
+    @pytest.fixture
+    def incremental_differ(self, differ_env):
+        return Differ(
+            schema=differ_env["schema"],
+            environment_id=differ_env["env_id"],
+            session_manager=differ_env["session_manager"],
+            incremental=True,
+        )
+
+    def test_only_written_tables_are_copied(self, differ_env, incremental_differ):
+        schema = differ_env["schema"]
+        engine = differ_env["engine"]
+
+        incremental_differ.create_snapshot("before")
+
+        execute_sql(engine, schema, """
+            INSERT INTO {schema}.messages (message_id, channel_id, user_id, message_text, created_at)
+            VALUES ('M_INCR_1', 'C01ABCD1234', 'U01AGENBOT9', 'incremental', NOW())
+        """)
+
+        incremental_differ.create_snapshot("after", base_suffix="before")
+
+        tables = query_tables(engine, schema, "%_snapshot_after")
+        assert tables == ["messages_snapshot_after"]
+
+        diff = incremental_differ.get_diff("before", "after")
+        assert len(diff.inserts) == 1
+        assert diff.inserts[0]["message_id"] == "M_INCR_1"
+        assert len(diff.updates) == 0
+        assert len(diff.deletes) == 0
+
+    def test_no_writes_copies_nothing(self, differ_env, incremental_differ):
+        schema = differ_env["schema"]
+        engine = differ_env["engine"]
+
+        incremental_differ.create_snapshot("before")
+        incremental_differ.create_snapshot("after", base_suffix="before")
+
+        assert query_tables(engine, schema, "%_snapshot_after") == []
+        diff = incremental_differ.get_diff("before", "after")
+        assert diff.inserts == diff.updates == diff.deletes == []
+
+    def test_chained_snapshots_resolve_to_source_table(
+        self, differ_env, incremental_differ
+    ):
+        schema = differ_env["schema"]
+        engine = differ_env["engine"]
+
+        incremental_differ.create_snapshot("before")
+        incremental_differ.create_snapshot("mid", base_suffix="before")
+
+        execute_sql(engine, schema, """
+            UPDATE {schema}.channels
+            SET topic_text = 'Changed after mid'
+            WHERE channel_id = 'C01ABCD1234'
+        """)
+
+        incremental_differ.create_snapshot("after", base_suffix="mid")
+        diff = incremental_differ.get_diff("mid", "after")
+
+        assert len(diff.updates) == 1
+        assert diff.updates[0]["__table__"] == "channels"
+        assert diff.updates[0]["after"]["topic_text"] == "Changed after mid"
+
+    def test_writes_recorded_once_per_transaction_and_dropped_with_schema(
+        self, differ_env, incremental_differ, environment_handler
+    ):
+        schema = differ_env["schema"]
+        engine = differ_env["engine"]
+
+        incremental_differ.create_snapshot("before")
+        execute_sql(engine, schema, """
+            UPDATE {schema}.channels SET topic_text = 'one' WHERE channel_id = 'C01ABCD1234';
+            UPDATE {schema}.channels SET topic_text = 'two' WHERE channel_id = 'C01ABCD1234';
+        """)
+        execute_sql(engine, schema, """
+            UPDATE {schema}.channels SET topic_text = 'three' WHERE channel_id = 'C01ABCD1234'
+        """)
+
+        def tracked_writes():
+            with engine.begin() as conn:
+                return dict(
+                    conn.execute(
+                        text(
+                            "SELECT table_name, count(*) FROM public.table_writes "
+                            "WHERE schema_name = :schema GROUP BY table_name"
+                        ),
+                        {"schema": schema},
+                    ).all()
+                )
+
+        assert tracked_writes() == {"channels": 2}
+
+        environment_handler.drop_schema(schema)
+        assert tracked_writes() == {}
+
+    def test_full_before_snapshot_falls_back_to_copy(
+        self, differ_env, incremental_differ
+    ):
+        differ = differ_env["differ"]
+        schema = differ_env["schema"]
+        engine = differ_env["engine"]
+
+        differ.create_snapshot("before")
+        incremental_differ.create_snapshot("after", base_suffix="before")
+
+        tables = query_tables(engine, schema, "%_snapshot_after")
+        assert set(tables) == {f"{t}_snapshot_after" for t in differ.tables}
+
+
+class TestSinglePassDiff:
+    def test_classifies_each_change(self, differ_env):
+        differ = differ_env["differ"]
+        schema = differ_env["schema"]
+        engine = differ_env["engine"]
+
+        differ.create_snapshot("before")
+
+        execute_sql(engine, schema, """
+            INSERT INTO {schema}.messages (message_id, channel_id, user_id, message_text, created_at)
+            VALUES ('M_SINGLE_PASS', 'C01ABCD1234', 'U01AGENBOT9', 'single pass', NOW());
+            UPDATE {schema}.channels SET topic_text = 'single pass' WHERE channel_id = 'C01ABCD1234';
+            DELETE FROM {schema}.message_reactions WHERE message_id = '1699572000.000789';
+            DELETE FROM {schema}.messages WHERE message_id = '1699572000.000789';
+        """)
+
+        differ.create_snapshot("after")
+        diff = differ.get_diff("before", "after")
+
+        assert [(r["__table__"], r["message_id"]) for r in diff.inserts] == [
+            ("messages", "M_SINGLE_PASS")
+        ]
+        assert len(diff.updates) == 1
+        assert diff.updates[0]["__table__"] == "channels"
+        assert diff.updates[0]["after"]["topic_text"] == "single pass"
+        assert diff.updates[0]["before"]["topic_text"] != "single pass"
+        deleted = {(r["__table__"], r["message_id"]) for r in diff.deletes}
+        assert ("messages", "1699572000.000789") in deleted
+        assert {t for t, _ in deleted} <= {"messages", "message_reactions"}
+
+    def test_serial_and_parallel_agree(self, differ_env):
+        differ = differ_env["differ"]
+        schema = differ_env["schema"]
+        engine = differ_env["engine"]
+
+        differ.create_snapshot("before")
+
+        execute_sql(engine, schema, """
+            INSERT INTO {schema}.channels (channel_id, channel_name, team_id, is_private, created_at)
+            VALUES ('C_PAR', 'parallel', 'T01WORKSPACE', false, NOW());
+            INSERT INTO {schema}.messages (message_id, channel_id, user_id, message_text, created_at)
+            VALUES ('M_PAR', 'C_PAR', 'U01AGENBOT9', 'parallel', NOW());
+        """)
+
+        differ.create_snapshot("after")
+        serial = Differ(
+            schema=schema,
+            environment_id=differ_env["env_id"],
+            session_manager=differ_env["session_manager"],
+            max_workers=1,
+        ).get_diff("before", "after")
+        parallel = differ.get_diff("before", "after")
+
+        assert serial == parallel
+        assert {row["__table__"] for row in parallel.inserts} == {"channels", "messages"}
+
+
+class TestJournalDiff:
+    """The compacted journal reports the same net changes as the snapshots."""
+
+    @staticmethod
+    def _row(engine, schema, message_id):
+        with engine.begin() as conn:
+            return conn.execute(
+                text(
+                    f"SELECT to_jsonb(m) FROM {schema}.messages m "
+                    "WHERE message_id = :id"
+                ),
+                {"id": message_id},
+            ).scalar()
+
+    def test_matches_snapshot_diff(self, differ_env, core_evaluation_engine):
+        differ = differ_env["differ"]
+        schema = differ_env["schema"]
+        engine = differ_env["engine"]
+        row = lambda mid: self._row(engine, schema, mid)  # noqa: E731
+        journal = []
+
+        def change(op, message_id, sql):
+            before = row(message_id)
+            execute_sql(engine, schema, sql)
+            journal.append((op, before if op != "insert" else None, row(message_id)))
+
+        differ.create_snapshot("before")
+        change("insert", "M_JOURNAL", """
+            INSERT INTO {schema}.messages (message_id, channel_id, user_id, message_text, created_at)
+            VALUES ('M_JOURNAL', 'C01ABCD1234', 'U01AGENBOT9', 'draft', NOW())
+        """)
+        for n in range(3):
+            change("update", "M_JOURNAL", f"""
+                UPDATE {{schema}}.messages SET message_text = 'edit {n}'
+                WHERE message_id = 'M_JOURNAL'
+            """)
+        change("insert", "M_SCRATCH", """
+            INSERT INTO {schema}.messages (message_id, channel_id, user_id, message_text, created_at)
+            VALUES ('M_SCRATCH', 'C01ABCD1234', 'U01AGENBOT9', 'scratch', NOW())
+        """)
+        change("delete", "M_SCRATCH", """
+            DELETE FROM {schema}.messages WHERE message_id = 'M_SCRATCH'
+        """)
+        for text_value in ("first", "second"):
+            change("update", MESSAGE_1, f"""
+                UPDATE {{schema}}.messages SET message_text = '{text_value}'
+                WHERE message_id = '{MESSAGE_1}'
+            """)
+        differ.create_snapshot("after")
+        expected = differ.get_diff("before", "after")
+
+        run_id = uuid4()
+        sessions = differ_env["session_manager"]
+        with sessions.with_meta_session() as session:
+            for n, (op, before, after) in enumerate(journal):
+                session.add(
+                    ChangeJournal(
+                        environment_id=UUID(differ_env["env_id"]),
+                        run_id=run_id,
+                        # F0 < 120 as LSNs but not as strings.
+                        lsn=f"0/{0xF0 + n * 0x30:X}",
+                        table_name="messages",
+                        operation=op,
+                        primary_key=before or after,
+                        before=before if op != "insert" else None,
+                        after=None if op == "delete" else after,
+                    )
+                )
+
+        diff = core_evaluation_engine.compute_diff_from_journal(
+            environment_id=differ_env["env_id"], run_id=str(run_id), schema=schema
+        )
+
+        assert [r["message_id"] for r in diff.inserts] == ["M_JOURNAL"]
+        assert [r["message_id"] for r in expected.inserts] == ["M_JOURNAL"]
+        assert diff.inserts[0]["message_text"] == "edit 2"
+        assert diff.deletes == expected.deletes == []
+        assert len(diff.updates) == len(expected.updates) == 1
+        for side in ("before", "after"):
+            assert (
+                diff.updates[0][side]["message_text"]
+                == expected.updates[0][side]["message_text"]
+            )
+
+        with sessions.with_meta_session() as session:
+            remaining = session.query(ChangeJournal).filter_by(run_id=run_id).count()
+        assert remaining == 0
@@ -2,7 +2,8 @@
 
 import time
 import pytest
-from sqlalchemy import text
+from uuid import UUID
+from sqlalchemy import event, text
 from datetime import datetime, timedelta
 
 from src.platform.db.schema import RunTimeEnvironment
@@ -268,3 +269,271 @@ def test_drop_schema_cleanup(
             {"schema": schema_name},
         ).scalar()
     assert exists_after is False
+
+
+def test_schema_metadata_cache_reuses_template_reflection(
+    session_manager, environment_handler, created_schemas, monkeypatch
+):
+    from src.platform.isolationEngine.schema_cache import schema_metadata_cache
+
+    engine = session_manager.base_engine
+    first = schema_metadata_cache.get(engine, "slack_default")
+    assert schema_metadata_cache.get(engine, "slack_default") is first
+    assert "messages" in first.tables
+    assert first.primary_keys["channels"] == ["channel_id"]
+    assert first.fk_order.index("channels") < first.fk_order.index("messages")
+
+    schema_name = "state_cache_probe"
+    created_schemas.append(schema_name)
+    environment_handler.create_schema(schema_name)
+    environment_handler.migrate_schema("slack_default", schema_name)
+    probe = schema_metadata_cache.get(engine, schema_name)
+    assert probe.tables == first.tables
+
+    # Snapshot tables do not change the version.
+    monkeypatch.setattr(schema_metadata_cache, "revalidate_after", 0.0)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"CREATE TABLE {schema_name}.messages_snapshot_probe AS "
+                f"SELECT * FROM {schema_name}.messages"
+            )
+        )
+    assert schema_metadata_cache.get(engine, schema_name) is probe
+
+    # DDL applied in place (as a migration in another process would) is
+    # picked up on revalidation without an explicit invalidate.
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"CREATE INDEX ix_probe_text ON {schema_name}.messages "
+                "USING gin (to_tsvector('simple', message_text))"
+            )
+        )
+        conn.execute(text(f"ALTER TABLE {schema_name}.messages ADD COLUMN probe int"))
+    altered = schema_metadata_cache.get(engine, schema_name)
+    assert altered is not probe
+    assert "ix_probe_text" in dict(altered.custom_indexes)
+    assert "probe" in altered.columns["messages"]
+    assert schema_metadata_cache.get(engine, schema_name) is altered
+
+    # Recreating the schema under the same name yields a fresh reflection.
+    environment_handler.drop_schema(schema_name)
+    environment_handler.create_schema(schema_name)
+    assert schema_metadata_cache.get(engine, schema_name).tables == ()
+
+
+def _schema_shape(conn, schema):
+    tables = conn.execute(
+        text(
+            """
+            SELECT table_name FROM information_schema.tables
+            WHERE table_schema = :schema ORDER BY table_name
+            """
+        ),
+        {"schema": schema},
+    ).scalars().all()
+    counts = {
+        tbl: conn.execute(text(f'SELECT count(*) FROM "{schema}"."{tbl}"')).scalar()
+        for tbl in tables
+    }
+    constraints = conn.execute(
+        text(
+            """
+            SELECT con.contype, con.condeferred, count(*)
+            FROM pg_constraint con
+            JOIN pg_namespace ns ON ns.oid = con.connamespace
+            WHERE ns.nspname = :schema
+            GROUP BY 1, 2 ORDER BY 1, 2
+            """
+        ),
+        {"schema": schema},
+    ).fetchall()
+    index_count = conn.execute(
+        text("SELECT count(*) FROM pg_indexes WHERE schemaname = :schema"),
+        {"schema": schema},
+    ).scalar()
+    return counts, [tuple(r) for r in constraints], index_count
+
+
+def test_clone_provisioning_matches_migrate(
+    session_manager, environment_handler, created_schemas
+):
+    migrated, cloned = "state_provision_migrate", "state_provision_clone"
+    created_schemas.extend([migrated, cloned])
+
+    environment_handler.provision_schema(
+        "slack_default", migrated, strategy="migrate"
+    )
+    environment_handler.provision_schema("slack_default", cloned, strategy="clone")
+
+    with session_manager.base_engine.begin() as conn:
+        assert _schema_shape(conn, cloned) == _schema_shape(conn, migrated)
+
+    with session_manager.with_session_for_schema(cloned) as session:
+        user = session.query(User).filter(User.user_id == "U01AGENBOT9").first()
+        user.real_name = "Modified in clone"
+        session.commit()
+
+    with session_manager.with_session_for_schema("slack_default") as session:
+        user = session.query(User).filter(User.user_id == "U01AGENBOT9").first()
+        assert user.real_name == "AI Agent"
+
+
+def test_clone_copies_identity_generated_and_sequence_options(
+    session_manager, environment_handler, created_schemas
+):
+    template, cloned = "state_clone_columns_tpl", "state_clone_columns"
+    created_schemas.extend([template, cloned])
+    environment_handler.create_schema(template)
+    with session_manager.base_engine.begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                CREATE SEQUENCE {template}.ticket_no_seq AS integer
+                    INCREMENT BY 10 MINVALUE 5 MAXVALUE 100000 START WITH 5 CYCLE;
+                CREATE TABLE {template}.tickets (
+                    id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+                    ticket_no integer NOT NULL DEFAULT nextval('{template}.ticket_no_seq'),
+                    title text NOT NULL,
+                    title_length integer GENERATED ALWAYS AS (length(title)) STORED
+                );
+                ALTER SEQUENCE {template}.ticket_no_seq OWNED BY {template}.tickets.ticket_no;
+                INSERT INTO {template}.tickets (title) VALUES ('first'), ('second');
+                """
+            )
+        )
+
+    environment_handler.provision_schema(template, cloned, strategy="clone")
+
+    with session_manager.base_engine.begin() as conn:
+        rows = conn.execute(
+            text(f"SELECT id, ticket_no, title_length FROM {cloned}.tickets ORDER BY id")
+        ).all()
+        assert [tuple(r) for r in rows] == [(1, 5, 5), (2, 15, 6)]
+        sequence = conn.execute(
+            text(
+                "SELECT data_type::text, increment_by, min_value, max_value, cycle "
+                "FROM pg_sequences WHERE schemaname = :schema "
+                "AND sequencename = 'ticket_no_seq'"
+            ),
+            {"schema": cloned},
+        ).one()
+        assert tuple(sequence) == ("integer", 10, 5, 100000, True)
+        inserted = conn.execute(
+            text(
+                f"INSERT INTO {cloned}.tickets (title) VALUES ('third') "
+                "RETURNING id, ticket_no"
+            )
+        ).one()
+        assert inserted.id == 3
+        assert inserted.ticket_no > 15
+
+
+def test_provisioning_strategy_is_validated(environment_handler):
+    with pytest.raises(ValueError):
+        environment_handler.provision_schema(
+            "slack_default", "state_never_created", strategy="rsync"
+        )
+
+
+def test_environment_resolution_is_cached_until_invalidated(
+    test_user_id,
+    core_isolation_engine,
+    environment_handler,
+    session_manager,
+    cleanup_test_environments,
+):
+    result = core_isolation_engine.create_environment(
+        template_schema="slack_default",
+        ttl_seconds=3600,
+        created_by=test_user_id,
+        impersonate_user_id="U01AGENBOT9",
+    )
+    env_id = result.environment_id
+
+    info = session_manager.resolve_environment(env_id)
+    assert info.schema == result.schema_name
+    assert info.impersonate_user_id == "U01AGENBOT9"
+
+    # A change made behind the cache's back is not seen until invalidation.
+    with session_manager.base_engine.begin() as conn:
+        conn.execute(
+            text("UPDATE run_time_environments SET status = 'deleted' WHERE id = :id"),
+            {"id": env_id},
+        )
+    assert session_manager.resolve_environment(env_id) == info
+
+    session_manager.invalidate_environment(env_id)
+    with pytest.raises(PermissionError):
+        session_manager.resolve_environment(env_id)
+
+    # mark_environment_status invalidates on its own.
+    environment_handler.mark_environment_status(env_id, "ready")
+    session_manager.resolve_environment(env_id)
+    environment_handler.mark_environment_status(env_id, "expired")
+    with pytest.raises(PermissionError):
+        session_manager.resolve_environment(env_id)
+
+
+def test_environment_invalidated_during_read_is_not_cached(
+    test_user_id, core_isolation_engine, session_manager, cleanup_test_environments
+):
+    result = core_isolation_engine.create_environment(
+        template_schema="slack_default",
+        ttl_seconds=3600,
+        created_by=test_user_id,
+    )
+    env_id = result.environment_id
+    session_manager.invalidate_environment(env_id)
+
+    # Invalidate while the status read is in flight, as a concurrent
+    # DELETE /env/{id} would.
+    def invalidate_mid_read(conn, cursor, statement, parameters, context, many):
+        if "run_time_environments" in statement:
+            session_manager.invalidate_environment(env_id)
+
+    engine = session_manager.base_engine
+    event.listen(engine, "before_cursor_execute", invalidate_mid_read)
+    try:
+        session_manager.resolve_environment(env_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", invalidate_mid_read)
+
+    assert UUID(env_id) not in session_manager._environments
+    session_manager.resolve_environment(env_id)
+    assert UUID(env_id) in session_manager._environments
+
+
+def test_last_used_at_updates_are_batched(
+    test_user_id, core_isolation_engine, session_manager, cleanup_test_environments
+):
+    envs = [
+        core_isolation_engine.create_environment(
+            template_schema="slack_default",
+            ttl_seconds=3600,
+            created_by=test_user_id,
+        )
+        for _ in range(2)
+    ]
+    session_manager.flush_last_used()
+    session_manager.last_used_flush_interval = 3600
+
+    touched = {
+        env.environment_id: session_manager.lookup_environment(env.environment_id)[1]
+        for env in envs
+    }
+    with session_manager.with_meta_session() as session:
+        for env in envs:
+            row = session.get(RunTimeEnvironment, env.environment_id)
+            assert row.last_used_at < touched[env.environment_id]
+
+    try:
+        assert session_manager.flush_last_used() == 2
+    finally:
+        session_manager.last_used_flush_interval = 5.0
+
+    with session_manager.with_meta_session() as session:
+        for env in envs:
+            row = session.get(RunTimeEnvironment, env.environment_id)
+            assert row.last_used_at == touched[env.environment_id]
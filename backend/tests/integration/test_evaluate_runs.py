@@ -0,0 +1,134 @@
+"""Tests for batch evaluation of runs over POST /evaluateRuns."""
+
+import json
+from datetime import datetime
+from uuid import UUID, uuid4
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from src.platform.api.routes import evaluate_runs
+from src.platform.db.schema import Test as TestRecord  # keep pytest from collecting it
+from src.platform.db.schema import TestRun as RunRecord
+from src.platform.evaluationEngine.compiler import DSLCompiler
+
+EXPECTED = {
+    "assertions": [
+        {
+            "diff_type": "added",
+            "entity": "messages",
+            "where": {"message_id": "M_BATCH"},
+            "expected_count": 1,
+        }
+    ]
+}
+
+
+@pytest.fixture
+def batch_runs(differ_env, test_user_id, core_evaluation_engine):
+    """Three runs of one test, all started before the same insert."""
+    sessions = differ_env["session_manager"]
+    with sessions.with_meta_session() as session:
+        test = TestRecord(
+            name=f"batch {uuid4().hex[:8]}",
+            prompt="post a message",
+            type="actionEval",
+            expected_output=EXPECTED,
+            template_schema="slack_default",
+        )
+        session.add(test)
+        session.flush()
+        test_id = test.id
+
+    run_ids = []
+    for _ in range(3):
+        before = core_evaluation_engine.take_before(
+            schema=differ_env["schema"], environment_id=differ_env["env_id"]
+        )
+        with sessions.with_meta_session() as session:
+            run = RunRecord(
+                test_id=test_id,
+                environment_id=UUID(differ_env["env_id"]),
+                status="running",
+                before_snapshot_suffix=before.suffix,
+                created_by=test_user_id,
+                created_at=datetime.now(),
+                updated_at=datetime.now(),
+            )
+            session.add(run)
+            session.flush()
+            run_ids.append(str(run.id))
+
+    with differ_env["engine"].begin() as conn:
+        conn.execute(
+            text(
+                f"INSERT INTO {differ_env['schema']}.messages "
+                "(message_id, channel_id, user_id, message_text, created_at) "
+                "VALUES ('M_BATCH', 'C01ABCD1234', 'U01AGENBOT9', 'batch', NOW())"
+            )
+        )
+
+    yield run_ids
+
+    with sessions.with_meta_session() as session:
+        session.query(RunRecord).filter(
+            RunRecord.id.in_([UUID(r) for r in run_ids])
+        ).delete(synchronize_session=False)
+        session.query(TestRecord).filter(TestRecord.id == test_id).delete()
+
+
+@pytest.mark.asyncio
+async def test_evaluate_runs_streams_each_result(
+    batch_runs, differ_env, test_user_id, core_evaluation_engine, monkeypatch
+):
+    sessions = differ_env["session_manager"]
+    app = Starlette(routes=[Route("/evaluateRuns", evaluate_runs, methods=["POST"])])
+    app.state.coreEvaluationEngine = core_evaluation_engine
+    app.state.evaluate_runs_concurrency = 2
+
+    @app.middleware("http")
+    async def add_db_session(request, call_next):
+        with sessions.with_meta_session() as session:
+            request.state.db_session = session
+            request.state.principal_id = test_user_id
+            return await call_next(request)
+
+    compiled = []
+    compiler = DSLCompiler()
+    normalize = compiler.normalize
+    monkeypatch.setattr(
+        compiler, "normalize", lambda spec: compiled.append(spec) or normalize(spec)
+    )
+    monkeypatch.setattr(core_evaluation_engine, "compiler", compiler)
+
+    missing = str(uuid4())
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/evaluateRuns",
+            json={"runIds": [*batch_runs, batch_runs[0], "not-a-uuid", missing]},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = {
+        line["runId"]: line for line in map(json.loads, response.text.splitlines())
+    }
+    assert len(results) == 5
+    assert results["not-a-uuid"]["error"] == "invalid run id"
+    assert results[missing]["error"] == "run not found"
+
+    for run_id in batch_runs:
+        assert results[run_id]["status"] == "passed"
+        assert results[run_id]["error"] is None
+    # Runs of the same test share one compiled spec.
+    assert compiled == [EXPECTED]
+
+    with sessions.with_meta_session() as session:
+        for run_id in batch_runs:
+            run = session.get(RunRecord, UUID(run_id))
+            assert run.after_snapshot_suffix
+            assert run.result["passed"] is True
@@ -0,0 +1,142 @@
+"""Integration tests for IsolationMiddleware request execution."""
+
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route, Router
+from sqlalchemy import text
+
+from src.platform.api.middleware import IsolationMiddleware
+from src.services.slack.api.methods import routes as slack_routes
+from tests.conftest import create_test_environment
+
+
+async def _slow_query(request):
+    # Blocking DB work inside an async handler, like the service handlers.
+    request.state.db_session.execute(text("SELECT pg_sleep(0.5)"))
+    return JSONResponse({"ok": True})
+
+
+async def _whoami(request):
+    request.state.db_session.execute(text("SELECT 1"))
+    return JSONResponse(
+        {
+            "environment_id": request.state.environment_id,
+            "impersonate_user_id": request.state.impersonate_user_id,
+        }
+    )
+
+
+async def _stream(request):
+    request.state.db_session.execute(text("SELECT 1"))
+
+    async def rows():
+        for i in range(3):
+            yield f"row-{i}\n"
+            await asyncio.sleep(0.01)
+
+    return StreamingResponse(rows(), media_type="text/plain")
+
+
+@pytest_asyncio.fixture
+async def env_client(
+    test_user_id, core_isolation_engine, session_manager, environment_handler
+):
+    env = create_test_environment(core_isolation_engine, created_by=test_user_id)
+    app = Starlette(
+        routes=[
+            Mount(
+                "/api/env/{env_id}/services/slack",
+                app=Router(slack_routes),
+            ),
+            Mount(
+                "/api/env/{env_id}/services/probe",
+                app=Router(
+                    [
+                        Route("/slow", _slow_query),
+                        Route("/whoami", _whoami),
+                        Route("/stream", _stream),
+                    ]
+                ),
+            ),
+        ],
+        middleware=[
+            Middleware(
+                IsolationMiddleware,
+                session_manager=session_manager,
+                core_isolation_engine=core_isolation_engine,
+                max_threads=4,
+            )
+        ],
+    )
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client, env
+    environment_handler.drop_schema(env.schema_name)
+
+
+@pytest.mark.asyncio
+async def test_write_is_visible_to_next_request(env_client):
+    client, env = env_client
+    base = f"/api/env/{env.environment_id}/services/slack"
+
+    posted = await client.post(
+        f"{base}/chat.postMessage",
+        json={"channel": "C01ABCD1234", "text": "through the middleware"},
+    )
+    assert posted.status_code == 200
+    assert posted.json()["ok"] is True
+
+    history = await client.get(
+        f"{base}/conversations.history", params={"channel": "C01ABCD1234"}
+    )
+    texts = [m["text"] for m in history.json()["messages"]]
+    assert "through the middleware" in texts
+
+
+@pytest.mark.asyncio
+async def test_blocking_handler_does_not_stall_other_requests(env_client):
+    client, env = env_client
+    base = f"/api/env/{env.environment_id}/services/probe"
+
+    async def timed(path):
+        start = time.perf_counter()
+        resp = await client.get(f"{base}{path}")
+        return resp, time.perf_counter() - start
+
+    slow = asyncio.create_task(timed("/slow"))
+    await asyncio.sleep(0.1)
+    fast, fast_elapsed = await timed("/whoami")
+    slow_resp, _ = await slow
+
+    assert slow_resp.status_code == 200
+    assert fast.status_code == 200
+    assert fast.json() == {
+        "environment_id": env.environment_id,
+        "impersonate_user_id": "U01AGENBOT9",
+    }
+    assert fast_elapsed < 0.4
+
+
+@pytest.mark.asyncio
+async def test_unknown_environment_returns_error(env_client):
+    client, _ = env_client
+    resp = await client.get("/api/env/not-a-uuid/services/probe/whoami")
+    assert resp.status_code == 500
+    assert resp.json()["error"] == "internal_error"
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_is_relayed(env_client):
+    client, env = env_client
+    resp = await client.get(
+        f"/api/env/{env.environment_id}/services/probe/stream"
+    )
+    assert resp.status_code == 200
+    assert resp.text == "row-0\nrow-1\nrow-2\n"
@@ -0,0 +1,259 @@
+"""Tests for recycling and sizing the environment pool."""
+
+import time
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+
+from src.platform.db.schema import EnvironmentPoolEntry
+from src.platform.isolationEngine.maintenance import EnvironmentMaintenanceService
+
+TEMPLATE = "slack_default"
+
+
+def _schema_oid(engine, schema: str) -> int | None:
+    with engine.begin() as conn:
+        return conn.execute(
+            text("SELECT oid FROM pg_namespace WHERE nspname = :schema"),
+            {"schema": schema},
+        ).scalar()
+
+
+def _table_counts(engine, schema: str) -> dict[str, int]:
+    with engine.begin() as conn:
+        tables = conn.execute(
+            text(
+                "SELECT table_name FROM information_schema.tables "
+                "WHERE table_schema = :schema ORDER BY table_name"
+            ),
+            {"schema": schema},
+        ).scalars().all()
+        return {
+            t: conn.execute(text(f'SELECT count(*) FROM "{schema}"."{t}"')).scalar()
+            for t in tables
+        }
+
+
+@pytest.fixture
+def pooled_schema(environment_handler, pool_manager, session_manager):
+    """A schema provisioned from the template and registered as a dirty entry."""
+    name = f"state_pool_{uuid4().hex}"
+    environment_handler.provision_schema(TEMPLATE, name)
+    pool_manager.register_entry(
+        schema_name=name,
+        template_schema=TEMPLATE,
+        status="dirty",
+        template_fingerprint=environment_handler.template_fingerprint(TEMPLATE),
+    )
+    yield name
+    environment_handler.drop_schema(name)
+    with session_manager.with_meta_session() as session:
+        session.query(EnvironmentPoolEntry).filter(
+            EnvironmentPoolEntry.schema_name == name
+        ).delete(synchronize_session=False)
+
+
+@pytest.fixture
+def maintenance(session_manager, environment_handler, pool_manager):
+    return EnvironmentMaintenanceService(
+        session_manager=session_manager,
+        environment_handler=environment_handler,
+        pool_manager=pool_manager,
+        pool_targets={TEMPLATE: 1},
+    )
+
+
+def _dirty(engine, schema: str) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f'INSERT INTO "{schema}".messages '
+                "(message_id, channel_id, user_id, message_text, created_at) "
+                "VALUES ('M_DIRTY', 'C01ABCD1234', 'U01AGENBOT9', 'dirty', NOW())"
+            )
+        )
+        conn.execute(text(f'DELETE FROM "{schema}".message_reactions'))
+        conn.execute(
+            text(
+                f'CREATE TABLE "{schema}".messages_snapshot_before_x '
+                f'AS SELECT * FROM "{schema}".messages'
+            )
+        )
+
+
+class TestPoolRecycle:
+    def test_reload_restores_template_data_without_ddl(
+        self, pooled_schema, environment_handler, session_manager
+    ):
+        engine = session_manager.base_engine
+        oid = _schema_oid(engine, pooled_schema)
+        _dirty(engine, pooled_schema)
+
+        environment_handler.reload_schema(TEMPLATE, pooled_schema)
+
+        assert _schema_oid(engine, pooled_schema) == oid
+        counts = _table_counts(engine, pooled_schema)
+        assert "messages_snapshot_before_x" not in counts
+        assert counts == {
+            t: n
+            for t, n in _table_counts(engine, TEMPLATE).items()
+            if "_snapshot_" not in t
+        }
+
+    def test_matching_fingerprint_recycles_in_place(
+        self, pooled_schema, maintenance, pool_manager, session_manager
+    ):
+        engine = session_manager.base_engine
+        oid = _schema_oid(engine, pooled_schema)
+        _dirty(engine, pooled_schema)
+        [(name, template_id, built_from)] = [
+            target
+            for target in pool_manager.schemas_for_refresh(
+                template_schema=TEMPLATE, limit=None
+            )
+            if target[0] == pooled_schema
+        ]
+        fingerprint = maintenance.environment_handler.template_fingerprint(TEMPLATE)
+        assert built_from == fingerprint
+
+        maintenance._build_pool_entry(
+            TEMPLATE, None, template_id, name, fingerprint, reload=True
+        )
+
+        assert _schema_oid(engine, pooled_schema) == oid
+        assert pool_manager.get_entry(pooled_schema).status == "ready"
+        with engine.begin() as conn:
+            assert not conn.execute(
+                text(
+                    f'SELECT count(*) FROM "{pooled_schema}".messages '
+                    "WHERE message_id = 'M_DIRTY'"
+                )
+            ).scalar()
+
+    def test_changed_template_structure_changes_fingerprint(
+        self, pooled_schema, environment_handler, session_manager
+    ):
+        # Use the pooled copy as a stand-in template so the shared one is untouched.
+        before = environment_handler.template_fingerprint(pooled_schema)
+        assert environment_handler.template_fingerprint(pooled_schema) == before
+
+        with session_manager.base_engine.begin() as conn:
+            conn.execute(
+                text(f'ALTER TABLE "{pooled_schema}".messages ADD COLUMN extra text')
+            )
+
+        assert environment_handler.template_fingerprint(pooled_schema) != before
+
+    def test_expired_pooled_schema_is_kept_for_recycle(
+        self, pooled_schema, maintenance, pool_manager
+    ):
+        assert maintenance._recyclable_in_place(pooled_schema)
+        maintenance.pool_targets = {}
+        assert not maintenance._recyclable_in_place(pooled_schema)
+
+
+@pytest.mark.asyncio
+async def test_adaptive_pool_trims_surplus_schemas(
+    session_manager, environment_handler, pool_manager, monkeypatch
+):
+    template = f"trim_{uuid4().hex[:8]}"
+    names = [f"state_pool_{uuid4().hex}" for _ in range(4)]
+    for n, name in enumerate(names):
+        environment_handler.create_schema(name)
+        pool_manager.register_entry(
+            schema_name=name,
+            template_schema=template,
+            status="dirty" if n == 3 else "ready",
+        )
+    service = EnvironmentMaintenanceService(
+        session_manager=session_manager,
+        environment_handler=environment_handler,
+        pool_manager=pool_manager,
+        pool_targets={template: 10},
+        pool_min_size=1,
+    )
+    # Trimming waits until a full demand window has been observed.
+    monkeypatch.setattr(
+        pool_manager, "_started_at", time.monotonic() - pool_manager.demand_window
+    )
+    try:
+        assert service.pool_target(template) == 1
+
+        assert await service._ensure_pool_capacity(template, 1)
+
+        remaining = [n for n in names if environment_handler.schema_exists(n)]
+        assert len(remaining) == 1
+        assert pool_manager.get_entry(remaining[0]).status == "ready"
+        assert all(pool_manager.get_entry(n) is None for n in names if n not in remaining)
+        assert service.pool_status()[template]["ready"] == 1
+    finally:
+        for name in names:
+            environment_handler.drop_schema(name)
+            pool_manager.remove_entry(name)
+
+
+@pytest.mark.asyncio
+async def test_delete_environment_returns_schema_to_pool(
+    test_user_id,
+    session_manager,
+    core_isolation_engine,
+    environment_handler,
+    pool_manager,
+    monkeypatch,
+):
+    from httpx import ASGITransport, AsyncClient
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+
+    from src.platform.api.routes import delete_environment
+
+    env = core_isolation_engine.create_environment(
+        template_schema=TEMPLATE, ttl_seconds=3600, created_by=test_user_id
+    )
+    service = EnvironmentMaintenanceService(
+        session_manager=session_manager,
+        environment_handler=environment_handler,
+        pool_manager=pool_manager,
+        pool_targets={},
+    )
+    app = Starlette(
+        routes=[Route("/env/{env_id}", delete_environment, methods=["DELETE"])]
+    )
+    app.state.coreIsolationEngine = core_isolation_engine
+
+    @app.middleware("http")
+    async def add_db_session(request, call_next):
+        with session_manager.with_meta_session() as session:
+            request.state.db_session = session
+            request.state.principal_id = test_user_id
+            return await call_next(request)
+
+    # Keep the loop idle: only the route's release is under test here.
+    monkeypatch.setattr(service, "trigger", _noop)
+    app.state.maintenance_service = service
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.delete(f"/env/{env.environment_id}")
+
+        assert response.status_code == 202
+        assert response.json()["status"] == "deleted"
+        assert environment_handler.get_environment(env.environment_id).status == "deleted"
+        # Not dropped by the request: queued for the maintenance loop.
+        assert environment_handler.schema_exists(env.schema_name)
+        assert pool_manager.get_entry(env.schema_name).status == "dirty"
+
+        # No pool for the template, so the drain drops it (after any older
+        # released schemas).
+        while pool_manager.get_entry(env.schema_name) is not None:
+            assert await service._drain_released_schemas()
+        assert not environment_handler.schema_exists(env.schema_name)
+        assert pool_manager.get_entry(env.schema_name) is None
+    finally:
+        environment_handler.drop_schema(env.schema_name)
+        pool_manager.remove_entry(env.schema_name)
+
+
+async def _noop() -> None:
+    return None
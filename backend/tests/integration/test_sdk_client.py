@@ -768,13 +768,14 @@ class TestRunLifecycle:
         sdk_client.evaluate_run(EndRunRequest(runId=start_resp.runId))
 
         # Get result
-        result = sdk_client.get_results_for_run(start_resp.runId)
+        result = sdk_client.get_results_for_run(start_resp.runId, include_diff=True)
 
         assert result.runId == start_resp.runId
         assert result.status in ["passed", "failed", "error"]
         assert result.passed is not None
         assert result.score is not None
         assert result.failures is not None
+        assert result.diffSummary is not None
         assert result.diff is not None
         assert result.createdAt is not None
 
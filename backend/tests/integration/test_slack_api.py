@@ -1,9 +1,14 @@
 """Integration tests for Slack API methods."""
 
+import base64
+import json
+
 import pytest
 from httpx import AsyncClient
 from urllib.parse import quote
 
+from src.services.slack.database import operations as ops
+
 USER_AGENT = "U01AGENBOT9"
 USER_JOHN = "U02JOHNDOE1"
 USER_ROBERT = "U03ROBERT23"
@@ -332,6 +337,48 @@ class TestConversationsHistory:
         assert data["ok"] is True
         assert len(data["messages"]) == 1
 
+    async def test_history_cursor_walks_every_message_once(
+        self, slack_client: AsyncClient
+    ):
+        full = await slack_client.get(
+            f"/conversations.history?channel={CHANNEL_GENERAL}"
+        )
+        expected = [m["ts"] for m in full.json()["messages"]]
+        assert len(expected) >= 2
+
+        seen, cursor = [], ""
+        while True:
+            page = (
+                await slack_client.get(
+                    "/conversations.history",
+                    params={"channel": CHANNEL_GENERAL, "limit": 1, "cursor": cursor},
+                )
+            ).json()
+            assert page["ok"] is True
+            seen += [m["ts"] for m in page["messages"]]
+            cursor = page["response_metadata"]["next_cursor"]
+            if not page["has_more"]:
+                assert cursor == ""
+                break
+        assert seen == expected
+
+    async def test_history_cursor_star_and_bad_ts(self, slack_client: AsyncClient):
+        star = await slack_client.get(
+            "/conversations.history",
+            params={"channel": CHANNEL_GENERAL, "cursor": "*"},
+        )
+        assert star.json()["ok"] is True
+
+        bad = base64.urlsafe_b64encode(
+            json.dumps({"ts": "abc", "id": "abc"}).encode()
+        ).decode()
+        response = await slack_client.get(
+            "/conversations.history",
+            params={"channel": CHANNEL_GENERAL, "cursor": bad},
+        )
+        assert response.status_code == 200
+        assert response.json()["error"] == "invalid_cursor"
+
     async def test_get_history_with_time_range(self, slack_client: AsyncClient):
         oldest = "1699564800"  # Around MESSAGE_1
         response = await slack_client.get(
@@ -417,6 +464,48 @@ class TestConversationsReplies:
         assert first_reply["parent_user_id"] == USER_AGENT
         assert first_reply["thread_ts"] == parent_ts
 
+    async def test_replies_cursor_pages_thread(self, slack_client: AsyncClient):
+        parent_resp = await slack_client.post(
+            "/chat.postMessage",
+            json={"channel": CHANNEL_GENERAL, "text": "Paged thread root"},
+        )
+        parent_ts = parent_resp.json()["ts"]
+        for i in range(3):
+            reply = await slack_client.post(
+                "/chat.postMessage",
+                json={
+                    "channel": CHANNEL_GENERAL,
+                    "text": f"Paged reply {i}",
+                    "thread_ts": parent_ts,
+                },
+            )
+            assert reply.status_code == 200
+
+        texts, cursor = [], ""
+        while True:
+            page = (
+                await slack_client.get(
+                    "/conversations.replies",
+                    params={
+                        "channel": CHANNEL_GENERAL,
+                        "ts": parent_ts,
+                        "limit": 2,
+                        "cursor": cursor,
+                    },
+                )
+            ).json()
+            assert page["ok"] is True
+            texts += [m["text"] for m in page["messages"]]
+            cursor = page["response_metadata"]["next_cursor"]
+            if not page["has_more"]:
+                break
+        assert texts == [
+            "Paged thread root",
+            "Paged reply 0",
+            "Paged reply 1",
+            "Paged reply 2",
+        ]
+
     async def test_replies_with_reply_ts(self, slack_client: AsyncClient):
         parent_resp = await slack_client.post(
             "/chat.postMessage",
@@ -588,6 +677,20 @@ class TestConversationsOpen:
         data = response.json()
         assert data["ok"] is True
 
+    async def test_open_mpim_returns_existing(self, slack_client: AsyncClient):
+        users = f"{USER_JOHN},{USER_ROBERT}"
+        resp1 = await slack_client.post("/conversations.open", json={"users": users})
+        resp2 = await slack_client.post(
+            "/conversations.open", json={"users": users, "return_im": True}
+        )
+        data = resp2.json()
+        assert data["ok"] is True
+        assert data["already_open"] is True
+        assert data["channel"]["id"] == resp1.json()["channel"]["id"]
+
+        dm = await slack_client.post("/conversations.open", json={"users": USER_JOHN})
+        assert dm.json()["channel"]["id"] != data["channel"]["id"]
+
     async def test_open_with_return_im(self, slack_client: AsyncClient):
         response = await slack_client.post(
             "/conversations.open", json={"users": USER_JOHN, "return_im": True}
@@ -829,6 +932,11 @@ class TestConversationsKickLeave:
         data = response.json()
         assert data["ok"] is True
 
+        members = await slack_client.get(
+            "/conversations.members", params={"channel": channel_id}
+        )
+        assert USER_JOHN not in members.json()["members"]
+
     async def test_kick_self_error(self, slack_client: AsyncClient):
         response = await slack_client.post(
             "/conversations.kick",
@@ -969,6 +1077,126 @@ class TestReactions:
         assert data["error"] == "no_reaction"
 
 
+@pytest.mark.asyncio
+class TestBatchWrite:
+    async def test_posts_messages_and_reactions(self, slack_client: AsyncClient):
+        response = await slack_client.post(
+            "/batch.write",
+            json={
+                "messages": [
+                    {"channel": CHANNEL_GENERAL, "text": "burst one"},
+                    {"channel": CHANNEL_RANDOM, "text": "burst two"},
+                    {
+                        "channel": CHANNEL_GENERAL,
+                        "text": "burst reply",
+                        "thread_ts": MESSAGE_1,
+                    },
+                ],
+                "reactions": [
+                    {"name": "tada", "channel": CHANNEL_RANDOM, "timestamp": MESSAGE_3},
+                    {"name": "tada", "channel": CHANNEL_RANDOM, "timestamp": MESSAGE_3},
+                ],
+            },
+        )
+        data = response.json()
+        assert data["ok"] is True
+        assert [m["message"]["text"] for m in data["messages"]] == [
+            "burst one",
+            "burst two",
+            "burst reply",
+        ]
+        assert data["messages"][2]["message"]["thread_ts"] == MESSAGE_1
+        ts = [m["ts"] for m in data["messages"]]
+        assert ts == sorted(set(ts), key=float)
+        assert data["reactions_added"] == 1
+
+        history = await slack_client.get(
+            f"/conversations.history?channel={CHANNEL_RANDOM}&limit=5"
+        )
+        assert ts[1] in [m["ts"] for m in history.json()["messages"]]
+        reactions = await slack_client.get(
+            f"/reactions.get?channel={CHANNEL_RANDOM}&timestamp={MESSAGE_3}"
+        )
+        names = [r["name"] for r in reactions.json()["message"]["reactions"]]
+        assert "tada" in names
+
+    async def test_invalid_item_rejects_whole_batch(self, slack_client: AsyncClient):
+        response = await slack_client.post(
+            "/batch.write",
+            json={
+                "messages": [
+                    {"channel": CHANNEL_GENERAL, "text": "batchRejectedMarker"},
+                    {
+                        "channel": CHANNEL_GENERAL,
+                        "text": "orphan",
+                        "thread_ts": "9999999999.999999",
+                    },
+                ]
+            },
+        )
+        data = response.json()
+        assert data["ok"] is False
+        assert data["error"] == "thread_not_found"
+
+        search = await slack_client.get("/search.messages?query=batchRejectedMarker")
+        assert search.json()["messages"]["total"] == 0
+
+        bad_reaction = await slack_client.post(
+            "/batch.write",
+            json={
+                "reactions": [
+                    {"name": "tada", "channel": CHANNEL_GENERAL, "timestamp": MESSAGE_3}
+                ]
+            },
+        )
+        assert bad_reaction.json()["error"] == "message_not_found"
+
+    async def test_rejects_reactions_in_archived_channel(
+        self, slack_client: AsyncClient
+    ):
+        created = await slack_client.post(
+            "/conversations.create", json={"name": "batch-archived"}
+        )
+        channel_id = created.json()["channel"]["id"]
+        posted = await slack_client.post(
+            "/chat.postMessage", json={"channel": channel_id, "text": "before"}
+        )
+        ts = posted.json()["ts"]
+        await slack_client.post("/conversations.archive", json={"channel": channel_id})
+
+        response = await slack_client.post(
+            "/batch.write",
+            json={
+                "reactions": [{"name": "tada", "channel": channel_id, "timestamp": ts}]
+            },
+        )
+        assert response.json()["error"] == "is_archived"
+
+    async def test_retries_when_a_burst_id_is_taken(
+        self, slack_client: AsyncClient, monkeypatch
+    ):
+        monkeypatch.setattr(ops.time, "time", lambda: 1700000000.25)
+        single = await slack_client.post(
+            "/chat.postMessage", json={"channel": CHANNEL_GENERAL, "text": "single"}
+        )
+        assert single.json()["ts"] == "1700000000.250000"
+
+        response = await slack_client.post(
+            "/batch.write",
+            json={
+                "messages": [
+                    {"channel": CHANNEL_GENERAL, "text": "first"},
+                    {"channel": CHANNEL_GENERAL, "text": "second"},
+                ]
+            },
+        )
+        data = response.json()
+        assert data["ok"] is True
+        ts = [m["ts"] for m in data["messages"]]
+        assert "1700000000.250000" not in ts
+        assert ts == sorted(set(ts), key=float)
+
+
 @pytest.mark.asyncio
 class TestUsers:
     async def test_get_user_info(self, slack_client: AsyncClient):
@@ -1184,6 +1412,34 @@ class TestSearchMessages:
         assert data2["messages"]["paging"]["total"] >= 2
         assert len(data2["messages"]["matches"]) == 1
 
+    async def test_sort_score_ranks_by_term_hits(self, slack_client: AsyncClient):
+        term = "sc0reterm"
+        for text in (
+            f"{term} once",
+            f"{term} {term.upper()} {term} thrice",
+            f"{term}, {term} twice",
+        ):
+            p = await slack_client.post(
+                "/chat.postMessage", json={"channel": CHANNEL_GENERAL, "text": text}
+            )
+            assert p.status_code == 200
+
+        resp = await slack_client.get(f"/search.messages?query={term}")
+        data = resp.json()["messages"]
+        assert [m["text"].split()[-1] for m in data["matches"]] == [
+            "thrice",
+            "twice",
+            "once",
+        ]
+        assert data["total"] == 3
+
+        asc = await slack_client.get(
+            f"/search.messages?query={term}&sort_dir=asc&count=2&page=2"
+        )
+        page = asc.json()["messages"]
+        assert [m["text"].split()[-1] for m in page["matches"]] == ["thrice"]
+        assert page["pagination"]["first"] == page["pagination"]["last"] == 3
+
     async def test_filters_in_and_from(
         self, slack_client: AsyncClient, slack_client_john: AsyncClient
     ):
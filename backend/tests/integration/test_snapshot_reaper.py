@@ -0,0 +1,194 @@
+"""Tests for dropping expired run snapshots."""
+
+from datetime import datetime, timedelta
+from uuid import UUID
+
+import pytest
+from sqlalchemy import text
+
+from src.platform.db.schema import SnapshotMetadata
+from src.platform.db.schema import TestRun as RunRecord  # keep pytest from collecting it
+from src.platform.evaluationEngine.diff_store import DiffStore
+from src.platform.evaluationEngine.differ import Differ
+from src.platform.evaluationEngine.retention import SnapshotReaper
+
+
+def _snapshot_tables(engine, schema: str, suffix: str) -> list[str]:
+    with engine.begin() as conn:
+        return list(
+            conn.execute(
+                text(
+                    "SELECT table_name FROM information_schema.tables "
+                    "WHERE table_schema = :schema AND table_name LIKE :pattern"
+                ),
+                {"schema": schema, "pattern": f"%\\_snapshot\\_{suffix}"},
+            ).scalars()
+        )
+
+
+def _metadata_count(sessions, env_id: str, suffix: str) -> int:
+    with sessions.with_meta_session() as session:
+        return (
+            session.query(SnapshotMetadata)
+            .filter(
+                SnapshotMetadata.environment_id == env_id,
+                SnapshotMetadata.snapshot_suffix == suffix,
+            )
+            .count()
+        )
+
+
+@pytest.fixture
+def make_run(differ_env):
+    sessions = differ_env["session_manager"]
+    run_ids = []
+
+    def _make(status, before, after=None, age=timedelta(0), result=None):
+        with sessions.with_meta_session() as session:
+            run = RunRecord(
+                environment_id=UUID(differ_env["env_id"]),
+                status=status,
+                result=result,
+                before_snapshot_suffix=before,
+                after_snapshot_suffix=after,
+                created_by="test_user",
+                created_at=datetime.now() - age,
+                updated_at=datetime.now() - age,
+            )
+            session.add(run)
+            session.flush()
+            run_ids.append(run.id)
+            return run.id
+
+    yield _make
+
+    with sessions.with_meta_session() as session:
+        session.query(RunRecord).filter(RunRecord.id.in_(run_ids)).delete(
+            synchronize_session=False
+        )
+
+
+def _insert_message(engine, schema: str) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"INSERT INTO {schema}.messages "
+                "(message_id, channel_id, user_id, message_text, created_at) "
+                "VALUES ('M_REAP', 'C01ABCD1234', 'U01AGENBOT9', 'reap me', NOW())"
+            )
+        )
+
+
+class TestSnapshotReaper:
+    def test_reaps_finished_run_and_stores_its_diff(self, differ_env, make_run):
+        differ, schema, engine = (
+            differ_env["differ"],
+            differ_env["schema"],
+            differ_env["engine"],
+        )
+        sessions = differ_env["session_manager"]
+        differ.create_snapshot("before_reap")
+        _insert_message(engine, schema)
+        differ.create_snapshot("after_reap")
+        # Evaluated with SQL assertions: the result has no diff yet.
+        run_id = make_run(
+            "passed",
+            "before_reap",
+            "after_reap",
+            age=timedelta(hours=2),
+            result={"passed": True, "score": {}, "failures": []},
+        )
+        assert _snapshot_tables(engine, schema, "after_reap")
+
+        stats = SnapshotReaper(sessions, retention_seconds=3600, batch_size=3).reap()
+
+        assert stats.snapshots >= 2
+        assert stats.bytes_reclaimed > 0
+        for suffix in ("before_reap", "after_reap"):
+            assert _snapshot_tables(engine, schema, suffix) == []
+            assert _metadata_count(sessions, differ_env["env_id"], suffix) == 0
+        with sessions.with_meta_session() as session:
+            diff_id = session.get(RunRecord, run_id).diff_id
+        diff = DiffStore(sessions).load(diff_id)
+        assert [row["message_id"] for row in diff.inserts] == ["M_REAP"]
+
+    def test_keeps_recent_and_running_runs(self, differ_env, make_run):
+        differ, schema, engine = (
+            differ_env["differ"],
+            differ_env["schema"],
+            differ_env["engine"],
+        )
+        differ.create_snapshot("before_running")
+        differ.create_snapshot("before_recent")
+        differ.create_snapshot("after_recent")
+        make_run("running", "before_running", age=timedelta(hours=2))
+        make_run("failed", "before_recent", "after_recent")
+
+        SnapshotReaper(differ_env["session_manager"], retention_seconds=3600).reap()
+
+        for suffix in ("before_running", "before_recent", "after_recent"):
+            assert _snapshot_tables(engine, schema, suffix)
+
+    def test_keeps_base_of_retained_incremental_snapshot(self, differ_env, make_run):
+        schema, engine = differ_env["schema"], differ_env["engine"]
+        sessions = differ_env["session_manager"]
+        differ = Differ(
+            schema=schema,
+            environment_id=differ_env["env_id"],
+            session_manager=sessions,
+            incremental=True,
+        )
+        differ.create_snapshot("before_base")
+        make_run("passed", "before_base", age=timedelta(hours=2))
+        _insert_message(engine, schema)
+        # A recent snapshot that copied only ``messages``.
+        differ.create_snapshot("after_pointer", base_suffix="before_base")
+
+        SnapshotReaper(sessions, retention_seconds=3600).reap()
+
+        assert _snapshot_tables(engine, schema, "after_pointer") == [
+            "messages_snapshot_after_pointer"
+        ]
+        assert len(_snapshot_tables(engine, schema, "before_base")) > 1
+        assert not differ.get_diff("before_base", "after_pointer").updates
+
+    def test_folds_write_tracking_into_one_row_per_table(self, differ_env):
+        schema, engine = differ_env["schema"], differ_env["engine"]
+        sessions = differ_env["session_manager"]
+        differ = Differ(
+            schema=schema,
+            environment_id=differ_env["env_id"],
+            session_manager=sessions,
+            incremental=True,
+        )
+        differ.create_snapshot("before_fold")
+        for text_value in ("one", "two", "three"):
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        f"UPDATE {schema}.channels SET topic_text = :value "
+                        "WHERE channel_id = 'C01ABCD1234'"
+                    ),
+                    {"value": text_value},
+                )
+
+        def tracked_writes():
+            with engine.begin() as conn:
+                return conn.execute(
+                    text(
+                        "SELECT table_name, txid, write_count FROM public.table_writes "
+                        "WHERE schema_name = :schema"
+                    ),
+                    {"schema": schema},
+                ).all()
+
+        assert len(tracked_writes()) == 3
+
+        SnapshotReaper(sessions, retention_seconds=3600).reap()
+
+        assert tracked_writes() == [("channels", 0, 3)]
+        # Folding keeps the count, so untouched tables are still reused.
+        differ.create_snapshot("after_fold", base_suffix="before_fold")
+        assert _snapshot_tables(engine, schema, "after_fold") == [
+            "channels_snapshot_after_fold"
+        ]
@@ -0,0 +1,186 @@
+"""SQL assertion evaluation agrees with AssertionEngine on real snapshot diffs."""
+
+import random
+
+import pytest
+from sqlalchemy import text
+
+from src.platform.evaluationEngine.assertion import AssertionEngine
+from src.platform.evaluationEngine.compiler import DSLCompiler
+from src.platform.evaluationEngine.differ import Differ
+from src.platform.isolationEngine.schema_cache import schema_metadata_cache
+
+ITEMS_DDL = """
+CREATE TABLE {schema}.items (
+    id integer PRIMARY KEY,
+    qty integer,
+    price numeric(10, 2),
+    score double precision,
+    ratio real,
+    label text,
+    code char(3),
+    flag boolean,
+    meta jsonb,
+    blob bytea,
+    seen_at timestamp
+);
+INSERT INTO {schema}.items
+SELECT i, i % 7, i * 1.25, i / 3.0, i / 10.0, 'item ' || i, 'c' || (i % 3),
+       i % 2 = 0, jsonb_build_object('n', i, 'tag', 'k' || (i % 4)),
+       decode('00', 'hex'), timestamp '2024-01-01' + i * interval '1 hour'
+FROM generate_series(1, 40) AS i;
+"""
+
+CHANGES = """
+INSERT INTO {schema}.items (id, qty, price, score, label, code, flag, meta)
+VALUES (100, 3, 9.99, 0.5, 'new item', 'c1', true, '{{"n": 100}}'),
+       (101, NULL, NULL, NULL, NULL, NULL, NULL, 'null');
+UPDATE {schema}.items SET qty = qty + 10 WHERE id <= 5;
+UPDATE {schema}.items SET label = 'Renamed ' || id, flag = NOT flag WHERE id BETWEEN 6 AND 9;
+UPDATE {schema}.items SET blob = decode('ff', 'hex') WHERE id = 10;
+UPDATE {schema}.items SET meta = '{{"n": 0}}', seen_at = NULL WHERE id = 11;
+UPDATE {schema}.items SET label = NULL WHERE id = 12;
+DELETE FROM {schema}.items WHERE id BETWEEN 30 AND 33;
+INSERT INTO {schema}.messages (message_id, channel_id, user_id, message_text, created_at)
+VALUES ('M_SQL_1', 'C01ABCD1234', 'U01AGENBOT9', 'hello sql world', NOW());
+UPDATE {schema}.channels SET topic_text = 'pushed down' WHERE channel_id = 'C01ABCD1234';
+"""
+
+
+@pytest.fixture
+def snapshot_run(differ_env, core_evaluation_engine):
+    schema = differ_env["schema"]
+    engine = differ_env["engine"]
+    with engine.begin() as conn:
+        conn.execute(text(ITEMS_DDL.format(schema=schema)))
+    schema_metadata_cache.invalidate(schema)
+    differ = Differ(
+        schema=schema,
+        environment_id=differ_env["env_id"],
+        session_manager=differ_env["session_manager"],
+    )
+    differ.create_snapshot("before")
+    with engine.begin() as conn:
+        conn.execute(text(CHANGES.format(schema=schema)))
+    differ.create_snapshot("after")
+    diff = differ.get_diff("before", "after").model_dump()
+
+    def both(spec: dict) -> tuple[dict, dict]:
+        compiled = DSLCompiler().normalize({"version": "0.1", **spec})
+        expected = AssertionEngine(compiled).evaluate(diff)
+        actual = core_evaluation_engine.evaluate_snapshots(
+            compiled_spec=compiled,
+            schema=schema,
+            environment_id=differ_env["env_id"],
+            before_suffix="before",
+            after_suffix="after",
+        )
+        return expected, actual
+
+    return both
+
+
+ASSERTIONS = [
+    {"diff_type": "added", "entity": "items", "expected_count": 2},
+    {"diff_type": "added", "entity": "items", "where": {"label": {"contains": "new"}}},
+    {"diff_type": "added", "entity": "items", "where": {"meta": {"exists": False}}},
+    {"diff_type": "added", "entity": "items", "where": {"qty": {"in": [3, None]}}},
+    {"diff_type": "added", "entity": "items", "where": {"price": 9.99}},
+    {"diff_type": "added", "entity": "items", "where": {"meta.n": 100}},
+    {"diff_type": "added", "entity": "messages", "where": {"message_text": {"regex": "sql\\s+w"}}},
+    {"diff_type": "added", "entity": "messages", "where": {"missing": {"exists": False}}},
+    {"diff_type": "removed", "entity": "items", "expected_count": {"min": 4, "max": 4}},
+    {"diff_type": "removed", "entity": "items", "where": {"score": {"gte": 10}, "code": "c0 "}},
+    {"diff_type": "removed", "entity": "channels", "expected_count": 0},
+    {"diff_type": "removed", "entity": "no_such_table", "expected_count": 0},
+    {
+        "diff_type": "changed",
+        "entity": "items",
+        "where": {"id": {"lte": 5}},
+        "expected_changes": {"qty": {"from": {"lt": 7}, "to": {"gte": 10}}},
+        "expected_count": 5,
+    },
+    {
+        "diff_type": "changed",
+        "entity": "items",
+        "where": {"label": {"starts_with": "Renamed"}},
+        "expected_changes": {"label": {"to": {"ends_with": "7"}}},
+    },
+    {
+        "diff_type": "changed",
+        "entity": "items",
+        "where": {"id": {"in": [10, 11, 12]}},
+        "expected_changes": {"meta": {"to": {"exists": True}}},
+    },
+    {
+        "diff_type": "changed",
+        "entity": "items",
+        "where": {"label": {"eq": None}},
+        "expected_changes": {"label": {"from": {"i_contains": "ITEM"}}},
+        "ignore": ["seen_at"],
+    },
+    {
+        "diff_type": "changed",
+        "entity": "channels",
+        "where": {"channel_id": "C01ABCD1234"},
+        "expected_changes": {"topic_text": {"to": {"contains": "pushed"}}},
+    },
+    {"diff_type": "unchanged", "entity": "items"},
+    # A real column widened to double precision in SQL would miss this row.
+    {"diff_type": "removed", "entity": "items", "where": {"ratio": 3.2}, "expected_count": 1},
+]
+
+
+@pytest.mark.parametrize("strict", [True, False])
+def test_fixed_assertions_match_python(snapshot_run, strict):
+    for assertion in ASSERTIONS:
+        expected, actual = snapshot_run({"strict": strict, "assertions": [assertion]})
+        assert actual == expected, assertion
+
+    expected, actual = snapshot_run({"strict": strict, "assertions": ASSERTIONS})
+    assert actual == expected
+
+
+def test_random_predicates_match_python(snapshot_run):
+    rng = random.Random(12)
+    columns = ["id", "qty", "price", "score", "ratio", "label", "code", "flag", "meta", "seen_at"]
+    operands = [None, 0, 3, 7, 2.5, 3.2, 9.99, True, False, "item 1", "Renamed", "c1", "1", ""]
+    ops = [
+        "eq", "ne", "in", "not_in", "gt", "gte", "lt", "lte", "contains",
+        "not_contains", "starts_with", "ends_with", "exists", "regex",
+    ]
+
+    def predicate():
+        op = rng.choice(ops)
+        if op in ("in", "not_in"):
+            return {op: rng.sample(operands, rng.randint(0, 3))}
+        if op == "regex":
+            return {op: rng.choice(["^item", "\\d$", "Ren"])}
+        return {op: rng.choice(operands)}
+
+    for _ in range(60):
+        kind = rng.choice(["added", "removed", "changed"])
+        assertion = {
+            "diff_type": kind,
+            "entity": "items",
+            "where": {rng.choice(columns): predicate() for _ in range(rng.randint(0, 2))},
+            # Unattainable, so both engines report the actual match count.
+            "expected_count": -1,
+        }
+        if kind == "changed":
+            field = rng.choice(columns)
+            assertion["expected_changes"] = {field: {"to": predicate()}}
+        for strict in (True, False):
+            expected, actual = snapshot_run({"strict": strict, "assertions": [assertion]})
+            assert actual == expected, (strict, assertion)
+
+
+def test_translatable_spec_does_not_build_diff(snapshot_run, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("diff rows were materialized")
+
+    monkeypatch.setattr(Differ, "_diff_table", fail)
+    translatable = [ASSERTIONS[i] for i in (0, 1, 2, 3, 8, 10, 11, 12, 13, 16)]
+    expected, actual = snapshot_run({"assertions": translatable})
+    assert actual == expected
+    assert actual["score"]["total"] == len(translatable)
@@ -7,9 +7,11 @@ Measures:
 - Message sending time
 - Diff evaluation time
 - Throughput under concurrent load
+- Per-service request latency (p50/p95/p99) under mixed-service load
 
 Usage:
     python tests/load_test.py --base-url http://localhost:8000 --concurrency 5 --requests 20
+    python tests/load_test.py --mixed --concurrency 20 --requests 400
 """
 
 import argparse
@@ -270,6 +272,141 @@ class LoadTester:
         return results
 
 
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# (service, template, impersonation) for the mixed-service benchmark.
+MIXED_SERVICES = [
+    ("slack", "slack_default", {"impersonateUserId": "U01AGENBOT9"}),
+    (
+        "linear",
+        "linear_default",
+        {"impersonateUserId": "2790a7ee-fde0-4537-9588-e233aa5a68d1"},
+    ),
+    ("calendar", "calendar_default", {"impersonateUserId": "user_agent"}),
+    ("box", "box_default", {"impersonateUserId": "27512847635"}),
+]
+
+
+def _mixed_operations(base: str, service: str) -> list[tuple[str, str, dict | None]]:
+    """(method, url, json body) requests issued round-robin per service."""
+    if service == "slack":
+        return [
+            (
+                "POST",
+                f"{base}/chat.postMessage",
+                {"channel": "C01ABCD1234", "text": "load"},
+            ),
+            ("GET", f"{base}/conversations.history?channel=C01ABCD1234", None),
+            ("GET", f"{base}/users.list", None),
+        ]
+    if service == "linear":
+        return [
+            ("POST", f"{base}/graphql", {"query": "{ viewer { id name } }"}),
+            (
+                "POST",
+                f"{base}/graphql",
+                {"query": "{ issues(first: 20) { nodes { id title } } }"},
+            ),
+        ]
+    if service == "calendar":
+        return [
+            ("GET", f"{base}/users/me/calendarList", None),
+            ("GET", f"{base}/calendars/primary/events?maxResults=20", None),
+        ]
+    return [
+        ("GET", f"{base}/2.0/users/me", None),
+        ("GET", f"{base}/2.0/folders/0/items", None),
+    ]
+
+
+async def run_mixed_service_test(
+    tester: LoadTester, num_requests: int, concurrency: int
+) -> dict[str, list[float]]:
+    """
+    Fire service API calls for Slack, Linear, Calendar and Box concurrently
+    against one environment per service and report latency percentiles.
+
+    This is the benchmark for request execution in IsolationMiddleware: a
+    slow query in one service should not inflate p99 for the others.
+    """
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+
+    async with httpx.AsyncClient(timeout=tester.timeout) as client:
+        available = set(await tester.check_templates(client))
+        workloads = []
+        for service, template, impersonation in MIXED_SERVICES:
+            if available and template not in available:
+                print(f"  skipping {service}: template {template} not found")
+                continue
+            resp = await client.post(
+                f"{tester.base_url}/api/platform/initEnv",
+                json={"templateSchema": template, "ttlSeconds": 600, **impersonation},
+            )
+            if resp.status_code >= 400:
+                print(f"  skipping {service}: initEnv failed ({resp.status_code})")
+                continue
+            env_id = resp.json()["environmentId"]
+            base = f"{tester.base_url}/api/env/{env_id}/services/{service}"
+            workloads.append((service, _mixed_operations(base, service)))
+            latencies[service] = []
+            errors[service] = 0
+
+        if not workloads:
+            print("No services available for mixed load test")
+            return latencies
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i: int) -> None:
+            service, operations = workloads[i % len(workloads)]
+            method, url, body = operations[(i // len(workloads)) % len(operations)]
+            async with semaphore:
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.request(method, url, json=body)
+                    ok = resp.status_code < 500
+                except httpx.HTTPError:
+                    ok = False
+                latencies[service].append(time.perf_counter() - t0)
+                if not ok:
+                    errors[service] += 1
+
+        print(f"\n{'=' * 60}")
+        print(
+            f"Mixed-service load: {num_requests} requests, {concurrency} concurrent, "
+            f"services={', '.join(s for s, _ in workloads)}"
+        )
+        print(f"{'=' * 60}\n")
+        overall_start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(num_requests)))
+        overall_time = time.perf_counter() - overall_start
+
+    all_latencies = [v for values in latencies.values() for v in values]
+    print(
+        f"{'Service':<10} {'Count':<7} {'Errors':<7} {'p50 ms':<9} "
+        f"{'p95 ms':<9} {'p99 ms':<9} {'max ms':<9}"
+    )
+    print("-" * 60)
+    for service, values in [*latencies.items(), ("all", all_latencies)]:
+        if not values:
+            continue
+        print(
+            f"{service:<10} {len(values):<7} "
+            f"{errors.get(service, sum(errors.values())):<7} "
+            f"{percentile(values, 50) * 1000:<9.1f} "
+            f"{percentile(values, 95) * 1000:<9.1f} "
+            f"{percentile(values, 99) * 1000:<9.1f} "
+            f"{max(values) * 1000:<9.1f}"
+        )
+    print(f"\nThroughput: {len(all_latencies) / overall_time:.1f} req/s")
+    return latencies
+
+
 def print_summary(results: LoadTestResults):
     """Print formatted summary of results."""
     summary = results.summary()
@@ -375,6 +512,11 @@ async def main():
     parser.add_argument(
         "--scaling-test", action="store_true", help="Run scaling test instead"
     )
+    parser.add_argument(
+        "--mixed",
+        action="store_true",
+        help="Run mixed-service API load (Slack, Linear, Calendar, Box) instead",
+    )
     parser.add_argument(
         "--max-concurrency",
         type=int,
@@ -388,6 +530,10 @@ async def main():
 
     if args.scaling_test:
         await run_scaling_test(tester, max_concurrency=args.max_concurrency)
+    elif args.mixed:
+        await run_mixed_service_test(
+            tester, num_requests=args.requests, concurrency=args.concurrency
+        )
     else:
         results = await tester.run_load_test(
             num_requests=args.requests,
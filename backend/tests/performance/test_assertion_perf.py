@@ -0,0 +1,108 @@
+"""
+Benchmark for AssertionEngine on a large diff.
+
+Evaluates 32 assertions against a bulk-import style diff (thousands of
+inserts and updates across a few tables) and logs the median evaluation
+time.
+
+Usage:
+    # Run from backend/ directory:
+    ASSERTION_BENCH_ROWS=20000 pytest tests/performance/test_assertion_perf.py -v -s
+"""
+
+import logging
+import os
+import statistics
+import time
+
+from src.platform.evaluationEngine.assertion import AssertionEngine
+from src.platform.evaluationEngine.compiler import DSLCompiler
+
+logger = logging.getLogger(__name__)
+
+ROWS = int(os.environ.get("ASSERTION_BENCH_ROWS", "5000"))
+ROUNDS = int(os.environ.get("ASSERTION_BENCH_ROUNDS", "5"))
+
+TABLES = ["messages", "channels", "users", "message_reactions"]
+
+
+def _bulk_diff(rows: int) -> dict:
+    inserts = [
+        {
+            "__table__": TABLES[i % len(TABLES)],
+            "id": i,
+            "channel_id": f"C{i % 50:04d}",
+            "message_text": f"imported message {i}",
+            "meta": {"source": "import", "batch": i // 100},
+        }
+        for i in range(rows)
+    ]
+    updates = [
+        {
+            "__table__": "messages",
+            "before": {"id": i, "message_text": f"draft {i}", "channel_id": "C0001"},
+            "after": {"id": i, "message_text": f"final {i}", "channel_id": "C0001"},
+        }
+        for i in range(rows // 5)
+    ]
+    return {"inserts": inserts, "updates": updates, "deletes": []}
+
+
+def _spec() -> dict:
+    assertions = []
+    for n in range(8):
+        table = TABLES[n % len(TABLES)]
+        assertions += [
+            {
+                "diff_type": "added",
+                "entity": table,
+                "where": {"channel_id": f"C{n:04d}"},
+                "expected_count": {"min": 1},
+            },
+            {
+                "diff_type": "added",
+                "entity": table,
+                "where": {
+                    "message_text": {"regex": rf"message {n}\d*$"},
+                    "meta.source": {"in": ["import", "sync"]},
+                },
+                "expected_count": {"min": 1},
+            },
+            {
+                "diff_type": "removed",
+                "entity": table,
+                "where": {"id": n},
+                "expected_count": 0,
+            },
+            {
+                "diff_type": "changed",
+                "entity": "messages",
+                "where": {"id": {"lt": 1000}},
+                "expected_changes": {
+                    "message_text": {
+                        "from": {"starts_with": "draft"},
+                        "to": {"i_contains": "FINAL"},
+                    }
+                },
+                "expected_count": {"min": 1},
+            },
+        ]
+    return DSLCompiler().normalize({"version": "0.1", "assertions": assertions})
+
+
+def test_large_diff_evaluation():
+    diff = _bulk_diff(ROWS)
+    engine = AssertionEngine(_spec())
+
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        result = engine.evaluate(diff)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    assert result["passed"], result["failures"]
+    median = statistics.median(timings)
+    logger.info(
+        f"[PERF] evaluate {len(engine.assertions)} assertions over "
+        f"{ROWS + ROWS // 5} rows: median {median:.1f}ms over {ROUNDS} rounds"
+    )
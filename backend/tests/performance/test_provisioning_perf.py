@@ -0,0 +1,55 @@
+"""
+Benchmark for environment provisioning backends.
+
+Builds environments from each seeded template with every provisioning
+strategy (see ``EnvironmentHandler.provision_schema``) and logs the median
+build time, i.e. the cost of a pool miss.
+
+Usage:
+    # Run from backend/ directory (requires DATABASE_URL in .env or env):
+    PROVISION_BENCH_ROUNDS=5 pytest tests/performance/test_provisioning_perf.py -v -s
+"""
+
+import logging
+import os
+import statistics
+import time
+from uuid import uuid4
+
+import pytest
+
+from src.platform.isolationEngine.environment import PROVISIONING_STRATEGIES
+
+logger = logging.getLogger(__name__)
+
+ROUNDS = int(os.environ.get("PROVISION_BENCH_ROUNDS", "3"))
+
+TEMPLATES = ["slack_default", "linear_expanded", "calendar_default", "box_default"]
+
+
+@pytest.mark.parametrize("template_schema", TEMPLATES)
+def test_provisioning_backends(environment_handler, created_schemas, template_schema):
+    if not environment_handler.schema_exists(template_schema):
+        pytest.skip(f"template {template_schema} is not seeded")
+
+    medians: dict[str, float] = {}
+    for strategy in PROVISIONING_STRATEGIES:
+        timings = []
+        for _ in range(ROUNDS):
+            schema = f"state_bench_{uuid4().hex[:12]}"
+            created_schemas.append(schema)
+            start = time.perf_counter()
+            environment_handler.provision_schema(
+                template_schema, schema, strategy=strategy
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+            environment_handler.drop_schema(schema)
+        medians[strategy] = statistics.median(timings)
+        logger.info(
+            f"[PERF] provision {template_schema} ({strategy}): "
+            f"median {medians[strategy]:.0f}ms over {ROUNDS} rounds"
+        )
+
+    assert medians["clone"] < 5000, (
+        f"clone provisioning of {template_schema} took {medians['clone']:.0f}ms"
+    )
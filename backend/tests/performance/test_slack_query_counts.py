@@ -0,0 +1,171 @@
+"""
+Query-count checks for the Slack list endpoints.
+
+conversations.list, users.conversations and users.list serialize a whole page
+of rows; members, latest DM messages and team roles are prefetched for the
+page, so the number of SQL statements per request must not grow with the
+page size. Likewise, finding an existing DM or MPIM in conversations.open
+must not cost a query per conversation in the workspace.
+
+Usage:
+    # Run from backend/ directory:
+    pytest tests/performance/test_slack_query_counts.py -v
+"""
+
+from contextlib import contextmanager
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from src.services.slack.api.methods import slack_endpoint
+from src.services.slack.database.schema import Channel, ChannelMember
+
+AGENT = "U01AGENBOT9"
+TEAM = "T01WORKSPACE"
+OTHER_USERS = ["U02JOHNDOE1", "U03ROBERT23"]
+ALL_TYPES = "public_channel,private_channel,mpim,im"
+
+
+@contextmanager
+def _count_queries():
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", _record)
+
+
+@pytest.fixture
+def slack_env(test_user_id, core_isolation_engine, environment_handler):
+    env_result = core_isolation_engine.create_environment(
+        template_schema="slack_default",
+        ttl_seconds=3600,
+        created_by=test_user_id,
+        impersonate_user_id=AGENT,
+        impersonate_email="agent@example.com",
+    )
+    yield env_result
+    environment_handler.drop_schema(env_result.schema_name)
+
+
+@pytest_asyncio.fixture
+async def slack_client(slack_env, session_manager):
+    """A fresh slack_default environment with extra private channels and DMs."""
+    env_result = slack_env
+
+    async def add_db_session(request, call_next):
+        with session_manager.with_session_for_environment(
+            env_result.environment_id
+        ) as session:
+            request.state.db_session = session
+            request.state.environment_id = env_result.environment_id
+            request.state.impersonate_user_id = AGENT
+            request.state.impersonate_email = "agent@example.com"
+            return await call_next(request)
+
+    routes = [Route("/{endpoint}", slack_endpoint, methods=["GET", "POST"])]
+    app = Starlette(routes=routes)
+    app.middleware("http")(add_db_session)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        for i in range(4):
+            created = await client.post(
+                "/conversations.create",
+                json={"name": f"perf-private-{i}", "is_private": True},
+            )
+            assert created.json()["ok"] is True
+        for user in OTHER_USERS:
+            opened = await client.post("/conversations.open", json={"users": user})
+            dm = opened.json()["channel"]["id"]
+            await client.post("/chat.postMessage", json={"channel": dm, "text": "hi"})
+        yield client
+
+
+async def _queries_for(client: AsyncClient, endpoint: str, params: dict) -> int:
+    with _count_queries() as statements:
+        response = await client.get(endpoint, params=params)
+    data = response.json()
+    assert data["ok"] is True, data
+    return len(statements)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "endpoint, params, key",
+    [
+        ("/conversations.list", {"types": ALL_TYPES}, "channels"),
+        ("/users.conversations", {"types": ALL_TYPES}, "channels"),
+        ("/users.list", {}, "members"),
+    ],
+)
+async def test_query_count_independent_of_page_size(
+    slack_client: AsyncClient, endpoint, params, key
+):
+    full = (await slack_client.get(endpoint, params=params)).json()[key]
+    assert len(full) >= 3
+
+    small = await _queries_for(slack_client, endpoint, {**params, "limit": 1})
+    large = await _queries_for(slack_client, endpoint, {**params, "limit": len(full)})
+    # The latest-message prefetch only runs for pages that contain a DM.
+    assert small <= large <= small + 1
+
+
+@pytest.mark.asyncio
+async def test_prefetched_dm_payload(slack_client: AsyncClient):
+    channels = (
+        await slack_client.get("/conversations.list", params={"types": "im"})
+    ).json()["channels"]
+    assert {c["user"] for c in channels} == set(OTHER_USERS)
+    for channel in channels:
+        assert channel["latest"]["text"] == "hi"
+        assert channel["num_members"] == 2
+
+
+@pytest.mark.asyncio
+async def test_conversations_open_query_count_independent_of_mpim_count(
+    slack_client: AsyncClient, slack_env, session_manager
+):
+    # No group DM with exactly these members exists, so the lookup has to
+    # consider every group DM in the workspace before giving up.
+    params = {"users": ",".join(OTHER_USERS), "prevent_creation": "true"}
+
+    async def lookup_queries() -> int:
+        with _count_queries() as statements:
+            response = await slack_client.get("/conversations.open", params=params)
+        assert response.json()["error"] == "channel_not_found"
+        return len(statements)
+
+    before = await lookup_queries()
+
+    with session_manager.with_session_for_environment(
+        slack_env.environment_id
+    ) as session:
+        for i in range(5):
+            channel_id = f"GPERF{i:06d}"
+            session.add(
+                Channel(
+                    channel_id=channel_id,
+                    channel_name=f"mpdm-perf-{i}",
+                    team_id=TEAM,
+                    is_private=True,
+                    is_gc=True,
+                )
+            )
+            session.add_all(
+                ChannelMember(channel_id=channel_id, user_id=uid)
+                for uid in (AGENT, OTHER_USERS[0])
+            )
+
+    assert await lookup_queries() == before
@@ -0,0 +1,185 @@
+"""Tests for control-plane API key validation caching."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from src.platform.api import auth
+
+GOOD_KEY_HASH = auth._hash_key("good-key")
+
+
+class _ControlPlane:
+    """Stands in for the control plane behind an httpx MockTransport."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.validations: list[dict] = []
+        self.usage: list[dict] = []
+        self.usage_status = 204
+        self.refuse_environments = False
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if request.url.path == "/usage":
+            if self.usage_status == 204:
+                self.usage.extend(body["events"])
+            return httpx.Response(self.usage_status)
+
+        self.validations.append(body)
+        await asyncio.sleep(self.delay)
+        if self.refuse_environments and body["action"] == "environment_created":
+            return httpx.Response(200, json={"valid": False, "reason": "quota exceeded"})
+        if body["api_key"] == "good-key":
+            return httpx.Response(200, json={"valid": True, "user_id": "user-1"})
+        if body["api_key"] == "busy-key":
+            return httpx.Response(429)
+        return httpx.Response(401)
+
+
+@pytest.fixture
+def control_plane(monkeypatch):
+    plane = _ControlPlane()
+    monkeypatch.setattr(auth, "ENVIRONMENT", "production")
+    monkeypatch.setattr(auth, "CONTROL_PLANE_URL", "http://control-plane")
+    monkeypatch.setattr(auth, "_validation_cache", auth.ValidationCache())
+    monkeypatch.setattr(auth, "_inflight", {})
+    monkeypatch.setattr(auth, "_pending_usage", {})
+    monkeypatch.setattr(auth, "_dropped_usage", 0)
+    monkeypatch.setattr(auth, "USAGE_FLUSH_INTERVAL", 3600.0)
+    monkeypatch.setattr(
+        auth,
+        "_http_client",
+        httpx.AsyncClient(transport=httpx.MockTransport(plane.handle)),
+    )
+    return plane
+
+
+class TestValidationCache:
+    def test_lru_eviction(self):
+        cache = auth.ValidationCache(ttl=60, negative_ttl=5, max_entries=2)
+        cache.put("a", True, "user-a")
+        cache.put("b", True, "user-b")
+        cache.get("a")
+        cache.put("c", True, "user-c")
+
+        assert cache.get("a") == (True, "user-a")
+        assert cache.get("b") is None
+        assert cache.get("c") == (True, "user-c")
+
+    def test_negative_entries_use_shorter_ttl(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(auth.time, "monotonic", lambda: now[0])
+        cache = auth.ValidationCache(ttl=60, negative_ttl=5, max_entries=10)
+        cache.put("ok", True, "user-1")
+        cache.put("bad", False, "invalid api key")
+
+        now[0] += 10
+        assert cache.get("bad") is None
+        assert cache.get("ok") == (True, "user-1")
+
+        now[0] += 60
+        assert cache.get("ok") is None
+
+
+@pytest.mark.asyncio
+async def test_cached_key_skips_control_plane(control_plane):
+    for _ in range(3):
+        assert await auth.get_principal_id("Bearer good-key") == "user-1"
+
+    assert len(control_plane.validations) == 1
+    assert auth._pending_usage == {(GOOD_KEY_HASH, "api_request"): 2}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_request(control_plane):
+    control_plane.delay = 0.05
+    results = await asyncio.gather(
+        *(auth.get_principal_id("good-key") for _ in range(10))
+    )
+
+    assert results == ["user-1"] * 10
+    assert len(control_plane.validations) == 1
+    assert auth._pending_usage == {(GOOD_KEY_HASH, "api_request"): 9}
+
+
+@pytest.mark.asyncio
+async def test_rejections_are_cached(control_plane):
+    for _ in range(2):
+        with pytest.raises(PermissionError, match="invalid api key"):
+            await auth.get_principal_id("bad-key")
+
+    assert len(control_plane.validations) == 1
+    assert auth._pending_usage == {}
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_not_cached(control_plane):
+    for _ in range(2):
+        with pytest.raises(PermissionError, match="rate limit"):
+            await auth.get_principal_id("busy-key")
+
+    assert len(control_plane.validations) == 2
+
+
+@pytest.mark.asyncio
+async def test_environment_creation_always_validates(control_plane):
+    await auth.get_principal_id("good-key", action="environment_created")
+    await auth.get_principal_id("good-key", action="environment_created")
+    await auth.get_principal_id("good-key")
+
+    assert [v["action"] for v in control_plane.validations] == [
+        "environment_created",
+        "environment_created",
+        "api_request",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_environment_creation_rejection_is_not_cached(control_plane):
+    control_plane.refuse_environments = True
+    with pytest.raises(PermissionError, match="quota exceeded"):
+        await auth.get_principal_id("good-key", action="environment_created")
+
+    assert await auth.get_principal_id("good-key") == "user-1"
+    assert len(control_plane.validations) == 2
+
+
+@pytest.mark.asyncio
+async def test_usage_is_flushed_in_one_batch(control_plane):
+    for _ in range(4):
+        await auth.get_principal_id("good-key")
+
+    control_plane.usage_status = 503
+    await auth.flush_usage()
+    assert control_plane.usage == []
+    assert auth._pending_usage == {(GOOD_KEY_HASH, "api_request"): 3}
+
+    control_plane.usage_status = 204
+    await auth.flush_usage()
+    assert control_plane.usage == [
+        {"api_key_hash": GOOD_KEY_HASH, "action": "api_request", "count": 3}
+    ]
+    assert auth._pending_usage == {}
+
+
+@pytest.mark.asyncio
+async def test_rejected_usage_batch_is_kept(control_plane):
+    for _ in range(3):
+        await auth.get_principal_id("good-key")
+
+    control_plane.usage_status = 404
+    await auth.flush_usage()
+    assert auth._pending_usage == {(GOOD_KEY_HASH, "api_request"): 2}
+
+
+@pytest.mark.asyncio
+async def test_pending_usage_is_capped(control_plane, monkeypatch):
+    monkeypatch.setattr(auth, "USAGE_MAX_PENDING", 2)
+    for key in ("a", "b", "c"):
+        auth._record_usage(key, "api_request")
+    auth._record_usage("a", "api_request")
+
+    assert auth._pending_usage == {("a", "api_request"): 2, ("b", "api_request"): 1}
+    assert auth._dropped_usage == 1
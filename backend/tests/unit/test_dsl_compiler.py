@@ -1,6 +1,6 @@
 import pytest
 from jsonschema.exceptions import ValidationError
-from src.platform.evaluationEngine.compiler import DSLCompiler
+from src.platform.evaluationEngine.compiler import DSLCompiler, spec_hash
 
 
 class TestDSLSchemaValidation:
@@ -204,3 +204,41 @@ class TestDSLCompile:
         }
         with pytest.raises(ValidationError):
             compiler.compile(spec)
+
+
+class TestCompiledSpecCache:
+    SPEC = {
+        "version": "0.1",
+        "assertions": [
+            {"diff_type": "added", "entity": "messages", "where": {"user_id": "U1"}}
+        ],
+    }
+
+    def test_same_content_is_compiled_once(self, monkeypatch):
+        compiler = DSLCompiler()
+        first = compiler.compile(self.SPEC)
+
+        def fail(spec):
+            raise AssertionError("spec validated again")
+
+        monkeypatch.setattr(compiler, "validate", fail)
+        reordered = {"assertions": self.SPEC["assertions"], "version": "0.1"}
+        assert compiler.compile(reordered) is first
+
+    def test_least_recently_used_spec_is_evicted(self):
+        compiler = DSLCompiler(cache_size=2)
+        specs = [
+            {"assertions": [{"diff_type": "added", "entity": f"table_{i}"}]}
+            for i in range(3)
+        ]
+        first = compiler.compile(specs[0])
+        compiler.compile(specs[1])
+        compiler.compile(specs[0])
+        compiler.compile(specs[2])
+
+        assert compiler.compile(specs[0]) is first
+        assert len(compiler._compiled) == 2
+        assert spec_hash(specs[1]) not in compiler._compiled
+
+    def test_compilers_share_one_validator(self):
+        assert DSLCompiler()._validator is DSLCompiler()._validator
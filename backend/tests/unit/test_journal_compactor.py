@@ -0,0 +1,170 @@
+"""Tests for folding change-journal entries into a net diff."""
+
+from src.platform.evaluationEngine.journal import JournalCompactor
+
+PKS = {"messages": ["message_id"]}
+
+
+def _msg(message_id, text, **extra):
+    return {"message_id": message_id, "message_text": text, **extra}
+
+
+class TestJournalCompactor:
+    def test_repeated_updates_collapse_to_one(self):
+        compactor = JournalCompactor(PKS)
+        versions = [_msg("M1", f"v{i}") for i in range(6)]
+        for before, after in zip(versions, versions[1:]):
+            compactor.add("messages", "update", before, after)
+
+        diff = compactor.result()
+
+        assert diff.inserts == [] and diff.deletes == []
+        assert diff.updates == [
+            {"__table__": "messages", "before": versions[0], "after": versions[-1]}
+        ]
+
+    def test_insert_then_delete_cancels_out(self):
+        compactor = JournalCompactor(PKS)
+        compactor.add("messages", "insert", None, _msg("M1", "hi"))
+        compactor.add("messages", "update", _msg("M1", "hi"), _msg("M1", "edit"))
+        compactor.add("messages", "delete", _msg("M1", "edit"), None)
+
+        diff = compactor.result()
+
+        assert (diff.inserts, diff.updates, diff.deletes) == ([], [], [])
+
+    def test_insert_then_update_is_an_insert_of_final_row(self):
+        compactor = JournalCompactor(PKS)
+        compactor.add("messages", "insert", None, _msg("M1", "hi"))
+        compactor.add("messages", "update", _msg("M1", "hi"), _msg("M1", "edit"))
+
+        diff = compactor.result()
+
+        assert diff.inserts == [{**_msg("M1", "edit"), "__table__": "messages"}]
+        assert diff.updates == []
+
+    def test_update_then_delete_deletes_original_row(self):
+        compactor = JournalCompactor(PKS)
+        compactor.add("messages", "update", _msg("M1", "orig"), _msg("M1", "edit"))
+        compactor.add("messages", "delete", _msg("M1", "edit"), None)
+
+        diff = compactor.result()
+
+        assert diff.deletes == [{**_msg("M1", "orig"), "__table__": "messages"}]
+        assert diff.updates == []
+
+    def test_update_back_to_original_is_dropped(self):
+        compactor = JournalCompactor(PKS)
+        compactor.add("messages", "update", _msg("M1", "orig"), _msg("M1", "edit"))
+        compactor.add("messages", "update", _msg("M1", "edit"), _msg("M1", "orig"))
+
+        assert compactor.result().updates == []
+
+    def test_delete_and_reinsert_with_same_key_is_an_update(self):
+        compactor = JournalCompactor(PKS)
+        compactor.add("messages", "delete", _msg("M1", "orig"), None)
+        compactor.add("messages", "insert", None, _msg("M1", "new"))
+
+        diff = compactor.result()
+
+        assert diff.inserts == [] and diff.deletes == []
+        assert diff.updates == [
+            {
+                "__table__": "messages",
+                "before": _msg("M1", "orig"),
+                "after": _msg("M1", "new"),
+            }
+        ]
+
+    def test_primary_key_change_is_followed(self):
+        compactor = JournalCompactor(PKS)
+        compactor.add("messages", "insert", None, _msg("M1", "hi"))
+        compactor.add("messages", "update", _msg("M1", "hi"), _msg("M2", "hi"))
+        compactor.add("messages", "update", _msg("M2", "hi"), _msg("M2", "edit"))
+
+        diff = compactor.result()
+
+        assert diff.inserts == [{**_msg("M2", "edit"), "__table__": "messages"}]
+
+    def test_rows_chain_by_full_image_without_key_columns(self):
+        compactor = JournalCompactor()
+        compactor.add("reactions", "insert", None, {"user": "U1", "name": "+1"})
+        compactor.add(
+            "reactions",
+            "update",
+            {"user": "U1", "name": "+1"},
+            {"user": "U1", "name": "tada"},
+        )
+        compactor.add("reactions", "delete", {"user": "U2", "name": "eyes"}, None)
+
+        diff = compactor.result()
+
+        assert diff.inserts == [{"user": "U1", "name": "tada", "__table__": "reactions"}]
+        assert diff.deletes == [{"user": "U2", "name": "eyes", "__table__": "reactions"}]
+        assert compactor.entries == 3
+
+    def test_independent_rows_are_kept_apart(self):
+        compactor = JournalCompactor(PKS)
+        compactor.add("messages", "insert", None, _msg("M1", "a"))
+        compactor.add("messages", "insert", None, _msg("M2", "b"))
+        compactor.add("channels", "insert", None, {"message_id": "M1"})
+
+        diff = compactor.result()
+
+        assert len(diff.inserts) == 3
+
+    def test_replayed_entries_are_not_counted_twice(self):
+        compactor = JournalCompactor(PKS)
+        entries = [
+            ("0/10", "insert", None, _msg("M1", "hi")),
+            ("0/20", "update", _msg("M1", "hi"), _msg("M2", "hi")),
+            ("0/30", "delete", _msg("M3", "orig"), None),
+            ("0/40", "update", _msg("M4", "orig"), _msg("M4", "edit")),
+        ]
+        # Re-delivered after a crash, each entry arrives a second time.
+        for lsn, operation, before, after in entries:
+            compactor.add("messages", operation, before, after, lsn)
+            compactor.add("messages", operation, before, after, lsn)
+
+        diff = compactor.result()
+
+        assert diff.inserts == [{**_msg("M2", "hi"), "__table__": "messages"}]
+        assert diff.deletes == [{**_msg("M3", "orig"), "__table__": "messages"}]
+        assert diff.updates == [
+            {
+                "__table__": "messages",
+                "before": _msg("M4", "orig"),
+                "after": _msg("M4", "edit"),
+            }
+        ]
+
+    def test_replayed_transaction_is_folded_once(self):
+        compactor = JournalCompactor(PKS)
+        transaction = [
+            ("insert", None, _msg("M1", "hi")),
+            ("update", _msg("M1", "hi"), _msg("M1", "edit")),
+        ]
+        # The whole transaction is journaled again under its LSN.
+        for operation, before, after in transaction * 2:
+            compactor.add("messages", operation, before, after, "0/10")
+
+        diff = compactor.result()
+
+        assert diff.inserts == [{**_msg("M1", "edit"), "__table__": "messages"}]
+        assert diff.updates == [] and diff.deletes == []
+
+    def test_replay_of_earlier_transactions_is_skipped(self):
+        compactor = JournalCompactor(PKS)
+        entries = [
+            ("0/10", "insert", None, _msg("M1", "hi")),
+            ("0/20", "update", _msg("M1", "hi"), _msg("M1", "edit")),
+        ]
+        # A tail replay: both transactions arrive again after the originals.
+        for lsn, operation, before, after in entries * 2:
+            compactor.add("messages", operation, before, after, lsn)
+
+        diff = compactor.result()
+
+        assert diff.inserts == [{**_msg("M1", "edit"), "__table__": "messages"}]
+        assert diff.updates == [] and diff.deletes == []
+        assert compactor.entries == 4
@@ -0,0 +1,128 @@
+"""Tests for per-template pool demand tracking and adaptive sizing."""
+
+from contextlib import contextmanager
+
+import pytest
+
+from src.platform.isolationEngine import pool as pool_module
+from src.platform.isolationEngine.maintenance import EnvironmentMaintenanceService
+from src.platform.isolationEngine.pool import PoolManager
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pool_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _manager() -> PoolManager:
+    return PoolManager(sessions=None, demand_window=100.0)
+
+
+class TestTemplateDemand:
+    def test_unknown_template_has_no_demand(self, clock):
+        manager = _manager()
+
+        assert manager.demand("slack_default").claim_rate == 0
+        assert manager.target_size("slack_default", minimum=2, maximum=50) == 2
+
+    def test_target_follows_recent_claims(self, clock):
+        manager = _manager()
+        for _ in range(10):
+            manager._record_claim("slack_default", hit=True)
+
+        assert manager.target_size("slack_default", minimum=1, maximum=50) == 10
+        assert manager.target_size("slack_default", minimum=1, maximum=4) == 4
+
+        # One window later the burst has decayed to 1/e of its weight.
+        clock[0] += 100
+        assert manager.target_size("slack_default", minimum=1, maximum=50) == 4
+
+    def test_misses_are_counted_separately(self, clock):
+        manager = _manager()
+        manager._record_claim("linear_default", hit=True)
+        manager._record_claim("linear_default", hit=False)
+        clock[0] += 5
+
+        demand = manager.demand("linear_default")
+
+        assert (demand.claims, demand.misses) == (2, 1)
+        assert demand.miss_rate < demand.claim_rate
+        assert demand.updated_at - demand.last_miss_at == 5
+
+
+class TestPoolPriority:
+    def test_templates_with_recent_misses_go_first(self, clock):
+        manager = _manager()
+        for _ in range(20):
+            manager._record_claim("busy", hit=True)
+        manager._record_claim("missed", hit=False)
+        service = EnvironmentMaintenanceService(
+            session_manager=None,
+            environment_handler=None,
+            pool_manager=manager,
+            pool_targets={"idle": 5, "busy": 30, "missed": 5},
+            pool_min_size=1,
+        )
+
+        assert service._templates_by_priority() == ["missed", "busy", "idle"]
+        assert service.pool_target("busy") == 20
+        assert service.pool_target("idle") == 1
+
+    def test_fixed_sizing_uses_configured_targets(self, clock):
+        service = EnvironmentMaintenanceService(
+            session_manager=None,
+            environment_handler=None,
+            pool_manager=_manager(),
+            pool_targets={"slack_default": 7},
+        )
+
+        assert service.pool_target("slack_default") == 7
+
+
+class _FakeSessions:
+    @contextmanager
+    def with_meta_session(self):
+        yield None
+
+
+class _ReadyPool(PoolManager):
+    def __init__(self, ready: int):
+        super().__init__(sessions=None, demand_window=100.0)
+        self.ready = ready
+        self.trimmed: list[int] = []
+
+    def ready_count(self, *, template_schema, session):
+        return self.ready
+
+    def claim_surplus(self, *, template_schema, limit):
+        self.trimmed.append(limit)
+        return []
+
+    def schemas_for_refresh(self, *, template_schema, limit):
+        return []
+
+
+class TestTrimAfterRestart:
+    @pytest.mark.asyncio
+    async def test_warm_pool_is_kept_until_demand_is_observed(self, clock):
+        manager = _ReadyPool(ready=8)
+        service = EnvironmentMaintenanceService(
+            session_manager=_FakeSessions(),
+            environment_handler=None,
+            pool_manager=manager,
+            pool_targets={"slack_default": 10},
+            pool_min_size=1,
+        )
+
+        # Just restarted: no claims seen yet, target is the floor.
+        assert service.pool_target("slack_default") == 1
+        assert not manager.demand_observed()
+        await service._ensure_pool_capacity("slack_default", 1)
+        assert manager.trimmed == []
+
+        clock[0] += 100
+        assert manager.demand_observed()
+        await service._ensure_pool_capacity("slack_default", 1)
+        assert manager.trimmed == [min(7, service.max_concurrent_builds)]
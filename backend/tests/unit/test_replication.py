@@ -1,7 +1,18 @@
-"""Tests for replication JSONB handling."""
+"""Tests for replication JSONB handling and journal buffering."""
+
+import json
+import threading
+from contextlib import contextmanager
+from uuid import uuid4
 
 import pytest
-from src.platform.evaluationEngine.replication import GlobalReplicationWorker
+from src.platform.evaluationEngine import replication
+from src.platform.evaluationEngine.replication import (
+    ActiveRun,
+    ChangeJournalWriter,
+    GlobalReplicationWorker,
+    ReplicationConfig,
+)
 
 
 class TestZipColumns:
@@ -93,3 +104,279 @@ class TestZipColumns:
         result = GlobalReplicationWorker._zip_columns(names, values, types)
         
         assert result["data"] == {"key": "value"}
+
+
+class _RecordingSessions:
+    """Stand-in for SessionManager that records journal inserts."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.batches: list[list[dict]] = []
+
+    @contextmanager
+    def with_meta_session(self):
+        sessions = self
+
+        class _Session:
+            def execute(self, _stmt, rows):
+                if sessions.fail:
+                    raise RuntimeError("database unavailable")
+                sessions.batches.append(list(rows))
+
+        yield _Session()
+
+
+def _write(writer, lsn, table="messages"):
+    writer.write(
+        environment_id=uuid4(),
+        run_id=uuid4(),
+        lsn=lsn,
+        table=table,
+        operation="insert",
+        primary_key={"id": lsn},
+        before=None,
+        after={"id": lsn},
+    )
+
+
+class TestChangeJournalWriter:
+    def test_write_buffers_until_flush(self):
+        sessions = _RecordingSessions()
+        writer = ChangeJournalWriter(sessions, flush_size=10, flush_interval=60)
+        for lsn in ("0/1", "0/2", "0/3"):
+            _write(writer, lsn)
+
+        assert sessions.batches == []
+        assert writer.pending == 3
+        assert not writer.should_flush()
+
+        assert writer.flush() == 3
+        assert len(sessions.batches) == 1
+        assert [row["lsn"] for row in sessions.batches[0]] == ["0/1", "0/2", "0/3"]
+        assert writer.pending == 0
+
+    def test_should_flush_on_size_and_age(self):
+        writer = ChangeJournalWriter(
+            _RecordingSessions(), flush_size=2, flush_interval=60
+        )
+        _write(writer, "0/1")
+        assert not writer.should_flush()
+        _write(writer, "0/2")
+        assert writer.should_flush()
+
+        aged = ChangeJournalWriter(_RecordingSessions(), flush_size=100, flush_interval=0)
+        _write(aged, "0/1")
+        assert aged.should_flush()
+
+    def test_failed_flush_keeps_changes_in_order(self):
+        sessions = _RecordingSessions(fail=True)
+        writer = ChangeJournalWriter(sessions, flush_size=10, flush_interval=60)
+        _write(writer, "0/1")
+        with pytest.raises(RuntimeError):
+            writer.flush()
+        _write(writer, "0/2")
+
+        sessions.fail = False
+        assert writer.flush() == 2
+        assert [row["lsn"] for row in sessions.batches[0]] == ["0/1", "0/2"]
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if params is None:
+            self._rows = [(self.conn.wal_lsn,)]
+            return
+        self.conn.log.append(("peek", params[1]))
+        self._rows = self.conn.slot[: params[1]]
+
+    def fetchone(self):
+        return self._rows[0]
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class _FakeConnection:
+    """Minimal logical slot: peek returns unacknowledged rows, advance drops them."""
+
+    def __init__(self, slot, log, wal_lsn="0/FF"):
+        self.slot = slot
+        self.log = log
+        self.wal_lsn = wal_lsn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def execute(self, sql, params):
+        _, lsn = params
+        self.log.append(("advance", lsn))
+        while self.slot and self.slot[0][0] <= lsn:
+            self.slot.pop(0)
+
+
+def _change(schema, lsn):
+    payload = {
+        "change": [
+            {
+                "kind": "insert",
+                "schema": schema,
+                "table": "messages",
+                "columnnames": ["id"],
+                "columntypes": ["text"],
+                "columnvalues": [lsn],
+            }
+        ]
+    }
+    return (lsn, json.dumps(payload))
+
+
+class TestReplicationAcknowledgement:
+    def _worker(self, monkeypatch, slot, log, *, flush_size):
+        monkeypatch.setattr(
+            replication.psycopg,
+            "connect",
+            lambda *args, **kwargs: _FakeConnection(slot, log),
+        )
+        sessions = _RecordingSessions()
+        writer = ChangeJournalWriter(
+            sessions, flush_size=flush_size, flush_interval=60
+        )
+        run = ActiveRun(environment_id=uuid4(), run_id=uuid4(), schema="state_a")
+        worker = GlobalReplicationWorker(
+            config=ReplicationConfig(dsn="", batch_size=2),
+            writer=writer,
+            active_runs={"state_a": run},
+            runs_lock=threading.Lock(),
+        )
+        return worker, sessions
+
+    def test_slot_advances_only_after_flush(self, monkeypatch):
+        slot = [_change("state_a", f"0/{i}") for i in range(1, 4)]
+        log: list = []
+        worker, sessions = self._worker(monkeypatch, slot, log, flush_size=3)
+
+        assert worker._poll_changes() is True
+        assert sessions.batches == []
+        assert not any(kind == "advance" for kind, _ in log)
+
+        # The second peek skips the two rows already buffered.
+        assert worker._poll_changes() is True
+        assert [row["lsn"] for row in sessions.batches[0]] == ["0/1", "0/2", "0/3"]
+        assert log[-1] == ("advance", "0/3")
+        assert slot == []
+
+    def test_untracked_schemas_are_acknowledged_when_caught_up(self, monkeypatch):
+        slot = [_change("state_other", "0/1")]
+        log: list = []
+        worker, sessions = self._worker(monkeypatch, slot, log, flush_size=10)
+
+        assert worker._poll_changes() is True
+        assert worker._poll_changes() is False
+        assert sessions.batches == []
+        assert log[-1] == ("advance", "0/1")
+
+    def test_wait_for_lsn_after_catching_up(self, monkeypatch):
+        slot = [_change("state_a", "0/1")]
+        log: list = []
+        worker, _ = self._worker(monkeypatch, slot, log, flush_size=10)
+
+        assert not worker.wait_for_lsn("0/FF", timeout=0)
+        worker._poll_changes()
+        # A short batch drains the slot up to the WAL position read first.
+        assert worker._seen_lsn == replication.parse_lsn("0/FF")
+
+
+def test_lsn_round_trip():
+    assert replication.parse_lsn("16/B374D848") == (0x16 << 32) + 0xB374D848
+    assert replication.format_lsn(replication.parse_lsn("16/B374D848")) == "16/B374D848"
+
+
+class _FakeMessage:
+    def __init__(self, lsn, payload):
+        self.data_start = replication.parse_lsn(lsn)
+        self.payload = payload
+
+
+class _FakeReplicationCursor:
+    def __init__(self, messages, worker):
+        self.messages = list(messages)
+        self.worker = worker
+        self.wal_end = 0
+        self.feedback: list[dict] = []
+        self.started_with = None
+
+    def start_replication(self, **kwargs):
+        self.started_with = kwargs
+
+    def read_message(self):
+        if self.messages:
+            msg = self.messages.pop(0)
+            self.wal_end = msg.data_start
+            return msg
+        self.wal_end = replication.parse_lsn("0/FF")
+        self.worker.stop()
+        return None
+
+    def send_feedback(self, **kwargs):
+        self.feedback.append(kwargs)
+
+
+class _FakeReplicationConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.closed = False
+
+    def cursor(self):
+        return self._cursor
+
+    def close(self):
+        self.closed = True
+
+
+class TestStreamingReplicationWorker:
+    def test_routes_stream_and_confirms_after_flush(self):
+        sessions = _RecordingSessions()
+        writer = ChangeJournalWriter(sessions, flush_size=10, flush_interval=60)
+        run = ActiveRun(environment_id=uuid4(), run_id=uuid4(), schema="state_a")
+        worker = replication.StreamingReplicationWorker(
+            config=ReplicationConfig(dsn="", mode="stream"),
+            writer=writer,
+            active_runs={"state_a": run},
+            runs_lock=threading.Lock(),
+        )
+        cursor = _FakeReplicationCursor(
+            [
+                _FakeMessage(*_change("state_a", "0/10")),
+                _FakeMessage(*_change("state_other", "0/20")),
+                _FakeMessage(*_change("state_a", "0/30")),
+            ],
+            worker,
+        )
+        conn = _FakeReplicationConnection(cursor)
+        worker._connect = lambda: conn
+        worker._wait_readable = lambda conn, timeout: None
+
+        worker._stream()
+
+        assert cursor.started_with["slot_name"] == "diffslot_global"
+        assert cursor.started_with["options"]["include-lsn"] == "true"
+        assert [row["lsn"] for row in sessions.batches[0]] == ["0/10", "0/30"]
+        confirmed = [f["flush_lsn"] for f in cursor.feedback if "flush_lsn" in f]
+        assert confirmed[-1] == replication.parse_lsn("0/30")
+        assert worker._seen_lsn == replication.parse_lsn("0/FF")
+        assert conn.closed
@@ -19,7 +19,9 @@ from uuid import uuid4
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
 from src.services.slack.database.base import Base
+from src.services.slack.database import operations as ops
 from src.services.slack.database import schema as slack_schema
 
 # Tables in foreign key dependency order
@@ -46,15 +48,30 @@ def create_tables(conn, schema_name: str):
     _ = slack_schema  # Ensure all models are loaded
     Base.metadata.create_all(conn_with_schema, checkfirst=True)
 
+    # Enable pg_trgm so search.messages' ILIKE filters hit a GIN trigram index
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_messages_message_text_trgm "
+            f"ON {schema_name}.messages USING gin (message_text gin_trgm_ops)"
+        )
+    )
+
 
 def insert_seed_data(conn, schema_name: str, seed_data: dict):
-    """Insert seed data into tables using dynamic SQL.
+    """Insert seed data into tables, one bulk statement per table.
+
+    Messages and reactions go through the Slack bulk write path; the other
+    tables are inserted with executemany, grouped by column set.
 
     Args:
         conn: Database connection
         schema_name: Target schema name
         seed_data: Dict mapping table names to lists of records
     """
+    session = Session(
+        bind=conn.execution_options(schema_translate_map={None: schema_name})
+    )
     for table_name in TABLE_ORDER:
         if table_name not in seed_data:
             continue
@@ -65,11 +82,20 @@ def insert_seed_data(conn, schema_name: str, seed_data: dict):
 
         print(f"  Inserting {len(records)} {table_name}...")
 
+        if table_name == "messages":
+            ops.insert_messages(session, records)
+            continue
+        if table_name == "message_reactions":
+            ops.insert_reactions(session, records)
+            continue
+
+        by_columns: dict[tuple[str, ...], list[dict]] = {}
         for record in records:
-            columns = ", ".join(record.keys())
-            placeholders = ", ".join([f":{k}" for k in record.keys()])
-            sql = f"INSERT INTO {schema_name}.{table_name} ({columns}) VALUES ({placeholders})"
-            conn.execute(text(sql), record)
+            by_columns.setdefault(tuple(record.keys()), []).append(record)
+        for columns, rows in by_columns.items():
+            placeholders = ", ".join([f":{k}" for k in columns])
+            sql = f"INSERT INTO {schema_name}.{table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+            conn.execute(text(sql), rows)
 
 
 def register_public_template(
@@ -9,9 +9,11 @@ from .models import (
     StartRunResponse,
     EndRunRequest,
     EndRunResponse,
+    EvaluateRunsResult,
     DiffRunRequest,
     DiffRunResponse,
     TestResultResponse,
+    RunDiffResponse,
     # Templates
     CreateTemplateFromEnvRequest,
     CreateTemplateFromEnvResponse,
@@ -57,9 +59,11 @@ __all__ = [
     "StartRunResponse",
     "EndRunRequest",
     "EndRunResponse",
+    "EvaluateRunsResult",
     "DiffRunRequest",
     "DiffRunResponse",
     "TestResultResponse",
+    "RunDiffResponse",
     # Templates
     "CreateTemplateFromEnvRequest",
     "CreateTemplateFromEnvResponse",
@@ -1,4 +1,6 @@
+import json
 import os
+from typing import Iterator
 from uuid import UUID
 import requests
 from .models import (
@@ -20,7 +22,9 @@ from .models import (
     StartRunResponse,
     EndRunRequest,
     EndRunResponse,
+    EvaluateRunsResult,
     TestResultResponse,
+    RunDiffResponse,
     DiffRunRequest,
     DiffRunResponse,
     DeleteEnvResponse,
@@ -259,20 +263,61 @@ class AgentDiff:
         return CreateTestSuiteResponse.model_validate(response.json())
 
     def get_results_for_run(
-        self, run_id: str | None = None, **kwargs
+        self, run_id: str | None = None, *, include_diff: bool = False, **kwargs
     ) -> TestResultResponse:
-        """Get results for a run by ID. Pass run_id or runId kwarg."""
+        """Get results for a run by ID. Pass run_id or runId kwarg.
+
+        The response carries per-table diff counts in `diffSummary`; the diff
+        rows are only included with `include_diff=True` (see `get_run_diff`
+        to page through large diffs).
+        """
         rid = run_id or kwargs.get("runId")
         if not rid:
             raise ValueError("run_id or runId required")
         response = requests.get(
             f"{self.base_url}/api/platform/results/{rid}",
+            params={"expand": "diff"} if include_diff else None,
             headers=self._headers(),
             timeout=120,
         )
         response.raise_for_status()
         return TestResultResponse.model_validate(response.json())
 
+    def get_run_diff(
+        self,
+        run_id: str | None = None,
+        *,
+        tables: list[str] | None = None,
+        change_types: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 500,
+        **kwargs,
+    ) -> RunDiffResponse:
+        """Get one page of a run's diff. Pass run_id or runId kwarg.
+
+        Args:
+            tables: Only rows of these tables.
+            change_types: Only these of "inserts", "updates", "deletes".
+            offset: Rows to skip; pass the previous page's `nextOffset`.
+            limit: Rows per page (at most 5000).
+        """
+        rid = run_id or kwargs.get("runId")
+        if not rid:
+            raise ValueError("run_id or runId required")
+        params: dict[str, str | int] = {"offset": offset, "limit": limit}
+        if tables:
+            params["table"] = ",".join(tables)
+        if change_types:
+            params["type"] = ",".join(change_types)
+        response = requests.get(
+            f"{self.base_url}/api/platform/results/{rid}/diff",
+            params=params,
+            headers=self._headers(),
+            timeout=120,
+        )
+        response.raise_for_status()
+        return RunDiffResponse.model_validate(response.json())
+
     def delete_env(self, env_id: str | None = None, **kwargs) -> DeleteEnvResponse:
         """Delete an environment. Pass env_id or envId kwarg."""
         eid = env_id or kwargs.get("envId")
@@ -319,6 +364,29 @@ class AgentDiff:
         response.raise_for_status()
         return EndRunResponse.model_validate(response.json())
 
+    def evaluate_runs(self, run_ids: list[str]) -> Iterator[EvaluateRunsResult]:
+        """Evaluate many runs in one request.
+
+        Runs are evaluated concurrently on the server; results are yielded as
+        each run finishes, so their order does not follow `run_ids`.
+        """
+        response = requests.post(
+            f"{self.base_url}/api/platform/evaluateRuns",
+            json={"runIds": [str(run_id) for run_id in run_ids]},
+            headers=self._headers(),
+            timeout=120,
+            stream=True,
+        )
+        response.raise_for_status()
+
+        def results() -> Iterator[EvaluateRunsResult]:
+            with response:
+                for line in response.iter_lines():
+                    if line:
+                        yield EvaluateRunsResult.model_validate(json.loads(line))
+
+        return results()
+
     def diff_run(
         self, request: DiffRunRequest | None = None, **kwargs
     ) -> DiffRunResponse:
@@ -164,16 +164,33 @@ class EndRunResponse(BaseModel):
     score: Any
 
 
+class EvaluateRunsResult(EndRunResponse):
+    error: Optional[str] = None  # set when the run could not be evaluated
+
+
 class TestResultResponse(BaseModel):
     runId: str
     status: str
     passed: bool
     score: Any
     failures: List[str]
-    diff: Any
+    diffSummary: Any = None
+    diff: Any = None  # only with include_diff=True
     createdAt: datetime
 
 
+class RunDiffResponse(BaseModel):
+    runId: str
+    summary: Any
+    inserts: List[dict[str, Any]]
+    updates: List[dict[str, Any]]
+    deletes: List[dict[str, Any]]
+    offset: int
+    limit: int
+    total: int
+    nextOffset: Optional[int] = None
+
+
 class DiffRunRequest(BaseModel):
     runId: Optional[str] = None
     envId: Optional[str] = None
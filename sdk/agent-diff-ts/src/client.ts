@@ -22,9 +22,12 @@ import type {
   StartRunResponse,
   EndRunRequest,
   EndRunResponse,
+  EvaluateRunsResult,
   DiffRunRequest,
   DiffRunResponse,
   TestResultResponse,
+  RunDiffOptions,
+  RunDiffResponse,
   Visibility,
 } from './types';
 
@@ -278,6 +281,46 @@ export class AgentDiff {
     });
   }
 
+  /**
+   * Evaluate many runs in one request, yielding each result as its run
+   * finishes (not in the order of `runIds`).
+   */
+  async *evaluateRuns(runIds: string[]): AsyncGenerator<EvaluateRunsResult> {
+    const response = await fetch(`${this.baseUrl}/api/platform/evaluateRuns`, {
+      method: 'POST',
+      body: JSON.stringify({ runIds }),
+      headers: this.headers(),
+    });
+
+    if (!response.ok || !response.body) {
+      const error = await response.text();
+      throw new Error(
+        `Request failed: ${response.status} ${response.statusText}\n${error}`
+      );
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      buffered += decoder.decode(value, { stream: !done });
+      const lines = buffered.split('\n');
+      buffered = lines.pop() ?? '';
+      for (const line of lines) {
+        if (line.trim()) {
+          yield JSON.parse(line) as EvaluateRunsResult;
+        }
+      }
+      if (done) {
+        break;
+      }
+    }
+    if (buffered.trim()) {
+      yield JSON.parse(buffered) as EvaluateRunsResult;
+    }
+  }
+
   async diffRun(request: DiffRunRequest): Promise<DiffRunResponse> {
     return this.request<DiffRunResponse>('/api/platform/diffRun', {
       method: 'POST',
@@ -285,9 +328,13 @@ export class AgentDiff {
     });
   }
 
-  async getResultsForRun(runId: string): Promise<TestResultResponse> {
+  async getResultsForRun(
+    runId: string,
+    options?: { includeDiff?: boolean }
+  ): Promise<TestResultResponse> {
+    const query = options?.includeDiff ? '?expand=diff' : '';
     const response = await this.request<any>(
-      `/api/platform/results/${runId}`
+      `/api/platform/results/${runId}${query}`
     );
 
     return {
@@ -295,4 +342,22 @@ export class AgentDiff {
       createdAt: new Date(response.createdAt || response.created_at),
     };
   }
+
+  async getRunDiff(
+    runId: string,
+    options?: RunDiffOptions
+  ): Promise<RunDiffResponse> {
+    const params = new URLSearchParams();
+    params.set('offset', String(options?.offset ?? 0));
+    params.set('limit', String(options?.limit ?? 500));
+    if (options?.tables?.length) {
+      params.set('table', options.tables.join(','));
+    }
+    if (options?.changeTypes?.length) {
+      params.set('type', options.changeTypes.join(','));
+    }
+    return this.request<RunDiffResponse>(
+      `/api/platform/results/${runId}/diff?${params.toString()}`
+    );
+  }
 }
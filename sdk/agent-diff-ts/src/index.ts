@@ -33,11 +33,14 @@ export type {
   StartRunResponse,
   EndRunRequest,
   EndRunResponse,
+  EvaluateRunsResult,
   DiffRunRequest,
   DiffRunResponse,
   DiffResult,
   EvaluationResult,
   TestResultResponse,
+  RunDiffOptions,
+  RunDiffResponse,
   ExecutionResult,
 } from './types';
 
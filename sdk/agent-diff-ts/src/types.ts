@@ -161,6 +161,11 @@ export interface EndRunResponse {
   score: unknown;
 }
 
+export interface EvaluateRunsResult extends EndRunResponse {
+  /** Set when the run could not be evaluated at all. */
+  error?: string | null;
+}
+
 export interface DiffRunRequest {
   runId?: string;
   envId?: string;
@@ -192,10 +197,31 @@ export interface TestResultResponse {
   passed: boolean;
   score: unknown;
   failures: string[];
-  diff: unknown;
+  diffSummary?: unknown;
+  /** Only present when requested with `includeDiff`. */
+  diff?: unknown;
   createdAt: Date;
 }
 
+export interface RunDiffOptions {
+  tables?: string[];
+  changeTypes?: Array<'inserts' | 'updates' | 'deletes'>;
+  offset?: number;
+  limit?: number;
+}
+
+export interface RunDiffResponse {
+  runId: string;
+  summary: unknown;
+  inserts: Array<Record<string, unknown>>;
+  updates: Array<Record<string, unknown>>;
+  deletes: Array<Record<string, unknown>>;
+  offset: number;
+  limit: number;
+  total: number;
+  nextOffset: number | null;
+}
+
 // Code Execution
 
 export interface ExecutionResult {